@@ -0,0 +1,341 @@
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
+                           QPushButton, QSizePolicy)
+from PyQt5.QtCore import Qt, pyqtSignal, QTimer
+from PyQt5.QtGui import QImage, QPixmap
+import bisect
+import queue
+import threading
+import time
+import governor
+import lazyload
+
+PREVIEW_WIDTH = 640       # 预览解码后的宽度
+PREFETCH_FRAMES = 90      # 解码线程最多提前缓存的帧数
+DECODE_BATCH = 12         # 每次申请租约解码的帧数
+TICK_INTERVAL = 5         # 显示定时器间隔（毫秒）
+
+# 解码线程放入队列的结束标记
+SEGMENT_END = 'segment_end'
+PLAYLIST_END = 'playlist_end'
+
+
+class KeyframeIndex:
+    """各素材的关键帧时间表（只读取数据包标志，不解码）"""
+    def __init__(self):
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def keyframes(self, file_path):
+        """返回升序的关键帧时间列表，读取失败时返回空列表
+
+        第一次读取时申请交互租约，不能在持有其他租约时调用。
+        """
+        with self._lock:
+            if file_path in self._cache:
+                return self._cache[file_path]
+        times = []
+        try:
+            output = governor.run_leased(
+                ['ffprobe', '-v', 'error', '-select_streams', 'v:0',
+                 '-show_entries', 'packet=pts_time,flags', '-of', 'csv=p=0', file_path],
+                governor.INTERACTIVE, name="关键帧", capture_output=True, text=True,
+                check=True).stdout
+            for line in output.splitlines():
+                pts, _, flags = line.partition(',')
+                if 'K' in flags and pts not in ('', 'N/A'):
+                    times.append(float(pts))
+            times.sort()
+        except Exception as e:
+            print(f"读取关键帧错误: {str(e)}")
+        with self._lock:
+            self._cache[file_path] = times
+        return times
+
+    def keyframe_before(self, file_path, time_pos):
+        """返回不晚于time_pos的最近关键帧时间，未知时返回None"""
+        times = self.keyframes(file_path)
+        i = bisect.bisect_right(times, time_pos)
+        return times[i - 1] if i > 0 else None
+
+
+class PrefetchDecoder(threading.Thread):
+    """后台解码线程：按顺序解码片段列表，解码进度领先播放进度
+
+    同一素材的下一片段如果与当前位置之间没有关键帧，只向前丢弃帧；
+    否则先定位到片段开始前最近的关键帧，再丢弃到片段开始，避免精确定位时的整段解码。
+    每批 DECODE_BATCH 帧申请一次交互租约，放入队列（可能等待播放）前先释放。
+    """
+    def __init__(self, segments, keyframe_index, frames):
+        super().__init__(daemon=True)
+        self.segments = segments
+        self.keyframe_index = keyframe_index
+        self.frames = frames
+        self.stop_event = threading.Event()
+        self.cv2 = lazyload.cv2()
+        self.cap = None
+        self.cap_path = None
+        self.cap_time = 0.0  # 当前解码位置（秒）
+        self.fps = 25.0
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _put(self, item):
+        """放入队列，停止时放弃"""
+        while not self.stop_event.is_set():
+            try:
+                self.frames.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _open(self, file_path):
+        cv2 = self.cv2
+        if self.cap is not None:
+            self.cap.release()
+        self.cap = cv2.VideoCapture(file_path)
+        self.cap_path = file_path
+        self.cap_time = 0.0
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 25.0
+
+    def _seek(self, file_path, start):
+        """关键帧感知的定位"""
+        cv2 = self.cv2
+        if self.cap_path != file_path:
+            self._open(file_path)
+        keyframe = self.keyframe_index.keyframe_before(file_path, start)
+        # 下一片段在当前位置之后，且中间没有更近的关键帧：直接向前丢帧
+        forward_only = (start >= self.cap_time
+                        and (keyframe is None or keyframe <= self.cap_time))
+        if not forward_only:
+            seek_to = keyframe if keyframe is not None else start
+            self.cap.set(cv2.CAP_PROP_POS_MSEC, seek_to * 1000)
+            self.cap_time = seek_to
+        # 只解包不转换，丢弃到片段开始
+        frame_time = 1.0 / self.fps
+        while self.cap_time + frame_time / 2 < start and not self.stop_event.is_set():
+            if not self.cap.grab():
+                break
+            self.cap_time += frame_time
+
+    def _acquire(self):
+        """申请一批解码的租约，停止时放弃"""
+        while not self.stop_event.is_set():
+            lease = governor.instance().acquire(governor.INTERACTIVE, name="预览", timeout=0.1)
+            if lease is not None:
+                return lease
+        return None
+
+    def _decode(self, count, first, clock):
+        """解码片段中从第 first 帧开始的至多 count 帧，返回队列项列表"""
+        cv2 = self.cv2
+        frame_time = 1.0 / self.fps
+        batch = []
+        for n in range(first, first + count):
+            ok, frame = self.cap.read()
+            if not ok:
+                break
+            self.cap_time += frame_time
+            h, w = frame.shape[:2]
+            if w > PREVIEW_WIDTH:
+                frame = cv2.resize(frame, (PREVIEW_WIDTH, int(h * PREVIEW_WIDTH / w)),
+                                   interpolation=cv2.INTER_AREA)
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            batch.append((clock + n * frame_time, frame, n == 0))
+        return batch
+
+    def run(self):
+        clock = 0.0  # 片段列表内的累计播放时间
+        try:
+            for file_path, start, end in self.segments:
+                if self.stop_event.is_set():
+                    return
+                # 关键帧探测自己申请租约，先读入缓存，定位时不再嵌套申请
+                self.keyframe_index.keyframes(file_path)
+                # 租约只覆盖解码，等待播放时不占槽位，批量导出在解码间隙继续
+                lease = self._acquire()
+                if lease is None:
+                    return
+                with lease:
+                    self._seek(file_path, start)
+                count = int(round((end - start) * self.fps))
+                n = 0
+                while n < count:
+                    lease = self._acquire()
+                    if lease is None:
+                        return
+                    with lease:
+                        batch = self._decode(min(DECODE_BATCH, count - n), n, clock)
+                    for item in batch:
+                        if not self._put(item):
+                            return
+                    if len(batch) < min(DECODE_BATCH, count - n):
+                        break  # 素材提前结束
+                    n += len(batch)
+                clock += end - start
+                if not self._put(SEGMENT_END):
+                    return
+            self._put(PLAYLIST_END)
+        finally:
+            if self.cap is not None:
+                self.cap.release()
+
+
+class VideoPlayer(QWidget):
+    """剪辑片段预览播放器：按顺序无缝播放片段列表"""
+    metrics_updated = pyqtSignal(dict)  # 播放指标
+    playback_finished = pyqtSignal()  # 播完或被停止
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.keyframe_index = KeyframeIndex()
+        self.proxy_cache = None  # 设置后优先播放代理素材
+        self.decoder = None
+        self.frames = None
+        self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.setInterval(TICK_INTERVAL)
+        self.timer.timeout.connect(self._tick)
+        self.pending_frame = None
+        self.reset_metrics()
+        self.initUI()
+
+    def initUI(self):
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(5)
+
+        # 画面
+        self.screen = QLabel()
+        self.screen.setAlignment(Qt.AlignCenter)
+        self.screen.setMinimumSize(320, 180)
+        self.screen.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.screen.setStyleSheet("background-color: black;")
+        layout.addWidget(self.screen)
+
+        # 控制与指标
+        controls = QHBoxLayout()
+        self.stop_btn = QPushButton("停止")
+        self.stop_btn.clicked.connect(self.stop)
+        controls.addWidget(self.stop_btn)
+        self.metrics_label = QLabel("首帧延迟: -- ms  丢帧: 0")
+        controls.addWidget(self.metrics_label)
+        controls.addStretch()
+        layout.addLayout(controls)
+
+    def reset_metrics(self):
+        """重置播放指标"""
+        self.metrics = {
+            'first_frame_latency': None,  # 从开始播放到显示第一帧（秒）
+            'max_transition_delay': 0.0,  # 片段切换处第一帧的最大延迟（秒）
+            'dropped_frames': 0,          # 因显示来不及而跳过的帧
+            'stall_time': 0.0,            # 解码跟不上导致的卡顿总时长（秒）
+            'frames_shown': 0,
+        }
+
+    def play_segment(self, file_path, start_time, end_time):
+        """播放单个片段"""
+        self.play_segments([(file_path, start_time, end_time)])
+
+    def play_segments(self, segments):
+        """按顺序播放片段列表，segments 可以是 SegmentView 或 (文件, 开始, 结束) 列表"""
+        self.stop()
+        resolve = self.proxy_cache.resolve if self.proxy_cache is not None else (lambda path: path)
+        segments = [(resolve(path), start, end) for path, start, end in segments if path]
+        if not segments:
+            return
+        self.reset_metrics()
+        self.frames = queue.Queue(maxsize=PREFETCH_FRAMES)
+        self.decoder = PrefetchDecoder(segments, self.keyframe_index, self.frames)
+        self.play_started = time.perf_counter()
+        self.clock_start = None  # 第一帧显示时开始计时
+        self.pending_frame = None
+        self.decoder.start()
+        self.timer.start()
+
+    def stop(self):
+        """停止播放，正在播放时发出 playback_finished"""
+        playing = self.decoder is not None
+        self.timer.stop()
+        if self.decoder is not None:
+            self.decoder.stop()
+            self.decoder = None
+        self.frames = None
+        self.pending_frame = None
+        if playing:
+            self.playback_finished.emit()
+
+    def _next_item(self):
+        """取出下一帧（跳过片段结束标记），没有可用帧时返回None"""
+        if self.pending_frame is not None:
+            item, self.pending_frame = self.pending_frame, None
+            return item
+        while True:
+            try:
+                item = self.frames.get_nowait()
+            except queue.Empty:
+                return None
+            if item != SEGMENT_END:
+                return item
+
+    def _tick(self):
+        """按播放时钟显示帧"""
+        now = time.perf_counter()
+        item = self._next_item()
+        if item is None:
+            # 解码跟不上：顺延播放时钟，避免之后连续丢帧
+            if self.clock_start is not None:
+                self.metrics['stall_time'] += TICK_INTERVAL / 1000
+                self.clock_start += TICK_INTERVAL / 1000
+            return
+        if item == PLAYLIST_END:
+            self._finish()
+            return
+
+        if self.clock_start is None:
+            self.clock_start = now
+            self.metrics['first_frame_latency'] = now - self.play_started
+        clock = now - self.clock_start
+
+        pts, frame, segment_first = item
+        if pts > clock:
+            # 还没到显示时间
+            self.pending_frame = item
+            return
+        # 已经过时的帧跳过，只显示最新一帧
+        while True:
+            following = self._next_item()
+            if following is None or following == PLAYLIST_END or following[0] > clock:
+                self.pending_frame = following
+                break
+            self.metrics['dropped_frames'] += 1
+            pts, frame, first = following
+            segment_first = segment_first or first
+        if segment_first:
+            self.metrics['max_transition_delay'] = max(
+                self.metrics['max_transition_delay'], clock - pts)
+        self._show(frame)
+
+    def _show(self, frame):
+        h, w = frame.shape[:2]
+        img = QImage(frame.data, w, h, w * 3, QImage.Format_RGB888)
+        pixmap = QPixmap.fromImage(img).scaled(
+            self.screen.size(), Qt.KeepAspectRatio, Qt.FastTransformation)
+        self.screen.setPixmap(pixmap)
+        self.metrics['frames_shown'] += 1
+        if self.metrics['frames_shown'] % 25 == 1:
+            self._report()
+
+    def _report(self):
+        latency = self.metrics['first_frame_latency']
+        latency_text = f"{latency * 1000:.0f}" if latency is not None else "--"
+        self.metrics_label.setText(
+            f"首帧延迟: {latency_text} ms  丢帧: {self.metrics['dropped_frames']}  "
+            f"卡顿: {self.metrics['stall_time'] * 1000:.0f} ms  "
+            f"切换延迟: {self.metrics['max_transition_delay'] * 1000:.0f} ms")
+        self.metrics_updated.emit(dict(self.metrics))
+
+    def _finish(self):
+        self._report()
+        self.stop()
@@ -1,463 +1,908 @@
-from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
-                           QSlider, QSizePolicy, QFrame, QLineEdit, QMessageBox, QPushButton)
-from PyQt5.QtCore import Qt, pyqtSignal, QRectF, QRect, QMargins
-from PyQt5.QtGui import (QDoubleValidator, QPainter, QPen, QColor, QPainterPath,
-                        QLinearGradient)
-from PyQt5.QtChart import QChart, QChartView, QLineSeries, QValueAxis
-import numpy as np
-import librosa
-import os
-import warnings
-
-# 过滤警告
-warnings.filterwarnings('ignore', category=UserWarning)
-warnings.filterwarnings('ignore', category=FutureWarning)
-
-# 设置librosa的缓存
-os.environ['LIBROSA_CACHE_DIR'] = 'tmp_cache'
-os.makedirs('tmp_cache', exist_ok=True)
-
-class WaveformWidget(QWidget):
-    """音频波形图表组件"""
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
-        self.setMinimumHeight(150)
-        self.audio_data = None
-        self.min_db = -60
-        self.max_db = 0
-        self.threshold = -40  # 添加阈值属性
-        self.selected_min = -60
-        self.selected_max = 0
-        
-        # 添加图表
-        self.chart = QChart()
-        self.chart.setMargins(QMargins(0, 0, 0, 0))
-        self.chart.setBackgroundVisible(False)
-        
-        # 创建图表视图
-        self.chart_view = QChartView(self.chart)
-        self.chart_view.setRenderHint(QPainter.Antialiasing)
-        
-        # 创建布局
-        layout = QVBoxLayout(self)
-        layout.setContentsMargins(0, 0, 0, 0)
-        layout.addWidget(self.chart_view)
-    
-    def set_selected_range(self, min_val, max_val):
-        """设置选择范围"""
-        self.selected_min = float(min_val)
-        self.selected_max = float(max_val)
-        self.update_chart()
-    
-    def set_data(self, data, min_db, max_db):
-        """设置音频数据并更新显示"""
-        self.audio_data = data
-        self.min_db = float(min_db)
-        self.max_db = float(max_db)
-        self.update_chart()
-    
-    def set_threshold(self, value):
-        """设置阈值"""
-        self.threshold = value
-        self.update_chart()
-    
-    def _setup_axes(self, data_length, y, sr):
-        """设置坐标轴"""
-        # 创建X轴
-        axis_x = QValueAxis()
-        axis_x.setRange(0, data_length)
-        duration = len(y) / sr
-        axis_x.setLabelFormat("%.1f")
-        axis_x.setTitleText(f"时间 (总长: {duration:.1f}s)")
-        
-        # 创建Y轴
-        axis_y = QValueAxis()
-        axis_y.setRange(0, 100)
-        axis_y.setLabelFormat("%d")
-        axis_y.setTitleText("电平 (dB)")
-        
-        # 设置轴
-        for series in self.chart.series():
-            self.chart.setAxisX(axis_x, series)
-            self.chart.setAxisY(axis_y, series)
-        
-        # 添加选择范围
-        self._add_range_lines(data_length, axis_x, axis_y)
-
-    def update_chart(self):
-        """更新图表显示"""
-        self.chart.removeAllSeries()
-        
-        if self.audio_data is None or 'waveform' not in self.audio_data:
-            return
-            
-        # 创建波形系列
-        series = QLineSeries()
-        series.setName("音频电平")
-        
-        # 使用原始波形计算RMS能量
-        y = self.audio_data['waveform']
-        frame_length = 2048
-        hop_length = 512
-        
-        # 计算RMS能量
-        rms = librosa.feature.rms(y=y, frame_length=frame_length, hop_length=hop_length)[0]
-        db_values = librosa.amplitude_to_db(rms, ref=np.max)
-        
-        # 重采样以适应显示
-        target_points = 1000
-        if len(db_values) > target_points:
-            indices = np.linspace(0, len(db_values)-1, target_points, dtype=int)
-            db_values = db_values[indices]
-        
-        # 添加数据点
-        for i, value in enumerate(db_values):
-            normalized_value = (value - self.min_db) / (self.max_db - self.min_db)
-            normalized_value = max(0, min(1, normalized_value))
-            series.append(i, normalized_value * 100)
-        
-        self.chart.addSeries(series)
-        
-        # 添加阈值线
-        threshold_series = QLineSeries()
-        normalized_threshold = (self.threshold - self.min_db) / (self.max_db - self.min_db)
-        normalized_threshold = max(0, min(1, normalized_threshold)) * 100
-        threshold_series.append(0, normalized_threshold)
-        threshold_series.append(len(db_values), normalized_threshold)
-        threshold_series.setPen(QPen(QColor(255, 0, 0, 128), 2, Qt.DashLine))
-        self.chart.addSeries(threshold_series)
-        
-        # 设置坐标轴
-        self._setup_axes(len(db_values), y, self.audio_data['sr'])
-
-    def _add_range_lines(self, data_length, axis_x, axis_y):
-        """添加选择范围线"""
-        # 下边界线
-        lower_series = QLineSeries()
-        normalized_min = (self.selected_min - self.min_db) / (self.max_db - self.min_db)
-        normalized_min = max(0, min(1, normalized_min)) * 100
-        lower_series.append(0, normalized_min)
-        lower_series.append(data_length, normalized_min)
-        lower_series.setPen(QPen(QColor(0, 255, 0, 128), 2, Qt.DashLine))
-        self.chart.addSeries(lower_series)
-        lower_series.attachAxis(axis_x)
-        lower_series.attachAxis(axis_y)
-        
-        # 上边界线
-        upper_series = QLineSeries()
-        normalized_max = (self.selected_max - self.min_db) / (self.max_db - self.min_db)
-        normalized_max = max(0, min(1, normalized_max)) * 100
-        upper_series.append(0, normalized_max)
-        upper_series.append(data_length, normalized_max)
-        upper_series.setPen(QPen(QColor(0, 255, 0, 128), 2, Qt.DashLine))
-        self.chart.addSeries(upper_series)
-        upper_series.attachAxis(axis_x)
-        upper_series.attachAxis(axis_y)
-
-class AudioReader(QWidget):
-    audio_analyzed = pyqtSignal(dict)
-    silence_detected = pyqtSignal(float, float)  # 添加静音检测信号
-    
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
-        self.audio_data = None
-        self.current_file = None
-        self.silence_threshold = -40  # 默认静音阈值
-        self.min_db = -60  # 添加默认最小分贝值
-        self.max_db = 0    # 添加默认最大分贝值
-        self.initUI()
-    
-    def initUI(self):
-        layout = QVBoxLayout(self)
-        layout.setContentsMargins(5, 5, 5, 5)
-        
-        # 添加阈值输入框
-        threshold_layout = QHBoxLayout()
-        threshold_layout.addWidget(QLabel("静音阈值:"))
-        self.threshold_input = QLineEdit("-40")
-        self.threshold_input.setValidator(QDoubleValidator(-100, 0, 1))
-        self.threshold_input.textChanged.connect(self.threshold_changed)
-        threshold_layout.addWidget(self.threshold_input)
-        layout.addLayout(threshold_layout)
-        
-        # 1. 文件信息区
-        file_info = QFrame()
-        file_info.setFrameStyle(QFrame.StyledPanel)
-        file_info_layout = QVBoxLayout(file_info)
-        
-        self.file_label = QLabel("当前文件：未选择")
-        self.duration_label = QLabel("时长：--:--")
-        file_info_layout.addWidget(self.file_label)
-        file_info_layout.addWidget(self.duration_label)
-        
-        layout.addWidget(file_info)
-        
-        # 2. 音频统计信息
-        stats_info = QFrame()
-        stats_info.setFrameStyle(QFrame.StyledPanel)
-        stats_layout = QVBoxLayout(stats_info)
-        
-        self.level_label = QLabel("音频电平范围：等待分析...")
-        self.silence_stats_label = QLabel("静音统计：等待分析...")
-        stats_layout.addWidget(self.level_label)
-        stats_layout.addWidget(self.silence_stats_label)
-        
-        layout.addWidget(stats_info)
-        
-        # 3. 波形图
-        self.waveform = WaveformWidget()
-        layout.addWidget(self.waveform)
-        
-        # 4. 控制区域
-        controls = QFrame()
-        controls.setFrameStyle(QFrame.StyledPanel)
-        controls_layout = QHBoxLayout(controls)
-        
-        # 电平控制
-        level_group = QWidget()
-        level_layout = QHBoxLayout(level_group)
-        
-        # 最小电平
-        min_layout = QHBoxLayout()
-        min_layout.addWidget(QLabel("最小电平:"))
-        self.min_input = QLineEdit("-60")
-        self.min_input.setValidator(QDoubleValidator(-100, 0, 1))
-        self.min_input.setFixedWidth(60)
-        min_layout.addWidget(self.min_input)
-        min_layout.addWidget(QLabel("dB"))
-        level_layout.addLayout(min_layout)
-        
-        level_layout.addSpacing(20)
-        
-        # 最大电平
-        max_layout = QHBoxLayout()
-        max_layout.addWidget(QLabel("最大电平:"))
-        self.max_input = QLineEdit("0")
-        self.max_input.setValidator(QDoubleValidator(-100, 0, 1))
-        self.max_input.setFixedWidth(60)
-        max_layout.addWidget(self.max_input)
-        max_layout.addWidget(QLabel("dB"))
-        level_layout.addLayout(max_layout)
-        
-        controls_layout.addWidget(level_group)
-        
-        # 添加自动检测按钮
-        detect_btn = QPushButton("检测静音")
-        detect_btn.clicked.connect(self.detect_silence)
-        controls_layout.addWidget(detect_btn)
-        
-        layout.addWidget(controls)
-        
-        # 设置样式
-        self.setStyleSheet("""
-            QFrame {
-                background-color: white;
-                border: 1px solid #ccc;
-                border-radius: 4px;
-            }
-            QLabel {
-                padding: 2px;
-            }
-            QLineEdit {
-                padding: 3px;
-                border: 1px solid #ccc;
-                border-radius: 2px;
-            }
-            QPushButton {
-                padding: 5px 15px;
-                background-color: #2196F3;
-                color: white;
-                border: none;
-                border-radius: 3px;
-            }
-            QPushButton:hover {
-                background-color: #1976D2;
-            }
-        """)
-        
-        # 连接信号
-        self.min_input.textChanged.connect(self.range_value_changed)
-        self.max_input.textChanged.connect(self.range_value_changed)
-
-    def detect_silence(self):
-        """检测静音段落"""
-        if not self.audio_data or 'waveform' not in self.audio_data:
-            return
-            
-        try:
-            y = self.audio_data['waveform']
-            sr = self.audio_data['sr']
-            
-            # 使用更小的分析窗口
-            frame_length = 1024
-            hop_length = 256
-            rms = librosa.feature.rms(y=y, frame_length=frame_length, hop_length=hop_length)[0]
-            db_values = librosa.amplitude_to_db(rms, ref=np.max)
-            
-            # 计算更精确的静音统计
-            silence_threshold = float(self.threshold_input.text() or "-40")
-            silence_mask = db_values < silence_threshold
-            
-            # 计算连续静音段
-            silence_runs = []
-            run_start = None
-            
-            for i, is_silence in enumerate(silence_mask):
-                if is_silence:
-                    if run_start is None:
-                        run_start = i
-                elif run_start is not None:
-                    silence_runs.append((run_start, i))
-                    run_start = None
-            
-            # 计算静音统计
-            total_frames = len(db_values)
-            silence_ratio = np.mean(silence_mask)
-            total_duration = len(y) / sr
-            silence_duration = silence_ratio * total_duration
-            
-            # 更新显示
-            stats_text = (
-                f"静音统计：\n"
-                f"静音比例: {silence_ratio:.1%}\n"
-                f"静音总时长: {silence_duration:.3f}秒\n"
-                f"最长静音: {max([end-start for start, end in silence_runs], default=0) / (sr/hop_length):.3f}秒\n"
-                f"建议阈值: {np.percentile(db_values, 10):.1f} dB"
-            )
-            self.silence_stats_label.setText(stats_text)
-            
-            # 发送检测结果
-            suggested_min = np.percentile(db_values, 10)
-            suggested_max = np.percentile(db_values, 90)
-            self.silence_detected.emit(suggested_min, suggested_max)
-            
-        except Exception as e:
-            print(f"静音检测错误: {str(e)}")
-
-    def analyze_audio(self, file_path):
-        """分析音频文件"""
-        try:
-            self.current_file = file_path
-            y, sr = librosa.load(file_path, sr=44100)
-            
-            # 计算音频特征
-            duration = len(y) / sr
-            rms = librosa.feature.rms(y=y)[0]
-            db_values = librosa.amplitude_to_db(rms, ref=np.max)
-            
-            # 计算统计值
-            min_db = float(np.percentile(db_values, 1))
-            max_db = float(np.percentile(db_values, 99))
-            mean_db = float(np.mean(db_values))
-            
-            # 保存分析结果
-            self.audio_data = {
-                'waveform': y,
-                'sr': sr,
-                'duration': duration,
-                'min_db': min_db,
-                'max_db': max_db,
-                'mean_db': mean_db,
-                'db_values': db_values
-            }
-            
-            # 更新类属性
-            self.min_db = min_db
-            self.max_db = max_db
-            
-            # 更新显示
-            self.update_display()
-            
-            # 返回分析结果
-            return self.audio_data
-            
-        except Exception as e:
-            print(f"音频分析错误: {str(e)}")
-            return None
-    
-    def update_display(self):
-        """更新显示的音频值"""
-        if hasattr(self, 'audio_data') and self.audio_data:
-            try:
-                # 更新文件名
-                if self.current_file:
-                    self.file_label.setText(f"当前文件：{os.path.basename(self.current_file)}")
-                else:
-                    self.file_label.setText("当前文件：未选择")
-                
-                # 更新电平范围
-                level_text = (
-                    f"音频电平范围：{self.audio_data['min_db']:.1f} dB 至 "
-                    f"{self.audio_data['max_db']:.1f} dB"
-                )
-                self.level_label.setText(level_text)
-                
-                # 更新波形图
-                self.waveform.set_data(self.audio_data, self.min_db, self.max_db)
-                
-            except KeyError as e:
-                self.level_label.setText(f"音频电平范围：数据不完整 (缺少 {str(e)})")
-        else:
-            self.file_label.setText("当前文件：未选择")
-            self.level_label.setText("音频电平范围：等待分析...")
-    
-    def clear_display(self):
-        """清除显示"""
-        self.file_label.setText("当前文件：未选择")
-        self.level_label.setText("音频电平范围：等待分析...")
-        self.current_file = None
-        self.audio_data = None
-        self.waveform.set_data(None, -60, 0)
-    
-    def range_value_changed(self):
-        """输入框值变化处理"""
-        try:
-            min_val = float(self.min_input.text() or "-60")
-            max_val = float(self.max_input.text() or "0")
-            
-            # 确保最小值不大于最大值
-            if min_val > max_val:
-                if self.sender() == self.min_input:
-                    min_val = max_val
-                    self.min_input.setText(f"{min_val}")
-                else:
-                    max_val = min_val
-                    self.max_input.setText(f"{max_val}")
-            
-            # 更新波形图的选中范围
-            self.waveform.set_selected_range(min_val, max_val)
-            
-            # 保存当前值作为实例变量
-            self.min_db = min_val
-            self.max_db = max_val
-            
-        except ValueError:
-            pass
-    
-    def threshold_changed(self):
-        """阈值改变时更新显示"""
-        try:
-            threshold = float(self.threshold_input.text() or "-40")
-            self.silence_threshold = threshold  # 更新类属性
-            if hasattr(self, 'waveform') and self.audio_data:
-                self.waveform.set_threshold(threshold)
-                self.detect_silence()  # 重新检测静音
-        except ValueError:
-            pass
-
-    def auto_cut(self, audio_data):
-        """执行自动剪辑"""
-        # 获取音频数据
-        y = audio_data['waveform']  # 原始波形
-        sr = audio_data['sr']       # 采样率
-        selected_range = audio_data['selected_range']  # 用户选择的阈值范围
-        min_db = selected_range[0]  # 最小分贝值
-        max_db = selected_range[1]  # 最大分贝值
-        
-        # 计算RMS能量
-        frame_length = 2048   # 帧长度，影响精度
-        hop_length = 512      # 帧移动步长，影响精度
-        rms = librosa.feature.rms(y=y, frame_length=frame_length, hop_length=hop_length)[0]
-        db_values = librosa.amplitude_to_db(rms, ref=np.max)  # 转换为分贝值
\ No newline at end of file
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
+                           QSlider, QSizePolicy, QFrame, QLineEdit, QMessageBox, QPushButton,
+                           QComboBox, QCheckBox, QApplication)
+from PyQt5.QtCore import Qt, pyqtSignal, QRectF, QRect, QMargins, QPointF, QTimer
+from PyQt5.QtGui import (QDoubleValidator, QPainter, QPen, QColor, QPainterPath,
+                        QLinearGradient)
+import numpy as np
+import os
+import subprocess
+import threading
+import time
+import warnings
+import lazyload
+import pcmstore
+import envelope
+import silencedetect
+import loudness
+import spectrogram
+import governor
+from levelstats import DbHistogram
+from tailfollow import TailFollower
+
+# 过滤警告
+warnings.filterwarnings('ignore', category=UserWarning)
+warnings.filterwarnings('ignore', category=FutureWarning)
+
+DECODE_BLOCK = 1 << 16  # 流式解码时每次读取的采样点数
+
+class WaveformWidget(QWidget):
+    """音频波形图表组件
+
+    多声道素材默认分声道显示：每个声道一条泳道，各自画出阈值线与电平范围线。
+    """
+    LANE_COLORS = [QColor(33, 150, 243), QColor(76, 175, 80), QColor(255, 152, 0),
+                   QColor(156, 39, 176), QColor(0, 150, 136), QColor(233, 30, 99)]
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
+        self.setMinimumHeight(150)
+        self.audio_data = None
+        self.min_db = -60
+        self.max_db = 0
+        self.threshold = -40  # 添加阈值属性
+        self.selected_min = -60
+        self.selected_max = 0
+        self.display_db = None  # 降采样后用于显示的电平 (泳道数, 点数)
+        self.lanes = True  # 多声道时分声道显示
+        self.segment_starts = np.zeros(0)  # 剪辑片段叠加层（秒）
+        self.segment_ends = np.zeros(0)
+        
+        # 图表在第一次有数据时才创建（QtChart导入较慢）
+        self.chart = None
+        self.chart_view = None
+        self.range_lines = []  # 每条泳道的 (泳道, 下边界线, 上边界线)
+        self.segment_series = None
+        
+        # 创建布局
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+    
+    def _ensure_chart(self):
+        """创建图表及图表视图"""
+        if self.chart is not None:
+            return
+        QtChart = lazyload.qtchart()
+        
+        # 添加图表
+        self.chart = QtChart.QChart()
+        self.chart.setMargins(QMargins(0, 0, 0, 0))
+        self.chart.setBackgroundVisible(False)
+        
+        # 创建图表视图
+        self.chart_view = QtChart.QChartView(self.chart)
+        self.chart_view.setRenderHint(QPainter.Antialiasing)
+        self.layout().addWidget(self.chart_view)
+    
+    def set_selected_range(self, min_val, max_val):
+        """设置选择范围"""
+        self.selected_min = float(min_val)
+        self.selected_max = float(max_val)
+        if self.range_lines:
+            # 只移动范围线，不重建图表
+            for lane, lower_series, upper_series in self.range_lines:
+                lower_series.replace(self._hline(self.selected_min, lane))
+                upper_series.replace(self._hline(self.selected_max, lane))
+        else:
+            self.update_chart()
+    
+    def set_data(self, data, min_db, max_db):
+        """设置音频数据并更新显示"""
+        self.audio_data = data
+        self.min_db = float(min_db)
+        self.max_db = float(max_db)
+        self.display_db = None
+        self.update_chart()
+    
+    def set_lanes(self, enabled):
+        """设置多声道素材是否分声道显示"""
+        self.lanes = bool(enabled)
+        self.display_db = None
+        self.update_chart()
+    
+    def set_segments(self, starts, ends):
+        """设置剪辑片段叠加层（秒）"""
+        self.segment_starts = np.asarray(starts, dtype=np.float64)
+        self.segment_ends = np.asarray(ends, dtype=np.float64)
+        if self.segment_series is not None:
+            self.segment_series.replace(self._segment_points())
+    
+    def _normalize(self, db, lane=0):
+        """把分贝值换算为图表纵坐标(0-100)，多条泳道时换算到该泳道的高度内（第一条在最上面）"""
+        span = (self.max_db - self.min_db) or 1.0
+        lanes = len(self.display_db) if self.display_db is not None else 1
+        value = np.clip((np.asarray(db, dtype=np.float64) - self.min_db) / span, 0, 1)
+        return (lanes - 1 - lane + value) * 100 / lanes
+    
+    def _hline(self, db, lane=0):
+        """横跨整个图表的水平线"""
+        value = float(self._normalize(db, lane))
+        return [QPointF(0, value), QPointF(self.display_db.shape[1], value)]
+    
+    def _segment_points(self):
+        """片段叠加层：在图表底部画出方波"""
+        duration = self.audio_data['duration'] if self.audio_data else 0
+        if self.display_db is None or not duration or len(self.segment_starts) == 0:
+            return []
+        scale = self.display_db.shape[1] / duration
+        x0 = self.segment_starts * scale
+        x1 = self.segment_ends * scale
+        height = 5.0
+        xs = np.stack([x0, x0, x1, x1], axis=1).ravel()
+        ys = np.tile([0.0, height, height, 0.0], len(x0))
+        return [QPointF(x, y) for x, y in zip(xs.tolist(), ys.tolist())]
+    
+    def _compute_display_db(self):
+        """计算显示用的电平（每组数据只计算一次）
+
+        返回 (泳道数, 点数)：分声道显示时每个声道一行，否则只有混合声道一行。
+        """
+        channel_db = self.audio_data.get('channel_db')
+        if self.lanes and channel_db is not None:
+            db_values = np.asarray(channel_db)
+        else:
+            db_values = self.audio_data.get('db_values')
+            if db_values is None:
+                db_values = envelope.rms_db(self.audio_data['waveform'], 2048, 512)
+            db_values = np.asarray(db_values)[None, :]
+        
+        # 重采样以适应显示
+        target_points = 1000
+        if db_values.shape[1] > target_points:
+            indices = np.linspace(0, db_values.shape[1]-1, target_points, dtype=int)
+            db_values = db_values[:, indices]
+        return db_values
+    
+    def set_threshold(self, value):
+        """设置阈值"""
+        self.threshold = value
+        self.update_chart()
+    
+    def _setup_axes(self, data_length, y, sr):
+        """设置坐标轴"""
+        QtChart = lazyload.qtchart()
+        
+        # 创建X轴
+        axis_x = QtChart.QValueAxis()
+        axis_x.setRange(0, data_length)
+        duration = len(y) / sr
+        axis_x.setLabelFormat("%.1f")
+        axis_x.setTitleText(f"时间 (总长: {duration:.1f}s)")
+        
+        # 创建Y轴
+        axis_y = QtChart.QValueAxis()
+        axis_y.setRange(0, 100)
+        axis_y.setLabelFormat("%d")
+        axis_y.setTitleText("电平 (dB)")
+        
+        # 设置轴
+        for series in self.chart.series():
+            self.chart.setAxisX(axis_x, series)
+            self.chart.setAxisY(axis_y, series)
+        
+        # 添加选择范围
+        self._add_range_lines(data_length, axis_x, axis_y)
+
+    def update_chart(self):
+        """更新图表显示"""
+        if self.audio_data is None or 'waveform' not in self.audio_data:
+            if self.chart is not None:
+                self.chart.removeAllSeries()
+            self.range_lines = []
+            self.segment_series = None
+            return
+        
+        self._ensure_chart()
+        self.chart.removeAllSeries()
+        QtChart = lazyload.qtchart()
+        if self.display_db is None:
+            self.display_db = self._compute_display_db()
+        db_values = self.display_db
+        lanes = len(db_values)
+            
+        for lane in range(lanes):
+            # 创建波形系列
+            series = QtChart.QLineSeries()
+            series.setName(f"声道 {lane + 1}" if lanes > 1 else "音频电平")
+            if lanes > 1:
+                series.setPen(QPen(self.LANE_COLORS[lane % len(self.LANE_COLORS)], 1))
+            
+            # 添加数据点
+            normalized = self._normalize(db_values[lane], lane)
+            series.replace([QPointF(i, value) for i, value in enumerate(normalized.tolist())])
+            
+            self.chart.addSeries(series)
+            
+            # 添加阈值线
+            threshold_series = QtChart.QLineSeries()
+            threshold_series.replace(self._hline(self.threshold, lane))
+            threshold_series.setPen(QPen(QColor(255, 0, 0, 128), 2, Qt.DashLine))
+            self.chart.addSeries(threshold_series)
+        
+        # 添加片段叠加层
+        self.segment_series = QtChart.QLineSeries()
+        self.segment_series.setName("剪辑片段")
+        self.segment_series.setPen(QPen(QColor(33, 150, 243), 2))
+        self.segment_series.replace(self._segment_points())
+        self.chart.addSeries(self.segment_series)
+        
+        # 设置坐标轴
+        self._setup_axes(db_values.shape[1], self.audio_data['waveform'], self.audio_data['sr'])
+
+    def _add_range_lines(self, data_length, axis_x, axis_y):
+        """添加选择范围线（每条泳道各一对）"""
+        QtChart = lazyload.qtchart()
+        self.range_lines = []
+        
+        for lane in range(len(self.display_db)):
+            # 下边界线
+            lower_series = QtChart.QLineSeries()
+            lower_series.replace(self._hline(self.selected_min, lane))
+            lower_series.setPen(QPen(QColor(0, 255, 0, 128), 2, Qt.DashLine))
+            self.chart.addSeries(lower_series)
+            lower_series.attachAxis(axis_x)
+            lower_series.attachAxis(axis_y)
+            
+            # 上边界线
+            upper_series = QtChart.QLineSeries()
+            upper_series.replace(self._hline(self.selected_max, lane))
+            upper_series.setPen(QPen(QColor(0, 255, 0, 128), 2, Qt.DashLine))
+            self.chart.addSeries(upper_series)
+            upper_series.attachAxis(axis_x)
+            upper_series.attachAxis(axis_y)
+            
+            self.range_lines.append((lane, lower_series, upper_series))
+
+class SpectrogramWidget(QWidget):
+    """频谱图：只计算可见范围与当前缩放级别的图块
+
+    滚轮以鼠标位置为中心缩放，拖动平移，双击显示全部。
+    """
+    ZOOM_STEP = 1.25
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
+        self.setMinimumHeight(120)
+        self.tiles = spectrogram.SpectrogramTiles(parent=self)
+        self.tiles.tile_ready.connect(lambda level, index: self.update())
+        self.view_start = 0.0    # 可见范围起点（秒）
+        self.view_seconds = 0.0  # 可见范围时长（秒）
+        self.segment_starts = np.zeros(0)
+        self.segment_ends = np.zeros(0)
+        self._drag_x = None
+    
+    def set_data(self, data):
+        """设置音频分析结果（None 表示清空），显示全部时长"""
+        if data is not None and data.get('waveform') is self.tiles.y:
+            return  # 同一段音频，保留缓存与可见范围
+        if data is None or 'waveform' not in data:
+            self.tiles.set_source(None, None)
+        else:
+            self.tiles.set_source(data['waveform'], data['sr'])
+        self.view_start = 0.0
+        self.view_seconds = self.tiles.duration
+        self.update()
+    
+    def set_segments(self, starts, ends):
+        """设置剪辑片段叠加层（秒）"""
+        self.segment_starts = np.asarray(starts, dtype=np.float64)
+        self.segment_ends = np.asarray(ends, dtype=np.float64)
+        self.update()
+    
+    def _clamp_view(self):
+        duration = self.tiles.duration
+        shortest = self.width() * spectrogram.seconds_per_column(0, self.tiles.sr)
+        self.view_seconds = min(max(self.view_seconds, min(shortest, duration)), duration)
+        self.view_start = min(max(self.view_start, 0.0), duration - self.view_seconds)
+    
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor(0, 0, 4))
+        if self.tiles.y is None or self.view_seconds <= 0 or self.width() <= 0:
+            painter.setPen(QColor(160, 160, 160))
+            painter.drawText(self.rect(), Qt.AlignCenter, "频谱图")
+            return
+        
+        sr = self.tiles.sr
+        top = spectrogram.max_level(self.tiles.duration, sr)
+        seconds_per_pixel = self.view_seconds / self.width()
+        level = spectrogram.level_for(seconds_per_pixel, sr, top)
+        span = spectrogram.tile_seconds(level, sr)
+        view_end = self.view_start + self.view_seconds
+        first = int(self.view_start // span)
+        last = int(min(view_end, self.tiles.duration) // span)
+        
+        missing = []
+        for index in range(first, last + 1):
+            x0 = (index * span - self.view_start) / seconds_per_pixel
+            target = QRectF(x0, 0, span / seconds_per_pixel, self.height())
+            image = self.tiles.get(level, index)
+            if image is not None:
+                painter.drawImage(target, image)
+                continue
+            missing.append((level, index))
+            # 先用更粗一级的已缓存图块顶替
+            for coarse in range(level + 1, top + 1):
+                ratio = 2 ** (coarse - level)
+                image = self.tiles.get(coarse, index // ratio)
+                if image is not None:
+                    width = image.width() / ratio
+                    source = QRectF((index % ratio) * width, 0, width, image.height())
+                    painter.drawImage(target, image, source)
+                    break
+        
+        # 离可见范围中心近的图块先算
+        center = (first + last) / 2
+        missing.sort(key=lambda key: abs(key[1] - center))
+        self.tiles.request(missing)
+        
+        # 剪辑片段叠加层
+        if len(self.segment_starts):
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(QColor(33, 150, 243))
+            visible = (self.segment_ends > self.view_start) & (self.segment_starts < view_end)
+            for start, end in zip(self.segment_starts[visible].tolist(),
+                                  self.segment_ends[visible].tolist()):
+                x0 = (start - self.view_start) / seconds_per_pixel
+                x1 = (end - self.view_start) / seconds_per_pixel
+                painter.drawRect(QRectF(x0, self.height() - 4, max(x1 - x0, 1.0), 4))
+        
+        painter.setPen(QColor(220, 220, 220))
+        painter.drawText(QRect(4, 2, self.width() - 8, 16), Qt.AlignLeft,
+                         f"{self.view_start:.1f}s")
+        painter.drawText(QRect(4, 2, self.width() - 8, 16), Qt.AlignRight,
+                         f"{view_end:.1f}s")
+    
+    def wheelEvent(self, event):
+        if self.tiles.y is None or self.width() <= 0:
+            return
+        anchor = self.view_start + event.x() / self.width() * self.view_seconds
+        factor = self.ZOOM_STEP if event.angleDelta().y() < 0 else 1 / self.ZOOM_STEP
+        self.view_seconds *= factor
+        self._clamp_view()
+        self.view_start = anchor - event.x() / self.width() * self.view_seconds
+        self._clamp_view()
+        self.update()
+    
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            self._drag_x = event.x()
+    
+    def mouseMoveEvent(self, event):
+        if self._drag_x is not None and self.width() > 0:
+            self.view_start -= (event.x() - self._drag_x) / self.width() * self.view_seconds
+            self._drag_x = event.x()
+            self._clamp_view()
+            self.update()
+    
+    def mouseReleaseEvent(self, event):
+        self._drag_x = None
+    
+    def mouseDoubleClickEvent(self, event):
+        self.view_start = 0.0
+        self.view_seconds = self.tiles.duration
+        self.update()
+    
+    def resizeEvent(self, event):
+        if self.tiles.y is not None:
+            self._clamp_view()
+        super().resizeEvent(event)
+
+class AudioReader(QWidget):
+    audio_analyzed = pyqtSignal(dict)
+    silence_detected = pyqtSignal(float, float)  # 添加静音检测信号
+    range_edited = pyqtSignal(float, float)  # 电平范围停止编辑后发送（已防抖）
+    follow_segments = pyqtSignal(str, object, object)  # 跟随录音时新确定的片段
+    follow_finished = pyqtSignal(str)  # 跟随的录音结束（或停止、出错）
+    
+    RANGE_DEBOUNCE = 150  # 电平范围防抖间隔（毫秒）
+    ANALYSIS_ENGINES = {
+        'librosa': "完整分析（波形）",
+        'ffmpeg': "快速（ffmpeg静音检测）",
+    }
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.audio_data = None
+        self.current_file = None
+        self.silence_threshold = -40  # 默认静音阈值
+        self.min_db = -60  # 添加默认最小分贝值
+        self.max_db = 0    # 添加默认最大分贝值
+        # 拖动或输入时不立即重新剪辑，停止变化一段时间后才发送 range_edited
+        self.range_timer = QTimer(self)
+        self.range_timer.setSingleShot(True)
+        self.range_timer.setInterval(self.RANGE_DEBOUNCE)
+        self.range_timer.timeout.connect(
+            lambda: self.range_edited.emit(self.min_db, self.max_db))
+        # 跟随正在写入的录音，增量分析
+        self.follower = TailFollower(self)
+        self.follower.segments_ready.connect(self._on_follow_segments)
+        self.follower.progress.connect(self._on_follow_progress)
+        self.follower.finished.connect(self._on_follow_finished)
+        self.follower.failed.connect(self._on_follow_failed)
+        self.follow_count = 0
+        self.initUI()
+    
+    def initUI(self):
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(5, 5, 5, 5)
+        
+        # 添加阈值输入框
+        threshold_layout = QHBoxLayout()
+        threshold_layout.addWidget(QLabel("静音阈值:"))
+        self.threshold_input = QLineEdit("-40")
+        self.threshold_input.setValidator(QDoubleValidator(-100, 0, 1))
+        self.threshold_input.textChanged.connect(self.threshold_changed)
+        threshold_layout.addWidget(self.threshold_input)
+        threshold_layout.addWidget(QLabel("分析引擎:"))
+        self.engine_combo = QComboBox()
+        for engine, name in self.ANALYSIS_ENGINES.items():
+            self.engine_combo.addItem(name, engine)
+        self.engine_combo.setToolTip("快速分析不显示波形，按静音阈值（dBFS）直接给出剪辑片段")
+        threshold_layout.addWidget(self.engine_combo)
+        self.spectrogram_check = QCheckBox("频谱图")
+        self.spectrogram_check.setToolTip("显示频谱图（滚轮缩放，拖动平移，双击显示全部）")
+        threshold_layout.addWidget(self.spectrogram_check)
+        self.lanes_check = QCheckBox("分声道")
+        self.lanes_check.setChecked(True)
+        self.lanes_check.setToolTip("多声道素材按声道分泳道显示电平")
+        threshold_layout.addWidget(self.lanes_check)
+        layout.addLayout(threshold_layout)
+        
+        # 1. 文件信息区
+        file_info = QFrame()
+        file_info.setFrameStyle(QFrame.StyledPanel)
+        file_info_layout = QVBoxLayout(file_info)
+        
+        self.file_label = QLabel("当前文件：未选择")
+        self.duration_label = QLabel("时长：--:--")
+        file_info_layout.addWidget(self.file_label)
+        file_info_layout.addWidget(self.duration_label)
+        
+        layout.addWidget(file_info)
+        
+        # 2. 音频统计信息
+        stats_info = QFrame()
+        stats_info.setFrameStyle(QFrame.StyledPanel)
+        stats_layout = QVBoxLayout(stats_info)
+        
+        self.level_label = QLabel("音频电平范围：等待分析...")
+        self.silence_stats_label = QLabel("静音统计：等待分析...")
+        stats_layout.addWidget(self.level_label)
+        stats_layout.addWidget(self.silence_stats_label)
+        
+        layout.addWidget(stats_info)
+        
+        # 3. 波形图
+        self.waveform = WaveformWidget()
+        self.lanes_check.toggled.connect(self.waveform.set_lanes)
+        layout.addWidget(self.waveform)
+        
+        # 频谱图（默认隐藏，显示时才计算可见部分）
+        self.spectrogram = SpectrogramWidget()
+        self.spectrogram.setVisible(False)
+        self.spectrogram_check.toggled.connect(self.spectrogram.setVisible)
+        layout.addWidget(self.spectrogram)
+        
+        # 4. 控制区域
+        controls = QFrame()
+        controls.setFrameStyle(QFrame.StyledPanel)
+        controls_layout = QHBoxLayout(controls)
+        
+        # 电平控制
+        level_group = QWidget()
+        level_layout = QHBoxLayout(level_group)
+        
+        # 最小电平
+        min_layout = QHBoxLayout()
+        min_layout.addWidget(QLabel("最小电平:"))
+        self.min_input = QLineEdit("-60")
+        self.min_input.setValidator(QDoubleValidator(-100, 0, 1))
+        self.min_input.setFixedWidth(60)
+        min_layout.addWidget(self.min_input)
+        min_layout.addWidget(QLabel("dB"))
+        level_layout.addLayout(min_layout)
+        
+        level_layout.addSpacing(20)
+        
+        # 最大电平
+        max_layout = QHBoxLayout()
+        max_layout.addWidget(QLabel("最大电平:"))
+        self.max_input = QLineEdit("0")
+        self.max_input.setValidator(QDoubleValidator(-100, 0, 1))
+        self.max_input.setFixedWidth(60)
+        max_layout.addWidget(self.max_input)
+        max_layout.addWidget(QLabel("dB"))
+        level_layout.addLayout(max_layout)
+        
+        controls_layout.addWidget(level_group)
+        
+        # 添加自动检测按钮
+        detect_btn = QPushButton("检测静音")
+        detect_btn.clicked.connect(self.detect_silence)
+        controls_layout.addWidget(detect_btn)
+        
+        layout.addWidget(controls)
+        
+        # 设置样式
+        self.setStyleSheet("""
+            QFrame {
+                background-color: white;
+                border: 1px solid #ccc;
+                border-radius: 4px;
+            }
+            QLabel {
+                padding: 2px;
+            }
+            QLineEdit {
+                padding: 3px;
+                border: 1px solid #ccc;
+                border-radius: 2px;
+            }
+            QPushButton {
+                padding: 5px 15px;
+                background-color: #2196F3;
+                color: white;
+                border: none;
+                border-radius: 3px;
+            }
+            QPushButton:hover {
+                background-color: #1976D2;
+            }
+        """)
+        
+        # 连接信号
+        self.min_input.textChanged.connect(self.range_value_changed)
+        self.max_input.textChanged.connect(self.range_value_changed)
+
+    def detect_silence(self):
+        """检测静音段落"""
+        if not self.audio_data or 'waveform' not in self.audio_data:
+            return
+            
+        try:
+            y = self.audio_data['waveform']
+            sr = self.audio_data['sr']
+            
+            # 使用更小的分析窗口
+            frame_length = 1024
+            hop_length = 256
+            db_values = envelope.rms_db(y, frame_length, hop_length)
+            
+            # 计算更精确的静音统计
+            silence_threshold = float(self.threshold_input.text() or "-40")
+            silence_mask = db_values < silence_threshold
+            
+            # 计算连续静音段
+            silence_runs = []
+            run_start = None
+            
+            for i, is_silence in enumerate(silence_mask):
+                if is_silence:
+                    if run_start is None:
+                        run_start = i
+                elif run_start is not None:
+                    silence_runs.append((run_start, i))
+                    run_start = None
+            
+            # 计算静音统计
+            total_frames = len(db_values)
+            silence_ratio = np.mean(silence_mask)
+            total_duration = len(y) / sr
+            silence_duration = silence_ratio * total_duration
+            
+            # 更新显示
+            stats_text = (
+                f"静音统计：\n"
+                f"静音比例: {silence_ratio:.1%}\n"
+                f"静音总时长: {silence_duration:.3f}秒\n"
+                f"最长静音: {max([end-start for start, end in silence_runs], default=0) / (sr/hop_length):.3f}秒\n"
+                f"建议阈值: {np.percentile(db_values, 10):.1f} dB"
+            )
+            self.silence_stats_label.setText(stats_text)
+            
+            # 发送检测结果
+            suggested_min = np.percentile(db_values, 10)
+            suggested_max = np.percentile(db_values, 90)
+            self.silence_detected.emit(suggested_min, suggested_max)
+            
+        except Exception as e:
+            print(f"静音检测错误: {str(e)}")
+
+    @staticmethod
+    def load_pcm(file_path, sr=44100):
+        """读取素材的PCM：已缓存的直接内存映射，否则流式解码后写入缓存
+
+        ffmpeg 把音频解码为交错的 s16le 从管道输出，逐块写入缓存的内存映射文件，
+        同时计算按声道求和的响度块，整段音频不会同时读入内存；
+        返回的视图默认是混合后的单声道，分声道分析用 multichannel()。
+        """
+        pcm = pcmstore.lookup(file_path, sr)
+        if pcm is None:
+            info = silencedetect.probe_media(file_path)
+            if info['audio'] is None:
+                raise ValueError("素材没有音频流")
+            # 在界面线程上由用户发起，按交互优先级申请（可抢占代理等后台工作）；
+            # 内存被导出等工作占满时等待，等待间隙处理界面事件
+            lease = None
+            while lease is None:
+                lease = governor.instance().acquire(governor.INTERACTIVE,
+                                                    memory_mb=governor.FFMPEG_MEMORY_MB,
+                                                    name=f"分析 {os.path.basename(file_path)}",
+                                                    timeout=0.1)
+                if lease is None:
+                    QApplication.processEvents()
+            with lease:
+                pcm = AudioReader._decode_pcm(file_path, sr, info['audio']['channels'] or 2,
+                                              info['duration'], lease)
+        return pcm
+
+    @staticmethod
+    def _decode_pcm(file_path, sr, channels, duration, lease):
+        """用 ffmpeg 流式解码并写入PCM缓存与响度块"""
+        command = ['ffmpeg', '-v', 'error', '-nostdin', '-i', file_path, '-map', '0:a:0',
+                   '-f', 's16le', '-ac', str(channels), '-ar', str(sr), 'pipe:1']
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        lease.attach(process)
+        errors = []
+        reader = threading.Thread(target=lambda: errors.append(process.stderr.read()), daemon=True)
+        reader.start()
+        writer = pcmstore.PcmWriter(file_path, sr, channels, duration * sr)
+        meter = loudness.LoudnessMeter(sr, channels)
+        frame_bytes = 2 * channels
+        try:
+            while True:
+                data = process.stdout.read(DECODE_BLOCK * frame_bytes)
+                if not data:
+                    break
+                samples = np.frombuffer(data[:len(data) // frame_bytes * frame_bytes],
+                                        dtype='<i2').reshape(-1, channels)
+                writer.write(samples)
+                meter.feed(samples / pcmstore.INT16_SCALE)
+            process.wait()
+            reader.join()
+            if process.returncode != 0:
+                message = b''.join(errors).decode('utf-8', 'replace').strip()
+                raise RuntimeError(message or f"ffmpeg返回码 {process.returncode}")
+            pcm = writer.close()
+        except BaseException:
+            writer.abort()
+            process.kill()
+            process.wait()
+            raise
+        finally:
+            lease.detach(process)
+            process.stdout.close()
+            process.stderr.close()
+        loudness.save_blocks(pcm, meter.result())
+        return pcm
+    
+    def analyze_audio(self, file_path):
+        """分析音频文件"""
+        try:
+            self.current_file = file_path
+            started = time.perf_counter()
+            pcm = self.load_pcm(file_path)
+            y, sr = pcm, pcm.sr
+            
+            # 计算音频特征
+            duration = len(y) / sr
+            channel_db = None
+            if pcm.channels > 1:
+                # 一次遍历交错数据，同时得到混合声道与各声道的电平
+                db_values, channel_db = envelope.channel_rms_db(pcm.multichannel())
+            else:
+                db_values = envelope.rms_db(y)
+            
+            # 计算统计值
+            min_db = float(np.percentile(db_values, 1))
+            max_db = float(np.percentile(db_values, 99))
+            mean_db = float(np.mean(db_values))
+            
+            # 保存分析结果（波形只保存内存映射视图）
+            self.audio_data = {
+                'waveform': pcm,
+                'sr': sr,
+                'duration': duration,
+                'min_db': min_db,
+                'max_db': max_db,
+                'mean_db': mean_db,
+                'db_values': db_values,
+                'channels': pcm.channels,
+                'channel_db': channel_db,  # (声道数, 帧数)，单声道素材为 None
+                'histogram': DbHistogram.from_values(db_values),  # 用于合并全局统计
+                'loudness': loudness.source_blocks(pcm),  # 导出时测量片段响度
+            }
+            self.audio_data['analysis_seconds'] = time.perf_counter() - started
+            
+            # 更新类属性
+            self.min_db = min_db
+            self.max_db = max_db
+            
+            # 更新显示
+            self.update_display()
+            
+            # 返回分析结果
+            return self.audio_data
+            
+        except Exception as e:
+            print(f"音频分析错误: {str(e)}")
+            return None
+    
+    def analysis_engine(self):
+        """当前选择的分析引擎"""
+        return self.engine_combo.currentData()
+    
+    def analyze_fast(self, file_path):
+        """用 ffmpeg 静音检测快速分析（不解码波形）"""
+        try:
+            self.current_file = file_path
+            started = time.perf_counter()
+            result = silencedetect.analyze(file_path, self.silence_threshold)
+            result['analysis_seconds'] = time.perf_counter() - started
+            
+            # 没有波形数据，清空波形图，只显示统计
+            self.audio_data = None
+            self.waveform.set_data(None, -60, 0)
+            self.spectrogram.set_data(None)
+            self.min_db = result['min_db']
+            self.max_db = result['max_db']
+            
+            duration = result['duration']
+            silence = float(sum(result['silence_ends'] - result['silence_starts']))
+            self.file_label.setText(f"当前文件：{os.path.basename(file_path)}")
+            self.duration_label.setText(f"时长：{int(duration // 60):02d}:{duration % 60:05.2f}")
+            self.level_label.setText(
+                f"音频电平范围：{self.min_db:.1f} dB 至 {self.max_db:.1f} dB（快速分析）")
+            self.silence_stats_label.setText(
+                f"静音统计：\n"
+                f"静音比例: {silence / duration if duration > 0 else 0:.1%}\n"
+                f"静音总时长: {silence:.3f}秒\n"
+                f"静音段数: {len(result['silence_starts'])}")
+            return result
+            
+        except Exception as e:
+            print(f"快速分析错误: {str(e)}")
+            return None
+    
+    def follow(self, file_path):
+        """跟随正在写入的录音（WAV、MKV 等），片段确定后通过 follow_segments 发出"""
+        self.clear_display()
+        self.current_file = file_path
+        self.follow_count = 0
+        self.file_label.setText(f"当前文件：{os.path.basename(file_path)}（跟随录音中）")
+        self.level_label.setText(f"音频电平范围：{self.silence_threshold:.1f} dBFS 以上为有声")
+        self.silence_stats_label.setText("静音统计：等待录音数据...")
+        self.follower.start(file_path, self.silence_threshold, 0.0)
+    
+    def stop_follow(self):
+        """停止跟随，已确定的片段保留
+
+        后台线程结束时总会发出 finished（或 failed），由信号统一处理结束，
+        这里不再直接调用，follow_finished 只发出一次。
+        """
+        if self.follower.active:
+            self.follower.stop()
+    
+    def _on_follow_segments(self, file_path, starts, ends):
+        self.follow_count += len(starts)
+        self.follow_segments.emit(file_path, starts, ends)
+    
+    def _on_follow_progress(self, file_path, duration):
+        self.duration_label.setText(f"时长：{int(duration // 60):02d}:{duration % 60:05.2f}")
+        self.silence_stats_label.setText(f"静音统计：\n已确定片段: {self.follow_count}")
+    
+    def _on_follow_finished(self, file_path):
+        if file_path != self.current_file:
+            return
+        self.file_label.setText(f"当前文件：{os.path.basename(file_path)}（录音已结束）")
+        cutter = self.follower.cutter
+        if cutter is not None and len(cutter.histogram):
+            min_db, max_db = cutter.histogram.suggest_range()
+            self.silence_stats_label.setText(
+                f"静音统计：\n"
+                f"片段数: {self.follow_count}\n"
+                f"建议电平范围: {min_db:.1f} 至 {max_db:.1f} dBFS")
+        self.follow_finished.emit(file_path)
+    
+    def _on_follow_failed(self, file_path, message):
+        print(f"跟随录音错误: {message}")
+        self._on_follow_finished(file_path)
+    
+    def update_display(self):
+        """更新显示的音频值"""
+        if hasattr(self, 'audio_data') and self.audio_data:
+            try:
+                # 更新文件名
+                if self.current_file:
+                    self.file_label.setText(f"当前文件：{os.path.basename(self.current_file)}")
+                else:
+                    self.file_label.setText("当前文件：未选择")
+                
+                # 更新电平范围
+                level_text = (
+                    f"音频电平范围：{self.audio_data['min_db']:.1f} dB 至 "
+                    f"{self.audio_data['max_db']:.1f} dB"
+                )
+                if self.audio_data.get('channels', 1) > 1:
+                    level_text += f"（{self.audio_data['channels']} 声道）"
+                self.level_label.setText(level_text)
+                
+                # 更新波形图
+                self.waveform.set_data(self.audio_data, self.min_db, self.max_db)
+                self.spectrogram.set_data(self.audio_data)
+                
+            except KeyError as e:
+                self.level_label.setText(f"音频电平范围：数据不完整 (缺少 {str(e)})")
+        else:
+            self.file_label.setText("当前文件：未选择")
+            self.level_label.setText("音频电平范围：等待分析...")
+    
+    def show_global_levels(self, min_db, max_db, source_count):
+        """显示多个素材合并后的全局电平范围"""
+        if source_count > 1:
+            self.level_label.setText(
+                f"全局电平范围（{source_count}个素材）：{min_db:.1f} dB 至 {max_db:.1f} dB")
+    
+    def clear_display(self):
+        """清除显示"""
+        self.file_label.setText("当前文件：未选择")
+        self.level_label.setText("音频电平范围：等待分析...")
+        self.current_file = None
+        self.audio_data = None
+        self.waveform.set_data(None, -60, 0)
+        self.spectrogram.set_data(None)
+    
+    def range_value_changed(self):
+        """输入框值变化处理"""
+        try:
+            min_val = float(self.min_input.text() or "-60")
+            max_val = float(self.max_input.text() or "0")
+            
+            # 确保最小值不大于最大值
+            if min_val > max_val:
+                if self.sender() == self.min_input:
+                    min_val = max_val
+                    self.min_input.setText(f"{min_val}")
+                else:
+                    max_val = min_val
+                    self.max_input.setText(f"{max_val}")
+            
+            # 更新波形图的选中范围
+            self.waveform.set_selected_range(min_val, max_val)
+            
+            # 保存当前值作为实例变量
+            self.min_db = min_val
+            self.max_db = max_val
+            self.range_timer.start()
+            
+        except ValueError:
+            pass
+    
+    def threshold_changed(self):
+        """阈值改变时更新显示"""
+        try:
+            threshold = float(self.threshold_input.text() or "-40")
+            self.silence_threshold = threshold  # 更新类属性
+            if hasattr(self, 'waveform') and self.audio_data:
+                self.waveform.set_threshold(threshold)
+                self.detect_silence()  # 重新检测静音
+        except ValueError:
+            pass
+
+    def auto_cut(self, audio_data):
+        """执行自动剪辑"""
+        # 获取音频数据
+        y = audio_data['waveform']  # 原始波形
+        sr = audio_data['sr']       # 采样率
+        selected_range = audio_data['selected_range']  # 用户选择的阈值范围
+        min_db = selected_range[0]  # 最小分贝值
+        max_db = selected_range[1]  # 最大分贝值
+        
+        # 计算RMS能量
+        frame_length = 2048   # 帧长度，影响精度
+        hop_length = 512      # 帧移动步长，影响精度
+        db_values = envelope.rms_db(y, frame_length, hop_length)  # 转换为分贝值
\ No newline at end of file
@@ -1,376 +1,660 @@
-from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
-                           QPushButton, QLineEdit, QCheckBox, QScrollArea,
-                           QFrame, QSizePolicy, QSpacerItem, QMessageBox)
-from PyQt5.QtCore import Qt, pyqtSignal, QTimer
-from PyQt5.QtGui import QImage, QPixmap, QDoubleValidator
-import cv2
-import numpy as np
-import librosa
-
-class TimeSegmentItem(QWidget):
-    """时间区间项目"""
-    deleted = pyqtSignal(int)  # 发送删除信号
-    timeChanged = pyqtSignal(int, float, float)  # 发送时间改变信号
-    playClicked = pyqtSignal(str, float, float, 'PyQt_PyObject')  # 修改信号
-    
-    def __init__(self, index, file_path, start_time, end_time, thumbnail, parent=None):
-        super().__init__(parent)
-        self.index = index
-        self.file_path = file_path
-        self.start_time = start_time
-        self.end_time = end_time
-        self.thumbnail = thumbnail
-        self.is_playing = False
-        self.initUI()
-        
-    def initUI(self):
-        layout = QHBoxLayout(self)
-        layout.setContentsMargins(5, 5, 5, 5)
-        layout.setSpacing(10)
-        
-        # 行编号
-        index_label = QLabel(f"#{self.index:02d}")
-        index_label.setFixedWidth(30)
-        index_label.setStyleSheet("font-weight: bold;")
-        layout.addWidget(index_label)
-        
-        # 缩略图
-        thumbnail_label = QLabel()
-        if isinstance(self.thumbnail, np.ndarray):
-            h, w, ch = self.thumbnail.shape
-            img = QImage(self.thumbnail.data, w, h, w * 3, QImage.Format_RGB888)
-            pixmap = QPixmap.fromImage(img)
-            thumbnail_label.setPixmap(pixmap)
-            thumbnail_label.setFixedSize(pixmap.size())
-        thumbnail_label.setStyleSheet("border: 1px solid #ccc;")
-        layout.addWidget(thumbnail_label)
-        
-        # 时间输入区域
-        time_group = QWidget()
-        time_layout = QHBoxLayout(time_group)
-        time_layout.setContentsMargins(0, 0, 0, 0)
-        
-        # 开始时间
-        time_layout.addWidget(QLabel("开始:"))
-        self.start_edit = QLineEdit(f"{self.start_time:.2f}")
-        self.start_edit.setValidator(QDoubleValidator(0, 999999, 2))
-        self.start_edit.setFixedWidth(70)
-        self.start_edit.textChanged.connect(self.time_changed)
-        time_layout.addWidget(self.start_edit)
-        
-        # 结束时间
-        time_layout.addWidget(QLabel("结束:"))
-        self.end_edit = QLineEdit(f"{self.end_time:.2f}")
-        self.end_edit.setValidator(QDoubleValidator(0, 999999, 2))
-        self.end_edit.setFixedWidth(70)
-        self.end_edit.textChanged.connect(self.time_changed)
-        time_layout.addWidget(self.end_edit)
-        
-        layout.addWidget(time_group)
-        
-        # 播放/暂停按钮
-        self.play_btn = QPushButton("播放")
-        self.play_btn.setFixedWidth(60)
-        self.play_btn.clicked.connect(self.toggle_play)
-        self.play_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #4CAF50;
-                color: white;
-                border: none;
-                border-radius: 3px;
-            }
-            QPushButton:hover {
-                background-color: #45a049;
-            }
-        """)
-        layout.addWidget(self.play_btn)
-        
-        # 删除按钮
-        delete_btn = QPushButton("删除")
-        delete_btn.setFixedWidth(60)
-        delete_btn.clicked.connect(lambda: self.deleted.emit(self.index))
-        delete_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #f44336;
-                color: white;
-                border: none;
-                border-radius: 3px;
-            }
-            QPushButton:hover {
-                background-color: #da190b;
-            }
-        """)
-        layout.addWidget(delete_btn)
-        
-        # 勾选框
-        self.checkbox = QCheckBox()
-        layout.addWidget(self.checkbox)
-        
-        # 设置整体样式
-        self.setStyleSheet("""
-            QWidget {
-                background-color: #f8f8f8;
-                border: 1px solid #ddd;
-                border-radius: 4px;
-            }
-            QLineEdit {
-                padding: 3px;
-                border: 1px solid #ccc;
-                border-radius: 2px;
-            }
-            QLabel {
-                border: none;
-            }
-        """)
-        self.setMinimumHeight(90)
-    
-    def toggle_play(self):
-        """切换播放状态"""
-        self.is_playing = not self.is_playing
-        self.play_btn.setText("暂停" if self.is_playing else "播放")
-        if self.is_playing:
-            self.playClicked.emit(
-                self.file_path,
-                float(self.start_edit.text()),
-                float(self.end_edit.text()),
-                self
-            )
-    
-    def time_changed(self):
-        """时间输入改变处理"""
-        try:
-            start = float(self.start_edit.text())
-            end = float(self.end_edit.text())
-            if start < end:
-                self.timeChanged.emit(self.index, start, end)
-        except ValueError:
-            pass
-    
-    def update_play_state(self, is_playing):
-        """更新播放状态"""
-        self.is_playing = is_playing
-        self.play_btn.setText("暂停" if is_playing else "播放")
-
-class TimeCutter(QWidget):
-    segments_created = pyqtSignal(list)  # 发送创建的时间段列表信号
-    play_segment = pyqtSignal(str, float, float)  # 发送播放片段信号
-    
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self.segments = []
-        self.initUI()
-        
-    def initUI(self):
-        layout = QVBoxLayout(self)
-        layout.setContentsMargins(0, 0, 0, 0)
-        layout.setSpacing(0)
-        
-        # 创建滚动区域
-        self.scroll = QScrollArea()
-        self.scroll.setWidgetResizable(True)
-        self.scroll.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
-        self.scroll.setHorizontalScrollBarPolicy(Qt.ScrollBarAsNeeded)
-        self.scroll.setStyleSheet("""
-            QScrollArea {
-                border: none;
-            }
-            QScrollBar:vertical {
-                width: 10px;
-            }
-        """)
-        
-        # 创建内容容器
-        self.content_widget = QWidget()
-        self.content_layout = QVBoxLayout(self.content_widget)
-        self.content_layout.setAlignment(Qt.AlignTop)
-        self.content_layout.setSpacing(5)
-        
-        self.scroll.setWidget(self.content_widget)
-        layout.addWidget(self.scroll)
-        
-        # 添加放入时间线按钮
-        self.add_to_timeline_btn = QPushButton("放入时间线")
-        self.add_to_timeline_btn.clicked.connect(self.add_to_timeline)
-        self.add_to_timeline_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #2196F3;
-                color: white;
-                padding: 5px;
-                border: none;
-                border-radius: 3px;
-                margin: 5px;
-            }
-            QPushButton:hover {
-                background-color: #1976D2;
-            }
-        """)
-        layout.addWidget(self.add_to_timeline_btn)
-    
-    def auto_cut(self, audio_data):
-        """执行自动剪辑"""
-        if not audio_data or 'waveform' not in audio_data:
-            return
-        
-        try:
-            # 获取音频数据
-            y = audio_data['waveform']
-            sr = audio_data['sr']
-            selected_range = audio_data['selected_range']
-            min_db = selected_range[0]
-            max_db = selected_range[1]
-            
-            # 优化参数设置
-            frame_length = 256  # 减小帧长度以提高精度
-            hop_length = 64     # 减小步长以提高时间精度
-            
-            # 计算RMS能量
-            rms = librosa.feature.rms(y=y, frame_length=frame_length, hop_length=hop_length)[0]
-            db_values = librosa.amplitude_to_db(rms, ref=np.max)
-            
-            # 查找符合条件的时间段
-            segments = []
-            current_start = None
-            MAX_SILENCE_LENGTH = 0.05  # 最大空白时长（秒）
-            MIN_SEGMENT_LENGTH = 0.1   # 最小有效片段时长（秒）
-            SAMPLES_PER_SECOND = sr / hop_length
-            MAX_SILENCE_SAMPLES = int(MAX_SILENCE_LENGTH * SAMPLES_PER_SECOND)
-            MIN_SEGMENT_SAMPLES = int(MIN_SEGMENT_LENGTH * SAMPLES_PER_SECOND)
-            
-            silence_count = 0
-            
-            for i, db_val in enumerate(db_values):
-                is_valid = min_db <= db_val <= max_db
-                
-                if current_start is None:
-                    if is_valid:
-                        current_start = i
-                        silence_count = 0
-                else:
-                    if not is_valid:
-                        silence_count += 1
-                        if silence_count >= MAX_SILENCE_SAMPLES:
-                            # 如果静音时长超过阈值，结束当前片段
-                            segment_length = i - current_start - silence_count
-                            if segment_length >= MIN_SEGMENT_SAMPLES:
-                                segments.append((current_start, i - silence_count))
-                            current_start = None
-                            silence_count = 0
-                    else:
-                        silence_count = 0
-            
-            # 处理最后一个片段
-            if current_start is not None:
-                segment_length = len(db_values) - current_start
-                if segment_length >= MIN_SEGMENT_SAMPLES:
-                    segments.append((current_start, len(db_values)))
-            
-            # 转换为实际时间
-            time_segments = []
-            for start, end in segments:
-                start_time = start / SAMPLES_PER_SECOND
-                end_time = end / SAMPLES_PER_SECOND
-                time_segments.append((start_time, end_time))
-            
-            # 创建时间段项目
-            self.clear_segments()
-            for i, (start, end) in enumerate(time_segments):
-                self.add_segment(i + 1, start, end, audio_data.get('sources', [None])[0])
-                
-        except Exception as e:
-            print(f"自动剪辑错误: {str(e)}")
-    
-    def _merge_close_segments(self, segments, min_gap):
-        """合并间隔太小的片段"""
-        if not segments:
-            return []
-        
-        merged = []
-        current_start, current_end = segments[0]
-        
-        for start, end in segments[1:]:
-            if start - current_end <= min_gap:
-                # 如果两个片段间隔小于最小间隔，则合并
-                current_end = end
-            else:
-                # 否则保存当前片段，开始新片段
-                merged.append((current_start, current_end))
-                current_start, current_end = start, end
-        
-        # 添加最后一个片段
-        merged.append((current_start, current_end))
-        
-        return merged
-    
-    def add_segment(self, index, start_time, end_time, file_path=None):
-        """添加时间段"""
-        # 获取缩略图
-        thumbnail = self.get_thumbnail(file_path, start_time) if file_path else None
-        
-        # 创建时间段项目
-        segment = TimeSegmentItem(index, file_path, start_time, end_time, thumbnail)
-        segment.deleted.connect(self.remove_segment)
-        segment.timeChanged.connect(self.update_segment_time)
-        segment.playClicked.connect(self.play_segment.emit)
-        
-        self.segments.append(segment)
-        self.content_layout.addWidget(segment)
-    
-    def get_thumbnail(self, file_path, time):
-        """获取指定时间的缩略图"""
-        try:
-            cap = cv2.VideoCapture(file_path)
-            cap.set(cv2.CAP_PROP_POS_MSEC, time * 1000)
-            ret, frame = cap.read()
-            if ret:
-                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                h, w = frame.shape[:2]
-                if w > h:
-                    thumbnail = cv2.resize(frame, (128, 72))
-                else:
-                    thumbnail = cv2.resize(frame, (72, 128))
-                return thumbnail
-        except Exception as e:
-            print(f"获取缩略图错误: {str(e)}")
-        finally:
-            cap.release()
-        return None
-    
-    def clear_segments(self):
-        """清除所有片段"""
-        for segment in self.segments:
-            self.content_layout.removeWidget(segment)
-            segment.deleteLater()
-        self.segments.clear()
-    
-    def remove_segment(self, index):
-        """删除指定片段"""
-        for segment in self.segments:
-            if segment.index == index:
-                self.content_layout.removeWidget(segment)
-                self.segments.remove(segment)
-                segment.deleteLater()
-                break
-    
-    def update_segment_time(self, index, start_time, end_time):
-        """更新片段时间"""
-        for segment in self.segments:
-            if segment.index == index:
-                segment.start_time = start_time
-                segment.end_time = end_time
-                break
-    
-    def get_selected_segments(self):
-        """获取选中的片段"""
-        return [segment for segment in self.segments if segment.checkbox.isChecked()]
-    
-    def add_to_timeline(self):
-        """将选中片段添加到时间线"""
-        selected = self.get_selected_segments()
-        if selected:
-            self.segments_created.emit(selected) 
-    
-    def set_silence_threshold(self, min_val, max_val):
-        """设置静音阈值"""
-        self.silence_min = min_val
-        self.silence_max = max_val
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
+                           QPushButton, QLineEdit, QCheckBox, QScrollArea,
+                           QFrame, QSizePolicy, QSpacerItem, QMessageBox)
+from PyQt5.QtCore import Qt, pyqtSignal, QTimer
+from PyQt5.QtGui import QImage, QPixmap, QDoubleValidator
+import numpy as np
+import envelope
+from segmentstore import SegmentStore
+import voiceactivity
+import scenedetect
+from thumbnails import ThumbnailLoader
+
+SCENE_TOLERANCE = 1.0  # 片段边界吸附镜头切换的最大距离（秒）
+ITEM_BATCH = 20        # 每次事件循环最多创建的时间段项目，大量片段时界面不会卡住
+
+class TimeSegmentItem(QWidget):
+    """时间区间项目"""
+    deleted = pyqtSignal(int)  # 发送删除信号
+    timeChanged = pyqtSignal(int, float, float)  # 发送时间改变信号
+    selectionChanged = pyqtSignal(int, bool)  # 发送勾选状态改变信号
+    playClicked = pyqtSignal(str, float, float, 'PyQt_PyObject')  # 修改信号
+    pauseClicked = pyqtSignal()  # 暂停播放
+    
+    def __init__(self, index, file_path, start_time, end_time, thumbnail, parent=None):
+        super().__init__(parent)
+        self.index = index
+        self.file_path = file_path
+        self.start_time = start_time
+        self.end_time = end_time
+        self.thumbnail = thumbnail
+        self.is_playing = False
+        self.initUI()
+        
+    def initUI(self):
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(5, 5, 5, 5)
+        layout.setSpacing(10)
+        
+        # 行编号
+        index_label = QLabel(f"#{self.index:02d}")
+        index_label.setFixedWidth(30)
+        index_label.setStyleSheet("font-weight: bold;")
+        layout.addWidget(index_label)
+        
+        # 缩略图（后台解码完成后由 set_thumbnail 显示）
+        self.thumbnail_label = QLabel()
+        self.set_thumbnail(self.thumbnail)
+        self.thumbnail_label.setStyleSheet("border: 1px solid #ccc;")
+        layout.addWidget(self.thumbnail_label)
+        
+        # 时间输入区域
+        time_group = QWidget()
+        time_layout = QHBoxLayout(time_group)
+        time_layout.setContentsMargins(0, 0, 0, 0)
+        
+        # 开始时间
+        time_layout.addWidget(QLabel("开始:"))
+        self.start_edit = QLineEdit(f"{self.start_time:.2f}")
+        self.start_edit.setValidator(QDoubleValidator(0, 999999, 2))
+        self.start_edit.setFixedWidth(70)
+        self.start_edit.textChanged.connect(self.time_changed)
+        time_layout.addWidget(self.start_edit)
+        
+        # 结束时间
+        time_layout.addWidget(QLabel("结束:"))
+        self.end_edit = QLineEdit(f"{self.end_time:.2f}")
+        self.end_edit.setValidator(QDoubleValidator(0, 999999, 2))
+        self.end_edit.setFixedWidth(70)
+        self.end_edit.textChanged.connect(self.time_changed)
+        time_layout.addWidget(self.end_edit)
+        
+        layout.addWidget(time_group)
+        
+        # 播放/暂停按钮
+        self.play_btn = QPushButton("播放")
+        self.play_btn.setFixedWidth(60)
+        self.play_btn.setToolTip("在预览窗口播放该片段（只有画面，没有声音）")
+        self.play_btn.clicked.connect(self.toggle_play)
+        self.play_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #4CAF50;
+                color: white;
+                border: none;
+                border-radius: 3px;
+            }
+            QPushButton:hover {
+                background-color: #45a049;
+            }
+        """)
+        layout.addWidget(self.play_btn)
+        
+        # 删除按钮
+        delete_btn = QPushButton("删除")
+        delete_btn.setFixedWidth(60)
+        delete_btn.clicked.connect(lambda: self.deleted.emit(self.index))
+        delete_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #f44336;
+                color: white;
+                border: none;
+                border-radius: 3px;
+            }
+            QPushButton:hover {
+                background-color: #da190b;
+            }
+        """)
+        layout.addWidget(delete_btn)
+        
+        # 勾选框
+        self.checkbox = QCheckBox()
+        self.checkbox.stateChanged.connect(
+            lambda state: self.selectionChanged.emit(self.index, state == Qt.Checked))
+        layout.addWidget(self.checkbox)
+        
+        # 设置整体样式
+        self.setStyleSheet("""
+            QWidget {
+                background-color: #f8f8f8;
+                border: 1px solid #ddd;
+                border-radius: 4px;
+            }
+            QLineEdit {
+                padding: 3px;
+                border: 1px solid #ccc;
+                border-radius: 2px;
+            }
+            QLabel {
+                border: none;
+            }
+        """)
+        self.setMinimumHeight(90)
+    
+    def set_thumbnail(self, thumbnail):
+        """显示缩略图"""
+        self.thumbnail = thumbnail
+        if isinstance(thumbnail, np.ndarray):
+            h, w, ch = thumbnail.shape
+            img = QImage(thumbnail.data, w, h, w * 3, QImage.Format_RGB888)
+            pixmap = QPixmap.fromImage(img)
+            self.thumbnail_label.setPixmap(pixmap)
+            self.thumbnail_label.setFixedSize(pixmap.size())
+    
+    def toggle_play(self):
+        """切换播放状态"""
+        self.is_playing = not self.is_playing
+        self.play_btn.setText("暂停" if self.is_playing else "播放")
+        if self.is_playing:
+            self.playClicked.emit(
+                self.file_path,
+                float(self.start_edit.text()),
+                float(self.end_edit.text()),
+                self
+            )
+        else:
+            self.pauseClicked.emit()
+    
+    def time_changed(self):
+        """时间输入改变处理"""
+        try:
+            start = float(self.start_edit.text())
+            end = float(self.end_edit.text())
+            if start < end:
+                self.timeChanged.emit(self.index, start, end)
+        except ValueError:
+            pass
+    
+    def set_times(self, start_time, end_time):
+        """由存储同步时间（不再回发信号）"""
+        self.start_time = start_time
+        self.end_time = end_time
+        for edit, value in ((self.start_edit, start_time), (self.end_edit, end_time)):
+            text = f"{value:.2f}"
+            if edit.text() != text:
+                edit.blockSignals(True)
+                edit.setText(text)
+                edit.blockSignals(False)
+    
+    def set_selected(self, selected):
+        """由存储同步勾选状态（不再回发信号）"""
+        if self.checkbox.isChecked() != selected:
+            self.checkbox.blockSignals(True)
+            self.checkbox.setChecked(selected)
+            self.checkbox.blockSignals(False)
+    
+    def update_play_state(self, is_playing):
+        """更新播放状态"""
+        self.is_playing = is_playing
+        self.play_btn.setText("暂停" if is_playing else "播放")
+
+class TimeCutter(QWidget):
+    # 可选的剪辑引擎：引擎名 -> 显示名称
+    ENGINES = {
+        'range': "电平范围",
+        'vad': "多特征人声检测",
+    }
+    # 多声道素材的剪辑依据：模式 -> 显示名称（另可用整数选择单个声道）
+    CHANNEL_MODES = {
+        'mix': "混合声道",
+        'all': "任一声道",
+        'loudest': "最响声道",
+    }
+    segments_created = pyqtSignal(object)  # 发送选中片段的视图(SegmentView)
+    play_segment = pyqtSignal(str, float, float)  # 发送播放片段信号
+    stop_segment = pyqtSignal()  # 暂停正在播放的片段
+    cut_updated = pyqtSignal(object, object)  # 剪辑结果的开始、结束时间数组
+    thumbnail_loaded = pyqtSignal(int, object)  # 片段id, 后台解码完成的缩略图
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # 片段数据保存在存储中，组件只是它的视图
+        self.store = SegmentStore(self)
+        self.items = {}  # 片段id -> TimeSegmentItem
+        self.playing_id = None  # 正在播放的片段id
+        self._queued = {}  # 等待创建项目的片段id（按插入顺序）
+        self._create_timer = QTimer(self)
+        self._create_timer.setSingleShot(True)
+        self._create_timer.timeout.connect(self._create_queued)
+        self.thumbnail_loader = ThumbnailLoader(self)
+        self.thumbnail_loader.ready.connect(self._on_thumbnail_ready)
+        self.store.rows_inserted.connect(self._on_rows_inserted)
+        self.store.rows_removed.connect(self._on_rows_removed)
+        self.store.rows_changed.connect(self._on_rows_changed)
+        self.store.store_reset.connect(self._on_store_reset)
+        self.engine = 'range'
+        self.channel_mode = 'mix'
+        self.proxy_cache = None  # 设置后缩略图从代理素材读取
+        self.audio_data = None  # 最近一次剪辑的分析结果，实时剪辑时复用
+        self._envelope = None   # (波形, 采样率, 混合电平, 各声道电平)，调整电平范围时不再重新计算
+        self._voice = None      # (波形, 采样率, {声道: 人声逐帧特征})，同上，用于人声检测
+        self.scene_snap = False  # 剪辑边界是否吸附到镜头切换
+        self._scene_cuts = {}    # 素材路径 -> 镜头切换时间数组
+        self._followed = (np.zeros(0), np.zeros(0))  # 跟随录音时已确定的片段
+        self.initUI()
+        
+    def initUI(self):
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(0)
+        
+        # 创建滚动区域
+        self.scroll = QScrollArea()
+        self.scroll.setWidgetResizable(True)
+        self.scroll.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
+        self.scroll.setHorizontalScrollBarPolicy(Qt.ScrollBarAsNeeded)
+        self.scroll.setStyleSheet("""
+            QScrollArea {
+                border: none;
+            }
+            QScrollBar:vertical {
+                width: 10px;
+            }
+        """)
+        
+        # 创建内容容器
+        self.content_widget = QWidget()
+        self.content_layout = QVBoxLayout(self.content_widget)
+        self.content_layout.setAlignment(Qt.AlignTop)
+        self.content_layout.setSpacing(5)
+        
+        self.scroll.setWidget(self.content_widget)
+        layout.addWidget(self.scroll)
+        
+        # 添加放入时间线按钮
+        self.add_to_timeline_btn = QPushButton("放入时间线")
+        self.add_to_timeline_btn.clicked.connect(self.add_to_timeline)
+        self.add_to_timeline_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #2196F3;
+                color: white;
+                padding: 5px;
+                border: none;
+                border-radius: 3px;
+                margin: 5px;
+            }
+            QPushButton:hover {
+                background-color: #1976D2;
+            }
+        """)
+        layout.addWidget(self.add_to_timeline_btn)
+    
+    def set_engine(self, engine):
+        """选择剪辑引擎"""
+        if engine in self.ENGINES:
+            self.engine = engine
+    
+    def set_channel_mode(self, mode):
+        """选择多声道素材的剪辑依据：'mix'、'all'、'loudest' 或声道序号（从0开始）"""
+        if mode in self.CHANNEL_MODES or (isinstance(mode, int) and mode >= 0):
+            self.channel_mode = mode
+    
+    def _channel_mode(self, y):
+        """对该波形实际生效的声道模式：单声道或声道序号超出范围时按混合声道剪辑"""
+        channels = getattr(y, 'channels', 1)
+        mode = self.channel_mode
+        if channels <= 1 or (isinstance(mode, int) and mode >= channels):
+            return 'mix'
+        return mode
+    
+    def auto_cut(self, audio_data):
+        """执行自动剪辑"""
+        if audio_data and 'segments' in audio_data:
+            self.cut_segments(audio_data)
+            return
+        if not audio_data or 'waveform' not in audio_data:
+            return
+        
+        try:
+            # 获取音频数据
+            y = audio_data['waveform']
+            sr = audio_data['sr']
+            selected_range = audio_data['selected_range']
+            min_db = selected_range[0]
+            max_db = selected_range[1]
+            
+            starts, ends = self._detect(y, sr, min_db, max_db)
+            starts, ends = self._snap(audio_data.get('sources', [None])[0], starts, ends)
+            self.audio_data = audio_data
+            
+            # 一次性写入存储，由存储通知界面创建时间段项目
+            self.clear_segments()
+            self.store.append(audio_data.get('sources', [None])[0], starts, ends)
+            self.cut_updated.emit(starts, ends)
+                
+        except Exception as e:
+            print(f"自动剪辑错误: {str(e)}")
+    
+    def cut_segments(self, audio_data):
+        """使用分析时已检测出的片段（快速分析），各素材的片段依次写入"""
+        try:
+            self.audio_data = None  # 没有波形，不支持实时剪辑
+            self.clear_segments()
+            for file_path, starts, ends in audio_data['segments']:
+                starts, ends = self._snap(file_path, starts, ends)
+                self.store.append(file_path, starts, ends)
+            if audio_data['segments']:
+                _, starts, ends = audio_data['segments'][0]
+                self.cut_updated.emit(starts, ends)
+        except Exception as e:
+            print(f"自动剪辑错误: {str(e)}")
+    
+    def begin_follow(self, file_path):
+        """开始跟随录音：清空片段，之后由 append_segments 逐批加入"""
+        self.audio_data = None  # 没有完整波形，不支持实时剪辑
+        self._followed = (np.zeros(0), np.zeros(0))
+        self.clear_segments()
+    
+    def append_segments(self, file_path, starts, ends):
+        """在末尾加入跟随录音时新确定的片段"""
+        try:
+            self.store.append(file_path, starts, ends)
+            self._followed = (np.concatenate((self._followed[0], starts)),
+                              np.concatenate((self._followed[1], ends)))
+            self.cut_updated.emit(*self._followed)
+        except Exception as e:
+            print(f"自动剪辑错误: {str(e)}")
+    
+    def recut(self, min_db, max_db):
+        """按新的电平范围重新剪辑（实时预览）
+
+        只对比新旧结果：未变化的片段保留组件和缩略图，只删除消失的片段、
+        按时间插入新出现的片段。
+        """
+        audio_data = self.audio_data
+        if not audio_data or 'waveform' not in audio_data:
+            return
+        try:
+            starts, ends = self._detect(audio_data['waveform'], audio_data['sr'], min_db, max_db)
+            starts, ends = self._snap(audio_data.get('sources', [None])[0], starts, ends)
+            audio_data['selected_range'] = (min_db, max_db)
+            
+            records = self.store.records
+            old_keys = self._segment_keys(records['start'], records['end'])
+            new_keys = self._segment_keys(starts, ends)
+            removed = records['id'][~np.isin(old_keys, new_keys)]
+            added = ~np.isin(new_keys, old_keys)
+            if len(removed):
+                self.store.remove(removed)
+            if added.any():
+                self.store.insert_sorted(audio_data.get('sources', [None])[0],
+                                         starts[added], ends[added])
+            self.cut_updated.emit(starts, ends)
+        except Exception as e:
+            print(f"实时剪辑错误: {str(e)}")
+    
+    @staticmethod
+    def _segment_keys(starts, ends):
+        """片段比较用的键（精确到毫秒）"""
+        starts = np.round(np.asarray(starts) * 1000).astype(np.int64)
+        ends = np.round(np.asarray(ends) * 1000).astype(np.int64)
+        return (starts << 32) | ends
+    
+    def _detect(self, y, sr, min_db, max_db):
+        """按当前引擎剪辑，返回 (开始时间数组, 结束时间数组)"""
+        if self.engine == 'vad':
+            return self._detect_voice(y, sr, min_db, max_db)
+        return self._cut_by_range(y, sr, min_db, max_db)
+    
+    def _detect_voice(self, y, sr, min_db, max_db):
+        """人声检测：单个声道直接检测；任一声道/最响声道按声道分别检测后合并"""
+        mode = self._channel_mode(y)
+        if mode == 'mix':
+            return voiceactivity.cut_frames(*self._voice_frames(y, sr, None), sr, min_db, max_db)
+        if isinstance(mode, int):
+            return voiceactivity.cut_frames(*self._voice_frames(y, sr, mode), sr, min_db, max_db)
+        results = [voiceactivity.cut_frames(*self._voice_frames(y, sr, c), sr, min_db, max_db)
+                   for c in range(y.channels)]
+        starts = np.concatenate([result[0] for result in results])
+        ends = np.concatenate([result[1] for result in results])
+        order = np.argsort(starts, kind='stable')
+        starts, ends = starts[order], np.maximum.accumulate(ends[order])
+        return voiceactivity.merge_intervals(starts, ends, voiceactivity.MIN_SILENCE,
+                                             voiceactivity.MIN_SEGMENT)
+    
+    def _voice_frames(self, y, sr, channel):
+        """人声检测的逐帧特征（按波形和声道缓存），channel 为 None 时为混合声道
+
+        特征与阈值无关，实时调整电平范围时只重新做滞回判定与区间合并。
+        """
+        cached = self._voice
+        if cached is None or cached[0] is not y or cached[1] != sr:
+            cached = self._voice = (y, sr, {})
+        frames = cached[2]
+        if channel not in frames:
+            frames[channel] = voiceactivity.voiced_frames(
+                y if channel is None else y.channel_view(channel))
+        return frames[channel]
+    
+    def set_scene_snap(self, enabled):
+        """设置剪辑边界是否吸附到镜头切换"""
+        self.scene_snap = bool(enabled)
+    
+    def scene_cuts(self, file_path):
+        """素材的镜头切换时间（按素材缓存，有代理素材时从代理检测）"""
+        if file_path not in self._scene_cuts:
+            path = file_path
+            if self.proxy_cache is not None:
+                path = self.proxy_cache.resolve(file_path)
+            try:
+                cuts = scenedetect.detect(path)
+            except Exception as e:
+                print(f"镜头切换检测错误: {str(e)}")
+                cuts = np.zeros(0)
+            self._scene_cuts[file_path] = cuts
+        return self._scene_cuts[file_path]
+    
+    def _snap(self, file_path, starts, ends):
+        """开启吸附时把片段边界移到附近的镜头切换上"""
+        if not self.scene_snap or not file_path:
+            return starts, ends
+        return scenedetect.snap_to_cuts(starts, ends, self.scene_cuts(file_path), SCENE_TOLERANCE)
+    
+    def _range_envelope(self, y, sr, hop_length):
+        """电平包络（按波形缓存），返回 (混合声道电平, 各声道电平)
+
+        多声道素材一次遍历交错数据同时得到两者，切换声道模式不需要重新计算；
+        单声道素材的各声道电平为 None。
+        """
+        cached = self._envelope
+        if cached is not None and cached[0] is y and cached[1] == sr:
+            return cached[2], cached[3]
+        
+        # 优化参数设置
+        frame_length = 256  # 减小帧长度以提高精度
+        
+        # 计算RMS能量
+        if getattr(y, 'channels', 1) > 1:
+            db_values, channel_db = envelope.channel_rms_db(y.multichannel(), frame_length,
+                                                            hop_length)
+        else:
+            db_values, channel_db = envelope.rms_db(y, frame_length, hop_length), None
+        self._envelope = (y, sr, db_values, channel_db)
+        return db_values, channel_db
+    
+    def _range_mask(self, y, sr, hop_length, min_db, max_db):
+        """按声道模式得到逐帧是否在电平范围内
+
+        各声道电平共用同一个参考（最响声道最响的一帧为 0 dB）：
+        任一声道在范围内即可，或以每帧最响的声道为准，或只看指定声道。
+        """
+        db_values, channel_db = self._range_envelope(y, sr, hop_length)
+        mode = self._channel_mode(y)
+        if mode == 'all':
+            return ((channel_db >= min_db) & (channel_db <= max_db)).any(axis=0)
+        if mode == 'loudest':
+            db_values = channel_db.max(axis=0)
+        elif isinstance(mode, int):
+            db_values = channel_db[mode]
+        return (db_values >= min_db) & (db_values <= max_db)
+    
+    def _cut_by_range(self, y, sr, min_db, max_db):
+        """按电平范围剪辑，返回 (开始时间数组, 结束时间数组)"""
+        hop_length = 64     # 减小步长以提高时间精度
+        mask = self._range_mask(y, sr, hop_length, min_db, max_db)
+        
+        MAX_SILENCE_LENGTH = 0.05  # 最大空白时长（秒）
+        MIN_SEGMENT_LENGTH = 0.1   # 最小有效片段时长（秒）
+        SAMPLES_PER_SECOND = sr / hop_length
+        MAX_SILENCE_SAMPLES = max(1, int(MAX_SILENCE_LENGTH * SAMPLES_PER_SECOND))
+        MIN_SEGMENT_SAMPLES = int(MIN_SEGMENT_LENGTH * SAMPLES_PER_SECOND)
+        
+        # 符合条件的帧；短于最大空白时长的空白并入片段
+        valid = np.flatnonzero(mask)
+        if len(valid) == 0:
+            return np.zeros(0), np.zeros(0)
+        split = np.flatnonzero(np.diff(valid) - 1 >= MAX_SILENCE_SAMPLES)
+        first = valid[np.concatenate(([0], split + 1))]
+        last = valid[np.concatenate((split, [len(valid) - 1]))]
+        # 被长空白结束的片段止于最后一个有效帧；末尾仍未结束的片段延续到音频结尾
+        if len(mask) - 1 - last[-1] < MAX_SILENCE_SAMPLES:
+            last[-1] = len(mask)
+        keep = last - first >= MIN_SEGMENT_SAMPLES
+        
+        # 转换为实际时间
+        return first[keep] / SAMPLES_PER_SECOND, last[keep] / SAMPLES_PER_SECOND
+    
+    def add_segment(self, index, start_time, end_time, file_path=None):
+        """添加时间段"""
+        self.store.append(file_path, [start_time], [end_time], ids=[index])
+    
+    def _create_item(self, segment_id):
+        """为存储中的片段创建时间段项目"""
+        record = self.store.get(segment_id)
+        file_id = int(record['file_id'])
+        file_path = self.store.files[file_id] if file_id >= 0 else None
+        start_time = float(record['start'])
+        end_time = float(record['end'])
+        
+        # 缩略图：没有时在后台解码
+        thumbnail = self.store.thumbnails.get(segment_id)
+        if thumbnail is None and file_path:
+            self.request_thumbnail(segment_id, file_path, start_time)
+        
+        # 创建时间段项目
+        segment = TimeSegmentItem(segment_id, file_path, start_time, end_time, thumbnail)
+        segment.set_selected(bool(record['selected']))
+        segment.deleted.connect(self.remove_segment)
+        segment.timeChanged.connect(self.update_segment_time)
+        segment.selectionChanged.connect(
+            lambda index, selected: self.store.select([index], selected))
+        segment.playClicked.connect(self._play_item)
+        segment.pauseClicked.connect(self.stop_segment)
+        return segment
+    
+    def _play_item(self, file_path, start, end, item):
+        """播放片段：之前播放的片段恢复为未播放状态"""
+        self.playback_finished()
+        if not file_path:
+            item.update_play_state(False)
+            return
+        # 播放器开始新的播放前会结束之前的播放（发出 playback_finished），之后再登记
+        self.play_segment.emit(file_path, start, end)
+        self.playing_id = item.index
+    
+    def playback_finished(self):
+        """播放器播完或被停止时，正在播放的片段恢复为未播放状态"""
+        item = self.items.get(self.playing_id)
+        self.playing_id = None
+        if item is not None:
+            item.update_play_state(False)
+    
+    def _on_rows_inserted(self, ids):
+        """存储新增片段时登记，组件在之后的事件循环中分批创建"""
+        self._queued.update(dict.fromkeys(ids.tolist()))
+        if not self._create_timer.isActive():
+            self._create_timer.start(0)
+    
+    def _create_queued(self):
+        """按行号创建一批等待中的组件，还有剩余时留到下一次事件循环"""
+        queued = np.fromiter(self._queued, dtype=np.int64, count=len(self._queued))
+        rows = self.store.rows(queued)
+        order = np.argsort(rows, kind='stable')[:ITEM_BATCH]
+        # 已创建组件的行号：新组件插在行号比它小的组件之后
+        created = np.fromiter(self.items, dtype=np.int64, count=len(self.items))
+        created_rows = np.sort(self.store.rows(created))
+        positions = np.searchsorted(created_rows, rows[order]) + np.arange(len(order))
+        for segment_id, position in zip(queued[order].tolist(), positions.tolist()):
+            del self._queued[segment_id]
+            item = self._create_item(segment_id)
+            self.items[segment_id] = item
+            self.content_layout.insertWidget(position, item)
+        if self._queued:
+            self._create_timer.start(0)
+    
+    def is_loading(self):
+        """是否还有组件或缩略图没有完成"""
+        return bool(self._queued) or self.thumbnail_loader.pending()
+    
+    def _on_rows_removed(self, ids):
+        """存储删除片段时移除对应组件"""
+        for segment_id in ids.tolist():
+            self._queued.pop(segment_id, None)
+            item = self.items.pop(segment_id, None)
+            if item is not None:
+                self.content_layout.removeWidget(item)
+                item.deleteLater()
+    
+    def _on_rows_changed(self, ids):
+        """存储中片段时间或勾选状态变化时同步组件"""
+        records = self.store.records
+        for segment_id, row in zip(ids.tolist(), self.store.rows(ids).tolist()):
+            item = self.items.get(segment_id)
+            if item is None or row < 0:
+                continue
+            item.set_times(float(records['start'][row]), float(records['end'][row]))
+            item.set_selected(bool(records['selected'][row]))
+    
+    def _on_store_reset(self):
+        """存储清空时移除全部组件"""
+        self._queued.clear()
+        self.thumbnail_loader.cancel()
+        for item in self.items.values():
+            self.content_layout.removeWidget(item)
+            item.deleteLater()
+        self.items.clear()
+    
+    def request_thumbnail(self, segment_id, file_path, time):
+        """在后台解码片段的缩略图（有代理素材时从代理读取）"""
+        if self.proxy_cache is not None:
+            file_path = self.proxy_cache.resolve(file_path)
+        self.thumbnail_loader.request(segment_id, file_path, time)
+    
+    def _on_thumbnail_ready(self, segment_id, thumbnail):
+        item = self.items.get(segment_id)
+        if item is None:
+            return  # 片段已删除
+        self.store.thumbnails[segment_id] = thumbnail
+        item.set_thumbnail(thumbnail)
+        self.thumbnail_loaded.emit(segment_id, thumbnail)
+    
+    def clear_segments(self):
+        """清除所有片段"""
+        self.store.clear()
+    
+    def remove_segment(self, index):
+        """删除指定片段"""
+        self.store.remove([index])
+    
+    def update_segment_time(self, index, start_time, end_time):
+        """更新片段时间"""
+        self.store.set_times(index, start_time, end_time)
+    
+    def select_all(self, selected=True):
+        """全选/取消全选"""
+        self.store.select(None, selected)
+    
+    def get_selected_segments(self):
+        """获取选中的片段"""
+        return self.store.view(selected_only=True)
+    
+    def add_to_timeline(self):
+        """将选中片段添加到时间线"""
+        selected = self.get_selected_segments()
+        if selected:
+            self.segments_created.emit(selected) 
+    
+    def set_silence_threshold(self, min_val, max_val):
+        """设置静音阈值"""
+        self.silence_min = min_val
+        self.silence_max = max_val
         # 可以在这里添加自动更新剪辑的逻辑 
\ No newline at end of file
@@ -1,415 +1,651 @@
-from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
-                           QPushButton, QScrollArea, QLabel, QSlider, QCheckBox,
-                           QLineEdit, QFrame, QGridLayout, QSpacerItem, QSizePolicy)
-from PyQt5.QtCore import Qt, QSize
-from PyQt5.QtGui import QIcon
-from sourceinfo import SourceInfo
-from AVreader import AudioReader
-from AVtimeCut import TimeCutter, TimeSegmentItem
-from AVplayer import VideoPlayer
-from AVoutput import VideoExporter
-from PyQt5.QtWidgets import QFileDialog, QMessageBox
-import cv2
-from timeline import Timeline
-import subprocess
-
-class VideoEditUI(QMainWindow):
-    def __init__(self):
-        super().__init__()
-        self.current_playing = None  # 当前播放的片段
-        self.initUI()
-        
-    def initUI(self):
-        self.setWindowTitle("视频剪辑程序")
-        self.setGeometry(100, 100, 1600, 900)
-        
-        # 创建主窗口部件
-        central_widget = QWidget()
-        self.setCentralWidget(central_widget)
-        
-        # 创建主布局
-        main_layout = QVBoxLayout(central_widget)
-        
-        # 创建上下两个主要区域
-        upper_widget = QWidget()
-        lower_widget = QWidget()
-        upper_layout = QHBoxLayout(upper_widget)
-        lower_layout = QVBoxLayout(lower_widget)
-        
-        # === 上半部分 ===
-        # 左侧面板
-        left_panel = QWidget()
-        left_layout = QVBoxLayout(left_panel)
-        left_layout.setContentsMargins(5, 5, 5, 5)  # 添加边距
-        left_layout.setSpacing(10)  # 添加间距
-        
-        # 1. 素材栏
-        source_group = QFrame()
-        source_group.setFrameStyle(QFrame.StyledPanel | QFrame.Raised)  # 修改边框样式
-        source_layout = QVBoxLayout(source_group)
-        source_layout.setContentsMargins(5, 5, 5, 5)
-        source_layout.setSpacing(5)
-        
-        # 素材栏标题和导入按钮
-        source_header = QHBoxLayout()
-        source_header.addWidget(QLabel("<b>素材栏</b>"))
-        source_header.addStretch()
-        self.import_btn = QPushButton("导入文件")
-        self.import_btn.clicked.connect(self.import_files)  # 连接导入按钮信号
-        source_header.addWidget(self.import_btn)
-        source_layout.addLayout(source_header)
-        
-        # 创建SourceInfo实例
-        self.source_info = SourceInfo()
-        source_layout.addWidget(self.source_info)
-        
-        # 将素材栏添加到左侧面板
-        left_layout.addWidget(source_group)
-        
-        # 2. 音频信息读取栏
-        audio_group = QFrame()
-        audio_group.setFrameStyle(QFrame.StyledPanel | QFrame.Raised)
-        audio_layout = QVBoxLayout(audio_group)
-        audio_layout.setContentsMargins(5, 5, 5, 5)
-        audio_layout.setSpacing(5)  # 添加间距
-        
-        # 音频栏标题和读取按钮
-        audio_header = QHBoxLayout()
-        audio_header.addWidget(QLabel("<b>音频信息读取栏</b>"))
-        audio_header.addStretch()
-        self.read_audio_btn = QPushButton("读取音频")
-        self.read_audio_btn.setFixedWidth(100)  # 设置按钮宽度
-        self.read_audio_btn.clicked.connect(self.analyze_selected_audio)
-        audio_header.addWidget(self.read_audio_btn)
-        audio_layout.addLayout(audio_header)
-        
-        # 创建AudioReader实例
-        self.audio_reader = AudioReader()
-        audio_layout.addWidget(self.audio_reader)
-        
-        # 将音频栏添加到左侧面板
-        left_layout.addWidget(audio_group)
-        
-        # 调整左侧面板中各部分的比例（如果之前没有设置）
-        left_layout.addWidget(source_group, 3)  # 素材栏占3份
-        left_layout.addWidget(audio_group, 2)   # 音频栏占2份
-        
-        # 3. 自动剪辑信息栏
-        cut_group = QFrame()
-        cut_group.setFrameStyle(QFrame.Box)
-        cut_layout = QVBoxLayout(cut_group)
-        
-        cut_header = QHBoxLayout()
-        cut_header.addWidget(QLabel("<b>自动剪辑信息栏</b>"))
-        cut_header.addStretch()
-        self.select_all = QCheckBox("全选")
-        self.select_all.stateChanged.connect(self.toggle_all_segments)
-        self.auto_cut_btn = QPushButton("自动剪辑")
-        self.auto_cut_btn.clicked.connect(self.perform_auto_cut)
-        cut_header.addWidget(self.select_all)
-        cut_header.addWidget(self.auto_cut_btn)
-        cut_layout.addLayout(cut_header)
-        
-        # 创建TimeCutter实例
-        self.time_cutter = TimeCutter()
-        cut_layout.addWidget(self.time_cutter)
-        
-        # 将左侧面板和剪辑栏平分空间
-        upper_layout.addWidget(left_panel, 1)
-        upper_layout.addWidget(cut_group, 1)
-        
-        # === 下半部分 ===
-        # 5. 时间线栏
-        timeline_group = QFrame()
-        timeline_group.setFrameStyle(QFrame.Box)
-        timeline_layout = QVBoxLayout(timeline_group)
-        
-        # 时间线标题
-        timeline_layout.addWidget(QLabel("<b>时间线栏</b>"))
-        
-        # 创建Timeline实例
-        self.timeline = Timeline()
-        timeline_layout.addWidget(self.timeline)
-        
-        # 连接信号
-        self.time_cutter.segments_created.connect(self.timeline.add_segments)
-        self.timeline.exportVideo.connect(self.export_video)
-        self.timeline.exportAudio.connect(self.export_audio)
-        self.timeline.exportScript.connect(self.export_script)
-        
-        # 将时间线添加到下半部分
-        lower_layout.addWidget(timeline_group)
-        
-        # 设置上下部分的比例
-        main_layout.addWidget(upper_widget, 2)
-        main_layout.addWidget(lower_widget, 1)
-
-        # 创建VideoExporter实例
-        self.video_exporter = VideoExporter()
-        self.video_exporter.progress_updated.connect(self.update_export_progress)
-        
-        # 连接静音检测信号
-        self.audio_reader.silence_detected.connect(self.update_silence_threshold)
-
-    def import_files(self):
-        """处理文件导入"""
-        file_dialog = QFileDialog()
-        file_dialog.setFileMode(QFileDialog.ExistingFiles)
-        file_dialog.setNameFilter(self.source_info.get_media_filters())
-        
-        if file_dialog.exec_():
-            file_paths = file_dialog.selectedFiles()
-            for file_path in file_paths:
-                self.source_info.add_source(file_path)
-    
-    def get_selected_sources(self):
-        """获取选中的素材列表"""
-        return self.source_info.get_selected_sources()
-
-    def analyze_selected_audio(self):
-        """分析选中素材的音频"""
-        selected_sources = self.get_selected_sources()
-        if not selected_sources:
-            QMessageBox.warning(self, "警告", "请先选择要分析的素材")
-            return
-        
-        # 清除之前的显示
-        self.audio_reader.clear_display()
-        
-        # 分析所有选中的素材
-        min_db = float('inf')
-        max_db = float('-inf')
-        valid_results = []
-        
-        for source in selected_sources:
-            result = self.audio_reader.analyze_audio(source)
-            if result:
-                # 更新全局最大最小值
-                min_db = min(min_db, result['min_db'])
-                max_db = max(max_db, result['max_db'])
-                valid_results.append(result)
-        
-        if not valid_results:
-            QMessageBox.warning(self, "警告", "没有可用的音频分析结果")
-            return
-        
-        # 保存分析结果供后续使用
-        self.audio_analysis_result = {
-            'min_db': min_db,
-            'max_db': max_db,
-            'sources': selected_sources,
-            'waveform': valid_results[0]['waveform'],  # 使用第一个有效结果的波形
-            'sr': valid_results[0]['sr'],  # 使用第一个有效结果的采样率
-            'selected_range': (
-                float(self.audio_reader.min_input.text()),
-                float(self.audio_reader.max_input.text())
-            )
-        }
-        
-        # 更新音频读取栏显示
-        self.audio_reader.min_db = min_db
-        self.audio_reader.max_db = max_db
-        self.audio_reader.update_display()
-    
-    def perform_auto_cut(self):
-        """执行自动剪辑"""
-        if not hasattr(self, 'audio_analysis_result'):
-            QMessageBox.warning(self, "警告", "请先进行音频分析")
-            return
-            
-        # 获取当前的选择范围
-        selected_range = (
-            float(self.audio_reader.min_input.text()),
-            float(self.audio_reader.max_input.text())
-        )
-        
-        # 更新分析结果中的选择范围
-        self.audio_analysis_result['selected_range'] = selected_range
-        
-        # 执行自动剪辑
-        self.time_cutter.auto_cut(self.audio_analysis_result)
-    
-    def toggle_all_segments(self, state):
-        """切换所有片段的选中状态"""
-        if hasattr(self, 'time_cutter'):
-            for segment in self.time_cutter.segments:
-                segment.checkbox.setChecked(state == Qt.Checked)
-
-    def export_video(self, segment_info):
-        """导出视频"""
-        output_path, _ = QFileDialog.getSaveFileName(
-            self, "导出视频", "", "MP4文件 (*.mp4)")
-        if output_path and segment_info:
-            try:
-                commands = []
-                temp_files = []
-                
-                # 处理每个片段
-                for i, info in enumerate(segment_info):
-                    temp_file = f"temp_{i}.mp4"
-                    temp_files.append(temp_file)
-                    
-                    command = (
-                        f'ffmpeg -i "{info["file_path"]}" -ss {info["start_time"]} '
-                        f'-t {info["end_time"] - info["start_time"]} '
-                        f'-c copy "{temp_file}"'
-                    )
-                    commands.append(command)
-                
-                # 创建文件列表
-                with open("mylist.txt", "w") as f:
-                    for temp in temp_files:
-                        f.write(f"file '{temp}'\n")
-                
-                # 使用 concat demuxer 合并
-                merge_command = f'ffmpeg -f concat -safe 0 -i mylist.txt -c copy "{output_path}"'
-                commands.append(merge_command)
-                
-                # 清理命令
-                commands.append('del mylist.txt')
-                for temp_file in temp_files:
-                    commands.append(f'del "{temp_file}"')
-                
-                # 执行命令
-                for command in commands:
-                    subprocess.run(command, shell=True, check=True)
-                
-                QMessageBox.information(self, "成功", "视频导出完成")
-                
-            except Exception as e:
-                QMessageBox.critical(self, "错误", f"导出失败: {str(e)}")
-
-    def export_audio(self, segment_info):
-        """导出音频"""
-        output_path, _ = QFileDialog.getSaveFileName(
-            self, "导出音频", "", "WAV文件 (*.wav);;MP3文件 (*.mp3)")
-        if output_path and segment_info:
-            try:
-                commands = []
-                temp_files = []
-                
-                # 处理每个片段
-                for i, info in enumerate(segment_info):
-                    temp_file = f"temp_{i}.wav"
-                    temp_files.append(temp_file)
-                    
-                    command = (
-                        f'ffmpeg -i "{info["file_path"]}" -ss {info["start_time"]} '
-                        f'-t {info["end_time"] - info["start_time"]} '
-                        f'-vn -acodec pcm_s16le "{temp_file}"'
-                    )
-                    commands.append(command)
-                
-                # 创建文件列表
-                with open("mylist.txt", "w") as f:
-                    for temp in temp_files:
-                        f.write(f"file '{temp}'\n")
-                
-                # 使用 concat demuxer 合并
-                if output_path.endswith('.mp3'):
-                    merge_command = (
-                        f'ffmpeg -f concat -safe 0 -i mylist.txt '
-                        f'-acodec libmp3lame "{output_path}"'
-                    )
-                else:
-                    merge_command = (
-                        f'ffmpeg -f concat -safe 0 -i mylist.txt '
-                        f'-acodec pcm_s16le "{output_path}"'
-                    )
-                commands.append(merge_command)
-                
-                # 清理命令
-                commands.append('del mylist.txt')
-                for temp_file in temp_files:
-                    commands.append(f'del "{temp_file}"')
-                
-                # 执行命令
-                for command in commands:
-                    subprocess.run(command, shell=True, check=True)
-                
-                QMessageBox.information(self, "成功", "音频导出完成")
-                
-            except Exception as e:
-                QMessageBox.critical(self, "错误", f"导出失败: {str(e)}")
-
-    def export_script(self, segment_info):
-        """导出ffmpeg脚本"""
-        output_path, _ = QFileDialog.getSaveFileName(
-            self, "保存脚本", "", "批处理文件 (*.bat)")
-        if output_path and segment_info:
-            try:
-                commands = []
-                temp_files = []
-                
-                # 添加注释
-                commands.append("@echo off")
-                commands.append("rem 自动生成的ffmpeg剪辑脚本")
-                commands.append("")
-                
-                # 处理每个片段
-                for i, info in enumerate(segment_info):
-                    temp_file = f"temp_{i}.mp4"
-                    temp_files.append(temp_file)
-                    
-                    commands.append(f'rem 处理片段 {i+1}')
-                    command = (
-                        f'ffmpeg -i "{info["file_path"]}" -ss {info["start_time"]} '
-                        f'-t {info["end_time"] - info["start_time"]} '
-                        f'-c copy "{temp_file}"'
-                    )
-                    commands.append(command)
-                    commands.append("")
-                
-                # 创建文件列表
-                commands.append("rem 创建文件列表")
-                commands.append('echo file temp_0.mp4 > mylist.txt')
-                for i in range(1, len(temp_files)):
-                    commands.append(f'echo file temp_{i}.mp4 >> mylist.txt')
-                commands.append("")
-                
-                # 合并命令
-                commands.append("rem 合并所有片段")
-                commands.append(
-                    'ffmpeg -f concat -safe 0 -i mylist.txt -c copy "output.mp4"'
-                )
-                commands.append("")
-                
-                # 清理命令
-                commands.append("rem 清理临时文件")
-                commands.append("del mylist.txt")
-                for temp_file in temp_files:
-                    commands.append(f'del "{temp_file}"')
-                
-                # 保存脚本
-                with open(output_path, "w", encoding='utf-8') as f:
-                    f.write("\n".join(commands))
-                
-                QMessageBox.information(self, "成功", "脚本导出完成")
-                
-            except Exception as e:
-                QMessageBox.critical(self, "错误", f"导出失败: {str(e)}")
-
-    def update_export_progress(self, progress):
-        """更新导出进度"""
-        # 可以添加进度条显示
-        pass
-
-    def update_silence_threshold(self, min_val, max_val):
-        """更新静音阈值"""
-        self.time_cutter.set_silence_threshold(min_val, max_val)
-
-    def add_to_timeline(self):
-        """将选中片段添加到时间线"""
-        selected = self.get_selected_segments()
-        if selected:
-            # 按编号排序
-            selected.sort(key=lambda x: x.index)
-            self.segments_created.emit(selected)
-
-if __name__ == '__main__':
-    import sys
-    from PyQt5.QtWidgets import QApplication
-    app = QApplication(sys.argv)
-    window = VideoEditUI()
-    window.show()
+from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
+                           QPushButton, QScrollArea, QLabel, QSlider, QCheckBox,
+                           QLineEdit, QFrame, QGridLayout, QSpacerItem, QSizePolicy,
+                           QComboBox, QProgressDialog, QApplication)
+from PyQt5.QtCore import Qt, QSize
+from PyQt5.QtGui import QIcon
+from sourceinfo import SourceInfo
+from AVreader import AudioReader
+from AVtimeCut import TimeCutter, TimeSegmentItem
+from AVplayer import VideoPlayer
+from AVoutput import VideoExporter
+from PyQt5.QtWidgets import QFileDialog, QMessageBox
+from timeline import Timeline
+import audioexport
+import chunkexport
+import exportplan
+import renderfarm
+import exportscript
+import loudness
+import analysisstore
+from proxycache import ProxyCache
+from filmstrip import FilmstripCache
+from ffmpegrunner import FfmpegRunner
+import os
+import tempfile
+
+class VideoEditUI(QMainWindow):
+    def __init__(self):
+        super().__init__()
+        self.current_playing = None  # 当前播放的片段
+        self.audio_cache = {}  # 素材路径 -> 音频分析结果（含解码后的PCM）
+        self.loudness_cache = {}  # (素材路径, 是否单声道) -> (响度块, PCM)
+        self.analysis_store = None  # 分析记录，第一次分析时打开
+        self.audio_exporting = False  # 音频导出在界面线程中进行，期间仍会处理事件
+        self.initUI()
+        
+    def initUI(self):
+        self.setWindowTitle("视频剪辑程序")
+        self.setGeometry(100, 100, 1600, 900)
+        
+        # 创建主窗口部件
+        central_widget = QWidget()
+        self.setCentralWidget(central_widget)
+        
+        # 创建主布局
+        main_layout = QVBoxLayout(central_widget)
+        
+        # 创建上下两个主要区域
+        upper_widget = QWidget()
+        lower_widget = QWidget()
+        upper_layout = QHBoxLayout(upper_widget)
+        lower_layout = QVBoxLayout(lower_widget)
+        
+        # === 上半部分 ===
+        # 左侧面板
+        left_panel = QWidget()
+        left_layout = QVBoxLayout(left_panel)
+        left_layout.setContentsMargins(5, 5, 5, 5)  # 添加边距
+        left_layout.setSpacing(10)  # 添加间距
+        
+        # 1. 素材栏
+        source_group = QFrame()
+        source_group.setFrameStyle(QFrame.StyledPanel | QFrame.Raised)  # 修改边框样式
+        source_layout = QVBoxLayout(source_group)
+        source_layout.setContentsMargins(5, 5, 5, 5)
+        source_layout.setSpacing(5)
+        
+        # 素材栏标题和导入按钮
+        source_header = QHBoxLayout()
+        source_header.addWidget(QLabel("<b>素材栏</b>"))
+        source_header.addStretch()
+        self.proxy_check = QCheckBox("生成代理")
+        self.proxy_check.setToolTip("后台生成低分辨率代理，用于缩略图与预览")
+        self.proxy_check.stateChanged.connect(self.toggle_proxies)
+        source_header.addWidget(self.proxy_check)
+        self.import_btn = QPushButton("导入文件")
+        self.import_btn.clicked.connect(self.import_files)  # 连接导入按钮信号
+        source_header.addWidget(self.import_btn)
+        source_layout.addLayout(source_header)
+        
+        # 创建SourceInfo实例
+        self.source_info = SourceInfo()
+        source_layout.addWidget(self.source_info)
+        
+        # 将素材栏添加到左侧面板
+        left_layout.addWidget(source_group)
+        
+        # 2. 音频信息读取栏
+        audio_group = QFrame()
+        audio_group.setFrameStyle(QFrame.StyledPanel | QFrame.Raised)
+        audio_layout = QVBoxLayout(audio_group)
+        audio_layout.setContentsMargins(5, 5, 5, 5)
+        audio_layout.setSpacing(5)  # 添加间距
+        
+        # 音频栏标题和读取按钮
+        audio_header = QHBoxLayout()
+        audio_header.addWidget(QLabel("<b>音频信息读取栏</b>"))
+        audio_header.addStretch()
+        self.read_audio_btn = QPushButton("读取音频")
+        self.read_audio_btn.setFixedWidth(100)  # 设置按钮宽度
+        self.read_audio_btn.clicked.connect(self.analyze_selected_audio)
+        audio_header.addWidget(self.read_audio_btn)
+        self.follow_btn = QPushButton("跟随录音")
+        self.follow_btn.setCheckable(True)
+        self.follow_btn.setFixedWidth(100)
+        self.follow_btn.setToolTip("分析正在写入的录音（WAV、MKV等），片段确定后立即加入剪辑列表")
+        self.follow_btn.toggled.connect(self.toggle_follow)
+        audio_header.addWidget(self.follow_btn)
+        audio_layout.addLayout(audio_header)
+        
+        # 创建AudioReader实例
+        self.audio_reader = AudioReader()
+        audio_layout.addWidget(self.audio_reader)
+        
+        # 将音频栏添加到左侧面板
+        left_layout.addWidget(audio_group)
+        
+        # 调整左侧面板中各部分的比例（如果之前没有设置）
+        left_layout.addWidget(source_group, 3)  # 素材栏占3份
+        left_layout.addWidget(audio_group, 2)   # 音频栏占2份
+        
+        # 3. 自动剪辑信息栏
+        cut_group = QFrame()
+        cut_group.setFrameStyle(QFrame.Box)
+        cut_layout = QVBoxLayout(cut_group)
+        
+        cut_header = QHBoxLayout()
+        cut_header.addWidget(QLabel("<b>自动剪辑信息栏</b>"))
+        cut_header.addStretch()
+        self.select_all = QCheckBox("全选")
+        self.select_all.stateChanged.connect(self.toggle_all_segments)
+        self.auto_cut_btn = QPushButton("自动剪辑")
+        self.auto_cut_btn.clicked.connect(self.perform_auto_cut)
+        self.engine_combo = QComboBox()
+        for engine, name in TimeCutter.ENGINES.items():
+            self.engine_combo.addItem(name, engine)
+        self.engine_combo.currentIndexChanged.connect(
+            lambda: self.time_cutter.set_engine(self.engine_combo.currentData()))
+        cut_header.addWidget(QLabel("剪辑引擎:"))
+        cut_header.addWidget(self.engine_combo)
+        self.channel_combo = QComboBox()
+        self.channel_combo.setToolTip("多声道素材按哪个声道剪辑：混合、任一声道有声、每帧最响的声道或指定声道")
+        self.channel_combo.currentIndexChanged.connect(
+            lambda: self.time_cutter.set_channel_mode(self.channel_combo.currentData()))
+        cut_header.addWidget(QLabel("剪辑声道:"))
+        cut_header.addWidget(self.channel_combo)
+        self.live_cut_check = QCheckBox("实时剪辑")
+        self.live_cut_check.setToolTip("调整电平范围时立即更新剪辑结果")
+        cut_header.addWidget(self.live_cut_check)
+        self.scene_snap_check = QCheckBox("吸附镜头切换")
+        self.scene_snap_check.setToolTip("把剪辑边界移到附近的视频镜头切换处")
+        cut_header.addWidget(self.scene_snap_check)
+        cut_header.addWidget(self.select_all)
+        cut_header.addWidget(self.auto_cut_btn)
+        cut_layout.addLayout(cut_header)
+        
+        # 创建TimeCutter实例
+        self.time_cutter = TimeCutter()
+        self.update_channel_modes(1)
+        cut_layout.addWidget(self.time_cutter)
+        self.scene_snap_check.toggled.connect(self.time_cutter.set_scene_snap)
+        
+        # 4. 预览栏
+        player_group = QFrame()
+        player_group.setFrameStyle(QFrame.Box)
+        player_layout = QVBoxLayout(player_group)
+        player_layout.addWidget(QLabel("<b>预览栏</b>"))
+        self.player = VideoPlayer()
+        player_layout.addWidget(self.player)
+        
+        # 将左侧面板、剪辑栏和预览栏平分空间
+        upper_layout.addWidget(left_panel, 1)
+        upper_layout.addWidget(cut_group, 1)
+        upper_layout.addWidget(player_group, 1)
+        
+        # === 下半部分 ===
+        # 5. 时间线栏
+        timeline_group = QFrame()
+        timeline_group.setFrameStyle(QFrame.Box)
+        timeline_layout = QVBoxLayout(timeline_group)
+        
+        # 时间线标题
+        timeline_layout.addWidget(QLabel("<b>时间线栏</b>"))
+        
+        # 创建Timeline实例
+        self.timeline = Timeline()
+        timeline_layout.addWidget(self.timeline)
+        
+        # 连接信号
+        self.time_cutter.segments_created.connect(self.timeline.add_segments)
+        self.time_cutter.thumbnail_loaded.connect(self.timeline.set_thumbnail)
+        self.time_cutter.play_segment.connect(self.player.play_segment)
+        self.time_cutter.stop_segment.connect(self.player.stop)
+        self.player.playback_finished.connect(self.time_cutter.playback_finished)
+        self.time_cutter.cut_updated.connect(self.audio_reader.waveform.set_segments)
+        self.time_cutter.cut_updated.connect(self.audio_reader.spectrogram.set_segments)
+        self.audio_reader.range_edited.connect(self.live_recut)
+        self.audio_reader.follow_segments.connect(self.time_cutter.append_segments)
+        self.audio_reader.follow_finished.connect(self.follow_finished)
+        self.timeline.previewRequested.connect(self.player.play_segments)
+        self.timeline.exportVideo.connect(self.export_video)
+        self.timeline.exportAudio.connect(self.export_audio)
+        self.timeline.exportScript.connect(self.export_script)
+        
+        # 将时间线添加到下半部分
+        lower_layout.addWidget(timeline_group)
+        
+        # 设置上下部分的比例
+        main_layout.addWidget(upper_widget, 2)
+        main_layout.addWidget(lower_widget, 1)
+
+        # 代理素材：缩略图和预览使用代理，导出使用原始素材
+        self.proxy_cache = ProxyCache(parent=self)
+        self.source_info.source_added.connect(self.source_added)
+        self.proxy_cache.progress.connect(self.source_info.set_proxy_progress)
+        self.proxy_cache.failed.connect(self.source_info.set_proxy_failed)
+        self.proxy_cache.ready.connect(
+            lambda file_path, proxy: self.source_info.set_proxy_progress(file_path, 100))
+        self.time_cutter.proxy_cache = self.proxy_cache
+        self.player.proxy_cache = self.proxy_cache
+        
+        # 时间线胶片条：每个素材解码一遍生成图集，缩放时不再解码
+        self.filmstrip_cache = FilmstripCache(proxy_cache=self.proxy_cache, parent=self)
+        self.filmstrip_cache.failed.connect(
+            lambda file_path, error: print(f"胶片条生成错误: {error}"))
+        self.timeline.set_filmstrip_cache(self.filmstrip_cache)
+        
+        # 创建VideoExporter实例
+        self.video_exporter = VideoExporter()
+        self.video_exporter.progress_updated.connect(self.update_export_progress)
+        
+        # 异步执行导出用的 ffmpeg 进程
+        self.progress_dialog = None
+        self.export_runner = FfmpegRunner(parent=self)
+        self.export_runner.progress.connect(self.update_export_progress)
+        self.export_runner.finished.connect(self.export_finished)
+        self.export_runner.failed.connect(self.export_failed)
+        self.export_runner.cancelled.connect(self.export_cancelled)
+        self.farm_export = renderfarm.FarmExport(self)
+        self.farm_export.progress.connect(self.update_export_progress)
+        self.farm_export.finished.connect(self.farm_export_finished)
+        self.farm_export.failed.connect(self.export_failed)
+        self.farm_export.cancelled.connect(self.export_cancelled)
+        
+        # 连接静音检测信号
+        self.audio_reader.silence_detected.connect(self.update_silence_threshold)
+
+    def import_files(self):
+        """处理文件导入"""
+        file_dialog = QFileDialog()
+        file_dialog.setFileMode(QFileDialog.ExistingFiles)
+        file_dialog.setNameFilter(self.source_info.get_media_filters())
+        
+        if file_dialog.exec_():
+            # 素材项分批创建，创建后再按需请求代理（source_added）
+            for file_path in file_dialog.selectedFiles():
+                self.source_info.add_source(file_path)
+    
+    def source_added(self, file_path):
+        """素材项创建完成：开启代理时为它生成代理"""
+        if self.proxy_check.isChecked():
+            self.request_proxy(file_path)
+    
+    def request_proxy(self, file_path):
+        """请求为素材生成代理"""
+        source = self.source_info.find_source(file_path)
+        if source is not None and source.media_info.is_video:
+            source.set_proxy_status("代理: 等待生成")
+            self.proxy_cache.request(file_path, source.media_info.duration)
+    
+    def toggle_proxies(self, state):
+        """开启时为已导入的视频生成代理，关闭时停止生成"""
+        if state == Qt.Checked:
+            for source in self.source_info.sources:
+                self.request_proxy(source.media_info.file_path)
+        else:
+            self.proxy_cache.cancel()
+            for source in self.source_info.sources:
+                if not self.proxy_cache.lookup(source.media_info.file_path):
+                    source.set_proxy_status("")
+    
+    def get_selected_sources(self):
+        """获取选中的素材列表"""
+        return self.source_info.get_selected_sources()
+
+    def analyze_selected_audio(self):
+        """分析选中素材的音频"""
+        selected_sources = self.get_selected_sources()
+        if not selected_sources:
+            QMessageBox.warning(self, "警告", "请先选择要分析的素材")
+            return
+        
+        # 清除之前的显示
+        self.audio_reader.clear_display()
+        
+        if self.audio_reader.analysis_engine() == 'ffmpeg':
+            self.analyze_selected_fast(selected_sources)
+            return
+        
+        # 分析所有选中的素材
+        valid_results = []
+        
+        for source in selected_sources:
+            result = self.audio_reader.analyze_audio(source)
+            if result:
+                self.audio_cache[source] = result
+                self.record_analysis(source, result)
+                valid_results.append(result)
+        
+        if not valid_results:
+            QMessageBox.warning(self, "警告", "没有可用的音频分析结果")
+            return
+        
+        # 合并各素材的电平直方图，求全局百分位数
+        histogram = sum(result['histogram'] for result in valid_results)
+        min_db, max_db = histogram.suggest_range()
+        
+        # 保存分析结果供后续使用
+        self.audio_analysis_result = {
+            'min_db': min_db,
+            'max_db': max_db,
+            'mean_db': histogram.mean(),
+            'histogram': histogram,
+            'sources': selected_sources,
+            'waveform': valid_results[0]['waveform'],  # 使用第一个有效结果的波形
+            'sr': valid_results[0]['sr'],  # 使用第一个有效结果的采样率
+            'channels': valid_results[0]['channels'],
+            'selected_range': (
+                float(self.audio_reader.min_input.text()),
+                float(self.audio_reader.max_input.text())
+            )
+        }
+        
+        # 更新音频读取栏显示
+        self.audio_reader.min_db = min_db
+        self.audio_reader.max_db = max_db
+        self.audio_reader.update_display()
+        self.audio_reader.show_global_levels(min_db, max_db, len(valid_results))
+        self.update_channel_modes(valid_results[0]['channels'])
+    
+    def update_channel_modes(self, channels):
+        """按素材的声道数更新剪辑声道选项（保留当前选择）"""
+        current = self.channel_combo.currentData()
+        self.channel_combo.blockSignals(True)
+        self.channel_combo.clear()
+        for mode, name in TimeCutter.CHANNEL_MODES.items():
+            self.channel_combo.addItem(name, mode)
+        for channel in range(channels if channels > 1 else 0):
+            self.channel_combo.addItem(f"声道 {channel + 1}", channel)
+        index = self.channel_combo.findData(current)
+        self.channel_combo.setCurrentIndex(max(index, 0))
+        self.channel_combo.setEnabled(channels > 1)
+        self.channel_combo.blockSignals(False)
+        self.time_cutter.set_channel_mode(self.channel_combo.currentData())
+    
+    def toggle_follow(self, checked):
+        """开始或停止跟随录音（选中的第一个素材，没有选中时选择文件）"""
+        if not checked:
+            self.audio_reader.stop_follow()
+            return
+        selected_sources = self.get_selected_sources()
+        if selected_sources:
+            file_path = selected_sources[0]
+        else:
+            file_path, _ = QFileDialog.getOpenFileName(
+                self, "选择正在写入的录音", "", self.source_info.get_media_filters())
+        if not file_path:
+            self.follow_btn.setChecked(False)
+            return
+        self.time_cutter.begin_follow(file_path)
+        self.audio_reader.follow(file_path)
+        self.follow_btn.setText("停止跟随")
+    
+    def follow_finished(self, file_path):
+        """录音结束或停止跟随"""
+        self.follow_btn.blockSignals(True)
+        self.follow_btn.setChecked(False)
+        self.follow_btn.blockSignals(False)
+        self.follow_btn.setText("跟随录音")
+    
+    def record_analysis(self, file_path, result):
+        """把分析摘要追加到分析记录中，供之后跨文件查询"""
+        try:
+            if self.analysis_store is None:
+                self.analysis_store = analysisstore.AnalysisStore()
+            row, envelope = analysisstore.summarize(
+                result, self.audio_reader.silence_threshold, result.get('analysis_seconds', 0.0))
+            self.analysis_store.append(file_path, row, envelope,
+                                       device=analysisstore.media_device(file_path))
+        except Exception as e:
+            print(f"分析记录保存错误: {str(e)}")
+    
+    def analyze_selected_fast(self, selected_sources):
+        """快速分析：ffmpeg 静音检测直接给出各素材的剪辑片段"""
+        valid_results = []
+        for source in selected_sources:
+            result = self.audio_reader.analyze_fast(source)
+            if result:
+                self.record_analysis(source, result)
+                valid_results.append(result)
+        
+        if not valid_results:
+            QMessageBox.warning(self, "警告", "没有可用的音频分析结果")
+            return
+        
+        # 没有波形，自动剪辑直接使用检测到的片段
+        self.audio_analysis_result = {
+            'engine': 'ffmpeg',
+            'min_db': min(result['min_db'] for result in valid_results),
+            'max_db': max(result['max_db'] for result in valid_results),
+            'mean_db': sum(result['mean_db'] for result in valid_results) / len(valid_results),
+            'sources': selected_sources,
+            'segments': [segment for result in valid_results for segment in result['segments']],
+            'selected_range': (
+                float(self.audio_reader.min_input.text()),
+                float(self.audio_reader.max_input.text())
+            )
+        }
+    
+    def perform_auto_cut(self):
+        """执行自动剪辑"""
+        if not hasattr(self, 'audio_analysis_result'):
+            QMessageBox.warning(self, "警告", "请先进行音频分析")
+            return
+            
+        # 获取当前的选择范围
+        selected_range = (
+            float(self.audio_reader.min_input.text()),
+            float(self.audio_reader.max_input.text())
+        )
+        
+        # 更新分析结果中的选择范围
+        self.audio_analysis_result['selected_range'] = selected_range
+        
+        # 执行自动剪辑
+        self.time_cutter.auto_cut(self.audio_analysis_result)
+    
+    def live_recut(self, min_db, max_db):
+        """实时剪辑：电平范围停止变化后重新剪辑"""
+        if self.live_cut_check.isChecked():
+            self.time_cutter.recut(min_db, max_db)
+    
+    def toggle_all_segments(self, state):
+        """切换所有片段的选中状态"""
+        if hasattr(self, 'time_cutter'):
+            self.time_cutter.select_all(state == Qt.Checked)
+
+    def export_busy(self):
+        """已有导出任务在进行时提示并返回True（共用同一个进度对话框，不能同时导出）"""
+        if self.export_runner.active or self.farm_export.active or self.audio_exporting:
+            QMessageBox.warning(self, "警告", "已有导出任务正在进行")
+            return True
+        return False
+
+    def export_video(self, segment_info):
+        """导出视频"""
+        if self.export_busy():
+            return
+        output_path, _ = QFileDialog.getSaveFileName(
+            self, "导出视频", "", "MP4文件 (*.mp4)")
+        if output_path and segment_info:
+            try:
+                # 先合并片段并估算，确认后再开始导出
+                plan = exportplan.build_plan(segment_info, self.timeline.gap_policy())
+                gain, loudness_text = self.loudness_gain(segment_info)
+                audio_filter = loudness.volume_filter(gain) if gain is not None else None
+                mode = self.timeline.export_mode()
+                if mode == 'auto':
+                    # 有需要重新编码的任务时整体并行重新编码
+                    reencode = any(job.mode == 'reencode' for job in plan.jobs)
+                    mode = 'parallel' if reencode else 'copy'
+                
+                reply = QMessageBox.question(
+                    self, "导出计划", f"{plan.summary()}{loudness_text}\n\n是否开始导出？",
+                    QMessageBox.Yes | QMessageBox.No)
+                if reply != QMessageBox.Yes:
+                    return
+                
+                if mode == 'farm':
+                    # 协调器与渲染节点在后台线程中运行，不阻塞界面
+                    self.show_progress("正在分布式渲染...", self.farm_export.cancel)
+                    self.farm_export.start(plan, output_path, audio_filter)
+                    return
+                
+                # 复制模式按计划逐任务导出，并行模式分块重新编码，都在后台进程中执行
+                work_dir = tempfile.mkdtemp(prefix='export_')
+                if mode == 'parallel':
+                    stages = chunkexport.export_stages(plan.segments(), output_path, work_dir,
+                                                       audio_filter=audio_filter)
+                else:
+                    stages = plan.stages(output_path, work_dir, audio_filter)
+                self.show_progress("正在导出视频...", self.export_runner.cancel)
+                self.export_runner.start(stages, output_path, work_dir)
+                
+            except Exception as e:
+                QMessageBox.critical(self, "错误", f"导出失败: {str(e)}")
+
+    def loudness_source(self, file_path, mono=False):
+        """素材的响度块与PCM：优先使用分析结果，否则读取PCM缓存"""
+        key = (file_path, mono)
+        if key not in self.loudness_cache:
+            cached = self.audio_cache.get(file_path)
+            if cached is not None and 'waveform' in cached:
+                pcm = cached['waveform']
+            else:
+                pcm = self.audio_reader.load_pcm(file_path)
+            if not mono and cached is not None and 'loudness' in cached:
+                blocks = cached['loudness']
+            else:
+                blocks = loudness.source_blocks(pcm, mono)
+            self.loudness_cache[key] = (blocks, pcm)
+        return self.loudness_cache[key]
+    
+    def loudness_gain(self, segment_info, mono=False):
+        """开启响度标准化时测量片段响度，返回 (增益dB, 说明文字)；未开启时增益为None
+
+        mono 为 True 时按单声道输出测量（单声道素材的音频导出）。
+        """
+        target = self.timeline.loudness_target()
+        if target is None:
+            return None, ""
+        measurement = loudness.measure_segments(
+            segment_info, lambda file_path: self.loudness_source(file_path, mono), mono)
+        return (measurement.gain(target),
+                f"\n响度标准化（{target:.1f} LUFS）: {measurement.summary(target)}")
+    
+    def show_progress(self, title, cancel):
+        """显示导出进度对话框"""
+        self.progress_dialog = QProgressDialog(title, "取消", 0, 100, self)
+        self.progress_dialog.setWindowTitle("导出")
+        self.progress_dialog.setWindowModality(Qt.WindowModal)
+        self.progress_dialog.setMinimumDuration(0)
+        self.progress_dialog.setAutoClose(False)
+        self.progress_dialog.setAutoReset(False)
+        self.progress_dialog.canceled.connect(cancel)
+        self.progress_dialog.setValue(0)
+
+    def close_progress(self):
+        if self.progress_dialog is not None:
+            self.progress_dialog.canceled.disconnect()
+            self.progress_dialog.close()
+            self.progress_dialog = None
+
+    def export_finished(self):
+        self.close_progress()
+        QMessageBox.information(self, "成功", "视频导出完成")
+
+    def farm_export_finished(self, stats):
+        self.close_progress()
+        QMessageBox.information(
+            self, "成功",
+            f"视频导出完成（{stats['workers']} 个渲染节点，{stats['jobs']} 个任务，"
+            f"重试 {stats['retries']} 次，用时 {stats['time']:.1f} 秒）")
+
+    def export_failed(self, message):
+        self.close_progress()
+        QMessageBox.critical(self, "错误", f"导出失败: {message}")
+
+    def export_cancelled(self):
+        self.close_progress()
+        QMessageBox.information(self, "提示", "导出已取消")
+
+    def export_audio(self, segment_info):
+        """导出音频"""
+        if self.export_busy():
+            return
+        output_path, _ = QFileDialog.getSaveFileName(
+            self, "导出音频", "", "WAV文件 (*.wav);;MP3文件 (*.mp3)")
+        if output_path and segment_info:
+            self.audio_exporting = True
+            try:
+                # 按参考素材的采样率和声道数导出，单声道输出时才按混合声道测量响度
+                sr, channels = audioexport.source_format(segment_info)
+                gain, _ = self.loudness_gain(segment_info, mono=channels == 1)
+                # 直接切片已解码的PCM（包括测量响度时读取的），其余素材使用流式解码；
+                # 有缓存时按缓存的采样率导出，否则采样率不同，缓存用不上
+                cache = {file_path: {'waveform': pcm, 'sr': pcm.sr}
+                         for (file_path, _), (_, pcm) in self.loudness_cache.items()}
+                cache.update(self.audio_cache)
+                sr = audioexport.cached_rate(segment_info, cache) or sr
+                self.show_progress("正在导出音频...", lambda: None)
+                completed = audioexport.export_audio(
+                    segment_info, output_path, cache=cache, sr=sr, channels=channels,
+                    progress=self.audio_export_progress, gain_db=gain or 0.0)
+                self.close_progress()
+                if completed:
+                    QMessageBox.information(self, "成功", "音频导出完成")
+                else:
+                    QMessageBox.information(self, "提示", "导出已取消")
+                
+            except Exception as e:
+                self.close_progress()
+                QMessageBox.critical(self, "错误", f"导出失败: {str(e)}")
+            finally:
+                self.audio_exporting = False
+
+    def audio_export_progress(self, done, total):
+        """音频导出进度，返回False表示取消"""
+        self.update_export_progress(done / total * 100)
+        QApplication.processEvents()
+        return not self.progress_dialog.wasCanceled()
+
+    def export_script(self, segment_info):
+        """导出ffmpeg脚本（shell、Makefile 或批处理，按所选类型）"""
+        output_path, selected_filter = QFileDialog.getSaveFileName(
+            self, "保存脚本", "", ";;".join(exportscript.FORMATS.values()))
+        if output_path and segment_info:
+            try:
+                fmt = next((fmt for fmt, name in exportscript.FORMATS.items()
+                            if name == selected_filter), None)
+                if os.path.splitext(output_path)[1] or os.path.basename(output_path) == 'Makefile':
+                    fmt = exportscript.script_format(output_path)
+                plan = exportplan.build_plan(segment_info, self.timeline.gap_policy())
+                gain, loudness_text = self.loudness_gain(segment_info)
+                audio_filter = loudness.volume_filter(gain) if gain is not None else None
+                exportscript.write_script(plan, output_path, fmt, audio_filter=audio_filter)
+                
+                QMessageBox.information(self, "成功", "脚本导出完成" + loudness_text)
+                
+            except Exception as e:
+                QMessageBox.critical(self, "错误", f"导出失败: {str(e)}")
+
+    def update_export_progress(self, progress, eta=-1.0):
+        """更新导出进度"""
+        if self.progress_dialog is None:
+            return
+        self.progress_dialog.setValue(int(progress))
+        text = f"导出进度: {progress:.0f}%"
+        if eta >= 0:
+            text += f"，剩余约 {eta:.0f} 秒"
+        self.progress_dialog.setLabelText(text)
+
+    def update_silence_threshold(self, min_val, max_val):
+        """更新静音阈值"""
+        self.time_cutter.set_silence_threshold(min_val, max_val)
+
+    def add_to_timeline(self):
+        """将选中片段添加到时间线"""
+        selected = self.get_selected_segments()
+        if selected:
+            # 按编号排序
+            selected.sort(key=lambda x: x.index)
+            self.segments_created.emit(selected)
+
+if __name__ == '__main__':
+    import sys
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication(sys.argv)
+    window = VideoEditUI()
+    window.show()
     sys.exit(app.exec_())
\ No newline at end of file
@@ -0,0 +1,311 @@
+"""音频分析结果的列式存储
+
+每次分析的摘要追加为一行，每一列是一个原始二进制文件（NumPy 定长类型），
+查询时只读取用到的列，几千上万行的扫描在毫秒级完成。字符串列（文件、设备）
+按字典编码：列中保存编号，字符串每行一个追加到 .txt 中（JSON 编码）。
+可选的显示用电平包络（float16）拼接在 envelope.bin 中，由每行的偏移与长度定位。
+
+只追加写入。写到一半中断时各列长度可能不一致，打开时以最短的列为准，
+下次追加前截掉多余的部分。不需要额外依赖。
+
+命令行查询：
+    python analysisstore.py [--days 7] [--min-silence 0.4] [--by device]
+"""
+import argparse
+import json
+import os
+import re
+import time
+
+import numpy as np
+import governor
+import loudness
+
+STORE_DIR = 'analysis_store'
+ENGINES = ('librosa', 'ffmpeg')
+ENVELOPE_POINTS = 1000  # 保存的包络点数
+# 按顺序查找的录音设备元数据标签
+DEVICE_TAGS = ('com.apple.quicktime.model', 'com.android.model', 'model', 'device',
+               'make', 'com.apple.quicktime.make')
+
+# 列名 -> 类型
+COLUMNS = {
+    'analyzed_at': np.float64,      # 分析时间（Unix 时间戳）
+    'file_id': np.int32,            # 文件编号，对应 files
+    'device_id': np.int32,          # 录音设备编号，对应 devices
+    'engine': np.uint8,             # 分析引擎，对应 ENGINES
+    'duration': np.float64,         # 时长（秒）
+    'min_db': np.float32,           # 最小电平（dB，以最响处为 0 dB）
+    'max_db': np.float32,           # 最大电平
+    'mean_db': np.float32,          # 平均电平
+    'threshold_db': np.float32,     # 统计静音使用的阈值
+    'suggested_db': np.float32,     # 建议阈值（电平的 10% 分位数）
+    'silence_ratio': np.float32,    # 静音比例（0-1）
+    'silence_count': np.int32,      # 静音段数
+    'segment_count': np.int32,      # 有声片段数
+    'loudness_lufs': np.float32,    # 综合响度（LUFS），未测量时为 NaN
+    'analysis_seconds': np.float32, # 分析耗时（秒）
+    'envelope_offset': np.int64,    # 包络在 envelope.bin 中的起始位置（元素数）
+    'envelope_length': np.int32,    # 包络点数，0 表示没有保存
+}
+STRING_COLUMNS = {'file': 'files', 'device': 'devices'}  # 字符串列 -> 字典名
+ENVELOPE_DTYPE = np.float16
+
+_METADATA = re.compile(r'^\s+([\w.]+)\s*:\s*(.+?)\s*$')
+
+
+def media_device(file_path):
+    """从容器元数据中读取录音设备名称，没有时返回空字符串"""
+    try:
+        result = governor.run_leased(['ffmpeg', '-hide_banner', '-nostdin', '-i', file_path],
+                                     governor.INTERACTIVE, name="探测", capture_output=True,
+                                     text=True, encoding='utf-8', errors='replace')
+    except OSError:
+        return ''
+    tags = {}
+    for line in result.stderr.splitlines():
+        match = _METADATA.match(line)
+        if match:
+            tags.setdefault(match.group(1).lower(), match.group(2))
+    return next((tags[tag] for tag in DEVICE_TAGS if tags.get(tag)), '')
+
+
+def _runs(mask):
+    """布尔数组中连续为 True 的段数"""
+    mask = np.asarray(mask, dtype=np.int8)
+    return int(np.count_nonzero(np.diff(np.concatenate(([0], mask))) == 1))
+
+
+def summarize(result, threshold_db, analysis_seconds=0.0):
+    """把 AudioReader 的分析结果整理为一行摘要，返回 (列值字典, 包络或None)"""
+    engine = result.get('engine', 'librosa')
+    row = {
+        'engine': ENGINES.index(engine),
+        'duration': result['duration'],
+        'min_db': result['min_db'],
+        'max_db': result['max_db'],
+        'mean_db': result['mean_db'],
+        'threshold_db': threshold_db,
+        'analysis_seconds': analysis_seconds,
+        'loudness_lufs': np.nan,
+    }
+    db_values = result.get('db_values')
+    envelope = None
+    if db_values is not None:
+        silent = np.asarray(db_values) < threshold_db
+        row['silence_ratio'] = float(silent.mean()) if len(silent) else 0.0
+        row['silence_count'] = _runs(silent)
+        row['segment_count'] = _runs(~silent)
+        row['suggested_db'] = float(np.percentile(db_values, 10)) if len(db_values) else np.nan
+        if len(db_values) > ENVELOPE_POINTS:
+            indices = np.linspace(0, len(db_values) - 1, ENVELOPE_POINTS, dtype=int)
+            envelope = np.asarray(db_values)[indices]
+        else:
+            envelope = np.asarray(db_values)
+    else:
+        # 快速分析只有静音区间
+        silence = float(np.sum(result['silence_ends'] - result['silence_starts']))
+        duration = result['duration']
+        row['silence_ratio'] = silence / duration if duration > 0 else 0.0
+        row['silence_count'] = len(result['silence_starts'])
+        row['segment_count'] = sum(len(starts) for _, starts, _ in result['segments'])
+        row['suggested_db'] = np.nan
+    blocks = result.get('loudness')
+    if blocks is not None:
+        row['loudness_lufs'] = loudness.integrated(blocks.power)[0]
+    return row, envelope
+
+
+class AnalysisStore:
+    """分析摘要的列式存储"""
+    def __init__(self, path=STORE_DIR):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._strings = {}  # 字典名 -> 字符串列表
+        self._codes = {}    # 字典名 -> {字符串: 编号}
+        for name in STRING_COLUMNS.values():
+            values = []
+            text_path = self._path(name + '.txt')
+            if os.path.exists(text_path):
+                with open(text_path, encoding='utf-8') as f:
+                    values = [json.loads(line) for line in f if line.strip()]
+            self._strings[name] = values
+            self._codes[name] = {value: i for i, value in enumerate(values)}
+        self.rows = min(self._column_rows(column) for column in COLUMNS)
+
+    def _path(self, name):
+        return os.path.join(self.path, name)
+
+    def _column_rows(self, column):
+        path = self._path(column + '.bin')
+        if not os.path.exists(path):
+            return 0
+        return os.path.getsize(path) // np.dtype(COLUMNS[column]).itemsize
+
+    def __len__(self):
+        return self.rows
+
+    @property
+    def files(self):
+        return self._strings['files']
+
+    @property
+    def devices(self):
+        return self._strings['devices']
+
+    def _code(self, name, value):
+        """字符串的编号，新字符串追加到字典文件"""
+        codes = self._codes[name]
+        if value not in codes:
+            with open(self._path(name + '.txt'), 'a', encoding='utf-8') as f:
+                f.write(json.dumps(value, ensure_ascii=False) + '\n')
+            codes[value] = len(self._strings[name])
+            self._strings[name].append(value)
+        return codes[value]
+
+    def _repair(self):
+        """截掉上次中断写入时多出的部分，使各列长度一致"""
+        for column, dtype in COLUMNS.items():
+            path = self._path(column + '.bin')
+            size = self.rows * np.dtype(dtype).itemsize
+            if os.path.exists(path) and os.path.getsize(path) != size:
+                os.truncate(path, size)
+
+    def append(self, file_path, row, envelope=None, device='', analyzed_at=None):
+        """追加一行摘要（row 为 summarize 返回的列值字典）"""
+        self._repair()
+        # 缺少的浮点列记为 NaN，整数列记为 0
+        values = {column: np.nan if np.dtype(dtype).kind == 'f' else 0
+                  for column, dtype in COLUMNS.items()}
+        values.update(row)
+        values['analyzed_at'] = time.time() if analyzed_at is None else analyzed_at
+        values['file_id'] = self._code('files', os.path.abspath(file_path))
+        values['device_id'] = self._code('devices', device)
+
+        # 包络文件以最后一行记录的结尾为准，多出的部分是中断写入留下的
+        envelope_path = self._path('envelope.bin')
+        offset = (int(self._last('envelope_offset')) + int(self._last('envelope_length'))
+                  if self.rows else 0)
+        if os.path.exists(envelope_path) and \
+                os.path.getsize(envelope_path) != offset * ENVELOPE_DTYPE().itemsize:
+            os.truncate(envelope_path, offset * ENVELOPE_DTYPE().itemsize)
+        if envelope is not None and len(envelope):
+            with open(envelope_path, 'ab') as f:
+                f.write(np.asarray(envelope, dtype=ENVELOPE_DTYPE).tobytes())
+            values['envelope_length'] = len(envelope)
+        values['envelope_offset'] = offset
+
+        # 最后写各列，每列追加一个值
+        for column, dtype in COLUMNS.items():
+            with open(self._path(column + '.bin'), 'ab') as f:
+                f.write(np.array([values[column]], dtype=dtype).tobytes())
+        self.rows += 1
+        return self.rows - 1
+
+    def _last(self, column):
+        """读取一列的最后一个值"""
+        dtype = np.dtype(COLUMNS[column])
+        return np.fromfile(self._path(column + '.bin'), dtype=dtype, count=1,
+                           offset=(self.rows - 1) * dtype.itemsize)[0]
+
+    def column(self, name):
+        """读取一列（字符串列返回对象数组）"""
+        if name in STRING_COLUMNS:
+            dictionary = self._strings[STRING_COLUMNS[name]]
+            codes = self.column(name + '_id')
+            return np.array(dictionary, dtype=object)[codes] if len(codes) else np.zeros(0, object)
+        path = self._path(name + '.bin')
+        if not os.path.exists(path) or self.rows == 0:
+            return np.zeros(0, dtype=COLUMNS[name])
+        return np.fromfile(path, dtype=COLUMNS[name], count=self.rows)
+
+    def envelope(self, row):
+        """读取一行的电平包络，没有时返回None"""
+        offset = int(self.column('envelope_offset')[row])
+        length = int(self.column('envelope_length')[row])
+        if length == 0:
+            return None
+        return np.fromfile(self._path('envelope.bin'), dtype=ENVELOPE_DTYPE, count=length,
+                           offset=offset * ENVELOPE_DTYPE().itemsize).astype(np.float32)
+
+    def query(self, columns=('file', 'analyzed_at'), where=None, since=None, latest=False):
+        """查询，返回 {列名: 数组}
+
+        where: 可选函数，参数为按需读取列的字典，返回行的布尔掩码；
+        since: 只保留此时间戳之后的分析；
+        latest: 每个文件只保留最近一次分析。
+        """
+        cache = {}
+
+        def get(name):
+            if name not in cache:
+                cache[name] = self.column(name)
+            return cache[name]
+
+        mask = np.ones(self.rows, dtype=bool)
+        if since is not None:
+            mask &= get('analyzed_at') >= since
+        if latest and self.rows:
+            # 按时间排序后每个文件取最后一次
+            file_ids = get('file_id')
+            order = np.argsort(get('analyzed_at'), kind='stable')
+            last = np.zeros(self.rows, dtype=bool)
+            _, index = np.unique(file_ids[order][::-1], return_index=True)
+            last[order[::-1][index]] = True
+            mask &= last
+        if where is not None:
+            mask &= np.asarray(where(_Columns(get)), dtype=bool)
+        return {name: get(name)[mask] for name in columns}
+
+    def distribution(self, column, by='device', **kwargs):
+        """按 by 列分组的 column 取值，返回 {分组: 数组}"""
+        result = self.query((by, column), **kwargs)
+        groups = {}
+        for key in np.unique(result[by]).tolist():
+            values = result[column][result[by] == key]
+            groups[key] = values[np.isfinite(values)] if values.dtype.kind == 'f' else values
+        return groups
+
+
+class _Columns:
+    """where 函数的参数：按列名读取（只读取用到的列）"""
+    __slots__ = ('_get',)
+
+    def __init__(self, get):
+        self._get = get
+
+    def __getitem__(self, name):
+        return self._get(name)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="查询音频分析记录")
+    parser.add_argument('--store', default=STORE_DIR, help="存储目录")
+    parser.add_argument('--days', type=float, help="只查询最近几天的分析")
+    parser.add_argument('--min-silence', type=float, help="列出静音比例不低于此值（0-1）的文件")
+    parser.add_argument('--by', choices=sorted(STRING_COLUMNS), default='device',
+                        help="按此列分组统计建议阈值")
+    args = parser.parse_args(argv)
+
+    store = AnalysisStore(args.store)
+    since = time.time() - args.days * 86400 if args.days else None
+    start = time.perf_counter()
+    if args.min_silence is not None:
+        result = store.query(('file', 'silence_ratio', 'duration'), since=since, latest=True,
+                             where=lambda c: c['silence_ratio'] >= args.min_silence)
+        for file_path, ratio, duration in zip(result['file'], result['silence_ratio'].tolist(),
+                                              result['duration'].tolist()):
+            print(f"{ratio:6.1%}  {duration:8.1f}s  {file_path}")
+        print(f"{len(result['file'])} 个文件")
+    else:
+        groups = store.distribution('suggested_db', by=args.by, since=since)
+        for key, values in groups.items():
+            if len(values):
+                low, median, high = np.percentile(values, [10, 50, 90])
+                print(f"{key or '(未知)'}: {len(values)} 次，建议阈值 "
+                      f"P10 {low:.1f} / 中位数 {median:.1f} / P90 {high:.1f} dB")
+    print(f"扫描 {len(store)} 条记录，耗时 {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,283 @@
+"""直接从PCM导出音频
+
+按采样点下标切片解码后的PCM（优先使用分析缓存，没有缓存时使用流式解码器），
+在每个剪辑点做很短的交叉淡化以消除爆音，然后边处理边写出：
+WAV 通过 soundfile 直接写入，MP3 通过管道交给单个 ffmpeg 编码进程。
+整个过程不产生任何临时文件。解码与编码进程登记在一个批量优先级的租约下，
+交互与后台工作需要CPU时会被暂停。
+默认按参考素材（第一个有音频的素材）的采样率和声道数导出，不混为单声道；
+片段素材有分析缓存时按缓存的采样率导出，直接切片缓存，不必重新解码。
+"""
+import os
+import subprocess
+
+import numpy as np
+import governor
+import silencedetect
+
+SAMPLE_RATE = 44100
+CROSSFADE = 0.005  # 剪辑点交叉淡化时长（秒）
+
+
+class StreamingDecoder:
+    """单个素材的流式解码器
+
+    用一个 ffmpeg 进程顺序解码为 float32 PCM。片段按时间顺序读取时只会
+    向前跳过不需要的数据；需要往回读时才重新启动进程并定位。
+    """
+
+    def __init__(self, file_path, sr=SAMPLE_RATE, channels=1, lease=None):
+        self.file_path = file_path
+        self.sr = sr
+        self.channels = channels
+        self.lease = lease
+        self.process = None
+        self.position = 0  # 下一次读取对应的采样点
+
+    def _start(self, sample):
+        """从指定采样点开始解码"""
+        self.close()
+        command = [
+            'ffmpeg', '-v', 'error', '-nostdin',
+            '-ss', f'{sample / self.sr:.6f}', '-i', self.file_path,
+            '-vn', '-f', 'f32le', '-ac', str(self.channels), '-ar', str(self.sr),
+            'pipe:1',
+        ]
+        # 提前结束时会向已关闭的管道写入，错误输出没有意义
+        self.process = subprocess.Popen(command, stdout=subprocess.PIPE,
+                                        stderr=subprocess.DEVNULL)
+        if self.lease is not None:
+            self.lease.attach(self.process)
+        self.position = sample
+
+    def _read(self, count):
+        """读取count个采样点，文件结束时返回的数据可能更短"""
+        frame_bytes = 4 * self.channels
+        data = self.process.stdout.read(count * frame_bytes)
+        samples = np.frombuffer(data[:len(data) // frame_bytes * frame_bytes], dtype=np.float32)
+        self.position += len(samples) // self.channels
+        return samples.reshape(-1, self.channels)
+
+    def read(self, start, end):
+        """读取 [start, end) 采样点"""
+        if self.process is None or start < self.position:
+            self._start(start)
+        # 向前跳过片段之间的数据
+        while self.position < start:
+            if len(self._read(min(start - self.position, self.sr))) == 0:
+                break
+        return self._read(max(0, end - start))
+
+    def close(self):
+        if self.process is not None:
+            if self.lease is not None:
+                self.lease.detach(self.process)
+            self.process.stdout.close()
+            self.process.kill()
+            self.process.wait()
+            self.process = None
+
+
+class PcmReader:
+    """按采样点读取片段PCM，优先使用分析缓存"""
+
+    def __init__(self, cache=None, sr=SAMPLE_RATE, channels=1, lease=None):
+        self.cache = cache or {}
+        self.sr = sr
+        self.channels = channels
+        self.lease = lease
+        self.decoders = {}
+
+    def read(self, file_path, start, end):
+        """读取 [start, end) 采样点，返回 (采样点数, 声道数) 的float32数组"""
+        cached = self.cache.get(file_path)
+        if cached is not None and cached.get('sr') == self.sr:
+            y = cached['waveform']
+            channels = getattr(y, 'channels', 1)
+            if self.channels == 1 or channels == self.channels:
+                # 声道数相同时直接切片交错的多声道缓存，单声道输出取混合后的视图
+                if self.channels > 1:
+                    y = y.multichannel()
+                start = min(start, len(y))
+                return np.asarray(y[start:min(end, len(y))],
+                                  dtype=np.float32).reshape(-1, self.channels)
+        decoder = self.decoders.get(file_path)
+        if decoder is None:
+            decoder = StreamingDecoder(file_path, self.sr, self.channels, self.lease)
+            self.decoders[file_path] = decoder
+        return decoder.read(start, end)
+
+    def close(self):
+        for decoder in self.decoders.values():
+            decoder.close()
+        self.decoders.clear()
+
+
+class WavWriter:
+    """通过soundfile流式写入WAV"""
+
+    def __init__(self, output_path, sr, channels):
+        import soundfile
+        self.file = soundfile.SoundFile(output_path, 'w', samplerate=sr,
+                                        channels=channels, subtype='PCM_16')
+
+    def write(self, samples):
+        self.file.write(samples)
+
+    def close(self):
+        self.file.close()
+
+    def abort(self):
+        self.file.close()
+
+
+class EncoderWriter:
+    """通过管道交给单个ffmpeg进程编码（MP3等）"""
+
+    def __init__(self, output_path, sr, channels, codec='libmp3lame', lease=None):
+        command = [
+            'ffmpeg', '-v', 'error', '-y',
+            '-f', 'f32le', '-ar', str(sr), '-ac', str(channels), '-i', 'pipe:0',
+            '-acodec', codec, output_path,
+        ]
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE)
+        self.lease = lease
+        if lease is not None:
+            lease.attach(self.process)
+
+    def write(self, samples):
+        self.process.stdin.write(np.ascontiguousarray(samples, dtype=np.float32).tobytes())
+
+    def close(self):
+        self.process.stdin.close()
+        code = self.process.wait()
+        if self.lease is not None:
+            self.lease.detach(self.process)
+        if code != 0:
+            raise RuntimeError(f"ffmpeg编码失败，返回码 {self.process.returncode}")
+
+    def abort(self):
+        """结束编码进程（取消导出时使用）"""
+        if self.lease is not None:
+            self.lease.detach(self.process)
+        self.process.kill()
+        self.process.wait()
+
+
+def crossfade_ramps(length):
+    """等功率交叉淡化曲线，返回 (淡出, 淡入)，形状为 (length, 1)"""
+    phase = (np.arange(length, dtype=np.float32) + 0.5) / length * (np.pi / 2)
+    return np.cos(phase)[:, None], np.sin(phase)[:, None]
+
+
+def open_writer(output_path, sr, channels, lease=None):
+    """按扩展名选择写出方式"""
+    if output_path.lower().endswith('.wav'):
+        return WavWriter(output_path, sr, channels)
+    return EncoderWriter(output_path, sr, channels, lease=lease)
+
+
+def cached_rate(segments, cache):
+    """片段素材中第一个有缓存的采样率，没有缓存时返回None
+
+    分析缓存统一重采样，与素材原生采样率不同时按缓存的采样率导出，否则缓存永远用不上。
+    """
+    for file_path in dict.fromkeys(segments.file_path(i) for i in range(len(segments))):
+        if cache and file_path in cache:
+            return cache[file_path]['sr']
+    return None
+
+
+def source_format(segments, cache=None):
+    """导出的采样率与声道数：取第一个有音频的素材，都没有时为 (SAMPLE_RATE, 1)
+
+    有缓存时采样率取 cached_rate。
+    """
+    sr = cached_rate(segments, cache)
+    for file_path in dict.fromkeys(segments.file_path(i) for i in range(len(segments))):
+        if file_path is None:
+            continue
+        try:
+            audio = silencedetect.probe_media(file_path)['audio']
+        except OSError:
+            continue
+        if audio is not None:
+            return sr or audio['sample_rate'] or SAMPLE_RATE, audio['channels'] or 2
+    return sr or SAMPLE_RATE, 1
+
+
+def export_audio(segments, output_path, cache=None, sr=None, channels=None,
+                 crossfade=CROSSFADE, progress=None, gain_db=0.0):
+    """把片段视图(SegmentView)中的片段拼接导出为音频文件
+
+    sr、channels 为 None 时按 source_format 取参考素材（有缓存时取缓存）的采样率与声道数。
+    交叉淡化以剪辑点为中心：前一片段向后多读半个淡化长度，后一片段向前多读
+    半个淡化长度，两者重叠相加，因此输出总时长与片段时长之和一致。
+    progress(已完成片段数, 片段总数) 在每个片段后调用（等待资源时也会定期调用），
+    返回 False 时取消导出、删除未完成的输出并返回 False。gain_db 为整体增益（如响度标准化）。
+    """
+    n = len(segments)
+    if sr is None or channels is None:
+        source_sr, source_channels = source_format(segments, cache)
+        sr = sr or source_sr
+        channels = channels or source_channels
+    starts = np.round(segments.starts * sr).astype(np.int64)
+    ends = np.round(segments.ends * sr).astype(np.int64)
+    # 每个剪辑点两侧补读的采样点数
+    pads = np.minimum(int(round(crossfade * sr / 2)), starts[1:])
+
+    gain = np.float32(10 ** (gain_db / 20))
+    # 等待批量预算期间仍然调用 progress，界面保持响应且可以取消
+    lease = None
+    while lease is None:
+        lease = governor.instance().acquire(governor.BULK, slots=2,
+                                            memory_mb=governor.FFMPEG_MEMORY_MB,
+                                            name="导出音频", timeout=0.2)
+        if lease is None and progress is not None and progress(0, n) is False:
+            return False
+    reader = PcmReader(cache, sr, channels, lease)
+    try:
+        writer = open_writer(output_path, sr, channels, lease)
+    except BaseException:
+        lease.release()
+        raise
+    completed = False
+    try:
+        pending = None  # 上一片段尚未写出的尾部（重叠区）
+        for i in range(n):
+            head = int(pads[i - 1]) if i > 0 else 0
+            tail = int(pads[i]) if i < n - 1 else 0
+            samples = reader.read(segments.file_path(i), starts[i] - head, ends[i] + tail)
+            if gain != 1:
+                samples = samples * gain
+            if pending is not None:
+                overlap = min(len(pending), len(samples), 2 * head)
+                if overlap > 0:
+                    # 重叠区：上一片段的尾部淡出，当前片段的头部淡入
+                    fade_out, fade_in = crossfade_ramps(overlap)
+                    writer.write(pending[:len(pending) - overlap])
+                    writer.write(pending[-overlap:] * fade_out + samples[:overlap] * fade_in)
+                    samples = samples[overlap:]
+                else:
+                    writer.write(pending)
+            # 当前片段末尾（包含向后多读的部分）留到下一片段处理
+            keep = min(len(samples), 2 * tail)
+            writer.write(samples[:len(samples) - keep])
+            pending = samples[len(samples) - keep:] if keep else None
+            if progress is not None and progress(i + 1, n) is False:
+                return False
+        if pending is not None:
+            writer.write(pending)
+        completed = True
+    finally:
+        reader.close()
+        try:
+            if completed:
+                writer.close()
+            else:
+                writer.abort()
+                if os.path.exists(output_path):
+                    os.remove(output_path)
+        finally:
+            lease.release()
+    return True
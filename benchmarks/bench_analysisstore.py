@@ -0,0 +1,72 @@
+"""分析记录查询性能测试
+
+在临时目录中写入大量随机的分析摘要（默认 10000 条，每条带 1000 点包络），
+测量两个典型查询的耗时：
+  - 最近 7 天静音比例超过 40% 的文件（每个文件取最近一次分析）；
+  - 按录音设备分组的建议阈值分布。
+
+用法：
+    python benchmarks/bench_analysisstore.py [--rows 10000] [--budget-ms 50]
+
+任一查询超过 --budget-ms 毫秒时以非零状态退出。
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import analysisstore  # noqa: E402
+
+DEVICES = ['Zoom H5', 'SM7B', 'iPhone 15', 'Rode NT-USB', '']
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分析记录查询性能测试")
+    parser.add_argument('--rows', type=int, default=10000, help="分析记录条数")
+    parser.add_argument('--files', type=int, default=3000, help="不同文件数")
+    parser.add_argument('--repeat', type=int, default=20, help="每个查询的重复次数")
+    parser.add_argument('--budget-ms', type=float, default=50.0, help="每个查询的时间上限（毫秒）")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    now = time.time()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = analysisstore.AnalysisStore(temp_dir)
+        start = time.perf_counter()
+        for i in range(args.rows):
+            row = {
+                'duration': rng.uniform(10, 3600),
+                'silence_ratio': rng.uniform(0, 1),
+                'suggested_db': rng.normal(-45, 5),
+                'mean_db': rng.normal(-20, 5),
+            }
+            store.append(f'/media/{i % args.files:05d}.wav', row, rng.normal(-30, 10, 1000),
+                         device=DEVICES[i % len(DEVICES)],
+                         analyzed_at=now - rng.uniform(0, 30 * 86400))
+        append_time = time.perf_counter() - start
+        print(f"写入 {args.rows} 条: {append_time:.2f} s（每条 {append_time / args.rows * 1000:.2f} ms）")
+
+        store = analysisstore.AnalysisStore(temp_dir)
+        queries = {
+            "最近7天静音>40%的文件": lambda: store.query(
+                ('file', 'silence_ratio'), since=now - 7 * 86400, latest=True,
+                where=lambda c: c['silence_ratio'] > 0.4)['file'],
+            "按设备分组的建议阈值": lambda: store.distribution('suggested_db', by='device'),
+        }
+        worst = 0.0
+        for name, query in queries.items():
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                result = query()
+            elapsed = (time.perf_counter() - start) / args.repeat * 1000
+            worst = max(worst, elapsed)
+            print(f"{name}: {elapsed:6.2f} ms，结果 {len(result)} 项")
+    return 0 if worst <= args.budget_ms else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
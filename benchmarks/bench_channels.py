@@ -0,0 +1,91 @@
+"""多声道电平性能测试
+
+在与 pcmstore 缓存格式相同的交错 int16 多声道音频上对比：
+  - 一次遍历：envelope.channel_rms_db 同时计算混合声道与各声道的电平；
+  - 逐声道：每个声道各读一遍（channel_view），混合声道再读一遍。
+并校验两者结果一致。
+
+用法：
+    python benchmarks/bench_channels.py [--channels 4] [--minutes 60] [--tolerance 0.01]
+
+结果误差超过 --tolerance dB，或一次遍历比逐声道慢时以非零状态退出。
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import envelope  # noqa: E402
+import pcmstore  # noqa: E402
+
+SR = 44100
+# 项目中用到的帧长/步长组合：分析显示与电平范围剪辑
+FRAME_SETTINGS = [(2048, 512), (256, 64)]
+
+
+def write_multichannel(path, seconds, channels, sr, block=1 << 20):
+    """分块写入交错的多声道音频（各声道轮流说话），返回内存映射视图"""
+    n = int(seconds * sr)
+    out = np.lib.format.open_memmap(path, mode='w+', dtype=np.int16, shape=(n, channels))
+    rng = np.random.default_rng(0)
+    for start in range(0, n, block):
+        count = min(block, n - start)
+        t = (start + np.arange(count)) / sr
+        speaker = (t // 2).astype(int) % channels
+        samples = 0.003 * rng.standard_normal((count, channels))
+        for c in range(channels):
+            gain = 0.5 / (c + 1)  # 各路麦克风的增益不同
+            samples[speaker == c, c] += gain * np.sin(2 * np.pi * (150 + 50 * c) * t[speaker == c])
+        out[start:start + count] = np.round(np.clip(samples, -1, 1) * pcmstore.INT16_SCALE)
+    out.flush()
+    del out
+    return pcmstore.PcmView(np.load(path, mmap_mode='r'), sr, path)
+
+
+def per_channel(pcm, frame_length, hop_length):
+    """逐声道计算：每个声道与混合声道各遍历一次"""
+    values = [envelope.rms(pcm.channel_view(c), frame_length, hop_length)
+              for c in range(pcm.channels)]
+    mix = envelope.rms_db(pcm, frame_length, hop_length)
+    return mix, envelope.to_db(np.stack(values))
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多声道电平性能测试")
+    parser.add_argument('--channels', type=int, default=4, help="声道数")
+    parser.add_argument('--minutes', type=float, default=60, help="音频时长（分钟）")
+    parser.add_argument('--tolerance', type=float, default=0.01, help="允许的最大误差（dB）")
+    args = parser.parse_args()
+
+    ok = True
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pcm = write_multichannel(os.path.join(temp_dir, 'multi.npy'), args.minutes * 60,
+                                 args.channels, SR)
+        print(f"音频: {args.minutes:g} 分钟，{args.channels} 声道（交错 int16，内存映射）")
+        for frame_length, hop_length in FRAME_SETTINGS:
+            (mix, channel_db), single_time = timed(
+                lambda: envelope.channel_rms_db(pcm.multichannel(), frame_length, hop_length))
+            (ref_mix, ref_channels), split_time = timed(
+                lambda: per_channel(pcm, frame_length, hop_length))
+            error = max(float(np.max(np.abs(mix - ref_mix))),
+                        float(np.max(np.abs(channel_db - ref_channels))))
+            speedup = split_time / single_time
+            ok = ok and error <= args.tolerance and speedup >= 1.0
+            print(f"  帧长 {frame_length:5d} 步长 {hop_length:4d}: 一次遍历 {single_time:6.2f} s  "
+                  f"逐声道 {split_time:6.2f} s  加速 {speedup:4.1f}x  最大误差 {error:.4f} dB")
+        del pcm
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""分块并行重新编码导出性能测试
+
+生成一段较长的合成素材和剪辑列表，分别用 1、2、4……直到CPU核数个分块导出，
+输出各分块数下的耗时、加速比与并行效率。
+
+用法：
+    python benchmarks/bench_chunk_export.py [--minutes 10] [--segment 4] [--gap 1]
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import chunkexport  # noqa: E402
+
+
+def make_source(path, seconds):
+    """用 lavfi 生成带音频的合成测试视频"""
+    subprocess.run(['ffmpeg', '-y', '-v', 'error',
+                    '-f', 'lavfi', '-i', f'testsrc2=size=1280x720:rate=30:duration={seconds}',
+                    '-f', 'lavfi', '-i', f'sine=frequency=440:duration={seconds}',
+                    '-c:v', 'libx264', '-preset', 'ultrafast', '-g', '60',
+                    '-c:a', 'aac', '-shortest', path], check=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分块并行重新编码导出性能测试")
+    parser.add_argument('--minutes', type=float, default=10, help="素材时长（分钟）")
+    parser.add_argument('--segment', type=float, default=4, help="每个片段时长（秒）")
+    parser.add_argument('--gap', type=float, default=1, help="片段之间剪掉的时长（秒）")
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp(prefix='bench_chunk_')
+    try:
+        source = os.path.join(temp_dir, 'source.mp4')
+        seconds = int(args.minutes * 60)
+        make_source(source, seconds)
+        step = args.segment + args.gap
+        segments = [(source, t, t + args.segment)
+                    for t in [i * step for i in range(int(seconds // step))]]
+        total = sum(end - start for _, start, end in segments)
+        print(f"片段数: {len(segments)}  输出时长: {total:.0f} 秒")
+
+        cores = os.cpu_count() or 1
+        counts = []
+        n = 1
+        while n < cores:
+            counts.append(n)
+            n *= 2
+        counts.append(cores)
+
+        baseline = None
+        for n in counts:
+            output = os.path.join(temp_dir, f'out_{n}.mp4')
+            start = time.perf_counter()
+            chunkexport.export_video(segments, output, jobs=n)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            speedup = baseline / elapsed
+            print(f"分块数 {n:3d}: {elapsed:7.1f} 秒  加速比 {speedup:5.2f}x  "
+                  f"并行效率 {speedup / n:5.0%}")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
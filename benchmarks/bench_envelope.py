@@ -0,0 +1,92 @@
+"""电平包络性能测试
+
+1. 在短音频上对比 envelope.rms_db 与 librosa.feature.rms + amplitude_to_db 的结果；
+2. 在同一段音频上对比两者耗时；
+3. 在数小时的内存映射 int16 音频（与 pcmstore 缓存格式相同）上测量吞吐量。
+
+用法：
+    python benchmarks/bench_envelope.py [--hours 1] [--compare-minutes 10] [--tolerance 0.01]
+
+结果误差超过 --tolerance dB 或比 librosa 慢时以非零状态退出。
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import envelope  # noqa: E402
+import pcmstore  # noqa: E402
+
+SR = 44100
+# 项目中用到的帧长/步长组合
+FRAME_SETTINGS = [(2048, 512), (1024, 256), (256, 64)]
+
+
+def synthetic_block(start, count, sr):
+    """生成一段带有响度起伏的测试音频"""
+    rng = np.random.default_rng(start)
+    t = (start + np.arange(count)) / sr
+    gate = 0.05 + 0.95 * (np.sin(2 * np.pi * 0.1 * t) > 0)
+    tone = 0.3 * np.sin(2 * np.pi * 220 * t)
+    return (gate * tone + 0.01 * rng.standard_normal(count)).astype(np.float32)
+
+
+def write_long_audio(path, seconds, sr, block=1 << 22):
+    """分块写入长音频，返回内存映射视图"""
+    n = int(seconds * sr)
+    out = np.lib.format.open_memmap(path, mode='w+', dtype=np.int16, shape=(n,))
+    for start in range(0, n, block):
+        count = min(block, n - start)
+        out[start:start + count] = np.round(synthetic_block(start, count, sr) * pcmstore.INT16_SCALE)
+    out.flush()
+    del out
+    return pcmstore.PcmView(np.load(path, mmap_mode='r'), sr, path)
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="电平包络性能测试")
+    parser.add_argument('--hours', type=float, default=1, help="长音频时长（小时）")
+    parser.add_argument('--compare-minutes', type=float, default=10, help="与librosa对比的音频时长（分钟）")
+    parser.add_argument('--tolerance', type=float, default=0.01, help="允许的最大误差（dB）")
+    args = parser.parse_args()
+
+    import librosa
+    librosa.feature.rms(y=np.zeros(SR, dtype=np.float32))  # 预热
+
+    ok = True
+    y = synthetic_block(0, int(args.compare_minutes * 60 * SR), SR)
+    print(f"对比音频: {args.compare_minutes:.1f} 分钟")
+    for frame_length, hop_length in FRAME_SETTINGS:
+        reference, librosa_time = timed(lambda: librosa.amplitude_to_db(
+            librosa.feature.rms(y=y, frame_length=frame_length, hop_length=hop_length)[0],
+            ref=np.max))
+        result, kernel_time = timed(lambda: envelope.rms_db(y, frame_length, hop_length))
+        error = float(np.max(np.abs(reference - result)))
+        speedup = librosa_time / kernel_time
+        ok = ok and error <= args.tolerance and speedup >= 1.0
+        print(f"  帧长 {frame_length:5d} 步长 {hop_length:4d}: librosa {librosa_time * 1000:7.0f} ms  "
+              f"envelope {kernel_time * 1000:6.0f} ms  加速 {speedup:5.1f}x  最大误差 {error:.4f} dB")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pcm = write_long_audio(os.path.join(temp_dir, 'long.npy'), args.hours * 3600, SR)
+        print(f"长音频: {args.hours:.1f} 小时（内存映射 int16）")
+        for frame_length, hop_length in FRAME_SETTINGS:
+            result, kernel_time = timed(lambda: envelope.rms_db(pcm, frame_length, hop_length))
+            print(f"  帧长 {frame_length:5d} 步长 {hop_length:4d}: {kernel_time:6.2f} s  "
+                  f"({args.hours * 3600 / kernel_time:.0f}x 实时, {len(result)} 帧)")
+        del pcm
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""资源调度性能测试
+
+后台持续运行占满全部CPU槽位的批量导出（与分块导出相同，逐块用 libx264
+重新编码，每块一个进程），同时反复提取单帧缩略图（交互优先级），
+测量缩略图的响应时间：
+  - 空闲：没有导出时的基准；
+  - 不抢占：调度器只排队，缩略图要等当前一块编码完释放槽位；
+  - 抢占：导出进程被暂停，缩略图立即开始，结束后导出恢复。
+
+用法：
+    python benchmarks/bench_governor.py [--thumbnails 10] [--max-ratio 3]
+
+抢占时缩略图的中位响应时间超过空闲时的 --max-ratio 倍时以非零状态退出。
+"""
+import argparse
+import itertools
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import governor  # noqa: E402
+
+
+def make_video(path, seconds):
+    subprocess.run(['ffmpeg', '-y', '-v', 'error', '-f', 'lavfi',
+                    '-i', f'testsrc2=size=1280x720:rate=25:duration={seconds}',
+                    '-c:v', 'libx264', '-preset', 'ultrafast', '-g', '50', path], check=True)
+
+
+def export_loop(scheduler, source, output, chunk, duration, stop):
+    """批量导出：逐块循环重新编码，直到 stop 被设置"""
+    for k in itertools.count():
+        if stop.is_set():
+            break
+        offset = (k * chunk) % max(duration - chunk, 1)
+        with scheduler.acquire(governor.BULK, scheduler.cpu_slots, governor.FFMPEG_MEMORY_MB,
+                               "导出") as lease:
+            process = subprocess.Popen(['ffmpeg', '-y', '-v', 'error', '-nostdin',
+                                        '-ss', f'{offset:.2f}', '-t', f'{chunk:.2f}', '-i', source,
+                                        '-c:v', 'libx264', '-preset', 'medium', output],
+                                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            lease.attach(process)
+            while process.poll() is None:
+                if stop.wait(0.05):
+                    process.kill()
+            process.wait()
+            lease.detach(process)
+
+
+def thumbnail_times(scheduler, source, count, duration):
+    """依次提取 count 张缩略图，返回每张从申请到完成的时间（秒）"""
+    times = []
+    for i in range(count):
+        start = time.perf_counter()
+        with scheduler.acquire(governor.INTERACTIVE, name="缩略图") as lease:
+            governor.run(['ffmpeg', '-v', 'error', '-nostdin', '-ss', f'{(i * 7.3) % duration:.2f}',
+                          '-i', source, '-frames:v', '1', '-vf', 'scale=128:72',
+                          '-f', 'rawvideo', '-pix_fmt', 'rgb24', 'pipe:1'],
+                         lease, check=True, capture_output=True)
+        times.append(time.perf_counter() - start)
+        time.sleep(0.2)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description="资源调度性能测试")
+    parser.add_argument('--seconds', type=float, default=60, help="测试视频时长（秒）")
+    parser.add_argument('--chunk', type=float, default=4, help="导出每块的时长（秒）")
+    parser.add_argument('--thumbnails', type=int, default=10, help="每种情况提取的缩略图数")
+    parser.add_argument('--max-ratio', type=float, default=3.0,
+                        help="抢占时中位响应时间相对空闲时的上限倍数")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source = os.path.join(temp_dir, 'source.mp4')
+        make_video(source, args.seconds)
+        results = {}
+        for name, preempt, busy in (("空闲", True, False), ("不抢占", False, True),
+                                    ("抢占", True, True)):
+            scheduler = governor.Governor(preempt=preempt)
+            stop = threading.Event()
+            exporter = None
+            if busy:
+                exporter = threading.Thread(
+                    target=export_loop,
+                    args=(scheduler, source, os.path.join(temp_dir, 'out.mp4'), args.chunk,
+                          args.seconds, stop))
+                exporter.start()
+                time.sleep(1.0)
+            times = thumbnail_times(scheduler, source, args.thumbnails, args.seconds)
+            stop.set()
+            if exporter is not None:
+                exporter.join()
+            results[name] = float(np.median(times))
+            print(f"{name:>4}: 中位 {results[name] * 1000:7.1f} ms，最慢 {max(times) * 1000:7.1f} ms")
+
+    ratio = results["抢占"] / results["空闲"]
+    print(f"抢占/空闲: {ratio:.2f} 倍；不抢占/空闲: {results['不抢占'] / results['空闲']:.2f} 倍")
+    return 0 if ratio <= args.max_ratio else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
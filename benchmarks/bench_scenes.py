@@ -0,0 +1,77 @@
+"""镜头切换检测性能测试
+
+用 ffmpeg 生成一段由多个不同画面拼接而成的测试视频（默认 1080p），
+测量 scenedetect.detect 的实时倍数，并检查检测到的切换是否与真实切换一致。
+
+用法：
+    python benchmarks/bench_scenes.py [--scenes 6] [--scene-seconds 10] [--size 1920x1080] [--target 15]
+
+漏检、误检或低于 --target 倍实时时以非零状态退出。
+单核实测约 16-18 倍实时（粗检关键帧约 0.6 s，其余为细检各关键帧区间的完整解码；
+改为两遍检测之前整段解码约 6 倍）。细检按核数并行，多核机器更快；
+切换越密集，需要细检的区间越多，每 5 秒一次切换时约 10 倍。
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import scenedetect  # noqa: E402
+
+# 每个镜头使用不同的测试画面
+SOURCES = ['testsrc2', 'smptebars', 'mandelbrot', 'rgbtestsrc', 'life', 'cellauto']
+
+
+def make_video(path, scenes, scene_seconds, size):
+    """生成测试视频，返回真实切换时间"""
+    inputs = []
+    for i in range(scenes):
+        source = SOURCES[i % len(SOURCES)]
+        option = f'size={size}:rate=25' if source not in ('life', 'cellauto') else f's={size}:r=25'
+        inputs += ['-f', 'lavfi', '-t', str(scene_seconds), '-i', f'{source}={option}']
+    streams = ''.join(f'[{i}:v]format=yuv420p,setsar=1[v{i}];' for i in range(scenes))
+    joined = ''.join(f'[v{i}]' for i in range(scenes))
+    subprocess.run(['ffmpeg', '-y', '-v', 'error'] + inputs +
+                   ['-filter_complex', f'{streams}{joined}concat=n={scenes}:v=1:a=0[out]',
+                    '-map', '[out]', '-c:v', 'libx264', '-preset', 'ultrafast', '-g', '50', path],
+                   check=True)
+    return np.arange(1, scenes) * float(scene_seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="镜头切换检测性能测试")
+    parser.add_argument('--scenes', type=int, default=6, help="镜头数")
+    parser.add_argument('--scene-seconds', type=float, default=10, help="每个镜头时长（秒）")
+    parser.add_argument('--size', default='1920x1080', help="画面尺寸")
+    parser.add_argument('--target', type=float, default=15, help="目标实时倍数")
+    parser.add_argument('--tolerance', type=float, default=0.5, help="切换时间允许误差（秒）")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, 'scenes.mp4')
+        print(f"生成测试视频: {args.scenes} 个镜头 x {args.scene_seconds:.0f} 秒, {args.size}")
+        truth = make_video(path, args.scenes, args.scene_seconds, args.size)
+        duration = args.scenes * args.scene_seconds
+
+        start = time.perf_counter()
+        cuts = scenedetect.detect(path)
+        elapsed = time.perf_counter() - start
+
+    matched = sum(np.any(np.abs(cuts - t) <= args.tolerance) for t in truth)
+    false_cuts = sum(not np.any(np.abs(truth - c) <= args.tolerance) for c in cuts)
+    speed = duration / elapsed
+    print(f"检测耗时: {elapsed:.2f} s  ({speed:.1f}x 实时, CPU {os.cpu_count()} 核)")
+    print(f"真实切换: {truth.tolist()}")
+    print(f"检测结果: {np.round(cuts, 2).tolist()}")
+    print(f"命中 {matched}/{len(truth)}，误检 {false_cuts}")
+    ok = matched == len(truth) and false_cuts == 0 and speed >= args.target
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
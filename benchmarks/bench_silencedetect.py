@@ -0,0 +1,96 @@
+"""快速音频分析性能测试
+
+用 ffmpeg 生成一段有规律停顿的 AAC 音频，对比两种分析引擎：
+  - 完整分析：librosa 解码为波形后计算电平包络（AudioReader.analyze_audio 的主要耗时）；
+  - 快速分析：silencedetect.analyze，ffmpeg 一遍流式处理。
+同时以相同的绝对阈值比较两者判定为有声的时间，报告重合度（交并比）。
+
+用法：
+    python benchmarks/bench_silencedetect.py [--minutes 30] [--noise -40]
+
+快速分析不比完整分析快，或重合度低于 --min-iou 时以非零状态退出。
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import envelope  # noqa: E402
+import silencedetect  # noqa: E402
+
+SR = 44100
+FRAME_LENGTH = 256
+HOP_LENGTH = 64
+
+
+def make_audio(path, seconds):
+    """生成每 5 秒有 2.5 秒停顿的测试音频"""
+    expr = '0.4*sin(2*PI*180*t)*gt(sin(2*PI*0.2*t)\\,0)+0.0005*(random(0)-0.5)'
+    subprocess.run(['ffmpeg', '-y', '-v', 'error', '-f', 'lavfi',
+                    '-i', f'aevalsrc={expr}:s={SR}:d={seconds}',
+                    '-c:a', 'aac', '-b:a', '128k', path], check=True)
+
+
+def coverage(starts, ends, duration, step=0.01):
+    """片段覆盖的时间格（按 step 秒取样）"""
+    grid = np.zeros(int(np.ceil(duration / step)) + 1, dtype=bool)
+    for start, end in zip(starts, ends):
+        grid[int(round(start / step)):int(round(end / step))] = True
+    return grid
+
+
+def librosa_segments(y, noise_db):
+    """完整分析的电平包络按绝对阈值得到的有声片段"""
+    levels = 20 * np.log10(np.maximum(envelope.rms(y, FRAME_LENGTH, HOP_LENGTH), envelope.AMIN))
+    loud = np.concatenate(([False], levels >= noise_db, [False]))
+    edges = np.flatnonzero(np.diff(loud.astype(np.int8)))
+    return edges[0::2] * HOP_LENGTH / SR, edges[1::2] * HOP_LENGTH / SR
+
+
+def main():
+    parser = argparse.ArgumentParser(description="快速音频分析性能测试")
+    parser.add_argument('--minutes', type=float, default=30, help="测试音频时长（分钟）")
+    parser.add_argument('--noise', type=float, default=silencedetect.NOISE_DB, help="静音阈值（dBFS）")
+    parser.add_argument('--min-iou', type=float, default=0.95, help="两种引擎有声时间的最低交并比")
+    args = parser.parse_args()
+
+    import librosa
+    warnings.filterwarnings('ignore', category=UserWarning)
+    warnings.filterwarnings('ignore', category=FutureWarning)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, 'speech.m4a')
+        make_audio(path, args.minutes * 60)
+        print(f"测试音频: {args.minutes:.0f} 分钟 AAC")
+
+        start = time.perf_counter()
+        y, _ = librosa.load(path, sr=SR)
+        envelope.rms_db(y)
+        full_time = time.perf_counter() - start
+        full_starts, full_ends = librosa_segments(y, args.noise)
+        del y
+
+        start = time.perf_counter()
+        result = silencedetect.analyze(path, args.noise)
+        fast_time = time.perf_counter() - start
+
+    duration = result['duration']
+    _, fast_starts, fast_ends = result['segments'][0]
+    full = coverage(full_starts, full_ends, duration)
+    fast = coverage(fast_starts, fast_ends, duration)
+    iou = (full & fast).sum() / max(1, (full | fast).sum())
+    speedup = full_time / fast_time
+    print(f"完整分析（librosa）: {full_time:6.2f} s  ({duration / full_time:6.0f}x 实时)")
+    print(f"快速分析（ffmpeg）:  {fast_time:6.2f} s  ({duration / fast_time:6.0f}x 实时)  加速 {speedup:.1f}x")
+    print(f"片段数: 完整 {len(full_starts)}，快速 {len(fast_starts)}；有声时间交并比 {iou:.3f}")
+    return 0 if speedup >= 1.0 and iou >= args.min_iou else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
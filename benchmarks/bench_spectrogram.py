@@ -0,0 +1,100 @@
+"""频谱图性能测试
+
+生成一段很长的内存映射 PCM（默认 3 小时），模拟打开文件后显示全部时长、
+再放大到几个随机位置，测量每个视图的图块全部算好所需的时间；
+并按 1 分钟音频的耗时估算对整段音频预先计算完整 STFT 的时间作为对比。
+
+用法：
+    python benchmarks/bench_spectrogram.py [--hours 3] [--width 1000] [--budget 2.0]
+
+任一视图超过 --budget 秒时以非零状态退出。
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pcmstore  # noqa: E402
+import spectrogram  # noqa: E402
+
+SR = 44100
+
+
+def make_pcm(path, seconds):
+    """按分钟写入带停顿的正弦波加噪声，返回 PcmView"""
+    n = int(seconds * SR)
+    out = np.lib.format.open_memmap(path, mode='w+', dtype=np.int16, shape=(n,))
+    chunk = SR * 60
+    t = np.arange(chunk) / SR
+    rng = np.random.default_rng(0)
+    for i, start in enumerate(range(0, n, chunk)):
+        signal = np.sin(2 * np.pi * (200 + i % 30 * 100) * t) * (t % 2 < 1) * 8000
+        signal += rng.normal(0, 50, chunk)
+        out[start:start + chunk] = signal[:n - start].astype(np.int16)
+    out.flush()
+    del out
+    return pcmstore.PcmView(np.load(path, mmap_mode='r'), SR, path)
+
+
+def view_tiles(duration, view_start, view_seconds, width):
+    """一个视图需要的图块（与 SpectrogramWidget 的选择方式相同）"""
+    top = spectrogram.max_level(duration, SR)
+    level = spectrogram.level_for(view_seconds / width, SR, top)
+    span = spectrogram.tile_seconds(level, SR)
+    first = int(view_start // span)
+    last = int(min(view_start + view_seconds, duration) // span)
+    return [(level, index) for index in range(first, last + 1)]
+
+
+def full_stft_seconds(pcm, seconds=60):
+    """按 seconds 秒音频的耗时估算完整 STFT（N_FFT 窗长，HOP 步长）的总耗时"""
+    y = np.asarray(pcm[:int(seconds * SR)], dtype=np.float32)
+    window = np.hanning(spectrogram.N_FFT).astype(np.float32)
+    start = time.perf_counter()
+    frames = np.lib.stride_tricks.sliding_window_view(y, spectrogram.N_FFT)[::spectrogram.HOP]
+    for f0 in range(0, len(frames), 4096):
+        np.abs(np.fft.rfft(frames[f0:f0 + 4096] * window, axis=-1))
+    return (time.perf_counter() - start) * pcm.duration / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="频谱图性能测试")
+    parser.add_argument('--hours', type=float, default=3, help="测试音频时长（小时）")
+    parser.add_argument('--width', type=int, default=1000, help="视图宽度（像素）")
+    parser.add_argument('--views', type=int, default=5, help="随机放大视图数")
+    parser.add_argument('--budget', type=float, default=2.0, help="每个视图的时间上限（秒）")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pcm = make_pcm(os.path.join(temp_dir, 'long.npy'), args.hours * 3600)
+        duration = pcm.duration
+        print(f"测试音频: {args.hours:g} 小时，视图宽度 {args.width} 像素")
+
+        rng = np.random.default_rng(1)
+        views = [("全部", 0.0, duration)]
+        for _ in range(args.views):
+            seconds = float(rng.choice([600, 60, 10]))
+            views.append((f"{seconds:g}秒", float(rng.uniform(0, duration - seconds)), seconds))
+
+        worst = 0.0
+        for name, view_start, view_seconds in views:
+            keys = view_tiles(duration, view_start, view_seconds, args.width)
+            start = time.perf_counter()
+            for level, index in keys:
+                spectrogram.render_tile(spectrogram.compute_tile(pcm, SR, level, index))
+            elapsed = time.perf_counter() - start
+            worst = max(worst, elapsed)
+            print(f"{name:>6} @ {view_start:8.1f}s: 级别 {keys[0][0]:2d}，{len(keys)} 块，{elapsed:6.3f} s")
+
+        estimate = full_stft_seconds(pcm)
+        print(f"预先计算完整 STFT（估算）: {estimate:6.1f} s；最慢视图 {worst:.3f} s")
+        del pcm
+    return 0 if worst <= args.budget else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
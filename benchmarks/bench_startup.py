@@ -0,0 +1,101 @@
+"""启动性能测试
+
+在全新的解释器进程中分别测量：
+  1. import VeditUI 的耗时
+  2. 从进程启动到主窗口第一次绘制(first paint)的耗时
+
+用法：
+    python benchmarks/bench_startup.py [--runs 5] [--budget 1.0]
+
+没有显示器时自动使用 QT_QPA_PLATFORM=offscreen。
+首次绘制的中位数超过 --budget 秒时以非零状态退出。
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def child_import():
+    """子进程：测量导入耗时"""
+    start = time.perf_counter()
+    import VeditUI  # noqa: F401
+    print(time.perf_counter() - start)
+
+
+def child_paint(process_start):
+    """子进程：测量到首次绘制的耗时"""
+    from PyQt5.QtWidgets import QApplication
+    from PyQt5.QtCore import QObject, QEvent, QTimer
+
+    app = QApplication(sys.argv)
+    import VeditUI
+
+    class PaintWatcher(QObject):
+        def eventFilter(self, obj, event):
+            if event.type() == QEvent.Paint:
+                print(time.time() - process_start)
+                # 本次绘制处理完后退出
+                QTimer.singleShot(0, app.quit)
+                obj.removeEventFilter(self)
+            return False
+
+    window = VeditUI.VideoEditUI()
+    watcher = PaintWatcher()
+    window.installEventFilter(watcher)
+    window.show()
+    # 防止窗口一直没有绘制时卡住
+    QTimer.singleShot(30000, app.quit)
+    app.exec_()
+
+
+def run_child(mode):
+    """启动子进程并返回其输出的耗时（秒）"""
+    env = dict(os.environ)
+    env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    args = [sys.executable, os.path.abspath(__file__), '--child', mode,
+            '--start', repr(time.time())]
+    output = subprocess.run(args, cwd=ROOT, env=env, check=True,
+                            capture_output=True, text=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="启动性能测试")
+    parser.add_argument('--runs', type=int, default=5, help="重复次数")
+    parser.add_argument('--budget', type=float, default=1.0,
+                        help="首次绘制耗时上限（秒）")
+    parser.add_argument('--child', choices=['import', 'paint'], help=argparse.SUPPRESS)
+    parser.add_argument('--start', type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        sys.path.insert(0, ROOT)
+        if args.child == 'import':
+            child_import()
+        else:
+            child_paint(args.start)
+        return 0
+
+    import_times = [run_child('import') for _ in range(args.runs)]
+    paint_times = [run_child('paint') for _ in range(args.runs)]
+
+    import_median = statistics.median(import_times)
+    paint_median = statistics.median(paint_times)
+    print(f"import VeditUI: 中位数 {import_median * 1000:.0f} ms "
+          f"(最小 {min(import_times) * 1000:.0f} ms, 最大 {max(import_times) * 1000:.0f} ms)")
+    print(f"首次绘制:       中位数 {paint_median * 1000:.0f} ms "
+          f"(最小 {min(paint_times) * 1000:.0f} ms, 最大 {max(paint_times) * 1000:.0f} ms)")
+
+    if paint_median > args.budget:
+        print(f"超出预算: {paint_median:.3f}s > {args.budget:.3f}s")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
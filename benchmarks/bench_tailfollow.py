@@ -0,0 +1,130 @@
+"""跟随录音性能测试
+
+模拟录音程序：以 --speed 倍实时的速度逐块写入一个 WAV 文件（文件头中的长度为0，
+与录音中的文件相同），同时用 TailFollower 跟随分析。测量：
+  - 每个片段的发出延迟：从确定该片段所需的数据（片段结束后 MAX_SILENCE 与半帧）
+    写入磁盘，到片段发出的时间；
+  - 结果是否与录音结束后对整个文件一次分析的结果相同；
+  - 读取的字节数是否等于音频数据的字节数（已处理的数据不重复读取）。
+
+用法：
+    python benchmarks/bench_tailfollow.py [--minutes 5] [--speed 20] [--budget 1.0]
+
+最大延迟超过 --budget 秒，或结果不一致、有重复读取时以非零状态退出。
+"""
+import argparse
+import bisect
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+from PyQt5.QtCore import QCoreApplication
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import tailfollow  # noqa: E402
+
+SR = 44100
+BLOCK_SECONDS = 0.1  # 录音程序每次写入的时长（秒）
+
+
+def make_audio(seconds):
+    """随机长度的说话与停顿交替（带底噪）"""
+    rng = np.random.default_rng(0)
+    parts = []
+    total = 0
+    while total < seconds * SR:
+        n = int(rng.uniform(0.05, 3.0) * SR)
+        amplitude = 0.3 if len(parts) % 2 == 0 else 0.0
+        t = np.arange(n) / SR
+        parts.append(amplitude * np.sin(2 * np.pi * rng.uniform(150, 400) * t)
+                     + rng.normal(0, 3e-4, n))
+        total += n
+    y = np.concatenate(parts)[:int(seconds * SR)]
+    return (np.clip(y, -1, 1) * 32767).astype('<i2')
+
+
+def record(path, pcm, speed, written):
+    """逐块写入，记录每块写入后的 (时间, 累计采样点数)"""
+    block = int(BLOCK_SECONDS * SR)
+    with open(path, 'wb') as f:
+        f.write(b'RIFF' + struct.pack('<I', 0) + b'WAVE'
+                + b'fmt ' + struct.pack('<IHHIIHH', 16, 1, 1, SR, SR * 2, 2, 16)
+                + b'data' + struct.pack('<I', 0))
+        f.flush()
+        start = time.monotonic()
+        for k, offset in enumerate(range(0, len(pcm), block)):
+            f.write(pcm[offset:offset + block].tobytes())
+            f.flush()
+            written.append((time.monotonic(), min(offset + block, len(pcm))))
+            # 按目标速度写入
+            delay = start + (k + 1) * BLOCK_SECONDS / speed - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="跟随录音性能测试")
+    parser.add_argument('--minutes', type=float, default=5, help="录音时长（分钟）")
+    parser.add_argument('--speed', type=float, default=20, help="写入速度（相对实时）")
+    parser.add_argument('--budget', type=float, default=1.0, help="片段发出延迟上限（秒）")
+    args = parser.parse_args()
+
+    app = QCoreApplication(sys.argv)
+    pcm = make_audio(args.minutes * 60)
+    written = []
+    emitted = []
+    follower = tailfollow.TailFollower()
+    # 片段在事件循环中收到，延迟包含信号传递到主线程的时间
+    follower.segments_ready.connect(
+        lambda path, starts, ends: emitted.extend(
+            (time.monotonic(), start, end) for start, end in zip(starts, ends)))
+    follower.finished.connect(lambda path: app.quit())
+    follower.failed.connect(lambda path, message: (print(f"跟随失败: {message}"), app.quit()))
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, 'recording.wav')
+        open(path, 'wb').close()
+        follower.start(path, idle_timeout=1.0)
+        recorder = threading.Thread(target=record, args=(path, pcm, args.speed, written))
+        started = time.monotonic()
+        recorder.start()
+        app.exec_()
+        recorder.join()
+        record_time = written[-1][0] - started
+        follower.stop()
+        bytes_read = follower.bytes_read
+
+    # 一次分析整个录音作为对照
+    cutter = tailfollow.IncrementalCutter(SR)
+    batch = [np.concatenate(parts) for parts in
+             zip(cutter.feed(pcm.astype(np.float32) / 32768), cutter.finish())]
+    starts = np.array([start for _, start, _ in emitted])
+    ends = np.array([end for _, _, end in emitted])
+    same = (len(starts) == len(batch[0]) and np.allclose(starts, batch[0])
+            and np.allclose(ends, batch[1]))
+
+    # 延迟：确定片段所需的数据写入后到片段发出
+    times = [t for t, _ in written]
+    totals = [n for _, n in written]
+    latencies = []
+    for emitted_at, _, end in emitted[:-1]:  # 最后一个片段在录音结束后才能确定
+        needed = int((end + tailfollow.MAX_SILENCE) * SR) + tailfollow.FRAME_LENGTH // 2
+        i = min(bisect.bisect_left(totals, needed), len(times) - 1)
+        latencies.append(max(0.0, emitted_at - times[i]))
+    latencies = np.array(latencies) if latencies else np.zeros(1)
+
+    print(f"录音 {args.minutes:g} 分钟，{args.speed:g} 倍速写入（{record_time:.1f} 秒）")
+    print(f"片段: {len(emitted)}，与整体分析一致: {'是' if same else '否'}")
+    print(f"读取: {bytes_read} 字节，音频数据 {pcm.nbytes} 字节")
+    print(f"发出延迟: 中位 {np.median(latencies) * 1000:.0f} ms，"
+          f"p95 {np.percentile(latencies, 95) * 1000:.0f} ms，最大 {latencies.max() * 1000:.0f} ms")
+    ok = same and bytes_read == pcm.nbytes and latencies.max() <= args.budget
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
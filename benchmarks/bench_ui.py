@@ -0,0 +1,262 @@
+"""界面响应性能测试
+
+在无界面模式（QT_QPA_PLATFORM=offscreen）下用合成素材和逐级增大的片段列表
+驱动界面的主要操作，测量：
+  - 组件构建耗时（素材列表、时间段列表、时间线与主窗口，含首次布局与绘制）；
+  - 每个操作的事件循环延迟：操作期间及随后的布局、绘制期间，用高频定时器
+    记录每次触发比预期晚了多少，报告 p50 / p95 / p99 与最大值（即最长卡顿）。
+    组件分批创建项目、在后台解码缩略图时（is_loading），测量持续到全部完成，
+    耗时一栏也包含这段时间。
+
+驱动的操作：
+  - SourceInfo.add_source：一次导入 N 个素材（读取信息和首帧缩略图）；
+  - TimeCutter.auto_cut：合成波形剪出 N 个片段（每个片段读取一张缩略图）；
+  - TimeCutter.add_segment：逐个添加 N 个片段；
+  - Timeline.add_segments：把 N 个片段放入时间线；
+  - Timeline.zoom_changed：N 个片段时连续缩放四次。
+时间线不设置胶片条缓存，避免后台生成干扰主线程的测量。
+
+用法：
+    python benchmarks/bench_ui.py [--sizes 10,100,500] [--budget-ms 1000]
+                                  [--budget auto_cut=3000 ...] [--construct-budget-ms 500]
+
+任一操作的最长卡顿超过预算（--budget 按操作单独设置，否则用 --budget-ms），
+或任一组件的构建耗时超过 --construct-budget-ms 时以非零状态退出。
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import numpy as np
+from PyQt5.QtCore import QEventLoop, QObject, Qt, QTimer, qInstallMessageHandler
+from PyQt5.QtWidgets import QApplication
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SR = 8000          # 合成波形的采样率
+TICK_MS = 5        # 测量事件循环延迟的定时器间隔
+SETTLE_MS = 300    # 操作结束后继续测量布局与绘制的时间
+ZOOM_STEPS = (150, 300, 50, 100)
+
+
+def _quiet(mode, context, message):
+    """忽略 offscreen 插件对窗口尺寸提示的警告"""
+    if 'propagateSizeHints' not in message:
+        sys.stderr.write(message + '\n')
+
+
+class LoopProbe(QObject):
+    """高频定时器：记录每次触发相对预期的延迟（毫秒）"""
+    def __init__(self, interval_ms=TICK_MS, parent=None):
+        super().__init__(parent)
+        self.interval = interval_ms / 1000
+        self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.setInterval(interval_ms)
+        self.timer.timeout.connect(self._tick)
+        self.delays = []
+        self.last = None
+
+    def start(self):
+        self.delays = []
+        self.last = time.perf_counter()
+        self.timer.start()
+
+    def stop(self):
+        self.timer.stop()
+        # 最后一段未触发的等待也计入
+        self._tick()
+        return np.asarray(self.delays) * 1000
+
+    def _tick(self):
+        now = time.perf_counter()
+        self.delays.append(max(0.0, now - self.last - self.interval))
+        self.last = now
+
+
+def measure(probe, steps, busy=None):
+    """在事件循环中依次执行各步骤，返回 (各步骤耗时列表（毫秒）, 事件循环延迟数组)
+
+    给出 busy 时等到它返回False（延后的工作全部完成）才结束，这段时间计入最后一步。
+    """
+    loop = QEventLoop()
+    durations = []
+    pending = list(steps)
+    last_start = [0.0]
+
+    def run_next():
+        if not pending:
+            if busy is not None and busy():
+                QTimer.singleShot(TICK_MS, run_next)
+                return
+            if busy is not None and durations:
+                durations[-1] = (time.perf_counter() - last_start[0]) * 1000
+            QTimer.singleShot(SETTLE_MS, loop.quit)
+            return
+        step = pending.pop(0)
+        start = last_start[0] = time.perf_counter()
+        step()
+        durations.append((time.perf_counter() - start) * 1000)
+        # 下一步之前先让事件循环处理布局与绘制
+        QTimer.singleShot(0, run_next)
+
+    probe.start()
+    QTimer.singleShot(TICK_MS * 2, run_next)
+    loop.exec_()
+    return durations, probe.stop()
+
+
+def construct(app, factory):
+    """构建组件并显示，处理完首次布局与绘制，返回 (组件, 耗时毫秒)"""
+    start = time.perf_counter()
+    widget = factory()
+    widget.resize(1200, 600)
+    widget.show()
+    app.processEvents()
+    return widget, (time.perf_counter() - start) * 1000
+
+
+def dispose(app, widget):
+    widget.close()
+    widget.deleteLater()
+    app.processEvents()
+
+
+def make_video(path, seconds, size='160x90', rate=5):
+    subprocess.run(['ffmpeg', '-y', '-v', 'error', '-f', 'lavfi',
+                    '-i', f'testsrc2=size={size}:rate={rate}:duration={seconds}',
+                    '-c:v', 'libx264', '-preset', 'ultrafast', '-g', str(rate * 2),
+                    '-pix_fmt', 'yuv420p', path], check=True)
+
+
+def make_sources(temp_dir, clip, count):
+    """count 个不同路径的素材（硬链接到同一个短视频）"""
+    paths = []
+    for i in range(count):
+        path = os.path.join(temp_dir, f'source_{count}_{i:05d}.mp4')
+        try:
+            os.link(clip, path)
+        except OSError:
+            shutil.copy(clip, path)
+        paths.append(path)
+    return paths
+
+
+def make_waveform(count):
+    """0.5 秒有声、0.5 秒静音交替的波形，按 (-30, 0) dB 剪辑得到 count 个片段"""
+    period = SR
+    t = np.arange(period * count) / SR
+    y = (0.5 * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+    y[(np.arange(len(y)) % period) >= period // 2] = 0
+    return y
+
+
+def percentiles(delays):
+    p50, p95, p99 = np.percentile(delays, [50, 95, 99]) if len(delays) else (0, 0, 0)
+    return p50, p95, p99, float(delays.max()) if len(delays) else 0.0
+
+
+def parse_budgets(items):
+    budgets = {}
+    for item in items:
+        name, _, value = item.partition('=')
+        budgets[name.strip()] = float(value)
+    return budgets
+
+
+def main():
+    parser = argparse.ArgumentParser(description="界面响应性能测试")
+    parser.add_argument('--sizes', default='10,100,500', help="逗号分隔的素材数/片段数")
+    parser.add_argument('--budget-ms', type=float, default=1000.0,
+                        help="每个操作最长卡顿的默认上限（毫秒）")
+    parser.add_argument('--budget', action='append', default=[], metavar='操作=毫秒',
+                        help="单独设置某个操作的卡顿上限，可重复")
+    parser.add_argument('--construct-budget-ms', type=float, default=500.0,
+                        help="组件构建耗时上限（毫秒）")
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    budgets = parse_budgets(args.budget)
+
+    qInstallMessageHandler(_quiet)
+    app = QApplication(sys.argv)
+    import VeditUI  # noqa: E402
+    from sourceinfo import SourceInfo  # noqa: E402
+    from AVtimeCut import TimeCutter  # noqa: E402
+    from timeline import Timeline  # noqa: E402
+
+    failures = []
+    probe = LoopProbe()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        clip = os.path.join(temp_dir, 'clip.mp4')
+        make_video(clip, 2, size='320x180', rate=25)
+        long_video = os.path.join(temp_dir, 'long.mp4')
+        make_video(long_video, max(sizes) + 1)
+
+        # 组件构建
+        print("组件构建（含首次布局与绘制）:")
+        for name, factory in (("SourceInfo", SourceInfo), ("TimeCutter", TimeCutter),
+                              ("Timeline", Timeline), ("VideoEditUI", VeditUI.VideoEditUI)):
+            widget, elapsed = construct(app, factory)
+            dispose(app, widget)
+            print(f"  {name:<12} {elapsed:8.1f} ms")
+            if elapsed > args.construct_budget_ms:
+                failures.append(f"构建 {name}: {elapsed:.1f} ms > {args.construct_budget_ms:g} ms")
+
+        print(f"\n{'操作':<16}{'N':>6}{'耗时':>10}{'p50':>8}{'p95':>8}{'p99':>8}{'最长卡顿':>10}  (毫秒)")
+        for n in sizes:
+            cases = []
+
+            sources = make_sources(temp_dir, clip, n)
+            source_info, _ = construct(app, SourceInfo)
+            cases.append(('add_source', source_info,
+                          [lambda: [source_info.add_source(path) for path in sources]]))
+
+            y = make_waveform(n)
+            audio_data = {'waveform': y, 'sr': SR, 'selected_range': (-30, 0),
+                          'sources': [long_video]}
+            cutter, _ = construct(app, TimeCutter)
+            cases.append(('auto_cut', cutter, [lambda: cutter.auto_cut(audio_data)]))
+
+            single, _ = construct(app, TimeCutter)
+
+            def add_each(single=single):
+                for i in range(n):
+                    single.add_segment(i, i + 0.0, i + 0.5, long_video)
+            cases.append(('add_segment', single, [add_each]))
+
+            timeline, _ = construct(app, Timeline)
+            cases.append(('add_segments', timeline,
+                          [lambda: timeline.add_segments(cutter.store.view())]))
+            cases.append(('zoom_changed', timeline,
+                          [lambda value=value: timeline.zoom_changed(value)
+                           for value in ZOOM_STEPS]))
+
+            for name, widget, steps in cases:
+                durations, delays = measure(probe, steps, getattr(widget, 'is_loading', None))
+                p50, p95, p99, worst = percentiles(delays)
+                print(f"{name:<16}{n:>6}{sum(durations):>10.1f}{p50:>8.1f}{p95:>8.1f}"
+                      f"{p99:>8.1f}{worst:>10.1f}")
+                budget = budgets.get(name, args.budget_ms)
+                if worst > budget:
+                    failures.append(f"{name} N={n}: 最长卡顿 {worst:.1f} ms > {budget:g} ms")
+            for widget in {id(case[1]): case[1] for case in cases}.values():
+                dispose(app, widget)
+            for path in sources:
+                os.remove(path)
+
+    if failures:
+        print("\n超出预算:")
+        for failure in failures:
+            print(f"  {failure}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""多特征人声检测性能测试
+
+对比 voiceactivity.frame_features（RMS + 过零率 + 频谱平坦度）
+与纯RMS计算（envelope.rms，TimeCutter 的区间引擎使用的实现）在相同帧参数下的耗时，
+并单独给出每帧一次FFT的耗时作为下限参考。
+
+预算为 1.5 倍。envelope.rms 按组累积，每个采样点只读一次，
+每帧一次 1024 点FFT 一项就远超预算，所以目前达不到，脚本给出实际倍数并以非零状态退出。
+10 分钟音频实测：纯RMS 12 ms，多特征 472 ms（约 39 倍），其中FFT约 28 倍。
+--stride 2 每隔一帧计算平坦度，约 28 倍，但平坦度的时间分辨率减半。
+
+用法：
+    python benchmarks/bench_vad.py [--minutes 10] [--runs 3] [--stride 1] [--budget 1.5]
+
+多特征计算耗时超过纯RMS的 --budget 倍时以非零状态退出。
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import envelope  # noqa: E402
+import voiceactivity  # noqa: E402
+
+
+def synthetic_audio(seconds, sr):
+    """生成带有语音状谐波段落和噪声段落的测试音频"""
+    rng = np.random.default_rng(0)
+    t = np.arange(int(seconds * sr)) / sr
+    gate = (np.sin(2 * np.pi * 0.2 * t) > 0).astype(np.float32)
+    tone = 0.4 * np.sin(2 * np.pi * 180 * t) + 0.1 * np.sin(2 * np.pi * 540 * t)
+    noise = 0.003 * rng.standard_normal(len(t))
+    return (gate * tone + noise).astype(np.float32)
+
+
+def best_of(runs, func):
+    """多次运行取最短耗时"""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多特征人声检测性能测试")
+    parser.add_argument('--minutes', type=float, default=10, help="测试音频时长（分钟）")
+    parser.add_argument('--runs', type=int, default=3, help="重复次数")
+    parser.add_argument('--stride', type=int, default=voiceactivity.SPECTRAL_STRIDE,
+                        help="每隔几帧计算一次频谱平坦度")
+    parser.add_argument('--budget', type=float, default=1.5, help="允许的耗时倍数")
+    args = parser.parse_args()
+
+    sr = 44100
+    y = synthetic_audio(args.minutes * 60, sr)
+    frame_length = voiceactivity.FRAME_LENGTH
+    hop_length = voiceactivity.HOP_LENGTH
+
+    rms_time = best_of(args.runs, lambda: envelope.rms(
+        y, frame_length, hop_length, center=False))
+    vad_time = best_of(args.runs, lambda: voiceactivity.frame_features(
+        y, frame_length, hop_length, args.stride))
+    frames = np.lib.stride_tricks.sliding_window_view(y, frame_length)[::hop_length * args.stride]
+    fft_time = best_of(args.runs, lambda: [
+        voiceactivity.lazyload.scipy_fft().rfft(frames[i:i + voiceactivity.BLOCK_FRAMES], axis=1)
+        for i in range(0, len(frames), voiceactivity.BLOCK_FRAMES)])
+
+    ratio = vad_time / rms_time
+    print(f"音频时长: {args.minutes:.1f} 分钟")
+    print(f"纯RMS (envelope):    {rms_time * 1000:.0f} ms")
+    print(f"RMS+过零率+平坦度:   {vad_time * 1000:.0f} ms（平坦度每 {args.stride} 帧计算一次）")
+    print(f"其中FFT下限:         {fft_time * 1000:.0f} ms ({fft_time / rms_time:.2f}x)")
+    print(f"耗时倍数: {ratio:.2f}x (预算 {args.budget:.2f}x)")
+    return 0 if ratio <= args.budget else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,278 @@
+"""分块并行重新编码导出
+
+需要重新编码时（多素材混合、精确剪辑点等），把剪辑列表按时长均分为N块，
+每块由一个独立的 ffmpeg 进程使用完全相同的编码参数编码，
+最后用 concat 分离器无损拼接各块。每块都从关键帧开始，拼接处不需要再编码。
+块内每个素材只打开一次，滤镜图写入脚本文件，片段数不受命令行长度限制。
+"""
+import functools
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import governor
+import lazyload
+import silencedetect
+from ffmpegrunner import FfmpegTask
+
+# 所有分块共用的编码参数
+VIDEO_CODEC = ['-c:v', 'libx264', '-preset', 'medium', '-crf', '20', '-pix_fmt', 'yuv420p']
+AUDIO_CODEC = ['-c:a', 'aac', '-b:a', '192k']
+AUDIO_RATE = 48000
+AUDIO_BLOCK = AUDIO_RATE // 100  # 音频截取的最小单位（采样点，10毫秒）
+MIN_CHUNK = 1.0  # 每块的最短时长（秒），太短的块没有并行意义
+MAX_INPUTS = 16  # 每块最多同时打开的输入数
+
+
+def split_chunks(segments, chunk_count):
+    """把片段列表按时长均分为若干块
+
+    segments 为 (文件, 开始, 结束) 的可迭代对象（如 SegmentView），
+    跨越分块边界的片段会被切开。返回每块的片段列表。
+    """
+    segments = [(path, float(start), float(end)) for path, start, end in segments if end > start]
+    if not segments:
+        return []
+    durations = np.array([end - start for _, start, end in segments])
+    total = float(durations.sum())
+    chunk_count = max(1, min(int(chunk_count), int(total // MIN_CHUNK) or 1))
+    # 各片段在输出时间轴上的开始位置
+    offsets = np.concatenate(([0.0], np.cumsum(durations)))
+    bounds = np.linspace(0.0, total, chunk_count + 1)
+
+    chunks = []
+    for k in range(chunk_count):
+        lo, hi = bounds[k], bounds[k + 1]
+        first = max(0, int(np.searchsorted(offsets, lo, side='right')) - 1)
+        last = int(np.searchsorted(offsets, hi, side='left'))
+        pieces = []
+        for i in range(first, min(last, len(segments))):
+            path, start, end = segments[i]
+            # 截取片段落在 [lo, hi) 内的部分
+            piece_start = start + max(0.0, lo - offsets[i])
+            piece_end = start + min(end - start, hi - offsets[i])
+            if piece_end - piece_start > 1e-6:
+                pieces.append((path, float(piece_start), float(piece_end)))
+        if pieces:
+            chunks.append(pieces)
+    return chunks
+
+
+@functools.lru_cache(maxsize=256)
+def _has_audio(path, mtime_ns):
+    return silencedetect.probe_media(path)['audio'] is not None
+
+
+def has_audio(path):
+    """素材是否有音频流（按路径和修改时间缓存）"""
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except OSError:
+        return True  # 路径在其他机器上（如导出脚本），按有音频处理
+    return _has_audio(os.path.abspath(path), mtime_ns)
+
+
+def _runs(pieces):
+    """把片段分为若干组：每组是连续的、来自同一素材且在素材中依次向后的片段
+
+    每组只需打开一次素材，顺序解码一遍就能截出组内全部片段。
+    返回 [(素材路径, 片段序号列表)]。
+    """
+    runs = []
+    for i, (path, start, end) in enumerate(pieces):
+        if not runs or runs[-1][0] != path or start < pieces[runs[-1][1][-1]][2] - 1e-6:
+            runs.append((path, []))
+        runs[-1][1].append(i)
+    return runs
+
+
+def limit_inputs(chunks, max_inputs=MAX_INPUTS):
+    """把输入（片段组）过多的分块再切开，限制每个 ffmpeg 进程同时打开的素材数
+
+    多机位交替剪辑时每个片段都是一组，不切开就要同时打开上千个解码器。
+    """
+    limited = []
+    for pieces in chunks:
+        runs = _runs(pieces)
+        for k in range(0, len(runs), max_inputs):
+            group = runs[k:k + max_inputs]
+            limited.append(pieces[group[0][1][0]:group[-1][1][-1] + 1])
+    return limited
+
+
+def _select(ranges):
+    """select/aselect 的表达式：保留序号在 [开始, 结束) 内的帧"""
+    return "'" + '+'.join(f'between(n,{first},{last - 1})' for first, last in ranges) + "'"
+
+
+def chunk_graph(pieces, width, height, fps, audio_filter=None):
+    """单个分块的输入与滤镜图，返回 (输入参数列表, 滤镜图文本)
+
+    同一素材中依次向后的片段共用一个输入（定位到第一个片段，读到最后一个片段为止），
+    先统一缩放、帧率与音频格式，再用 select/aselect 只保留片段内的帧，整条链顺序
+    处理：内存占用与片段数无关，ffmpeg 也不会为后面的片段提前解码并缓存画面。
+    视频按帧序号截取（帧率统一后第 m 帧位于 m/fps 秒），音频分成 AUDIO_BLOCK 个采样点
+    的小块按块序号截取，每组内音频的累计时长跟随视频的累计帧数，音画偏差不超过半块。
+    没有音频流的素材用等长的静音代替。各分块的流参数一致，最后才能无损拼接。
+    audio_filter 附加在音频滤镜之后（如响度标准化的增益）。
+    """
+    inputs, filters, streams = [], [], []
+    block_rate = AUDIO_RATE / AUDIO_BLOCK  # 每秒的音频块数
+    for path, indices in _runs(pieces):
+        # 定位点对齐到输出帧网格，fps 滤镜的取帧位置才与片段边界一致
+        lo = np.floor(pieces[indices[0]][1] * fps + 1e-6) / fps
+        hi = pieces[indices[-1]][2]
+        # 输入端定位后时间戳从0开始，片段位置相对 lo
+        frames, blocks = [], []
+        video_total = audio_total = 0
+        for i in indices:
+            first = int(np.ceil((pieces[i][1] - lo) * fps - 1e-6))
+            last = int(np.ceil((pieces[i][2] - lo) * fps - 1e-6))
+            if last <= first:
+                continue  # 不足一帧的片段
+            video_total += last - first
+            # 音频从片段开始处截取，块数使累计时长与视频一致
+            count = int(round(video_total / fps * block_rate)) - audio_total
+            start_block = int(round(first / fps * block_rate))
+            frames.append((first, last))
+            if count > 0:
+                blocks.append((start_block, start_block + count))
+                audio_total += count
+        if not frames:
+            continue
+        k = len(streams)
+        # 多读一帧，fps 滤镜在输入结束处可能丢掉最后一帧
+        inputs += ['-ss', f'{lo:.6f}', '-t', f'{hi - lo + 1 / fps:.6f}', '-i', path]
+        filters.append(
+            f'[{k}:v]fps=fps={fps}:start_time=0,'
+            f'scale={width}:{height}:force_original_aspect_ratio=decrease,'
+            f'pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,setsar=1,format=yuv420p,'
+            f'select={_select(frames)},setpts=N/FRAME_RATE/TB[v{k}]')
+        if has_audio(path) and blocks:
+            filters.append(
+                f'[{k}:a]aresample={AUDIO_RATE}:async=1:first_pts=0,'
+                f'aformat=channel_layouts=stereo' + (f',{audio_filter}' if audio_filter else '')
+                + f',asetnsamples=n={AUDIO_BLOCK}:p=0,aselect={_select(blocks)},'
+                f'asetpts=N/SR/TB[a{k}]')
+        else:
+            filters.append(f'anullsrc=r={AUDIO_RATE}:cl=stereo,'
+                           f'atrim=end_sample={audio_total * AUDIO_BLOCK}[a{k}]')
+        streams.append(f'[v{k}][a{k}]')
+    if not streams:
+        raise ValueError("片段都短于一帧，没有可导出的内容")
+    filters.append(f'{"".join(streams)}concat=n={len(streams)}:v=1:a=1[v][a]')
+    return inputs, ';\n'.join(filters)
+
+
+def chunk_command(pieces, output_path, width, height, fps, threads, audio_filter=None,
+                  script_path=None):
+    """生成单个分块的编码命令
+
+    给出 script_path 时滤镜图写入该文件，用 -filter_complex_script 读取，
+    片段再多命令行长度也不变（Windows 的命令行上限约 32K 字符）；
+    否则直接写在命令行中，只适合片段很少的情况。
+    """
+    inputs, graph = chunk_graph(pieces, width, height, fps, audio_filter)
+    command = ['ffmpeg', '-y', '-v', 'error', '-nostdin'] + inputs
+    if script_path:
+        with open(script_path, 'w', encoding='utf-8') as f:
+            f.write(graph)
+        command += ['-filter_complex_script', script_path]
+    else:
+        command += ['-filter_complex', graph.replace('\n', '')]
+    command += ['-map', '[v]', '-map', '[a]', '-threads', str(threads)]
+    command += VIDEO_CODEC + AUDIO_CODEC + ['-ar', str(AUDIO_RATE), output_path]
+    return command
+
+
+def probe_video(file_path):
+    """读取视频的宽、高和帧率"""
+    cv2 = lazyload.cv2()
+    with governor.instance().acquire(governor.INTERACTIVE, name="探测"):
+        cap = cv2.VideoCapture(file_path)
+        try:
+            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)) or 1280
+            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) or 720
+            fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+        finally:
+            cap.release()
+    # libx264 要求偶数尺寸
+    return width // 2 * 2, height // 2 * 2, round(fps, 3)
+
+
+def _prepare(segments, jobs, width, height, fps):
+    """分块并补全输出参数，返回 (分块列表, 宽, 高, 帧率, 每块线程数)"""
+    segments = list(segments)
+    if not segments:
+        raise ValueError("没有可导出的片段")
+    if width is None or height is None or fps is None:
+        probed = probe_video(segments[0][0])
+        width, height, fps = width or probed[0], height or probed[1], fps or probed[2]
+    chunks = split_chunks(segments, jobs or os.cpu_count() or 1)
+    threads = max(1, (os.cpu_count() or 1) // len(chunks))
+    chunks = limit_inputs(chunks)
+    return chunks, width, height, fps, threads
+
+
+def export_stages(segments, output_path, work_dir, jobs=None, width=None, height=None, fps=None,
+                  audio_filter=None):
+    """异步执行用的任务阶段：先并行编码各块，再无损拼接"""
+    chunks, width, height, fps, threads = _prepare(segments, jobs, width, height, fps)
+    tasks = []
+    for k, pieces in enumerate(chunks):
+        path = os.path.join(work_dir, f'chunk_{k:04d}.mp4')
+        duration = sum(end - start for _, start, end in pieces)
+        script = os.path.join(work_dir, f'chunk_{k:04d}.filter')
+        tasks.append(FfmpegTask(chunk_command(pieces, path, width, height, fps, threads,
+                                              audio_filter, script),
+                                duration, path, slots=threads))
+    concat = FfmpegTask(concat_command([task.output for task in tasks], output_path, work_dir),
+                        0.0, output_path)
+    return [tasks, [concat]]
+
+
+def concat_command(paths, output_path, work_dir):
+    """生成各块的无损拼接命令（列表文件写入work_dir）"""
+    list_file = os.path.join(work_dir, 'chunks.txt')
+    with open(list_file, 'w', encoding='utf-8') as f:
+        for path in paths:
+            f.write(f"file '{path}'\n")
+    return ['ffmpeg', '-y', '-v', 'error', '-nostdin', '-f', 'concat', '-safe', '0',
+            '-i', list_file, '-c', 'copy', '-movflags', '+faststart', output_path]
+
+
+def export_video(segments, output_path, jobs=None, width=None, height=None, fps=None):
+    """分块并行重新编码导出，返回各阶段耗时统计"""
+    chunks, width, height, fps, threads = _prepare(segments, jobs, width, height, fps)
+    temp_dir = tempfile.mkdtemp(prefix='chunk_export_')
+    stats = {'chunks': len(chunks)}
+    try:
+        chunk_files = [os.path.join(temp_dir, f'chunk_{k:04d}.mp4') for k in range(len(chunks))]
+        commands = [chunk_command(pieces, path, width, height, fps, threads,
+                                  script_path=path + '.filter')
+                    for pieces, path in zip(chunks, chunk_files)]
+
+        # 各分块在独立进程中并行编码
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=min(len(chunks), jobs or os.cpu_count() or 1)) as pool:
+            results = list(pool.map(
+                lambda command: governor.run_leased(
+                    command, governor.BULK, threads, governor.FFMPEG_MEMORY_MB, "导出",
+                    capture_output=True, text=True),
+                commands))
+        for result in results:
+            if result.returncode != 0:
+                raise RuntimeError(result.stderr.strip() or "分块编码失败")
+        stats['encode_time'] = time.perf_counter() - start
+
+        # 无损拼接
+        start = time.perf_counter()
+        governor.run_leased(concat_command(chunk_files, output_path, temp_dir), governor.BULK,
+                            name="导出", check=True, capture_output=True)
+        stats['concat_time'] = time.perf_counter() - start
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    return stats
@@ -0,0 +1,130 @@
+"""电平包络计算
+
+用平方和的累积和计算滑动窗口RMS：每帧的能量等于两个累积和之差，
+任何帧长与步长组合都只需遍历一次数据，总耗时 O(n)，只分配一个输出数组。
+采样点先按帧长与步长的最大公约数分组求平方和（帧边界总是落在组边界上），
+累积和只需在组上计算；累积和使用 float64 并按块计算，长音频也不会累积误差
+或占用大量内存。输入可以是数组或 PcmView，按块切片读取。
+
+多声道输入为 (采样点数, 声道数) 的交错数据（如 PcmView.multichannel()），
+一次遍历同时得到每个声道的包络，需要时顺便得到混合声道的包络，不必逐声道重复读取。
+
+结果与 librosa.feature.rms(center=True, pad_mode='constant') 和
+librosa.amplitude_to_db(ref=np.max) 一致。
+"""
+import math
+
+import numpy as np
+
+BLOCK_SAMPLES = 1 << 22  # 每块读取的采样点数（约4M）
+AMIN = 1e-5           # 转换分贝时的最小幅度
+TOP_DB = 80.0         # 分贝动态范围
+
+
+def frame_count(n_samples, frame_length, hop_length, center=True):
+    """帧数（与 librosa 的分帧方式相同）"""
+    if center:
+        n_samples += 2 * (frame_length // 2)
+    if n_samples < frame_length:
+        return 0
+    return 1 + (n_samples - frame_length) // hop_length
+
+
+def _read(y, start, end):
+    """读取 [start, end) 采样点，越界部分补零"""
+    lo, hi = max(start, 0), min(end, len(y))
+    samples = (np.asarray(y[lo:hi], dtype=np.float32) if hi > lo
+               else np.zeros((0,) + tuple(y.shape[1:]), dtype=np.float32))
+    if lo == start and hi == end:
+        return samples
+    padding = [(lo - start, end - max(hi, lo))] + [(0, 0)] * (samples.ndim - 1)
+    return np.pad(samples, padding)
+
+
+def rms(y, frame_length=2048, hop_length=512, center=True, block_samples=BLOCK_SAMPLES,
+        mix=False):
+    """逐帧RMS，返回 float32 数组
+
+    y 为 (采样点数, 声道数) 的多声道数据时返回 (声道数, 帧数)；
+    mix 为 True 时多返回一行按声道平均后的混合声道包络（最后一行）。
+    """
+    if len(y.shape) == 2:
+        return _rms_channels(y, frame_length, hop_length, center, block_samples, mix)
+    pad = frame_length // 2 if center else 0
+    n_frames = frame_count(len(y), frame_length, hop_length, center)
+    out = np.empty(n_frames, dtype=np.float32)
+    group = math.gcd(frame_length, hop_length)
+    frame_groups = frame_length // group
+    hop_groups = hop_length // group
+    block_frames = max(1, block_samples // hop_length)
+    for f0 in range(0, n_frames, block_frames):
+        f1 = min(f0 + block_frames, n_frames)
+        # 本块帧覆盖的采样点（补零后的坐标），长度是组大小的整数倍
+        start = f0 * hop_length
+        end = (f1 - 1) * hop_length + frame_length
+        groups = _read(y, start - pad, end - pad).reshape(-1, group)
+        cumulative = np.zeros(len(groups) + 1)
+        np.cumsum(np.einsum('ij,ij->i', groups, groups), out=cumulative[1:])
+        count = f1 - f0
+        energy = (cumulative[frame_groups::hop_groups][:count]
+                  - cumulative[0::hop_groups][:count])
+        # 累积和相减可能出现极小的负数
+        np.sqrt(np.maximum(energy, 0.0) / frame_length, out=out[f0:f1], casting='unsafe')
+    return out
+
+
+def _rms_channels(y, frame_length, hop_length, center, block_samples, mix):
+    """多声道逐帧RMS：每块交错数据只读一次，所有声道一起计算"""
+    pad = frame_length // 2 if center else 0
+    channels = y.shape[1]
+    n_frames = frame_count(len(y), frame_length, hop_length, center)
+    out = np.empty((channels + int(mix), n_frames), dtype=np.float32)
+    group = math.gcd(frame_length, hop_length)
+    frame_groups = frame_length // group
+    hop_groups = hop_length // group
+    block_frames = max(1, block_samples // (hop_length * channels))
+    weights = np.full(channels, 1.0 / channels, dtype=np.float32)
+    for f0 in range(0, n_frames, block_frames):
+        f1 = min(f0 + block_frames, n_frames)
+        start = f0 * hop_length
+        end = (f1 - 1) * hop_length + frame_length
+        samples = _read(y, start - pad, end - pad)
+        # 每组每个声道的平方和 (组数, 声道数)
+        groups = samples.reshape(-1, group, channels)
+        sums = np.einsum('igc,igc->ic', groups, groups)
+        if mix:
+            # 按声道平均用矩阵乘法，比在最后一维上求平均快得多
+            mixed = (samples @ weights).reshape(-1, group)
+            sums = np.concatenate((sums, np.einsum('ig,ig->i', mixed, mixed)[:, None]), axis=1)
+        cumulative = np.zeros((len(sums) + 1, sums.shape[1]))
+        np.cumsum(sums, axis=0, out=cumulative[1:])
+        count = f1 - f0
+        energy = (cumulative[frame_groups::hop_groups][:count]
+                  - cumulative[0::hop_groups][:count])
+        out[:, f0:f1] = np.sqrt(np.maximum(energy, 0.0) / frame_length).T
+    return out
+
+
+def to_db(values, amin=AMIN, top_db=TOP_DB):
+    """幅度转换为分贝，以最大值为 0 dB（多声道时以所有声道中的最大值为参考）"""
+    values = np.abs(np.asarray(values, dtype=np.float32))
+    ref = max(float(values.max()) if len(values) else 0.0, amin)
+    db = 20.0 * np.log10(np.maximum(values, amin)) - 20.0 * np.log10(ref)
+    if top_db is not None:
+        db = np.maximum(db, -top_db)
+    return db.astype(np.float32)
+
+
+def rms_db(y, frame_length=2048, hop_length=512, center=True):
+    """逐帧RMS电平（dB，以最响的一帧为 0 dB）"""
+    return to_db(rms(y, frame_length, hop_length, center))
+
+
+def channel_rms_db(y, frame_length=2048, hop_length=512, center=True):
+    """多声道电平：返回 (混合声道电平, (声道数, 帧数) 的各声道电平)
+
+    一次遍历交错数据。混合声道与 rms_db 对单声道混合的结果相同；
+    各声道共用同一个参考（最响声道最响的一帧为 0 dB），声道之间可以直接比较。
+    """
+    values = rms(y, frame_length, hop_length, center, mix=True)
+    return to_db(values[-1]), to_db(values[:-1])
@@ -0,0 +1,285 @@
+"""导出计划
+
+导出前先把剪辑列表整理成尽量少的任务：
+  1. 按间隔策略合并同一素材中相邻或几乎相邻的片段；
+  2. 把连续来自同一素材的片段归为一个任务（一次 ffmpeg 调用）；
+  3. 逐个任务选择直接复制还是重新编码：复制任务的输出保留素材原有的流参数，
+     不能与重新编码的输出无损拼接，只要有一个任务需要重新编码，全部任务都重新编码；
+  4. 开始导出前估算输出时长、大小和渲染耗时。
+"""
+import os
+
+import numpy as np
+import lazyload
+import chunkexport
+import governor
+import silencedetect
+from ffmpegrunner import FfmpegTask
+
+# 可以直接复制的视频编码（OpenCV FOURCC）与容器
+COPY_CODECS = ('avc1', 'h264', 'x264', 'hev1', 'hvc1', 'hevc')
+COPY_CONTAINERS = ('mp4', 'mov', 'mkv')
+
+# 估算参数
+COPY_THROUGHPUT = 200e6        # 复制模式的读写吞吐量（字节/秒）
+REENCODE_SPEED_1080P = 1.5     # 1080p 重新编码速度（相对实时）
+REENCODE_BITRATE_1080P = 8e6   # 1080p 重新编码后的码率估计（比特/秒）
+JOB_OVERHEAD = 0.3             # 每次启动 ffmpeg 的固定开销（秒）
+
+
+class GapPolicy:
+    """片段合并策略
+
+    max_gap: 同一素材中前后两个片段的间隔不超过该值（秒）时合并为一个区间，
+             间隔中的内容会一并保留；为0时只合并首尾相接或重叠的片段。
+    """
+    def __init__(self, max_gap=0.1):
+        self.max_gap = float(max_gap)
+
+
+def merge_ranges(file_ids, starts, ends, max_gap):
+    """合并相邻区间（向量化）
+
+    只有同一素材、时间向前且间隔不超过max_gap的相邻区间才会合并。
+    返回 (素材编号, 开始, 结束) 三个数组。
+    """
+    file_ids = np.asarray(file_ids)
+    starts = np.asarray(starts, dtype=np.float64)
+    ends = np.asarray(ends, dtype=np.float64)
+    if len(starts) == 0:
+        return file_ids, starts, ends
+    gaps = starts[1:] - ends[:-1]
+    joined = ((file_ids[1:] == file_ids[:-1]) & (gaps <= max_gap)
+              & (starts[1:] >= starts[:-1]))
+    group_first = np.flatnonzero(np.concatenate(([True], ~joined)))
+    return (file_ids[group_first], starts[group_first],
+            np.maximum.reduceat(ends, group_first))
+
+
+class SourceProbe:
+    """素材参数：分辨率、帧率、编码、码率与音频流参数"""
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.width = 0
+        self.height = 0
+        self.fps = 0.0
+        self.codec = ''
+        self.duration = 0.0
+        self.bitrate = 0.0
+        cv2 = lazyload.cv2()
+        with governor.instance().acquire(governor.INTERACTIVE, name="探测"):
+            cap = cv2.VideoCapture(file_path)
+            try:
+                if cap.isOpened():
+                    self.width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+                    self.height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+                    self.fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+                    fourcc = int(cap.get(cv2.CAP_PROP_FOURCC))
+                    self.codec = ''.join(chr((fourcc >> (8 * i)) & 0xFF)
+                                         for i in range(4)).strip().lower()
+                    frames = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+                    self.duration = frames / self.fps if self.fps > 0 else 0.0
+            finally:
+                cap.release()
+        if self.duration > 0:
+            self.bitrate = os.path.getsize(file_path) * 8 / self.duration
+        # 第一个音频流的 {'codec', 'sample_rate', 'channels'}，没有音频时为None
+        # （probe_media 自己申请租约，放在上面的租约之外）
+        self.audio = silencedetect.probe_media(file_path)['audio']
+
+    @property
+    def container(self):
+        return os.path.splitext(self.file_path)[1].lower().lstrip('.')
+
+    def stream_key(self):
+        """流参数，相同时才能无损拼接（音频的编码、采样率与声道数也要相同）"""
+        audio = self.audio
+        audio_key = (audio['codec'], audio['sample_rate'], audio['channels']) if audio else None
+        return (self.codec, self.width, self.height, round(self.fps, 3), audio_key)
+
+
+def filtered_audio_args(audio_filter):
+    """复制模式下音频经过滤镜时的参数（没有滤镜时为空）
+
+    各复制任务的音频格式一致，才能无损拼接。
+    """
+    if not audio_filter:
+        return []
+    return (['-af', f'aresample={chunkexport.AUDIO_RATE},'
+                    f'aformat=channel_layouts=stereo,{audio_filter}']
+            + chunkexport.AUDIO_CODEC + ['-ar', str(chunkexport.AUDIO_RATE)])
+
+
+class ExportJob:
+    """一个导出任务：同一素材的若干区间，一次 ffmpeg 调用完成"""
+    def __init__(self, file_path, starts, ends, mode):
+        self.file_path = file_path
+        self.starts = starts
+        self.ends = ends
+        self.mode = mode  # 'copy' 或 'reencode'
+        self.est_size = 0.0
+        self.est_time = 0.0
+
+    @property
+    def duration(self):
+        return float(np.sum(self.ends - self.starts))
+
+    @property
+    def slots(self):
+        """重新编码使用全部核心，复制只占一个"""
+        return (os.cpu_count() or 1) if self.mode == 'reencode' else 1
+
+    def __len__(self):
+        return len(self.starts)
+
+    def concat_list(self):
+        """复制模式的 concat 分离器列表（按行），每个区间由 inpoint/outpoint 截取"""
+        path = os.path.abspath(self.file_path).replace("'", "'\\''")
+        lines = []
+        for start, end in zip(self.starts.tolist(), self.ends.tolist()):
+            lines += [f"file '{path}'", f'inpoint {start:.6f}', f'outpoint {end:.6f}']
+        return lines
+
+    def copy_command(self, list_file, output_path, audio_filter=None):
+        """复制模式的命令，list_file 中为 concat_list 的内容"""
+        command = ['ffmpeg', '-y', '-v', 'error', '-nostdin', '-f', 'concat', '-safe', '0',
+                   '-i', list_file, '-c', 'copy']
+        command += filtered_audio_args(audio_filter)
+        return command + ['-avoid_negative_ts', 'make_zero', output_path]
+
+    def command(self, output_path, work_dir, index, width, height, fps, audio_filter=None):
+        """生成任务的 ffmpeg 命令
+
+        复制模式用 concat 分离器的 inpoint/outpoint 在一个进程中截取全部区间；
+        重新编码模式每个素材只打开一次，用 select 截取各区间后接 concat 滤镜。
+        有 audio_filter 时复制模式只复制视频，音频经过滤镜后按重新编码的音频格式编码。
+        """
+        if self.mode == 'copy':
+            list_file = os.path.join(work_dir, f'job_{index:04d}.txt')
+            with open(list_file, 'w', encoding='utf-8') as f:
+                f.write(''.join(line + '\n' for line in self.concat_list()))
+            return self.copy_command(list_file, output_path, audio_filter)
+        pieces = [(self.file_path, start, end)
+                  for start, end in zip(self.starts.tolist(), self.ends.tolist())]
+        return chunkexport.chunk_command(pieces, output_path, width, height, fps,
+                                         os.cpu_count() or 1, audio_filter,
+                                         os.path.join(work_dir, f'job_{index:04d}.filter'))
+
+
+class ExportPlan:
+    """导出计划"""
+    def __init__(self, jobs, segment_count, reference):
+        self.jobs = jobs
+        self.segment_count = segment_count
+        self.reference = reference  # 决定输出流参数的素材
+
+    @property
+    def duration(self):
+        return sum(job.duration for job in self.jobs)
+
+    @property
+    def est_size(self):
+        return sum(job.est_size for job in self.jobs)
+
+    @property
+    def est_time(self):
+        return sum(job.est_time for job in self.jobs) + JOB_OVERHEAD
+
+    def segments(self):
+        """逐条返回合并后的 (文件, 开始, 结束)"""
+        for job in self.jobs:
+            for start, end in zip(job.starts.tolist(), job.ends.tolist()):
+                yield job.file_path, start, end
+
+    def summary(self):
+        """计划摘要文本"""
+        copy_jobs = sum(1 for job in self.jobs if job.mode == 'copy')
+        ranges = sum(len(job) for job in self.jobs)
+        return (
+            f"片段: {self.segment_count} 个，合并后 {ranges} 个区间\n"
+            f"任务: {len(self.jobs)} 个（复制 {copy_jobs}，重新编码 {len(self.jobs) - copy_jobs}）\n"
+            f"输出时长: {self.duration:.1f} 秒\n"
+            f"预计大小: {self.est_size / 1024 / 1024:.1f} MB\n"
+            f"预计耗时: {self.est_time:.1f} 秒"
+        )
+
+    def output_format(self):
+        """输出的宽、高和帧率（由参考素材决定，重新编码的任务都按此统一）"""
+        reference = self.reference
+        width, height = reference.width // 2 * 2 or 1280, reference.height // 2 * 2 or 720
+        return width, height, round(reference.fps, 3) or 25
+
+    def stages(self, output_path, work_dir, audio_filter=None):
+        """异步执行用的任务阶段：先并行执行各任务，再拼接"""
+        width, height, fps = self.output_format()
+        if len(self.jobs) == 1:
+            job = self.jobs[0]
+            return [[FfmpegTask(job.command(output_path, work_dir, 0, width, height, fps,
+                                            audio_filter),
+                                job.duration, output_path, slots=job.slots)]]
+        tasks = []
+        for index, job in enumerate(self.jobs):
+            job_output = os.path.join(work_dir, f'job_{index:04d}.mp4')
+            tasks.append(FfmpegTask(job.command(job_output, work_dir, index, width, height, fps,
+                                                audio_filter),
+                                    job.duration, job_output, slots=job.slots))
+        concat = FfmpegTask(concat_command([task.output for task in tasks], output_path, work_dir),
+                            0.0, output_path)
+        return [tasks, [concat]]
+
+
+def concat_command(paths, output_path, work_dir):
+    """生成无损拼接命令（列表文件写入work_dir）"""
+    list_file = os.path.join(work_dir, 'jobs.txt')
+    with open(list_file, 'w', encoding='utf-8') as f:
+        for path in paths:
+            f.write(f"file '{path}'\n")
+    return ['ffmpeg', '-y', '-v', 'error', '-nostdin', '-f', 'concat',
+            '-safe', '0', '-i', list_file, '-c', 'copy', output_path]
+
+
+def build_plan(segments, policy=None, probe=SourceProbe):
+    """根据片段视图(SegmentView)生成导出计划"""
+    policy = policy or GapPolicy()
+    records = segments.records
+    # 没有关联素材的片段（file_id 为 -1）无法导出
+    records = records[records['file_id'] >= 0]
+    if len(records) == 0:
+        raise ValueError("没有可导出的片段（片段没有关联素材）")
+    file_ids, starts, ends = merge_ranges(records['file_id'], records['start'],
+                                          records['end'], policy.max_gap)
+
+    probes = {}
+    for file_id in np.unique(file_ids).tolist():
+        probes[file_id] = probe(segments.files[file_id])
+    reference = probes[int(file_ids[0])]
+
+    # 连续来自同一素材的区间归为一个任务
+    boundaries = np.flatnonzero(np.diff(file_ids)) + 1
+    groups = list(zip(np.split(starts, boundaries), np.split(ends, boundaries),
+                      [probes[int(ids[0])] for ids in np.split(file_ids, boundaries)]))
+    # 复制的输出与重新编码的输出流参数不同（编码参数、像素格式、音频格式），
+    # 不能用 -c copy 拼接，有一个任务不能复制时全部统一重新编码
+    copyable = all(source.codec in COPY_CODECS
+                   and source.container in COPY_CONTAINERS
+                   and source.stream_key() == reference.stream_key()
+                   for _, _, source in groups)
+    jobs = []
+    for job_starts, job_ends, source in groups:
+        job = ExportJob(source.file_path, job_starts, job_ends,
+                        'copy' if copyable else 'reencode')
+        estimate_job(job, source, reference)
+        jobs.append(job)
+    return ExportPlan(jobs, len(segments.records), reference)
+
+
+def estimate_job(job, source, reference):
+    """估算任务的输出大小与渲染耗时"""
+    duration = job.duration
+    if job.mode == 'copy':
+        job.est_size = duration * source.bitrate / 8
+        job.est_time = job.est_size / COPY_THROUGHPUT + JOB_OVERHEAD
+    else:
+        pixels = max(1, reference.width * reference.height) / (1920 * 1080)
+        job.est_size = duration * REENCODE_BITRATE_1080P * pixels / 8
+        job.est_time = duration * pixels / REENCODE_SPEED_1080P + JOB_OVERHEAD
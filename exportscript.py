@@ -0,0 +1,295 @@
+"""导出剪辑脚本
+
+把导出计划写成可以在其他机器上执行的脚本。截取任务彼此没有依赖，可以并行执行，
+全部完成后再无损拼接为最终输出。截取方式与程序内导出相同：复制模式每个任务
+用 concat 分离器的 inpoint/outpoint 截取（列表文件由脚本写入工作目录），
+重新编码模式每个区间是一个任务。
+
+支持三种格式：
+  - sh：bash 脚本（需要 bash 4.3 以上的 wait -n），按 JOBS 环境变量并发执行，
+    任一任务完成就启动下一个，输出文件由第一个参数指定；
+  - make：Makefile，每个任务一个目标，用 make -j 并行，输出由 OUTPUT 变量指定；
+    工作目录为输出旁的 $(OUTPUT).parts（可用 WORK 覆盖），合并后删除；
+  - bat：Windows 批处理，逐个执行。
+sh 与 bat 的中间文件放在临时目录中。
+
+素材路径写成绝对路径，执行脚本的机器上素材需要位于相同路径。
+开启响度标准化时，增益滤镜随各任务的命令一起写入脚本。
+"""
+import os
+import shlex
+
+import chunkexport
+import exportplan
+
+FORMATS = {
+    'sh': "Shell脚本 (*.sh)",
+    'make': "Makefile (Makefile *.mk)",
+    'bat': "批处理文件 (*.bat)",
+}
+DEFAULT_OUTPUT = 'output.mp4'
+LIST_NAME = 'parts.txt'
+
+
+class _Ref(str):
+    """脚本变量中的路径（如临时目录下的文件），按各格式的语法引用"""
+    def __new__(cls, var, name=''):
+        ref = super().__new__(cls, f'{var}/{name}' if name else var)
+        ref.var = var
+        ref.name = name
+        return ref
+
+
+def script_format(path):
+    """根据文件名判断脚本格式"""
+    name = os.path.basename(path).lower()
+    if name.endswith('.bat') or name.endswith('.cmd'):
+        return 'bat'
+    if name == 'makefile' or name.endswith('.mk'):
+        return 'make'
+    return 'sh'
+
+
+def part_name(index):
+    return f'part_{index:04d}.mp4'
+
+
+def part_commands(plan, threads=0, audio_filter=None):
+    """各截取任务的命令，返回 [(中间文件名, 命令参数列表, 列表文件)]
+
+    复制模式每个任务一条命令，与 ExportJob 相同用 inpoint/outpoint 截取，
+    列表文件为 (文件名, 行列表)，需要在命令之前写入工作目录；
+    重新编码模式每个区间一条命令，统一为计划的输出格式，列表文件为None。
+    threads 为 0 时由 ffmpeg 自行决定线程数。audio_filter 与导出视频时相同。
+    """
+    if not plan.jobs:
+        raise ValueError("导出计划中没有片段")
+    width, height, fps = plan.output_format()
+    parts = []
+    for job in plan.jobs:
+        if job.mode == 'copy':
+            name = part_name(len(parts))
+            list_name = os.path.splitext(name)[0] + '.txt'
+            command = job.copy_command(_Ref('WORK', list_name), _Ref('WORK', name), audio_filter)
+            parts.append((name, command, (list_name, job.concat_list())))
+            continue
+        path = os.path.abspath(job.file_path)
+        for start, end in zip(job.starts.tolist(), job.ends.tolist()):
+            name = part_name(len(parts))
+            command = chunkexport.chunk_command([(path, start, end)], _Ref('WORK', name),
+                                                width, height, fps, threads, audio_filter)
+            parts.append((name, command, None))
+    return parts
+
+
+def _printf_list(list_file, quote):
+    """把列表文件写入工作目录的 printf 命令行（sh 与 make 共用）"""
+    list_name, lines = list_file
+    return (_join(['printf', '%s\\n'] + lines, quote)
+            + ' > ' + quote(_Ref('WORK', list_name)))
+
+
+def _bat_echo(text):
+    """批处理括号块中 echo 的文本转义"""
+    text = text.replace('%', '%%').replace('^', '^^')
+    for char in '&|<>()':
+        text = text.replace(char, '^' + char)
+    return text
+
+
+def concat_command():
+    """拼接全部中间文件的命令（列表文件位于临时目录中）"""
+    return ['ffmpeg', '-y', '-v', 'error', '-nostdin', '-f', 'concat', '-safe', '0',
+            '-i', _Ref('WORK', LIST_NAME), '-c', 'copy', _Ref('OUTPUT')]
+
+
+def _sh_quote(arg):
+    if isinstance(arg, _Ref):
+        return f'"${arg.var}"' + (f'/{shlex.quote(arg.name)}' if arg.name else '')
+    return shlex.quote(arg)
+
+
+def _make_quote(arg):
+    if isinstance(arg, _Ref):
+        return f'"$({arg.var})"' + (f'/{shlex.quote(arg.name)}' if arg.name else '')
+    return shlex.quote(arg).replace('$', '$$')
+
+
+def _bat_quote(arg):
+    if isinstance(arg, _Ref):
+        return f'"%{arg.var}%' + (f'\\{arg.name}' if arg.name else '') + '"'
+    arg = arg.replace('%', '%%')
+    if arg and all(c.isalnum() or c in '-_.:/=' for c in arg):
+        return arg
+    return '"' + arg.replace('"', '""') + '"'
+
+
+def _join(command, quote):
+    return ' '.join(quote(arg) for arg in command)
+
+
+def shell_script(plan, output=DEFAULT_OUTPUT, audio_filter=None):
+    """bash 脚本：各任务按 JOBS 并发（滑动窗口），全部成功后拼接"""
+    parts = part_commands(plan, audio_filter=audio_filter)
+    lines = [
+        '#!/usr/bin/env bash',
+        '# 自动生成的ffmpeg剪辑脚本',
+        f'# 用法: JOBS=4 bash 脚本 [输出文件，默认 {output}]',
+        'set -u',
+        f'OUTPUT=${{1:-{shlex.quote(output)}}}',
+        'JOBS=${JOBS:-$(getconf _NPROCESSORS_ONLN 2>/dev/null || echo 2)}',
+        'WORK=$(mktemp -d "${TMPDIR:-/tmp}/vedit.XXXXXX") || exit 1',
+        'running=0',
+        'failed=0',
+        "trap 'rm -rf \"$WORK\"' EXIT",
+        "trap 'kill $(jobs -p) 2>/dev/null; exit 130' INT TERM",
+        '',
+        '# 等待任意一个后台任务结束',
+        'wait_one() {',
+        '    wait -n || failed=1',
+        '    running=$((running - 1))',
+        '}',
+        '',
+        'wait_all() {',
+        '    while [ "$running" -gt 0 ]; do',
+        '        wait_one',
+        '    done',
+        '}',
+        '',
+        '# 在后台执行，达到并发数时先等待任意一个任务完成',
+        'spawn() {',
+        '    if [ "$running" -ge "$JOBS" ]; then',
+        '        wait_one',
+        '    fi',
+        '    "$@" &',
+        '    running=$((running + 1))',
+        '}',
+        '',
+    ]
+    for index, (name, command, list_file) in enumerate(parts):
+        lines.append(f'part_{index}() {{')
+        if list_file is not None:
+            lines.append(f'    {_printf_list(list_file, _sh_quote)}')
+        lines.append(f'    {_join(command, _sh_quote)}')
+        lines.append('}')
+    lines.append('')
+    lines += [f'spawn part_{index}' for index in range(len(parts))]
+    lines += [
+        'wait_all',
+        'if [ "$failed" -ne 0 ]; then',
+        '    echo "片段截取失败" >&2',
+        '    exit 1',
+        'fi',
+        '',
+        '# 合并所有片段',
+        f'printf "file \'%s\'\\n" {" ".join(part[0] for part in parts)} > "$WORK"/{LIST_NAME}',
+        f'if ! {_join(concat_command(), _sh_quote)}; then',
+        '    rm -f "$OUTPUT"',
+        '    echo "合并失败" >&2',
+        '    exit 1',
+        'fi',
+        'echo "已导出 $OUTPUT"',
+    ]
+    return '\n'.join(lines) + '\n'
+
+
+def makefile(plan, output=DEFAULT_OUTPUT, audio_filter=None):
+    """Makefile：每个任务一个目标，最终输出依赖全部任务
+
+    用 make -j 并行；OUTPUT 与 WORK 可以在命令行中覆盖（不能包含空格）。
+    """
+    parts = part_commands(plan, audio_filter=audio_filter)
+    names = [part[0] for part in parts]
+    lines = [
+        '# 自动生成的ffmpeg剪辑脚本',
+        f'# 用法: make -j4 [OUTPUT={output}]',
+        f'OUTPUT ?= {output}',
+        'WORK ?= $(OUTPUT).parts',
+        'PARTS = ' + ' '.join(f'$(WORK)/{name}' for name in names),
+        '',
+        '.PHONY: all clean',
+        '.DELETE_ON_ERROR:',
+        '# 中间文件在合并后删除，不会因为缺失而重新生成',
+        '.INTERMEDIATE: $(PARTS)',
+        '',
+        'all: $(OUTPUT)',
+        '',
+        '$(WORK):',
+        '\tmkdir -p "$(WORK)"',
+        '',
+    ]
+    for name, command, list_file in parts:
+        lines.append(f'$(WORK)/{name}: | $(WORK)')
+        if list_file is not None:
+            lines.append(f'\t{_printf_list(list_file, _make_quote)}')
+        lines.append(f'\t{_join(command, _make_quote)}')
+        lines.append('')
+    lines += [
+        '$(OUTPUT): $(PARTS)',
+        f'\tprintf "file \'%s\'\\n" {" ".join(names)} > "$(WORK)"/{LIST_NAME}',
+        f'\t{_join(concat_command(), _make_quote)}',
+        '\trm -rf "$(WORK)"',
+        '',
+        'clean:',
+        '\trm -rf "$(WORK)"',
+    ]
+    return '\n'.join(lines) + '\n'
+
+
+def batch_script(plan, output=DEFAULT_OUTPUT, audio_filter=None):
+    """Windows 批处理：逐个截取后拼接"""
+    parts = part_commands(plan, audio_filter=audio_filter)
+    lines = [
+        '@echo off',
+        'rem 自动生成的ffmpeg剪辑脚本',
+        f'rem 用法: 脚本 [输出文件，默认 {output}]',
+        'setlocal',
+        'set "OUTPUT=%~1"',
+        f'if "%OUTPUT%"=="" set "OUTPUT={output.replace("%", "%%")}"',
+        'set "WORK=%TEMP%\\vedit_%RANDOM%%RANDOM%"',
+        'mkdir "%WORK%" || exit /b 1',
+        '',
+    ]
+    for index, (name, command, list_file) in enumerate(parts):
+        lines.append(f'rem 处理片段 {index + 1}')
+        if list_file is not None:
+            list_name, list_lines = list_file
+            lines.append('(')
+            lines += [f'echo {_bat_echo(line)}' for line in list_lines]
+            lines.append(f') > "%WORK%\\{list_name}"')
+        lines.append(f'{_join(command, _bat_quote)} || goto failed')
+    lines.append('')
+    lines.append('rem 合并所有片段')
+    lines.append('(')
+    lines += [f"echo file '{part[0]}'" for part in parts]
+    lines.append(f') > "%WORK%\\{LIST_NAME}"')
+    lines += [
+        f'{_join(concat_command(), _bat_quote)} || goto failed',
+        'rmdir /s /q "%WORK%"',
+        'echo 已导出 %OUTPUT%',
+        'exit /b 0',
+        '',
+        ':failed',
+        'rmdir /s /q "%WORK%"',
+        'if exist "%OUTPUT%" del "%OUTPUT%"',
+        'echo 导出失败',
+        'exit /b 1',
+    ]
+    return '\r\n'.join(lines) + '\r\n'
+
+
+WRITERS = {'sh': shell_script, 'make': makefile, 'bat': batch_script}
+
+
+def write_script(plan, path, fmt=None, output=DEFAULT_OUTPUT, audio_filter=None):
+    """按格式生成脚本并写入文件，返回使用的格式
+
+    计划中没有片段时抛出 ValueError，不会写出文件。
+    """
+    fmt = fmt or script_format(path)
+    text = WRITERS[fmt](plan, output, audio_filter)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write(text)
+    if fmt == 'sh':
+        os.chmod(path, os.stat(path).st_mode | 0o111)
+    return fmt
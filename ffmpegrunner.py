@@ -0,0 +1,204 @@
+"""异步执行 ffmpeg
+
+通过 QProcess 运行 ffmpeg，不阻塞界面。每个进程加上 -progress pipe:1，
+从 out_time 与 speed 计算全部任务的整体进度和剩余时间；同时运行的进程数
+受并发上限与全局调度器（governor）的批量优先级预算限制，交互与后台工作
+需要CPU时导出进程会被暂停；取消时结束所有子进程并删除未完成的输出。
+
+任务按阶段执行：同一阶段内的任务并行，前一阶段全部成功后才开始下一阶段
+（例如先并行渲染各部分，再拼接）。
+"""
+from PyQt5.QtCore import QObject, QProcess, Qt, pyqtSignal
+import os
+import shutil
+import time
+import governor
+
+
+def parse_progress(line):
+    """解析 ffmpeg -progress 输出的一行，返回 (键, 值)"""
+    key, _, value = line.strip().partition('=')
+    return key, value
+
+
+def with_progress(command):
+    """在 ffmpeg 命令中加入进度输出参数"""
+    return [command[0], '-progress', 'pipe:1', '-nostats'] + list(command[1:])
+
+
+class FfmpegTask:
+    """一个 ffmpeg 进程"""
+    def __init__(self, command, duration=0.0, output=None, slots=1):
+        self.command = with_progress(command)
+        self.duration = float(duration)  # 输出时长（秒），用于计算进度
+        self.output = output             # 取消或失败时删除
+        self.slots = slots               # 进程使用的线程数（向调度器申请的CPU槽位）
+        self.lease = None
+        self.done_time = 0.0             # 已完成的输出时长（秒）
+        self.speed = 0.0                 # 相对实时的处理速度
+        self.process = None
+        self.buffer = b''
+        self.error = b''
+
+
+class FfmpegRunner(QObject):
+    """按阶段并发执行 ffmpeg 任务"""
+    progress = pyqtSignal(float, float)  # 整体进度(0-100), 预计剩余时间（秒，未知时为-1）
+    finished = pyqtSignal()
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+    def __init__(self, max_jobs=None, parent=None):
+        super().__init__(parent)
+        self.max_jobs = max_jobs or os.cpu_count() or 1
+        self.stages = []
+        self.pending = []
+        self.running = []
+        self.tasks = []
+        self.output_path = None
+        self.work_dir = None
+        self.started = 0.0
+        self.active = False
+        # 其他工作释放资源后重试启动等待中的任务
+        governor.instance().changed.connect(self._resources_changed, Qt.QueuedConnection)
+
+    def start(self, stages, output_path=None, work_dir=None):
+        """开始执行
+
+        stages: 任务列表的列表；output_path: 最终输出，取消或失败时删除；
+        work_dir: 临时目录，结束后删除。
+        """
+        self.stages = [list(stage) for stage in stages if stage]
+        self.tasks = [task for stage in self.stages for task in stage]
+        self.output_path = output_path
+        self.work_dir = work_dir
+        self.started = time.monotonic()
+        self.active = True
+        self._next_stage()
+
+    def total_duration(self):
+        return sum(task.duration for task in self.tasks)
+
+    def _next_stage(self):
+        if not self.stages:
+            self._finish()
+            self.finished.emit()
+            return
+        self.pending = self.stages.pop(0)
+        self._fill()
+
+    def _resources_changed(self):
+        if self.active and self.pending:
+            self._fill()
+
+    def _fill(self):
+        """在并发上限与调度器预算内启动等待中的任务"""
+        while self.pending and len(self.running) < self.max_jobs:
+            task = self.pending[0]
+            task.lease = governor.instance().try_acquire(
+                governor.BULK, task.slots, governor.FFMPEG_MEMORY_MB, name="导出")
+            if task.lease is None:
+                break
+            self.pending.pop(0)
+            process = QProcess(self)
+            process.readyReadStandardOutput.connect(lambda task=task: self._read(task))
+            process.readyReadStandardError.connect(
+                lambda task=task: self._read_error(task))
+            process.finished.connect(
+                lambda code, status, task=task: self._task_finished(task, code, status))
+            process.errorOccurred.connect(lambda error, task=task: self._start_failed(task, error))
+            process.started.connect(lambda task=task: task.lease.attach(task.process))
+            task.process = process
+            self.running.append(task)
+            process.start(task.command[0], task.command[1:])
+
+    def _read(self, task):
+        task.buffer += bytes(task.process.readAllStandardOutput())
+        *lines, task.buffer = task.buffer.split(b'\n')
+        for line in lines:
+            key, value = parse_progress(line.decode('utf-8', 'replace'))
+            if key == 'out_time_us' and value.lstrip('-').isdigit():
+                task.done_time = max(0.0, int(value) / 1e6)
+            elif key == 'speed' and value.endswith('x'):
+                try:
+                    task.speed = float(value[:-1])
+                except ValueError:
+                    pass
+            elif key == 'progress':
+                self._report()
+
+    def _read_error(self, task):
+        # 只保留最后一部分错误输出
+        task.error = (task.error + bytes(task.process.readAllStandardError()))[-4000:]
+
+    def _report(self):
+        """计算整体进度与剩余时间"""
+        total = self.total_duration()
+        if total <= 0:
+            return
+        done = sum(min(task.done_time, task.duration) for task in self.tasks)
+        percent = min(99.0, done / total * 100)
+        speed = sum(task.speed for task in self.running)
+        if speed > 0:
+            eta = (total - done) / speed
+        elif done > 0:
+            eta = (total - done) * (time.monotonic() - self.started) / done
+        else:
+            eta = -1.0
+        self.progress.emit(percent, eta)
+
+    def _start_failed(self, task, error):
+        """进程无法启动时不会发出 finished 信号，按失败处理"""
+        if error == QProcess.FailedToStart:
+            task.error = f"无法启动 {task.command[0]}".encode('utf-8')
+            self._task_finished(task, -1, QProcess.CrashExit)
+
+    def _release(self, task):
+        if task.lease is not None:
+            task.lease.detach(task.process)
+            task.lease.release()
+            task.lease = None
+
+    def _task_finished(self, task, code, status):
+        if task not in self.running:
+            return
+        self.running.remove(task)
+        self._release(task)
+        if code != 0 or status != QProcess.NormalExit:
+            message = task.error.decode('utf-8', 'replace').strip() or f"ffmpeg返回码 {code}"
+            self._abort()
+            self.failed.emit(message)
+            return
+        task.done_time = task.duration
+        self._report()
+        if self.pending:
+            self._fill()
+        elif not self.running:
+            self._next_stage()
+
+    def cancel(self):
+        """取消：结束所有子进程并删除未完成的输出"""
+        if not self.active:
+            return
+        self._abort()
+        self.cancelled.emit()
+
+    def _abort(self):
+        self.pending = []
+        self.stages = []
+        running, self.running = self.running, []
+        for task in running:
+            task.process.kill()
+            task.process.waitForFinished(3000)
+            self._release(task)
+        outputs = [task.output for task in self.tasks] + [self.output_path]
+        for path in outputs:
+            if path and os.path.exists(path):
+                os.remove(path)
+        self._finish()
+
+    def _finish(self):
+        self.active = False
+        if self.work_dir:
+            shutil.rmtree(self.work_dir, ignore_errors=True)
+            self.work_dir = None
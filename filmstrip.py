@@ -0,0 +1,200 @@
+"""时间线胶片条
+
+每个素材只解码一遍：ffmpeg 以低帧率（默认每秒一帧）输出缩小的画面，
+拼成一张图集（JPEG）保存在磁盘缓存中，另存一个记录取帧间隔与帧数的 JSON。
+时间线在任何缩放级别下都从图集中取出对应时间的帧铺满片段宽度，不再调用解码器。
+有代理素材时从代理解码。
+"""
+from PyQt5.QtCore import QObject, QRect, pyqtSignal
+from PyQt5.QtGui import QImage
+import hashlib
+import json
+import os
+import queue
+import subprocess
+import threading
+
+import numpy as np
+import lazyload
+import governor
+import scenedetect
+from proxycache import VIDEO_FORMATS
+
+FILMSTRIP_DIR = 'filmstrip_cache'
+TILE_WIDTH = 64       # 每帧宽度（像素）
+TILE_HEIGHT = 36      # 每帧高度（像素）
+INTERVAL = 1.0        # 最短取帧间隔（秒）
+MAX_TILES = 3600      # 每个素材最多的帧数，长素材按此加大取帧间隔
+COLUMNS = 32          # 图集每行的帧数
+JPEG_QUALITY = 85
+
+
+class Filmstrip:
+    """一个素材的胶片条"""
+    def __init__(self, sheet, interval, count, columns=COLUMNS,
+                 tile_width=TILE_WIDTH, tile_height=TILE_HEIGHT):
+        self.sheet = sheet          # QImage 图集
+        self.interval = interval    # 取帧间隔（秒）
+        self.count = count          # 帧数
+        self.columns = columns
+        self.tile_width = tile_width
+        self.tile_height = tile_height
+
+    def tile_at(self, time):
+        """时间对应的帧序号"""
+        index = int(time / self.interval + 0.5)
+        return min(max(index, 0), self.count - 1)
+
+    def tile_rect(self, index):
+        """帧在图集中的区域"""
+        row, column = divmod(index, self.columns)
+        return QRect(column * self.tile_width, row * self.tile_height,
+                     self.tile_width, self.tile_height)
+
+
+class FilmstripCache(QObject):
+    """后台生成并缓存各素材的胶片条"""
+    ready = pyqtSignal(str)          # 源文件
+    failed = pyqtSignal(str, str)    # 源文件, 错误信息
+
+    def __init__(self, cache_dir=FILMSTRIP_DIR, proxy_cache=None, parent=None):
+        super().__init__(parent)
+        self.cache_dir = cache_dir
+        self.proxy_cache = proxy_cache
+        self._strips = {}  # 源文件 -> Filmstrip
+        self._jobs = queue.Queue()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._process = None
+        self._worker = None
+
+    def strip_path(self, file_path):
+        """缓存文件路径（不含扩展名）：由源文件路径、大小、修改时间和帧尺寸决定"""
+        stat = os.stat(file_path)
+        key = (f"{os.path.abspath(file_path)}|{stat.st_size}|{stat.st_mtime_ns}|"
+               f"{TILE_WIDTH}x{TILE_HEIGHT}|{INTERVAL}|{MAX_TILES}")
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.cache_dir, digest)
+
+    def get(self, file_path):
+        """返回已载入的胶片条，没有时返回None（需要先 request）"""
+        with self._lock:
+            return self._strips.get(file_path)
+
+    def request(self, file_path):
+        """请求载入或生成胶片条（已载入、已在队列中或不是视频时忽略）"""
+        if os.path.splitext(file_path)[1].lower().lstrip('.') not in VIDEO_FORMATS:
+            return
+        with self._lock:
+            if file_path in self._strips or file_path in self._pending:
+                return
+            self._pending.add(file_path)
+        self._jobs.put(file_path)
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, daemon=True)
+            self._worker.start()
+
+    def cancel(self):
+        """清空队列并终止正在进行的解码"""
+        with self._lock:
+            self._pending.clear()
+        while not self._jobs.empty():
+            try:
+                self._jobs.get_nowait()
+            except queue.Empty:
+                break
+        if self._process is not None:
+            self._process.kill()
+
+    def _run(self):
+        """后台线程：依次载入或生成队列中的胶片条"""
+        while True:
+            try:
+                file_path = self._jobs.get(timeout=1)
+            except queue.Empty:
+                return
+            with self._lock:
+                if file_path not in self._pending:
+                    continue
+            try:
+                strip = self._load(file_path)
+                if strip is None:
+                    self._build(file_path)
+                    strip = self._load(file_path)
+                with self._lock:
+                    self._strips[file_path] = strip
+                self.ready.emit(file_path)
+            except Exception as e:
+                with self._lock:
+                    cancelled = file_path not in self._pending
+                if not cancelled:
+                    self.failed.emit(file_path, str(e))
+            finally:
+                with self._lock:
+                    self._pending.discard(file_path)
+
+    def _load(self, file_path):
+        """从磁盘缓存载入，没有时返回None"""
+        base = self.strip_path(file_path)
+        if not os.path.exists(base + '.json'):
+            return None
+        with open(base + '.json', encoding='utf-8') as f:
+            meta = json.load(f)
+        sheet = QImage(base + '.jpg')
+        if sheet.isNull():
+            return None
+        return Filmstrip(sheet, meta['interval'], meta['count'], meta['columns'],
+                         meta['tile_width'], meta['tile_height'])
+
+    def _build(self, file_path):
+        """解码一遍生成图集"""
+        source = self.proxy_cache.resolve(file_path) if self.proxy_cache is not None else file_path
+        duration = scenedetect.probe_duration(source)
+        interval = max(INTERVAL, duration / MAX_TILES)
+        command = [
+            'ffmpeg', '-v', 'error', '-nostdin', '-i', source, '-an', '-sn', '-dn',
+            '-vf', (f'fps=1/{interval:.6f},'
+                    f'scale={TILE_WIDTH}:{TILE_HEIGHT}:force_original_aspect_ratio=decrease,'
+                    f'pad={TILE_WIDTH}:{TILE_HEIGHT}:(ow-iw)/2:(oh-ih)/2'),
+            '-f', 'rawvideo', '-pix_fmt', 'bgr24', 'pipe:1',
+        ]
+        # 胶片条提前为整个素材生成，属于后台工作，预览时会被暂停
+        with governor.instance().acquire(governor.BACKGROUND,
+                                         name=f"胶片条 {os.path.basename(file_path)}") as lease:
+            self._process = subprocess.Popen(command, stdout=subprocess.PIPE,
+                                             stderr=subprocess.PIPE)
+            lease.attach(self._process)
+            data, error = self._process.communicate()
+            returncode = self._process.returncode
+            lease.detach(self._process)
+            self._process = None
+        if returncode != 0:
+            raise RuntimeError(error.decode('utf-8', 'replace').strip() or f"ffmpeg返回码 {returncode}")
+        tile_size = TILE_WIDTH * TILE_HEIGHT * 3
+        count = len(data) // tile_size
+        if count == 0:
+            raise RuntimeError("没有可用的视频帧")
+
+        # 按行排列成图集，最后一行不足时补黑
+        rows = -(-count // COLUMNS)
+        tiles = np.zeros((rows * COLUMNS, TILE_HEIGHT, TILE_WIDTH, 3), dtype=np.uint8)
+        tiles[:count] = np.frombuffer(data[:count * tile_size], dtype=np.uint8).reshape(
+            count, TILE_HEIGHT, TILE_WIDTH, 3)
+        sheet = tiles.reshape(rows, COLUMNS, TILE_HEIGHT, TILE_WIDTH, 3).transpose(
+            0, 2, 1, 3, 4).reshape(rows * TILE_HEIGHT, COLUMNS * TILE_WIDTH, 3)
+
+        # 先写图集再写 JSON，JSON 存在即表示缓存完整
+        os.makedirs(self.cache_dir, exist_ok=True)
+        base = self.strip_path(file_path)
+        cv2 = lazyload.cv2()
+        ok, encoded = cv2.imencode('.jpg', sheet, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+        if not ok:
+            raise RuntimeError("图集编码失败")
+        with open(base + '.partial.jpg', 'wb') as f:
+            f.write(encoded.tobytes())
+        os.replace(base + '.partial.jpg', base + '.jpg')
+        meta = {'interval': interval, 'count': count, 'columns': COLUMNS,
+                'tile_width': TILE_WIDTH, 'tile_height': TILE_HEIGHT}
+        with open(base + '.partial.json', 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(base + '.partial.json', base + '.json')
@@ -0,0 +1,365 @@
+"""全局资源调度
+
+缩略图、探测、分析、代理、频谱图、胶片条和导出都要解码，过去各自启动进程、
+互不相让。现在所有解码工作先向调度器申请租约（Lease），再开始工作：
+
+  - 预算：CPU 槽位数（默认等于CPU核数）与内存（MB，默认物理内存的一半），
+    可用环境变量 VEDIT_CPU_SLOTS、VEDIT_MEMORY_MB 或 configure() 修改；
+  - 优先级：交互（缩略图、探测、预览、频谱图、界面上的分析）> 后台（分析、代理、镜头检测、胶片条）
+    > 批量（导出）。有高优先级的请求在等待时，低优先级的请求不会被批准；
+  - 降速：租约上登记的子进程按优先级降低系统调度优先级；
+  - 抢占：高优先级请求因CPU不足而等待时，暂停低优先级租约的子进程
+    （POSIX 上用 SIGSTOP，Windows 上用 NtSuspendProcess），腾出的槽位交给
+    高优先级请求，资源空闲后再恢复。暂停不释放内存，只有CPU槽位可以抢占；
+    没有登记子进程的租约（进程内的计算）不会被抢占，它们本身都很短。
+
+超过预算的单个请求按预算计算，保证总能单独运行。同一线程不应嵌套申请租约。
+界面线程不应长时间阻塞等待租约：只占一个槽位的探测可以直接等待（交互优先级可以抢占），
+需要内存的工作用 try_acquire，或带超时地 acquire 并在等待间隙处理界面事件。
+"""
+from PyQt5.QtCore import QObject, pyqtSignal
+import itertools
+import os
+import signal
+import subprocess
+import sys
+import threading
+
+INTERACTIVE = 0   # 缩略图、探测、预览、频谱图
+BACKGROUND = 1    # 音频分析、代理、镜头检测、胶片条
+BULK = 2          # 导出
+PRIORITY_NAMES = {INTERACTIVE: "交互", BACKGROUND: "后台", BULK: "批量"}
+
+# 各优先级子进程的 nice 值（POSIX）与优先级类（Windows）
+NICE = {INTERACTIVE: 0, BACKGROUND: 5, BULK: 10}
+_WINDOWS_CLASS = {INTERACTIVE: 0x20, BACKGROUND: 0x4000, BULK: 0x40}  # 普通 / 低于普通 / 空闲
+FFMPEG_MEMORY_MB = 200  # 一个 ffmpeg 转码进程的典型内存占用（MB）
+
+
+def physical_memory_mb():
+    """物理内存（MB），无法获取时返回None"""
+    try:
+        if sys.platform == 'win32':
+            import ctypes
+
+            class MemoryStatus(ctypes.Structure):
+                _fields_ = [('length', ctypes.c_ulong), ('load', ctypes.c_ulong),
+                            ('total', ctypes.c_ulonglong), ('available', ctypes.c_ulonglong),
+                            ('total_page', ctypes.c_ulonglong), ('available_page', ctypes.c_ulonglong),
+                            ('total_virtual', ctypes.c_ulonglong),
+                            ('available_virtual', ctypes.c_ulonglong),
+                            ('available_extended', ctypes.c_ulonglong)]
+            status = MemoryStatus()
+            status.length = ctypes.sizeof(MemoryStatus)
+            ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status))
+            return status.total // (1 << 20)
+        return os.sysconf('SC_PHYS_PAGES') * os.sysconf('SC_PAGE_SIZE') // (1 << 20)
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def default_cpu_slots():
+    return int(os.environ.get('VEDIT_CPU_SLOTS') or os.cpu_count() or 1)
+
+
+def default_memory_mb():
+    if os.environ.get('VEDIT_MEMORY_MB'):
+        return int(os.environ['VEDIT_MEMORY_MB'])
+    total = physical_memory_mb()
+    return total // 2 if total else 4096
+
+
+# ---- 子进程的优先级与暂停 ----
+
+def _windows_call(pid, access, action):
+    import ctypes
+    handle = ctypes.windll.kernel32.OpenProcess(access, False, pid)
+    if not handle:
+        return
+    try:
+        action(ctypes, handle)
+    finally:
+        ctypes.windll.kernel32.CloseHandle(handle)
+
+
+def set_process_priority(pid, priority):
+    """按优先级降低子进程的系统调度优先级（失败时忽略）"""
+    try:
+        if sys.platform == 'win32':
+            _windows_call(pid, 0x0200, lambda ctypes, handle: ctypes.windll.kernel32.SetPriorityClass(
+                handle, _WINDOWS_CLASS[priority]))
+        elif NICE[priority]:
+            os.setpriority(os.PRIO_PROCESS, pid, NICE[priority])
+    except (AttributeError, OSError):
+        pass
+
+
+def suspend_process(pid):
+    try:
+        if sys.platform == 'win32':
+            _windows_call(pid, 0x0800, lambda ctypes, handle: ctypes.windll.ntdll.NtSuspendProcess(handle))
+        else:
+            os.kill(pid, signal.SIGSTOP)
+    except (AttributeError, OSError):
+        pass
+
+
+def resume_process(pid):
+    try:
+        if sys.platform == 'win32':
+            _windows_call(pid, 0x0800, lambda ctypes, handle: ctypes.windll.ntdll.NtResumeProcess(handle))
+        else:
+            os.kill(pid, signal.SIGCONT)
+    except (AttributeError, OSError):
+        pass
+
+
+def _pid(process):
+    """subprocess.Popen 或 QProcess 的进程号"""
+    if hasattr(process, 'processId'):
+        return int(process.processId())
+    return process.pid
+
+
+class Lease:
+    """一次资源租约，可以作为上下文管理器使用"""
+    def __init__(self, governor, priority, slots, memory_mb, name):
+        self.governor = governor
+        self.priority = priority
+        self.slots = slots
+        self.memory_mb = memory_mb
+        self.name = name
+        self.pids = []
+        self.suspended = False
+        self.released = False
+
+    def attach(self, process):
+        """登记租约下的子进程：按优先级降速，之后可以被抢占"""
+        pid = _pid(process)
+        if not pid:
+            return
+        set_process_priority(pid, self.priority)
+        self.governor._attach(self, pid)
+
+    def detach(self, process):
+        """子进程结束后取消登记"""
+        self.governor._detach(self, _pid(process))
+
+    def release(self):
+        self.governor._release(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class _Request:
+    __slots__ = ('priority', 'order', 'slots', 'memory_mb')
+
+    def __init__(self, priority, order, slots, memory_mb):
+        self.priority = priority
+        self.order = order
+        self.slots = slots
+        self.memory_mb = memory_mb
+
+
+class Governor(QObject):
+    """CPU槽位与内存预算内按优先级批准租约"""
+    changed = pyqtSignal()  # 有资源释放（可能从其他线程发出）
+
+    def __init__(self, cpu_slots=None, memory_mb=None, preempt=True, parent=None):
+        super().__init__(parent)
+        self.cpu_slots = cpu_slots or default_cpu_slots()
+        self.memory_mb = memory_mb or default_memory_mb()
+        self.preempt = preempt
+        self._condition = threading.Condition()
+        self._leases = []
+        self._waiting = []
+        self._counter = itertools.count()
+
+    def configure(self, cpu_slots=None, memory_mb=None, preempt=None):
+        """修改预算（立即对等待中的请求生效）"""
+        with self._condition:
+            if cpu_slots:
+                self.cpu_slots = int(cpu_slots)
+            if memory_mb:
+                self.memory_mb = int(memory_mb)
+            if preempt is not None:
+                self.preempt = preempt
+            self._schedule()
+        self.changed.emit()
+
+    def _clamp(self, slots, memory_mb):
+        return max(1, min(int(slots), self.cpu_slots)), max(0, min(int(memory_mb), self.memory_mb))
+
+    def _used(self):
+        slots = sum(lease.slots for lease in self._leases if not lease.suspended)
+        memory = sum(lease.memory_mb for lease in self._leases)
+        return slots, memory
+
+    def _fits(self, priority, slots, memory_mb):
+        """资源是否足够；暂停的租约腾出的槽位只能给优先级比它高的请求使用"""
+        used_slots = sum(lease.slots for lease in self._leases
+                         if not lease.suspended or lease.priority <= priority)
+        used_memory = sum(lease.memory_mb for lease in self._leases)
+        return used_slots + slots <= self.cpu_slots and used_memory + memory_mb <= self.memory_mb
+
+    def _ahead(self, request):
+        """是否有排在 request 前面的等待请求"""
+        return any((other.priority, other.order) < (request.priority, request.order)
+                   for other in self._waiting if other is not request)
+
+    def acquire(self, priority, slots=1, memory_mb=0, name='', timeout=None):
+        """申请租约，资源不足时阻塞；超时返回None"""
+        lease = None
+        with self._condition:
+            slots, memory_mb = self._clamp(slots, memory_mb)
+            request = _Request(priority, next(self._counter), slots, memory_mb)
+            self._waiting.append(request)
+            try:
+                self._schedule()
+                granted = self._condition.wait_for(
+                    lambda: not self._ahead(request) and self._fits(priority, slots, memory_mb), timeout)
+            finally:
+                self._waiting.remove(request)
+            if granted:
+                lease = Lease(self, priority, slots, memory_mb, name)
+                self._leases.append(lease)
+            self._schedule()
+        if lease is None:
+            # 超时退出后，排在后面的请求可能可以批准了
+            self.changed.emit()
+        return lease
+
+    def try_acquire(self, priority, slots=1, memory_mb=0, name=''):
+        """不阻塞地申请租约，不能立即批准时返回None（之后可在 changed 信号时重试）
+
+        与 acquire 一样可以抢占低优先级租约，界面线程上的交互工作应使用这个方法。
+        """
+        with self._condition:
+            slots, memory_mb = self._clamp(slots, memory_mb)
+            request = _Request(priority, next(self._counter), slots, memory_mb)
+            self._waiting.append(request)
+            try:
+                self._schedule()
+                granted = not self._ahead(request) and self._fits(priority, slots, memory_mb)
+            finally:
+                self._waiting.remove(request)
+            lease = None
+            if granted:
+                lease = Lease(self, priority, slots, memory_mb, name)
+                self._leases.append(lease)
+            # 未批准时恢复刚才为它暂停的租约
+            self._schedule()
+            return lease
+
+    def _attach(self, lease, pid):
+        with self._condition:
+            if lease.released:
+                return
+            lease.pids.append(pid)
+            if lease.suspended:
+                suspend_process(pid)
+            self._schedule()
+
+    def _detach(self, lease, pid):
+        with self._condition:
+            if pid in lease.pids:
+                lease.pids.remove(pid)
+                if lease.suspended:
+                    resume_process(pid)
+
+    def _release(self, lease):
+        with self._condition:
+            if lease.released:
+                return
+            lease.released = True
+            if lease.suspended:
+                for pid in lease.pids:
+                    resume_process(pid)
+            self._leases.remove(lease)
+            self._schedule()
+        self.changed.emit()
+
+    def _schedule(self):
+        """抢占或恢复低优先级租约，并唤醒等待中的请求（调用时已持有锁）"""
+        head = min(self._waiting, key=lambda r: (r.priority, r.order), default=None)
+        if self.preempt and head is not None:
+            used_slots, _ = self._used()
+            shortfall = used_slots + head.slots - self.cpu_slots
+            # 暂停优先级最低、最晚批准的可抢占租约
+            victims = sorted((lease for lease in self._leases
+                              if lease.priority > head.priority and lease.pids
+                              and not lease.suspended),
+                             key=lambda lease: (-lease.priority, -self._leases.index(lease)))
+            for lease in victims:
+                if shortfall <= 0:
+                    break
+                lease.suspended = True
+                for pid in lease.pids:
+                    suspend_process(pid)
+                shortfall -= lease.slots
+        # 恢复不妨碍等待中的更高优先级请求的租约
+        for lease in sorted((lease for lease in self._leases if lease.suspended),
+                            key=lambda lease: (lease.priority, self._leases.index(lease))):
+            if head is not None and head.priority < lease.priority:
+                break
+            used_slots, _ = self._used()
+            if used_slots + lease.slots > self.cpu_slots:
+                break
+            lease.suspended = False
+            for pid in lease.pids:
+                resume_process(pid)
+        self._condition.notify_all()
+
+    def status(self):
+        """当前占用情况：{'slots': 已用槽位, 'memory_mb': 已用内存, 'leases': [...], 'waiting': 数量}"""
+        with self._condition:
+            used_slots, used_memory = self._used()
+            return {
+                'slots': used_slots,
+                'memory_mb': used_memory,
+                'leases': [(lease.name, PRIORITY_NAMES[lease.priority], lease.slots,
+                            lease.memory_mb, lease.suspended) for lease in self._leases],
+                'waiting': len(self._waiting),
+            }
+
+
+def run(command, lease, check=False, **kwargs):
+    """与 subprocess.run 相同，子进程登记在租约下（可以被降速和抢占）"""
+    if kwargs.pop('capture_output', False):
+        kwargs['stdout'] = kwargs['stderr'] = subprocess.PIPE
+    process = subprocess.Popen(command, **kwargs)
+    lease.attach(process)
+    try:
+        output, error = process.communicate()
+    except BaseException:
+        process.kill()
+        process.wait()
+        raise
+    finally:
+        lease.detach(process)
+    if check and process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, command, output, error)
+    return subprocess.CompletedProcess(command, process.returncode, output, error)
+
+
+def run_leased(command, priority, slots=1, memory_mb=0, name='', **kwargs):
+    """申请租约后执行命令（参数同 subprocess.run），结束后释放"""
+    with instance().acquire(priority, slots, memory_mb, name) as lease:
+        return run(command, lease, **kwargs)
+
+
+_instance = None
+_instance_lock = threading.Lock()
+
+
+def instance():
+    """进程内共用的调度器"""
+    global _instance
+    with _instance_lock:
+        if _instance is None:
+            _instance = Governor()
+        return _instance
@@ -0,0 +1,44 @@
+"""重量级依赖的延迟加载
+
+librosa（连带numba、scipy）、scipy.signal、scipy.fft、cv2、QtChart、mutagen 的导入耗时都在数百毫秒以上，
+程序启动时只导入Qt基础组件，这些模块在第一次真正用到时才加载。
+"""
+import os
+import sys
+
+# librosa的缓存目录，首次加载librosa时才创建
+LIBROSA_CACHE_DIR = 'tmp_cache'
+
+
+def librosa():
+    """返回librosa模块，首次调用时设置缓存目录并导入"""
+    if 'librosa' not in sys.modules:
+        # LIBROSA_CACHE_DIR 在librosa导入时读取，必须先设置
+        os.environ.setdefault('LIBROSA_CACHE_DIR', LIBROSA_CACHE_DIR)
+        os.makedirs(os.environ['LIBROSA_CACHE_DIR'], exist_ok=True)
+    import librosa as module
+    return module
+
+
+def cv2():
+    """返回cv2模块"""
+    import cv2 as module
+    return module
+
+
+def scipy_signal():
+    """返回scipy.signal模块"""
+    from scipy import signal as module
+    return module
+
+
+def scipy_fft():
+    """返回scipy.fft模块（支持float32变换，比numpy.fft快）"""
+    from scipy import fft as module
+    return module
+
+
+def qtchart():
+    """返回PyQt5.QtChart模块"""
+    from PyQt5 import QtChart as module
+    return module
@@ -0,0 +1,81 @@
+"""可合并的电平统计
+
+每个素材分析时生成一个固定分箱的分贝直方图（0.1 dB 一箱），
+多个素材的直方图直接相加即可得到全局分布，再从中求百分位数。
+每个直方图的内存固定，与音频长度和素材数量无关。
+"""
+import numpy as np
+
+DB_FLOOR = -120.0     # 直方图下限（dB），更低的值计入第一箱
+DB_CEIL = 20.0        # 直方图上限（dB），更高的值计入最后一箱
+BIN_WIDTH = 0.1       # 分箱宽度（dB）
+BIN_COUNT = int(round((DB_CEIL - DB_FLOOR) / BIN_WIDTH))
+
+
+class DbHistogram:
+    """固定分箱的分贝直方图"""
+    __slots__ = ('counts', 'total')
+
+    def __init__(self, counts=None):
+        self.counts = (np.zeros(BIN_COUNT, dtype=np.int64) if counts is None
+                       else np.asarray(counts, dtype=np.int64))
+        self.total = 0.0  # 分贝值之和，用于求均值
+
+    @classmethod
+    def from_values(cls, db_values):
+        histogram = cls()
+        histogram.add(db_values)
+        return histogram
+
+    def __len__(self):
+        return int(self.counts.sum())
+
+    def add(self, db_values):
+        """加入一批分贝值"""
+        db_values = np.asarray(db_values, dtype=np.float64).ravel()
+        db_values = db_values[np.isfinite(db_values)]
+        bins = np.clip(((db_values - DB_FLOOR) / BIN_WIDTH).astype(np.int64), 0, BIN_COUNT - 1)
+        self.counts += np.bincount(bins, minlength=BIN_COUNT)
+        self.total += float(db_values.sum())
+
+    def merge(self, other):
+        """把另一个直方图合并进来"""
+        self.counts += other.counts
+        self.total += other.total
+        return self
+
+    def __add__(self, other):
+        merged = DbHistogram(self.counts.copy())
+        merged.total = self.total
+        return merged.merge(other)
+
+    def __radd__(self, other):
+        # 支持 sum(直方图列表)
+        return self if other == 0 else self.__add__(other)
+
+    def mean(self):
+        count = len(self)
+        return self.total / count if count else 0.0
+
+    def quantile(self, q):
+        """求分位数（0-1），在箱内线性插值，误差不超过一个箱宽"""
+        q = np.atleast_1d(np.asarray(q, dtype=np.float64))
+        count = len(self)
+        if count == 0:
+            return np.full(len(q), np.nan)
+        cumulative = np.cumsum(self.counts)
+        target = q * count
+        index = np.clip(np.searchsorted(cumulative, target, side='left'), 0, BIN_COUNT - 1)
+        before = np.where(index > 0, cumulative[index - 1], 0)
+        inside = np.maximum(self.counts[index], 1)
+        fraction = np.clip((target - before) / inside, 0.0, 1.0)
+        return DB_FLOOR + (index + fraction) * BIN_WIDTH
+
+    def percentile(self, p):
+        """求百分位数（0-100），单个值时返回float"""
+        values = self.quantile(np.asarray(p, dtype=np.float64) / 100)
+        return float(values[0]) if np.ndim(p) == 0 else values
+
+    def suggest_range(self, low=1, high=99):
+        """建议的剪辑电平范围：全局低、高百分位数"""
+        return self.percentile(low), self.percentile(high)
@@ -0,0 +1,250 @@
+"""响度测量（ITU-R BS.1770 / EBU R128）
+
+分析解码时对各声道做一次 K 计权滤波，保存每 100 毫秒各声道均方功率之和
+（响度块），与 PCM 缓存放在一起，测量时不需要再滤波；没有保存的响度块时
+（如旧的缓存）才按 PCM 重新计算。
+剪辑后的响度直接从这些块计算：只取完全落在片段内的块，按片段顺序拼接，
+再组成 400 毫秒门限块（综合响度）与 3 秒短时块（响度范围 LRA）。
+真峰值只对片段内的采样点做 4 倍过采样，多声道素材逐声道测量后取最大值。
+
+导出时按测量值计算一个固定增益（与 loudnorm 的线性模式相同），
+重新编码时作为音频滤镜、直接导出音频时在 numpy 中乘上，不需要再次解码。
+"""
+import math
+import os
+
+import numpy as np
+import lazyload
+
+TARGET_LUFS = -16.0     # 目标综合响度（LUFS）
+TARGET_TP = -1.5        # 真峰值上限（dBTP）
+BLOCK = 0.1             # 响度块时长（秒）
+ABS_GATE = -70.0        # 绝对门限（LUFS）
+REL_GATE = -10.0        # 综合响度的相对门限（LU）
+LRA_REL_GATE = -20.0    # 响度范围的相对门限（LU）
+OVERSAMPLE = 4          # 真峰值过采样倍数
+CHUNK_BLOCKS = 3000     # 滤波时每次读取的响度块数（5分钟）
+
+
+def k_weighting(sr):
+    """K 计权滤波器（高频搁架 + 高通）的二阶节系数"""
+    # 搁架滤波器
+    f0, gain, q = 1681.974450955533, 3.999843853973347, 0.7071752369554196
+    k = math.tan(math.pi * f0 / sr)
+    vh = 10 ** (gain / 20)
+    vb = vh ** 0.4996667741545416
+    a0 = 1 + k / q + k * k
+    shelf = [(vh + vb * k / q + k * k) / a0, 2 * (k * k - vh) / a0, (vh - vb * k / q + k * k) / a0,
+             1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0]
+    # 高通滤波器
+    f0, q = 38.13547087602444, 0.5003270373238773
+    k = math.tan(math.pi * f0 / sr)
+    a0 = 1 + k / q + k * k
+    highpass = [1.0, -2.0, 1.0, 1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0]
+    return np.array([shelf, highpass])
+
+
+def _to_lufs(power):
+    return -0.691 + 10 * np.log10(np.maximum(power, 1e-20))
+
+
+class LoudnessBlocks:
+    """每 100 毫秒一个的 K 计权均方功率"""
+    def __init__(self, power, sr):
+        self.power = np.asarray(power, dtype=np.float64)
+        self.sr = sr
+
+    @property
+    def block_samples(self):
+        return int(round(self.sr * BLOCK))
+
+    def select(self, starts, ends):
+        """按顺序取出完全落在各片段内的响度块"""
+        first = np.ceil(np.asarray(starts) / BLOCK - 1e-6).astype(np.int64)
+        last = np.floor(np.asarray(ends) / BLOCK + 1e-6).astype(np.int64)
+        last = np.minimum(last, len(self.power))
+        pieces = [self.power[a:b] for a, b in zip(first.tolist(), last.tolist()) if b > a]
+        return np.concatenate(pieces) if pieces else np.zeros(0)
+
+
+class LoudnessMeter:
+    """逐块计算响度块（流式解码时边解码边计算），结果与 measure_blocks 相同"""
+    def __init__(self, sr, channels=1):
+        self.sr = sr
+        self.channels = channels
+        self.sos = k_weighting(sr)
+        self.block = int(round(sr * BLOCK))
+        self.states = [np.zeros((self.sos.shape[0], 2)) for _ in range(channels)]
+        self.pending = np.zeros((0, channels))  # 不足一个响度块的采样点
+        self.power = []
+
+    def feed(self, samples):
+        """送入 (采样点数, 声道数) 的采样点"""
+        signal = lazyload.scipy_signal()
+        samples = np.asarray(samples).reshape(-1, self.channels)
+        if len(self.pending):
+            samples = np.concatenate((self.pending, samples))
+        usable = len(samples) // self.block * self.block
+        self.pending = samples[usable:]
+        if usable == 0:
+            return
+        power = np.zeros(usable // self.block)
+        for c in range(self.channels):
+            filtered, self.states[c] = signal.sosfilt(
+                self.sos, np.asarray(samples[:usable, c], dtype=np.float64), zi=self.states[c])
+            filtered = filtered.reshape(-1, self.block)
+            power += np.einsum('ij,ij->i', filtered, filtered) / self.block
+        self.power.append(power)
+
+    def result(self):
+        """已送入的完整响度块（末尾不足一块的采样点不计）"""
+        return LoudnessBlocks(np.concatenate(self.power) if self.power else np.zeros(0), self.sr)
+
+
+def measure_blocks(y, sr):
+    """计算 PCM 的响度块
+
+    y 为单声道数组、PcmView，或 (声道数, 采样点数) 的多声道数组（各声道权重均为1）。
+    """
+    channels = y.shape[0] if len(y.shape) == 2 else 0
+    meter = LoudnessMeter(sr, max(channels, 1))
+    block = meter.block
+    count = y.shape[-1] // block
+    for b0 in range(0, count, CHUNK_BLOCKS):
+        b1 = min(b0 + CHUNK_BLOCKS, count)
+        if channels:
+            meter.feed(np.asarray(y[:, b0 * block:b1 * block]).T)
+        else:
+            meter.feed(np.asarray(y[b0 * block:b1 * block]))
+    return meter.result()
+
+
+def blocks_path(pcm):
+    """PCM 缓存对应的响度块文件"""
+    return os.path.splitext(pcm.path)[0] + '.loudness.npy'
+
+
+def save_blocks(pcm, blocks):
+    """把解码时按声道计算的响度块保存在 PCM 缓存旁边"""
+    path = blocks_path(pcm)
+    partial = path + '.partial.npy'
+    np.save(partial, blocks.power)
+    os.replace(partial, path)
+
+
+def source_blocks(pcm, mono=False):
+    """素材的响度块
+
+    mono 为 True 时按单声道 PCM 计算（单声道输出）；否则优先使用解码时
+    按声道计算并保存的结果。
+    """
+    if not mono and pcm.path and os.path.exists(blocks_path(pcm)):
+        return LoudnessBlocks(np.load(blocks_path(pcm)), pcm.sr)
+    return measure_blocks(pcm, pcm.sr)
+
+
+def _windows(power, length):
+    """连续 length 个响度块组成的滑动窗口（步长 100 毫秒）的均方功率"""
+    if len(power) < length:
+        return np.zeros(0)
+    cumulative = np.concatenate(([0.0], np.cumsum(power)))
+    return (cumulative[length:] - cumulative[:-length]) / length
+
+
+def integrated(power):
+    """综合响度（LUFS）与相对门限，返回 (响度, 门限)"""
+    blocks = _windows(power, 4)
+    blocks = blocks[_to_lufs(blocks) > ABS_GATE]
+    if len(blocks) == 0:
+        return -math.inf, ABS_GATE
+    threshold = float(_to_lufs(blocks.mean())) + REL_GATE
+    gated = blocks[_to_lufs(blocks) > threshold]
+    return float(_to_lufs(gated.mean())), threshold
+
+
+def loudness_range(power):
+    """响度范围 LRA（LU）：门限后短时响度的 10% 与 95% 分位数之差"""
+    short_term = _to_lufs(_windows(power, 30))
+    short_term = short_term[short_term > ABS_GATE]
+    if len(short_term) == 0:
+        return 0.0
+    threshold = float(_to_lufs(np.mean(10 ** ((short_term + 0.691) / 10)))) + LRA_REL_GATE
+    short_term = short_term[short_term > threshold]
+    if len(short_term) == 0:
+        return 0.0
+    low, high = np.percentile(short_term, [10, 95])
+    return float(high - low)
+
+
+def true_peak(samples, block=4410):
+    """真峰值（线性幅度），4 倍过采样
+
+    samples 为单声道数组或 (采样点数, 声道数) 的多声道数组，多声道时取各声道的最大值。
+    真峰值最多只比采样峰值高几 dB，只对采样峰值在最大值 6 dB 以内的块过采样。
+    """
+    samples = np.asarray(samples, dtype=np.float64)
+    if samples.ndim == 2:
+        return max((true_peak(samples[:, c], block) for c in range(samples.shape[1])),
+                   default=0.0)
+    n = len(samples)
+    if n == 0:
+        return 0.0
+    magnitude = np.abs(samples)
+    count = -(-n // block)
+    peaks = np.maximum.reduceat(magnitude, np.arange(count) * block)
+    peak = float(peaks.max())
+    resample_poly = lazyload.scipy_signal().resample_poly
+    margin = 64  # 块两侧多取的采样点，避免滤波器在边界处补零
+    for b in np.flatnonzero(peaks >= peak / 2).tolist():
+        lo, hi = max(0, b * block - margin), min(n, (b + 1) * block + margin)
+        peak = max(peak, float(np.abs(resample_poly(samples[lo:hi], OVERSAMPLE, 1)).max()))
+    return peak
+
+
+class Measurement:
+    """一组片段的响度测量结果"""
+    def __init__(self, integrated, lra, true_peak_db, threshold):
+        self.integrated = integrated      # 综合响度（LUFS）
+        self.lra = lra                    # 响度范围（LU）
+        self.true_peak = true_peak_db     # 真峰值（dBTP）
+        self.threshold = threshold        # 相对门限（LUFS）
+
+    def gain(self, target=TARGET_LUFS, true_peak_limit=TARGET_TP):
+        """达到目标响度所需的增益（dB），受真峰值上限限制"""
+        if not math.isfinite(self.integrated):
+            return 0.0
+        gain = target - self.integrated
+        return min(gain, true_peak_limit - self.true_peak)
+
+    def summary(self, target=TARGET_LUFS):
+        return (f"综合响度 {self.integrated:.1f} LUFS，响度范围 {self.lra:.1f} LU，"
+                f"真峰值 {self.true_peak:.1f} dBTP，增益 {self.gain(target):+.1f} dB")
+
+
+def measure_segments(segments, sources, mono=False):
+    """测量片段视图(SegmentView)中全部片段拼接后的响度
+
+    sources(文件) 返回 (LoudnessBlocks, PCM)，PCM 按采样点切片读取。
+    mono 为 False 时真峰值按各声道测量（PcmView.multichannel()），
+    为 True 时按混合后的单声道测量（单声道输出）。
+    """
+    records = segments.records
+    power = []
+    peak = 0.0
+    for file_id, start, end in zip(records['file_id'].tolist(), records['start'].tolist(),
+                                   records['end'].tolist()):
+        blocks, pcm = sources(segments.files[file_id])
+        power.append(blocks.select([start], [end]))
+        sr = blocks.sr
+        if not mono and getattr(pcm, 'channels', 1) > 1:
+            pcm = pcm.multichannel()
+        peak = max(peak, true_peak(pcm[int(round(start * sr)):int(round(end * sr))]))
+    power = np.concatenate(power) if power else np.zeros(0)
+    loudness, threshold = integrated(power)
+    return Measurement(loudness, loudness_range(power), 20 * math.log10(max(peak, 1e-10)),
+                       threshold)
+
+
+def volume_filter(gain_db):
+    """ffmpeg 增益滤镜"""
+    return f'volume={gain_db:.2f}dB'
@@ -0,0 +1,219 @@
+"""解码PCM的磁盘缓存
+
+每个素材解码后的PCM只写入一次，保存为 int16（或 float16）的 .npy 文件，
+之后通过内存映射读取。分析结果中只保存 PcmView 这样的轻量视图，
+按需切片时才转换为 float32，内存占用取决于正在处理的片段而不是音频总长度。
+
+解码时可以用 PcmWriter 逐块写入，不需要先把整段音频解码到内存中。
+
+多声道素材按 (采样点数, 声道数) 交错保存，不单独保存混合后的单声道：
+默认视图切片时按声道求平均（与 librosa.to_mono 相同），也可以取单个声道，
+或一次取出全部声道（分声道分析只需遍历一遍交错数据）。
+"""
+import hashlib
+import os
+
+import numpy as np
+
+PCM_DIR = 'pcm_cache'
+PCM_DTYPE = 'int16'  # 'int16' 或 'float16'
+INT16_SCALE = 32767.0
+ALL_CHANNELS = slice(None)
+
+
+class PcmView:
+    """内存映射PCM的只读视图，切片返回 float32 数组
+
+    channel 为 None 时返回混合后的单声道，为整数时只返回该声道，
+    为 ALL_CHANNELS 时返回 (采样点数, 声道数) 的全部声道。
+    """
+    __slots__ = ('data', 'sr', 'path', 'channel')
+
+    def __init__(self, data, sr, path=None, channel=None):
+        self.data = data
+        self.sr = sr
+        self.path = path
+        self.channel = channel
+
+    def __len__(self):
+        return len(self.data)
+
+    @property
+    def channels(self):
+        """素材的声道数"""
+        return self.data.shape[1] if self.data.ndim == 2 else 1
+
+    @property
+    def shape(self):
+        if self.channel is ALL_CHANNELS:
+            return (len(self.data), self.channels)
+        return (len(self.data),)
+
+    @property
+    def duration(self):
+        return len(self.data) / self.sr
+
+    def channel_view(self, index):
+        """单个声道的视图"""
+        if self.data.ndim == 1:
+            return PcmView(self.data, self.sr, self.path)
+        return PcmView(self.data, self.sr, self.path, int(index))
+
+    def multichannel(self):
+        """全部声道的视图，切片返回 (采样点数, 声道数)"""
+        data = self.data if self.data.ndim == 2 else self.data[:, None]
+        return PcmView(data, self.sr, self.path, ALL_CHANNELS)
+
+    def _convert(self, samples):
+        if samples.ndim == 2:
+            if self.channel is None:
+                # 混合为单声道：各声道求平均（矩阵乘法比沿最后一维求平均快）
+                weights = np.full(samples.shape[1], 1.0 / samples.shape[1], dtype=np.float32)
+                return self._scale(samples) @ weights
+            samples = samples[:, self.channel]
+        return self._scale(samples)
+
+    @staticmethod
+    def _scale(samples):
+        if samples.dtype == np.int16:
+            return samples.astype(np.float32) * np.float32(1.0 / INT16_SCALE)
+        return samples.astype(np.float32)
+
+    def __getitem__(self, key):
+        return self._convert(self.data[key])
+
+    def __array__(self, dtype=None, copy=None):
+        """整体转换为数组（会读入全部数据，只应在临时计算中使用）"""
+        samples = self._convert(self.data)
+        return samples if dtype is None else samples.astype(dtype, copy=False)
+
+
+def pcm_path(file_path, sr, dtype=PCM_DTYPE, cache_dir=PCM_DIR):
+    """缓存文件路径：由源文件路径、大小、修改时间、采样率和格式决定"""
+    stat = os.stat(file_path)
+    # 'channels' 区分保留各声道的缓存与旧的单声道缓存
+    key = (f"{os.path.abspath(file_path)}|{stat.st_size}|{stat.st_mtime_ns}|{sr}|{dtype}"
+           f"|channels")
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(cache_dir, f"{digest}.npy")
+
+
+def lookup(file_path, sr, dtype=PCM_DTYPE, cache_dir=PCM_DIR):
+    """返回已缓存的PCM视图，没有时返回None"""
+    try:
+        path = pcm_path(file_path, sr, dtype, cache_dir)
+    except OSError:
+        return None
+    if not os.path.exists(path):
+        return None
+    return PcmView(np.load(path, mmap_mode='r'), sr, path)
+
+
+def store(file_path, y, sr, dtype=PCM_DTYPE, cache_dir=PCM_DIR, block_size=1 << 20):
+    """把解码后的PCM写入缓存并返回内存映射视图
+
+    y 为单声道数组，或 (声道数, 采样点数) 的多声道数组（librosa 的格式），
+    多声道按采样点交错写入。先写入临时文件再改名，缓存目录中存在的文件都是完整的。
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    path = pcm_path(file_path, sr, dtype, cache_dir)
+    partial = path + '.partial.npy'
+    multichannel = len(y.shape) == 2 and y.shape[0] > 1
+    if len(y.shape) == 2 and not multichannel:
+        y = y[0]
+    length = y.shape[-1]
+    shape = (length, y.shape[0]) if multichannel else (length,)
+    out = np.lib.format.open_memmap(partial, mode='w+', dtype=np.dtype(dtype), shape=shape)
+    try:
+        for start in range(0, length, block_size):
+            if multichannel:
+                block = np.asarray(y[:, start:start + block_size], dtype=np.float32).T
+            else:
+                block = np.asarray(y[start:start + block_size], dtype=np.float32)
+            if out.dtype == np.int16:
+                block = np.round(np.clip(block, -1.0, 1.0) * INT16_SCALE)
+            out[start:start + len(block)] = block
+        out.flush()
+    finally:
+        del out
+    os.replace(partial, path)
+    return PcmView(np.load(path, mmap_mode='r'), sr, path)
+
+
+def _resize(path, shape, dtype):
+    """原地修改 .npy 文件头中的形状并调整文件大小
+
+    numpy 写文件头时为第一维的长度预留了位数，改变长度时文件头的大小不变。
+    """
+    with open(path, 'r+b') as f:
+        np.lib.format.read_magic(f)
+        np.lib.format.read_array_header_1_0(f)
+        offset = f.tell()
+        f.seek(0)
+        np.lib.format.write_array_header_1_0(
+            f, {'descr': np.lib.format.dtype_to_descr(np.dtype(dtype)),
+                'fortran_order': False, 'shape': shape})
+        if f.tell() != offset:
+            raise ValueError("PCM缓存文件头的大小改变")
+        f.truncate(offset + int(np.prod(shape)) * np.dtype(dtype).itemsize)
+
+
+class PcmWriter:
+    """流式写入PCM缓存
+
+    逐块追加 (采样点数, 声道数) 的交错数据（int16，或 [-1, 1] 的浮点数），直接写入
+    内存映射的临时文件。预估的长度不够时扩大文件，close() 时把长度改为实际写入的
+    采样点数，再改名为缓存文件。
+    """
+    def __init__(self, file_path, sr, channels, capacity, dtype=PCM_DTYPE, cache_dir=PCM_DIR):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.sr = sr
+        self.channels = channels
+        self.dtype = np.dtype(dtype)
+        self.path = pcm_path(file_path, sr, dtype, cache_dir)
+        self.partial = self.path + '.partial.npy'
+        self.length = 0
+        self.capacity = max(int(capacity), sr)
+        self.out = np.lib.format.open_memmap(self.partial, mode='w+', dtype=self.dtype,
+                                             shape=self._shape(self.capacity))
+
+    def _shape(self, length):
+        return (length, self.channels) if self.channels > 1 else (length,)
+
+    def _grow(self, capacity):
+        self.out.flush()
+        self.out = None  # 先关闭内存映射才能改变文件大小
+        _resize(self.partial, self._shape(capacity), self.dtype)
+        self.capacity = capacity
+        self.out = np.load(self.partial, mmap_mode='r+')
+
+    def write(self, block):
+        block = np.asarray(block)
+        count = len(block)
+        if self.length + count > self.capacity:
+            self._grow(max(self.capacity * 2, self.length + count))
+        if self.channels == 1:
+            block = block.reshape(-1)
+        if block.dtype != self.dtype:
+            if block.dtype == np.int16:
+                block = block / INT16_SCALE
+            elif self.dtype == np.int16:
+                block = np.round(np.clip(block, -1.0, 1.0) * INT16_SCALE)
+        self.out[self.length:self.length + count] = block
+        self.length += count
+
+    def close(self):
+        """完成写入，返回缓存的内存映射视图"""
+        self.out.flush()
+        self.out = None
+        _resize(self.partial, self._shape(self.length), self.dtype)
+        os.replace(self.partial, self.path)
+        return PcmView(np.load(self.path, mmap_mode='r'), self.sr, self.path)
+
+    def abort(self):
+        """放弃写入并删除临时文件"""
+        self.out = None
+        try:
+            os.remove(self.partial)
+        except OSError:
+            pass
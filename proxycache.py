@@ -0,0 +1,154 @@
+"""代理素材缓存
+
+导入的视频在后台转码为低分辨率、全帧内编码（或短GOP）的代理文件，
+缩略图、预览与拖动定位使用代理，最终导出仍然使用原始素材。
+代理文件先写入临时文件，完成后改名，因此缓存目录中存在的代理文件都是完整的。
+"""
+from PyQt5.QtCore import QObject, pyqtSignal
+import hashlib
+import os
+import queue
+import subprocess
+import threading
+
+from ffmpegrunner import parse_progress
+import governor
+
+PROXY_DIR = 'proxy_cache'
+PROXY_HEIGHT = 360   # 代理视频高度
+PROXY_GOP = 1        # 关键帧间隔，1表示全帧内编码
+VIDEO_FORMATS = ('mp4', 'avi', 'mkv', 'mpeg', 'mov')
+
+
+class ProxyCache(QObject):
+    """后台生成并管理代理素材"""
+    progress = pyqtSignal(str, int)  # 源文件, 进度百分比
+    ready = pyqtSignal(str, str)     # 源文件, 代理文件
+    failed = pyqtSignal(str, str)    # 源文件, 错误信息
+
+    def __init__(self, cache_dir=PROXY_DIR, height=PROXY_HEIGHT, gop=PROXY_GOP, parent=None):
+        super().__init__(parent)
+        self.cache_dir = cache_dir
+        self.height = height
+        self.gop = gop
+        self._jobs = queue.Queue()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._process = None
+        self._worker = None
+
+    def proxy_path(self, file_path):
+        """代理文件路径：由源文件路径、大小和修改时间决定"""
+        stat = os.stat(file_path)
+        key = f"{os.path.abspath(file_path)}|{stat.st_size}|{stat.st_mtime_ns}|{self.height}|{self.gop}"
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{digest}.mp4")
+
+    def lookup(self, file_path):
+        """返回已生成的代理文件，没有时返回None"""
+        try:
+            path = self.proxy_path(file_path)
+        except OSError:
+            return None
+        return path if os.path.exists(path) else None
+
+    def resolve(self, file_path):
+        """预览用的文件：有代理时返回代理，否则返回原始素材"""
+        return self.lookup(file_path) or file_path
+
+    def request(self, file_path, duration=0):
+        """请求生成代理（已存在或已在队列中时忽略）"""
+        if os.path.splitext(file_path)[1].lower().lstrip('.') not in VIDEO_FORMATS:
+            return
+        if self.lookup(file_path):
+            self.ready.emit(file_path, self.proxy_path(file_path))
+            return
+        with self._lock:
+            if file_path in self._pending:
+                return
+            self._pending.add(file_path)
+            self._jobs.put((file_path, duration))
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, daemon=True)
+                self._worker.start()
+
+    def cancel(self):
+        """清空队列并终止正在进行的转码"""
+        with self._lock:
+            self._pending.clear()
+        while not self._jobs.empty():
+            try:
+                self._jobs.get_nowait()
+            except queue.Empty:
+                break
+        if self._process is not None:
+            self._process.kill()
+
+    def _run(self):
+        """后台线程：依次生成队列中的代理"""
+        while True:
+            try:
+                file_path, duration = self._jobs.get(timeout=1)
+            except queue.Empty:
+                # 与 request 在同一把锁下判断，避免新请求放入队列时线程恰好退出
+                with self._lock:
+                    if self._jobs.empty():
+                        self._worker = None
+                        return
+                continue
+            with self._lock:
+                if file_path not in self._pending:
+                    continue
+            try:
+                self._build(file_path, duration)
+            except Exception as e:
+                with self._lock:
+                    cancelled = file_path not in self._pending
+                if not cancelled:
+                    self.failed.emit(file_path, str(e))
+            finally:
+                with self._lock:
+                    self._pending.discard(file_path)
+
+    def _build(self, file_path, duration):
+        """转码生成单个代理"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        output = self.proxy_path(file_path)
+        partial = output + '.partial.mp4'
+        command = [
+            'ffmpeg', '-y', '-v', 'error', '-nostdin', '-i', file_path,
+            '-map', '0:v:0', '-map', '0:a:0?',
+            '-vf', f'scale=-2:{self.height}',
+            '-c:v', 'libx264', '-preset', 'ultrafast', '-tune', 'fastdecode',
+            '-g', str(self.gop), '-pix_fmt', 'yuv420p',
+            '-c:a', 'aac', '-b:a', '96k',
+            '-progress', 'pipe:1', '-nostats', partial,
+        ]
+        # 代理属于后台工作：预览或缩略图需要CPU时会被暂停
+        with governor.instance().acquire(governor.BACKGROUND, memory_mb=governor.FFMPEG_MEMORY_MB,
+                                         name=f"代理 {os.path.basename(file_path)}") as lease:
+            with self._lock:
+                if file_path not in self._pending:
+                    return  # 等待期间已取消
+            self._process = subprocess.Popen(command, stdout=subprocess.PIPE,
+                                             stderr=subprocess.PIPE, text=True)
+            lease.attach(self._process)
+            last_percent = -1
+            for line in self._process.stdout:
+                key, value = parse_progress(line)
+                if key == 'out_time_us' and duration > 0 and value.isdigit():
+                    percent = min(99, int(int(value) / 1e6 / duration * 100))
+                    if percent != last_percent:
+                        last_percent = percent
+                        self.progress.emit(file_path, percent)
+            error = self._process.stderr.read()
+            returncode = self._process.wait()
+            lease.detach(self._process)
+            self._process = None
+        if returncode != 0:
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise RuntimeError(error.strip() or f"ffmpeg返回码 {returncode}")
+        os.replace(partial, output)
+        self.progress.emit(file_path, 100)
+        self.ready.emit(file_path, output)
@@ -0,0 +1,644 @@
+"""分布式渲染
+
+协调器把导出计划拆成若干渲染任务，通过 HTTP 接口分发给渲染节点；
+渲染节点（本机或其他主机上的独立进程）领取任务、调用 ffmpeg 渲染、
+定期发送心跳，完成后上传结果。协调器收齐全部结果后无损拼接。
+
+接口（JSON）：
+  POST /lease                 领取任务：200 返回任务，204 暂无任务，410 已全部完成
+  POST /jobs/<编号>/heartbeat  心跳：409 表示租约已失效，节点应放弃该任务
+  PUT  /jobs/<编号>/result     上传渲染结果（请求体为文件内容）
+  POST /jobs/<编号>/fail       报告失败，协调器按重试次数决定是否重新分发
+  GET  /status                任务状态统计
+
+各节点需要能以相同路径访问素材文件（共享存储），渲染结果通过接口上传，
+输出目录不需要共享。
+
+协调器默认只监听本机地址。监听其他地址（接受其他主机的节点）时必须设置共享令牌，
+节点在每个请求的 X-Farm-Token 头中携带令牌，不匹配的请求返回403。
+"""
+import argparse
+import hmac
+import json
+import os
+import secrets
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from PyQt5.QtCore import QObject, pyqtSignal
+import numpy as np
+import chunkexport
+import exportplan
+import governor
+
+HEARTBEAT_INTERVAL = 2.0   # 节点发送心跳的间隔（秒）
+LEASE_TIMEOUT = 10.0       # 超过该时间没有心跳则收回任务（秒）
+MAX_ATTEMPTS = 3           # 每个任务最多尝试次数
+POLL_INTERVAL = 0.5        # 暂无任务时节点的等待间隔（秒）
+REQUEST_TIMEOUT = 30.0     # 单次请求超时（秒）
+CONNECT_RETRIES = 20       # 节点连续连接失败多少次后退出
+TOKEN_ENV = 'VEDIT_FARM_TOKEN'  # 共享令牌的环境变量
+LOOPBACK_HOSTS = ('127.0.0.1', '::1', 'localhost')
+
+
+class RenderCancelled(Exception):
+    """渲染被取消"""
+
+
+class FarmJob:
+    """一个渲染任务"""
+    def __init__(self, index, spec):
+        self.index = index
+        self.spec = spec          # 发给节点的任务描述
+        self.state = 'pending'    # pending / running / done / failed
+        self.attempts = 0
+        self.worker = None
+        self.heartbeat = 0.0
+        self.output = None
+        self.error = ''
+
+
+def split_plan(plan, parts, audio_filter=None):
+    """把导出计划拆成渲染任务描述
+
+    重新编码的任务按时长再分成最多 parts 块，复制任务保持一个整体
+    （复制模式的切点受关键帧限制，再拆分没有意义）。
+    """
+    width, height, fps = plan.output_format()
+    specs = []
+    for job in plan.jobs:
+        if job.mode == 'reencode' and parts > 1:
+            pieces = [(job.file_path, start, end)
+                      for start, end in zip(job.starts.tolist(), job.ends.tolist())]
+            ranges = [[(start, end) for _, start, end in chunk]
+                      for chunk in chunkexport.split_chunks(pieces, parts)]
+        else:
+            ranges = [list(zip(job.starts.tolist(), job.ends.tolist()))]
+        for chunk in ranges:
+            specs.append({
+                'index': len(specs),
+                'file_path': os.path.abspath(job.file_path),
+                'starts': [start for start, _ in chunk],
+                'ends': [end for _, end in chunk],
+                'mode': job.mode,
+                'width': width,
+                'height': height,
+                'fps': fps,
+                'audio_filter': audio_filter,
+            })
+    return specs
+
+
+def concat_files(paths, output_path, work_dir):
+    """无损拼接各任务的输出，只有一个文件时直接移动"""
+    if len(paths) == 1:
+        shutil.move(paths[0], output_path)
+        return
+    governor.run_leased(exportplan.concat_command(paths, output_path, work_dir), governor.BULK,
+                        name="导出", check=True, capture_output=True)
+
+
+class Coordinator:
+    """渲染协调器：保存任务队列并提供 HTTP 接口"""
+    def __init__(self, host='127.0.0.1', port=0, max_attempts=MAX_ATTEMPTS,
+                 lease_timeout=LEASE_TIMEOUT, token=None):
+        if host not in LOOPBACK_HOSTS and not token:
+            raise ValueError("监听非本机地址时必须设置共享令牌")
+        self.token = token
+        self.max_attempts = max_attempts
+        self.lease_timeout = lease_timeout
+        self.jobs = []
+        self.retries = 0
+        self.closed = False
+        self.work_dir = tempfile.mkdtemp(prefix='render_farm_')
+        self.condition = threading.Condition()
+        self.server = ThreadingHTTPServer((host, port), FarmRequestHandler)
+        self.server.daemon_threads = True
+        self.server.coordinator = self
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        if host in ('0.0.0.0', ''):
+            host = socket.gethostname()
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop_leasing(self):
+        """不再分发任务，之后领取任务的节点会收到410并退出"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def cancel(self):
+        """取消全部任务：进行中任务的心跳收到409，节点随即结束 ffmpeg 并退出"""
+        with self.condition:
+            self.closed = True
+            for job in self.jobs:
+                if job.state in ('pending', 'running'):
+                    job.state = 'cancelled'
+                    job.worker = None
+            self.condition.notify_all()
+
+    def authorized(self, token):
+        return not self.token or hmac.compare_digest(token or '', self.token)
+
+    def close(self):
+        """停止服务并删除临时文件"""
+        self.stop_leasing()
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def submit(self, specs):
+        with self.condition:
+            for spec in specs:
+                self.jobs.append(FarmJob(len(self.jobs), spec))
+            self.condition.notify_all()
+
+    def finished(self):
+        return self.closed or all(job.state == 'done' for job in self.jobs)
+
+    def _expire(self):
+        """收回心跳超时的任务（调用时需持有锁）"""
+        now = time.monotonic()
+        for job in self.jobs:
+            if job.state == 'running' and now - job.heartbeat > self.lease_timeout:
+                self._retry(job, f"节点 {job.worker} 心跳超时")
+
+    def _retry(self, job, error):
+        """任务失败：未超过重试次数时重新排队（调用时需持有锁）"""
+        job.error = error
+        job.worker = None
+        if job.attempts >= self.max_attempts:
+            job.state = 'failed'
+        else:
+            job.state = 'pending'
+            self.retries += 1
+        self.condition.notify_all()
+
+    def lease(self, worker):
+        """分配一个待渲染任务，返回任务描述；没有任务时返回None"""
+        with self.condition:
+            self._expire()
+            for job in self.jobs:
+                if job.state == 'pending':
+                    job.state = 'running'
+                    job.worker = worker
+                    job.attempts += 1
+                    job.heartbeat = time.monotonic()
+                    return job.spec
+        return None
+
+    def _owned(self, index, worker):
+        """返回该节点当前持有的任务（调用时需持有锁）"""
+        if 0 <= index < len(self.jobs):
+            job = self.jobs[index]
+            if job.state == 'running' and job.worker == worker:
+                return job
+        return None
+
+    def heartbeat(self, index, worker):
+        with self.condition:
+            job = self._owned(index, worker)
+            if job is None:
+                return False
+            job.heartbeat = time.monotonic()
+            return True
+
+    def complete(self, index, worker, stream, length):
+        """接收渲染结果，租约已失效时丢弃"""
+        fd, path = tempfile.mkstemp(prefix=f'part_{index:04d}_', suffix='.mp4', dir=self.work_dir)
+        with os.fdopen(fd, 'wb') as f:
+            remaining = length
+            while remaining > 0:
+                data = stream.read(min(remaining, 1 << 20))
+                if not data:
+                    break
+                f.write(data)
+                remaining -= len(data)
+        with self.condition:
+            job = self._owned(index, worker)
+            if job is None or remaining > 0:
+                os.remove(path)
+                return False
+            job.state = 'done'
+            job.output = path
+            self.condition.notify_all()
+            return True
+
+    def fail(self, index, worker, error):
+        with self.condition:
+            job = self._owned(index, worker)
+            if job is not None:
+                self._retry(job, error)
+
+    def status(self):
+        with self.condition:
+            counts = {}
+            for job in self.jobs:
+                counts[job.state] = counts.get(job.state, 0) + 1
+            return {'jobs': len(self.jobs), 'states': counts, 'retries': self.retries}
+
+    def progress(self):
+        """已完成任务的时长占比（0-1）"""
+        with self.condition:
+            durations = [sum(job.spec['ends']) - sum(job.spec['starts']) for job in self.jobs]
+            total = sum(durations)
+            done = sum(duration for job, duration in zip(self.jobs, durations)
+                       if job.state == 'done')
+            return done / total if total > 0 else 0.0
+
+    def wait(self, alive=None, progress=None, cancel=None):
+        """等待全部任务完成，有任务最终失败或没有可用节点时抛出异常
+
+        progress 为回调（参数为完成占比），cancel 为 threading.Event，设置后取消全部任务
+        并抛出 RenderCancelled。
+        """
+        with self.condition:
+            while not self.finished():
+                if cancel is not None and cancel.is_set():
+                    self.cancel()
+                    raise RenderCancelled()
+                if progress is not None:
+                    progress(self.progress())
+                self._expire()
+                failed = [job for job in self.jobs if job.state == 'failed']
+                if failed:
+                    raise RuntimeError(f"任务 {failed[0].index} 渲染失败: {failed[0].error}")
+                if alive is not None and not alive():
+                    raise RuntimeError("没有可用的渲染节点")
+                self.condition.wait(timeout=1.0)
+
+    def run(self, specs, output_path, alive=None, progress=None, cancel=None):
+        """分发任务、等待完成并拼接输出"""
+        self.submit(specs)
+        self.wait(alive, progress, cancel)
+        outputs = [job.output for job in sorted(self.jobs, key=lambda job: job.index)]
+        concat_files(outputs, output_path, self.work_dir)
+
+
+class FarmRequestHandler(BaseHTTPRequestHandler):
+    """协调器的 HTTP 接口"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, code, payload=None):
+        body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _payload(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def _authorized(self):
+        if self.server.coordinator.authorized(self.headers.get('X-Farm-Token')):
+            return True
+        self._reply(403)
+        return False
+
+    def _route(self):
+        """解析 /jobs/<编号>/<动作>"""
+        parts = self.path.split('?')[0].strip('/').split('/')
+        if len(parts) == 3 and parts[0] == 'jobs' and parts[1].isdigit():
+            return int(parts[1]), parts[2]
+        return None, parts[0]
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        if self.path == '/status':
+            self._reply(200, self.server.coordinator.status())
+        else:
+            self._reply(404)
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        coordinator = self.server.coordinator
+        index, action = self._route()
+        payload = self._payload()
+        worker = str(payload.get('worker', ''))
+        if index is None and action == 'lease':
+            spec = coordinator.lease(worker)
+            if spec is not None:
+                self._reply(200, spec)
+            else:
+                self._reply(410 if coordinator.finished() else 204)
+        elif action == 'heartbeat':
+            self._reply(200 if coordinator.heartbeat(index, worker) else 409)
+        elif action == 'fail':
+            coordinator.fail(index, worker, str(payload.get('error', '')))
+            self._reply(200)
+        else:
+            self._reply(404)
+
+    def do_PUT(self):
+        if not self._authorized():
+            return
+        index, action = self._route()
+        if action != 'result':
+            self._reply(404)
+            return
+        worker = self.headers.get('X-Worker', '')
+        length = int(self.headers.get('Content-Length') or 0)
+        accepted = self.server.coordinator.complete(index, worker, self.rfile, length)
+        self._reply(200 if accepted else 409)
+
+
+def _call(url, payload=None, data=None, method='POST', headers=None, token=None):
+    """发送请求，返回 (状态码, JSON内容)"""
+    if payload is not None:
+        data = json.dumps(payload).encode('utf-8')
+    headers = dict(headers or {})
+    if token:
+        headers['X-Farm-Token'] = token
+    request = urllib.request.Request(url, data=data, method=method, headers=headers)
+    try:
+        with urllib.request.urlopen(request, timeout=REQUEST_TIMEOUT) as response:
+            body = response.read()
+            return response.status, (json.loads(body) if body else None)
+    except urllib.error.HTTPError as e:
+        return e.code, None
+
+
+def render_spec(spec, output_path, work_dir):
+    """按任务描述生成 ffmpeg 命令"""
+    job = exportplan.ExportJob(spec['file_path'], np.asarray(spec['starts']),
+                               np.asarray(spec['ends']), spec['mode'])
+    return job.command(output_path, work_dir, spec['index'],
+                       spec['width'], spec['height'], spec['fps'], spec.get('audio_filter'))
+
+
+def run_worker(url, name=None, token=None):
+    """渲染节点主循环：领取任务直到协调器报告全部完成"""
+    name = name or f"{socket.gethostname()}-{os.getpid()}"
+    url = url.rstrip('/')
+    failures = 0
+    while True:
+        try:
+            status, spec = _call(f"{url}/lease", {'worker': name}, token=token)
+            failures = 0
+        except OSError:
+            failures += 1
+            if failures >= CONNECT_RETRIES:
+                return
+            time.sleep(POLL_INTERVAL)
+            continue
+        if status in (403, 410):
+            if status == 403:
+                print("渲染节点错误: 共享令牌不匹配")
+            return
+        if status != 200:
+            time.sleep(POLL_INTERVAL)
+            continue
+        try:
+            _render(url, name, spec, token)
+        except OSError as e:
+            print(f"渲染节点错误: {str(e)}")
+
+
+class _Heartbeat(threading.Thread):
+    """在独立线程上为任务定期发送心跳，覆盖等待资源、渲染与上传结果的全过程
+
+    协调器回复409（租约已被收回）时设置 lost。
+    """
+    def __init__(self, job_url, name, token=None):
+        super().__init__(daemon=True)
+        self.job_url = job_url
+        self.name = name
+        self.token = token
+        self.lost = threading.Event()
+        self.done = threading.Event()
+
+    def run(self):
+        while not self.done.wait(HEARTBEAT_INTERVAL):
+            try:
+                status, _ = _call(f"{self.job_url}/heartbeat", {'worker': self.name},
+                                  token=self.token)
+            except OSError:
+                continue  # 偶发的连接失败由下一次心跳补上
+            if status == 409:
+                self.lost.set()
+                return
+
+    def stop(self):
+        self.done.set()
+        self.join()
+
+
+def _render(url, name, spec, token=None):
+    """渲染单个任务，期间由心跳线程定期发送心跳"""
+    job_url = f"{url}/jobs/{spec['index']}"
+    work_dir = tempfile.mkdtemp(prefix='render_worker_')
+    heartbeat = _Heartbeat(job_url, name, token)
+    heartbeat.start()
+    lease = process = None
+    try:
+        # 生成命令时可能要探测素材（自己申请租约），须在申请渲染租约之前
+        output = os.path.join(work_dir, f"part_{spec['index']:04d}.mp4")
+        command = render_spec(spec, output, work_dir)
+        # 节点上同时在做的交互与后台工作优先，渲染进程按批量优先级调度；
+        # 等待期间心跳照常发送，租约被收回则放弃
+        while lease is None:
+            if heartbeat.lost.is_set():
+                return
+            lease = governor.instance().acquire(governor.BULK, os.cpu_count() or 1,
+                                                governor.FFMPEG_MEMORY_MB, "渲染节点",
+                                                timeout=HEARTBEAT_INTERVAL)
+        process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        lease.attach(process)
+        stderr = []
+        reader = threading.Thread(target=lambda: stderr.append(process.stderr.read()),
+                                  daemon=True)
+        reader.start()
+        while process.poll() is None:
+            if heartbeat.lost.wait(POLL_INTERVAL):
+                # 租约已被收回，任务已交给其他节点（finally 中结束进程）
+                return
+        reader.join()
+        if process.returncode != 0:
+            error = b''.join(stderr).decode('utf-8', 'replace').strip()
+            _call(f"{job_url}/fail", {'worker': name,
+                                      'error': error or f"ffmpeg返回码 {process.returncode}"},
+                  token=token)
+            return
+        with open(output, 'rb') as f:
+            _call(f"{job_url}/result", data=f, method='PUT',
+                  headers={'X-Worker': name,
+                           'Content-Length': str(os.path.getsize(output)),
+                           'Content-Type': 'video/mp4'},
+                  token=token)
+    finally:
+        heartbeat.stop()
+        if process is not None:
+            # 请求出错（OSError）或租约失效时不留下孤立的 ffmpeg 进程
+            if process.poll() is None:
+                process.kill()
+            process.wait()
+            lease.detach(process)
+        if lease is not None:
+            lease.release()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def spawn_workers(url, count, token=None):
+    """在本机启动若干渲染节点进程（令牌通过环境变量传递，不出现在命令行中）"""
+    env = dict(os.environ)
+    if token:
+        env[TOKEN_ENV] = token
+    return [subprocess.Popen([sys.executable, os.path.abspath(__file__), 'worker', url,
+                              '--name', f'local-{k}'], env=env)
+            for k in range(count)]
+
+
+def render_local(plan, output_path, workers=None, parts=None, audio_filter=None,
+                 progress=None, cancel=None):
+    """在本机用多个渲染节点进程执行导出计划，返回统计信息
+
+    progress、cancel 同 Coordinator.wait，取消时抛出 RenderCancelled。
+    """
+    workers = workers or os.cpu_count() or 1
+    specs = split_plan(plan, parts or workers, audio_filter)
+    token = secrets.token_hex(16)
+    coordinator = Coordinator(host='127.0.0.1', token=token)
+    coordinator.start()
+    processes = spawn_workers(coordinator.url, min(workers, len(specs)), token)
+    start = time.perf_counter()
+    try:
+        coordinator.run(specs, output_path,
+                        alive=lambda: any(p.poll() is None for p in processes),
+                        progress=progress, cancel=cancel)
+        stats = coordinator.status()
+        stats['workers'] = len(processes)
+        stats['time'] = time.perf_counter() - start
+        return stats
+    finally:
+        # 先让节点收到410自行退出，再关闭服务
+        coordinator.stop_leasing()
+        for process in processes:
+            try:
+                process.wait(timeout=REQUEST_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        coordinator.close()
+
+
+class FarmExport(QObject):
+    """在后台线程中执行 render_local，界面通过信号获得进度与结果"""
+    progress = pyqtSignal(float, float)  # 整体进度(0-100), 预计剩余时间（秒，未知时为-1）
+    finished = pyqtSignal(dict)          # 统计信息
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._cancel = threading.Event()
+        self._worker = None
+
+    @property
+    def active(self):
+        return self._worker is not None and self._worker.is_alive()
+
+    def start(self, plan, output_path, audio_filter=None):
+        self._cancel = threading.Event()
+        self._worker = threading.Thread(target=self._run, args=(plan, output_path, audio_filter),
+                                        daemon=True)
+        self._worker.start()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def _run(self, plan, output_path, audio_filter):
+        started = time.monotonic()
+
+        def report(fraction):
+            elapsed = time.monotonic() - started
+            eta = elapsed * (1 - fraction) / fraction if fraction > 0 else -1.0
+            self.progress.emit(min(99.0, fraction * 100), eta)
+
+        try:
+            stats = render_local(plan, output_path, audio_filter=audio_filter,
+                                 progress=report, cancel=self._cancel)
+        except RenderCancelled:
+            self.cancelled.emit()
+        except Exception as e:
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            self.failed.emit(str(e))
+        else:
+            self.finished.emit(stats)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="分布式渲染")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    worker = commands.add_parser('worker', help="启动渲染节点")
+    worker.add_argument('url', help="协调器地址，如 http://host:8765")
+    worker.add_argument('--name', help="节点名称")
+    worker.add_argument('--token', default=os.environ.get(TOKEN_ENV),
+                        help=f"共享令牌（默认读取环境变量 {TOKEN_ENV}）")
+
+    render = commands.add_parser('render', help="无界面批量导出")
+    render.add_argument('segments', help="片段列表JSON：[[文件, 开始, 结束], ...]")
+    render.add_argument('output', help="输出视频文件")
+    render.add_argument('--workers', type=int, default=0,
+                        help="本机启动的渲染节点数，0表示只等待其他主机的节点")
+    render.add_argument('--host', default='127.0.0.1',
+                        help="监听地址，接受其他主机的节点时用 0.0.0.0（需要 --token）")
+    render.add_argument('--token', default=os.environ.get(TOKEN_ENV),
+                        help=f"共享令牌（默认读取环境变量 {TOKEN_ENV}）")
+    render.add_argument('--port', type=int, default=8765)
+    render.add_argument('--parts', type=int, default=0, help="重新编码任务拆分的块数")
+    render.add_argument('--max-gap', type=float, default=0.1, help="片段合并间隔（秒）")
+    args = parser.parse_args(argv)
+
+    if args.command == 'worker':
+        run_worker(args.url, args.name, args.token)
+        return
+
+    from segmentstore import SegmentView
+    with open(args.segments, encoding='utf-8') as f:
+        view = SegmentView.from_segments(json.load(f))
+    plan = exportplan.build_plan(view, exportplan.GapPolicy(args.max_gap))
+    print(plan.summary())
+    if args.workers > 0:
+        stats = render_local(plan, args.output, args.workers, args.parts or None)
+    else:
+        try:
+            coordinator = Coordinator(args.host, args.port, token=args.token)
+        except ValueError as e:
+            parser.error(str(e))
+        coordinator.start()
+        print(f"协调器地址: {coordinator.url}")
+        try:
+            coordinator.run(split_plan(plan, args.parts or 1), args.output)
+            stats = coordinator.status()
+            # 留出一个轮询间隔，让空闲节点收到410后退出
+            coordinator.stop_leasing()
+            time.sleep(POLL_INTERVAL * 2)
+        finally:
+            coordinator.close()
+    print(json.dumps(stats, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+"""镜头切换检测
+
+先粗后细两遍：粗检只解码关键帧（-skip_frame nokey），相邻关键帧差别大的区间
+才可能有镜头切换；细检只把这些区间以较低帧率解码，定位切换所在的帧。
+两遍都以极低分辨率（默认 64 像素宽的灰度图）输出，跳过环路滤波；长视频的粗检
+按时间分成几段，细检的各区间由多个 ffmpeg 进程并行解码。
+一个关键帧间隔内切走又切回同一画面的闪切会被粗检漏掉；关键帧间隔超过
+MAX_KEY_GAP 的区间总是细检，关键帧很少的视频退化为整段细检。
+逐帧的亮度直方图差与像素差都用向量化计算，得分超过阈值且为局部最大值的位置
+即为镜头切换候选。检测结果可以用来把音频剪辑片段的边界吸附到附近的镜头切换上。
+"""
+from concurrent.futures import ThreadPoolExecutor
+import os
+import re
+
+import numpy as np
+import governor
+import lazyload
+
+SAMPLE_FPS = 5.0      # 采样帧率
+FRAME_WIDTH = 64      # 解码宽度（像素）
+FRAME_HEIGHT = 36     # 解码高度（像素）
+HIST_BINS = 16        # 亮度直方图分箱数
+THRESHOLD = 0.2       # 切换得分阈值（0-1）
+MIN_SCENE = 0.5       # 两次切换的最小间隔（秒）
+MIN_PART = 30.0       # 粗检并行解码时每段的最短时长（秒）
+COARSE_RATIO = 1.0    # 粗检阈值与切换阈值之比（关键帧间隔内的运动也会抬高得分）
+MAX_KEY_GAP = 5.0     # 关键帧间隔超过该值（秒）的区间不经粗检判断，总是细检
+
+
+def probe_duration(file_path):
+    """视频时长（秒）"""
+    cv2 = lazyload.cv2()
+    cap = cv2.VideoCapture(file_path)
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+        frames = cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0.0
+    finally:
+        cap.release()
+    return frames / fps if fps > 0 else 0.0
+
+
+def decode_frames(file_path, start=0.0, duration=None, fps=SAMPLE_FPS,
+                  width=FRAME_WIDTH, height=FRAME_HEIGHT, threads=1):
+    """解码一段视频为 (帧数, 高, 宽) 的 uint8 灰度数组"""
+    command = ['ffmpeg', '-v', 'error', '-nostdin',
+               '-skip_frame', 'noref', '-skip_loop_filter', 'all', '-flags2', 'fast',
+               '-threads', str(threads)]
+    if start > 0:
+        command += ['-ss', f'{start:.3f}']
+    if duration is not None:
+        command += ['-t', f'{duration:.3f}']
+    command += ['-i', file_path, '-an', '-sn', '-dn',
+                '-vf', f'fps={fps},scale={width}:{height}:flags=area,format=gray',
+                '-f', 'rawvideo', 'pipe:1']
+    # 镜头检测属于后台工作，每个解码进程占用 threads 个CPU槽位
+    result = governor.run_leased(command, governor.BACKGROUND, slots=threads,
+                                 name="镜头检测", capture_output=True, check=True)
+    frame_size = width * height
+    count = len(result.stdout) // frame_size
+    return np.frombuffer(result.stdout[:count * frame_size], dtype=np.uint8).reshape(
+        count, height, width)
+
+
+def decode_keyframes(file_path, start=0.0, duration=None, min_interval=1 / SAMPLE_FPS,
+                     width=FRAME_WIDTH, height=FRAME_HEIGHT, threads=1):
+    """只解码关键帧，返回 (时间数组, (帧数, 高, 宽) 的 uint8 灰度数组)
+
+    间隔小于 min_interval 的关键帧（如全帧内编码的素材）只保留第一个。
+    """
+    command = ['ffmpeg', '-hide_banner', '-nostats', '-v', 'info', '-nostdin',
+               '-skip_frame', 'nokey', '-skip_loop_filter', 'all', '-flags2', 'fast',
+               '-threads', str(threads)]
+    if start > 0:
+        command += ['-ss', f'{start:.3f}']
+    if duration is not None:
+        command += ['-t', f'{duration:.3f}']
+    command += ['-i', file_path, '-an', '-sn', '-dn',
+                '-vf', f"select='isnan(prev_selected_t)+gte(t-prev_selected_t,{min_interval * 0.99:.4f})',"
+                       f'scale={width}:{height}:flags=area,format=gray,showinfo',
+                '-fps_mode', 'passthrough', '-f', 'rawvideo', 'pipe:1']
+    result = governor.run_leased(command, governor.BACKGROUND, slots=threads,
+                                 name="镜头检测", capture_output=True, check=True)
+    # 各帧的时间由 showinfo 输出（输入端定位后时间从0开始）
+    times = [float(value) for value in re.findall(
+        rb'Parsed_showinfo.*?pts_time:\s*(-?[\d.]+)', result.stderr)]
+    frame_size = width * height
+    count = min(len(result.stdout) // frame_size, len(times))
+    frames = np.frombuffer(result.stdout[:count * frame_size], dtype=np.uint8).reshape(
+        count, height, width)
+    return start + np.array(times[:count]), frames
+
+
+def frame_scores(frames, bins=HIST_BINS):
+    """相邻帧之间的切换得分（0-1），长度为帧数-1
+
+    得分为亮度直方图差（L1距离的一半）与平均像素差的平均值。
+    """
+    n = len(frames)
+    if n < 2:
+        return np.zeros(0, dtype=np.float32)
+    flat = frames.reshape(n, -1)
+    # 向量化直方图：给每帧的分箱编号加上帧偏移后一次计数
+    indices = (flat // (256 // bins)).astype(np.int64) + np.arange(n)[:, None] * bins
+    hist = np.bincount(indices.ravel(), minlength=n * bins).reshape(n, bins)
+    hist = hist / flat.shape[1]
+    hist_diff = 0.5 * np.abs(np.diff(hist, axis=0)).sum(axis=1)
+    pixel_diff = np.abs(np.diff(flat.astype(np.int16), axis=0)).mean(axis=1) / 255.0
+    return (0.5 * (hist_diff + pixel_diff)).astype(np.float32)
+
+
+def pick_cuts(scores, fps, threshold=THRESHOLD, min_scene=MIN_SCENE):
+    """从得分中选出切换时间：超过阈值、在最小间隔内得分最高"""
+    candidates = np.flatnonzero(scores > threshold)
+    if len(candidates) == 0:
+        return np.zeros(0)
+    # 按得分从高到低贪心选择，已选位置附近的候选被抑制
+    radius = max(1, int(round(min_scene * fps)))
+    order = candidates[np.argsort(-scores[candidates], kind='stable')]
+    chosen = []
+    taken = np.zeros(len(scores) + 2 * radius, dtype=bool)
+    for i in order.tolist():
+        if not taken[i + radius]:
+            chosen.append(i)
+            taken[i:i + 2 * radius + 1] = True
+    # 得分 i 对应第 i 帧与第 i+1 帧之间，切换时间取第 i+1 帧
+    return (np.sort(np.array(chosen)) + 1) / fps
+
+
+def candidate_ranges(times, frames, duration, threshold, max_gap=MAX_KEY_GAP):
+    """粗检：返回可能有镜头切换、需要细检的 [(开始, 结束)] 时间区间
+
+    相邻关键帧得分超过 threshold 或间隔超过 max_gap 的区间入选，最后一个关键帧
+    之后没有可比较的帧，总是入选；相连的区间合并。
+    """
+    if len(times) == 0:
+        return [(0.0, duration)]
+    bounds = np.append(times, max(duration, times[-1]))
+    flagged = np.append((frame_scores(frames) > threshold) | (np.diff(times) > max_gap), True)
+    if times[0] > 0:
+        bounds = np.insert(bounds, 0, 0.0)
+        flagged = np.insert(flagged, 0, True)
+    # 相连的入选区间合并为一段
+    edges = np.diff(flagged.astype(np.int8), prepend=0, append=0)
+    first = np.flatnonzero(edges == 1)
+    last = np.flatnonzero(edges == -1)
+    return [(float(bounds[a]), float(bounds[b])) for a, b in zip(first, last)]
+
+
+def detect(file_path, fps=SAMPLE_FPS, threshold=THRESHOLD, min_scene=MIN_SCENE, jobs=None):
+    """检测镜头切换，返回切换时间数组（秒）"""
+    jobs = jobs or os.cpu_count() or 1
+    duration = probe_duration(file_path)
+    # 粗检：长视频分段并行解码关键帧
+    parts = max(1, min(jobs, int(duration // MIN_PART)))
+    if parts == 1:
+        times, frames = decode_keyframes(file_path, threads=jobs)
+    else:
+        step = duration / parts
+        with ThreadPoolExecutor(max_workers=parts) as pool:
+            pieces = list(pool.map(
+                lambda start: decode_keyframes(file_path, start, step),
+                [k * step for k in range(parts)]))
+        times = np.concatenate([piece[0] for piece in pieces])
+        frames = np.concatenate([piece[1] for piece in pieces])
+        times, unique = np.unique(np.round(times, 3), return_index=True)
+        frames = frames[unique]
+    ranges = candidate_ranges(times, frames, duration, threshold * COARSE_RATIO)
+    
+    # 细检：各区间按采样帧率解码（多读一帧，包含区间结束处的关键帧）并定位切换
+    def fine(bounds):
+        start, end = bounds
+        scores = frame_scores(decode_frames(file_path, start, end - start + 1 / fps, fps))
+        return start + pick_cuts(scores, fps, threshold, min_scene)
+    
+    if not ranges:
+        return np.zeros(0)
+    with ThreadPoolExecutor(max_workers=min(jobs, len(ranges))) as pool:
+        cuts = np.concatenate(list(pool.map(fine, ranges)))
+    return np.unique(np.round(cuts, 6))
+
+
+def snap_to_cuts(starts, ends, cuts, tolerance):
+    """把片段边界吸附到 tolerance 秒内最近的镜头切换上
+
+    吸附后片段长度不为正的边界保持原值。
+    """
+    starts = np.asarray(starts, dtype=np.float64)
+    ends = np.asarray(ends, dtype=np.float64)
+    cuts = np.asarray(cuts, dtype=np.float64)
+    if len(cuts) == 0 or len(starts) == 0:
+        return starts, ends
+
+    def nearest(times):
+        pos = np.searchsorted(cuts, times)
+        left = cuts[np.clip(pos - 1, 0, len(cuts) - 1)]
+        right = cuts[np.clip(pos, 0, len(cuts) - 1)]
+        best = np.where(np.abs(times - left) <= np.abs(right - times), left, right)
+        return np.where(np.abs(best - times) <= tolerance, best, times)
+
+    snapped_starts = nearest(starts)
+    snapped_ends = nearest(ends)
+    valid = snapped_ends > snapped_starts
+    return np.where(valid, snapped_starts, starts), np.where(valid, snapped_ends, ends)
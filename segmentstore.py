@@ -0,0 +1,319 @@
+"""剪辑片段存储
+
+片段数据保存在一个结构化NumPy数组中，与界面组件解耦：
+TimeCutter、Timeline 等视图只订阅存储的变化信号，
+导出时直接拿到数组的只读拷贝，不再遍历组件重建字典列表。
+"""
+from PyQt5.QtCore import QObject, pyqtSignal
+import numpy as np
+
+# 单条片段记录
+SEGMENT_DTYPE = np.dtype([
+    ('id', np.int64),        # 片段编号（存储内唯一）
+    ('file_id', np.int32),   # 素材编号，对应 SegmentStore.files 的下标
+    ('start', np.float64),   # 开始时间（秒）
+    ('end', np.float64),     # 结束时间（秒）
+    ('selected', np.bool_),  # 是否勾选
+    ('order', np.int32),     # 显示顺序（从1开始）
+])
+
+
+class SegmentView:
+    """片段数组的只读视图，交给导出模块使用"""
+    __slots__ = ('records', 'files', 'thumbnails')
+
+    def __init__(self, records, files, thumbnails=None):
+        self.records = records
+        self.files = files
+        self.thumbnails = thumbnails if thumbnails is not None else {}
+
+    @classmethod
+    def from_segments(cls, segments):
+        """由 (文件, 开始, 结束) 列表创建视图（无界面的批处理使用）"""
+        segments = list(segments)
+        records = np.zeros(len(segments), dtype=SEGMENT_DTYPE)
+        files = []
+        file_index = {}
+        for row, (file_path, start, end) in enumerate(segments):
+            if file_path not in file_index:
+                file_index[file_path] = len(files)
+                files.append(file_path)
+            records[row] = (row + 1, file_index[file_path], start, end, True, row + 1)
+        records.flags.writeable = False
+        return cls(records, tuple(files))
+
+    def __len__(self):
+        return len(self.records)
+
+    def __bool__(self):
+        return len(self.records) > 0
+
+    def __iter__(self):
+        """逐条返回 (文件路径, 开始时间, 结束时间)"""
+        files = self.files
+        for file_id, start, end in zip(self.records['file_id'].tolist(),
+                                       self.records['start'].tolist(),
+                                       self.records['end'].tolist()):
+            yield (files[file_id] if file_id >= 0 else None), start, end
+
+    @property
+    def ids(self):
+        return self.records['id']
+
+    @property
+    def starts(self):
+        return self.records['start']
+
+    @property
+    def ends(self):
+        return self.records['end']
+
+    @property
+    def durations(self):
+        return self.records['end'] - self.records['start']
+
+    def file_path(self, row):
+        """返回第row条片段的文件路径"""
+        file_id = int(self.records['file_id'][row])
+        return self.files[file_id] if file_id >= 0 else None
+
+    def total_duration(self):
+        """片段总时长（秒）"""
+        return float(np.sum(self.durations))
+
+
+class SegmentStore(QObject):
+    """基于结构化数组的片段存储"""
+    rows_inserted = pyqtSignal(object)  # 新增片段的id数组
+    rows_removed = pyqtSignal(object)   # 删除片段的id数组
+    rows_changed = pyqtSignal(object)   # 时间或勾选状态改变的片段id数组
+    store_reset = pyqtSignal()          # 存储被清空或整体替换
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.files = []
+        self._file_index = {}
+        self.thumbnails = {}
+        self._data = np.zeros(64, dtype=SEGMENT_DTYPE)
+        self._count = 0
+        self._next_id = 1
+        self._lookup = None  # (排序后的id, 对应的行号)，结构变化后重建
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def records(self):
+        """当前全部记录（数组视图，按显示顺序排列）"""
+        return self._data[:self._count]
+
+    def file_id(self, file_path):
+        """返回素材编号，不存在则登记"""
+        file_id = self._file_index.get(file_path)
+        if file_id is None:
+            file_id = len(self.files)
+            self.files.append(file_path)
+            self._file_index[file_path] = file_id
+        return file_id
+
+    def _reserve(self, extra):
+        """保证容量足够，按倍数扩容"""
+        needed = self._count + extra
+        if needed <= len(self._data):
+            return
+        capacity = max(needed, len(self._data) * 2)
+        data = np.zeros(capacity, dtype=SEGMENT_DTYPE)
+        data[:self._count] = self._data[:self._count]
+        self._data = data
+
+    def _renumber(self):
+        """重新生成显示顺序"""
+        self._data['order'][:self._count] = np.arange(1, self._count + 1)
+        self._lookup = None
+
+    def rows(self, ids):
+        """把片段id转换为行号，不存在的id返回-1"""
+        if self._lookup is None:
+            ids_col = self.records['id']
+            order = np.argsort(ids_col, kind='stable')
+            self._lookup = (ids_col[order], order)
+        sorted_ids, order = self._lookup
+        ids = np.atleast_1d(np.asarray(ids, dtype=np.int64))
+        if len(sorted_ids) == 0:
+            return np.full(len(ids), -1, dtype=np.intp)
+        pos = np.searchsorted(sorted_ids, ids)
+        pos = np.minimum(pos, len(sorted_ids) - 1)
+        found = sorted_ids[pos] == ids
+        return np.where(found, order[pos], -1)
+
+    def get(self, segment_id):
+        """返回单条记录，不存在时返回None"""
+        row = self.rows(segment_id)[0]
+        if row < 0:
+            return None
+        return self._data[row]
+
+    def append(self, file_path, starts, ends, selected=False, ids=None):
+        """在末尾批量添加同一素材的片段，返回新片段的id数组"""
+        return self.insert(self._count, file_path, starts, ends, selected, ids)
+
+    def insert(self, position, file_path, starts, ends, selected=False, ids=None):
+        """在指定行之前批量插入同一素材的片段，返回新片段的id数组"""
+        starts = np.atleast_1d(np.asarray(starts, dtype=np.float64))
+        ends = np.atleast_1d(np.asarray(ends, dtype=np.float64))
+        n = len(starts)
+        if n == 0:
+            return np.zeros(0, dtype=np.int64)
+        if ids is None:
+            ids = np.arange(self._next_id, self._next_id + n, dtype=np.int64)
+        else:
+            ids = np.asarray(ids, dtype=np.int64)
+        self._next_id = max(self._next_id, int(ids.max()) + 1)
+
+        position = max(0, min(int(position), self._count))
+        self._reserve(n)
+        data = self._data
+        # 后移插入点之后的记录
+        data[position + n:self._count + n] = data[position:self._count].copy()
+        block = data[position:position + n]
+        block['id'] = ids
+        block['file_id'] = self.file_id(file_path) if file_path is not None else -1
+        block['start'] = starts
+        block['end'] = ends
+        block['selected'] = selected
+        self._count += n
+        self._renumber()
+        self.rows_inserted.emit(ids)
+        return ids
+
+    def insert_sorted(self, file_path, starts, ends, selected=False):
+        """按开始时间把片段插入到已按时间排列的记录中，返回新片段的id数组"""
+        starts = np.atleast_1d(np.asarray(starts, dtype=np.float64))
+        ends = np.atleast_1d(np.asarray(ends, dtype=np.float64))
+        n = len(starts)
+        if n == 0:
+            return np.zeros(0, dtype=np.int64)
+        order = np.argsort(starts, kind='stable')
+        starts, ends = starts[order], ends[order]
+        ids = np.arange(self._next_id, self._next_id + n, dtype=np.int64)
+        self._next_id += n
+
+        block = np.zeros(n, dtype=SEGMENT_DTYPE)
+        block['id'] = ids
+        block['file_id'] = self.file_id(file_path) if file_path is not None else -1
+        block['start'] = starts
+        block['end'] = ends
+        block['selected'] = selected
+        positions = np.searchsorted(self.records['start'], starts, side='right')
+        merged = np.insert(self.records, positions, block)
+        self._reserve(n)
+        self._count += n
+        self._data[:self._count] = merged
+        self._renumber()
+        self.rows_inserted.emit(ids)
+        return ids
+
+    def extend(self, view):
+        """复制另一个存储的视图（保留片段id与缩略图）"""
+        records = view.records
+        n = len(records)
+        if n == 0:
+            return
+        self._reserve(n)
+        block = self._data[self._count:self._count + n]
+        block[:] = records
+        # 素材编号映射到本存储
+        mapping = np.array([self.file_id(path) for path in view.files] or [0],
+                           dtype=np.int32)
+        valid = records['file_id'] >= 0
+        block['file_id'] = np.where(valid, mapping[np.maximum(records['file_id'], 0)], -1)
+        self._count += n
+        self._next_id = max(self._next_id, int(records['id'].max()) + 1)
+        for segment_id in records['id'].tolist():
+            thumbnail = view.thumbnails.get(segment_id)
+            if thumbnail is not None:
+                self.thumbnails[segment_id] = thumbnail
+        self._renumber()
+        self.rows_inserted.emit(block['id'].copy())
+
+    def remove(self, ids):
+        """批量删除片段"""
+        ids = np.atleast_1d(np.asarray(ids, dtype=np.int64))
+        records = self.records
+        mask = np.isin(records['id'], ids)
+        if not mask.any():
+            return
+        removed = records['id'][mask].copy()
+        keep = records[~mask].copy()
+        self._count = len(keep)
+        self._data[:self._count] = keep
+        for segment_id in removed.tolist():
+            self.thumbnails.pop(segment_id, None)
+        self._renumber()
+        self.rows_removed.emit(removed)
+
+    def clear(self):
+        """清空所有片段"""
+        self._count = 0
+        self._next_id = 1
+        self.files.clear()
+        self._file_index.clear()
+        self.thumbnails.clear()
+        self._lookup = None
+        self.store_reset.emit()
+
+    def set_times(self, segment_id, start, end):
+        """修改单个片段的时间"""
+        row = self.rows(segment_id)[0]
+        if row < 0:
+            return
+        self._data['start'][row] = start
+        self._data['end'][row] = end
+        self.rows_changed.emit(np.array([segment_id], dtype=np.int64))
+
+    def shift(self, ids, delta):
+        """批量平移片段时间（不会移到0秒之前）"""
+        rows = self.rows(ids)
+        rows = rows[rows >= 0]
+        if len(rows) == 0:
+            return
+        data = self._data
+        delta = np.maximum(delta, -data['start'][rows])
+        data['start'][rows] += delta
+        data['end'][rows] += delta
+        self.rows_changed.emit(data['id'][rows].copy())
+
+    def select(self, ids=None, value=True):
+        """批量设置勾选状态，ids为None时作用于全部片段"""
+        records = self.records
+        if ids is None:
+            rows = np.flatnonzero(records['selected'] != value)
+        else:
+            rows = self.rows(ids)
+            rows = rows[rows >= 0]
+            rows = rows[records['selected'][rows] != value]
+        if len(rows) == 0:
+            return
+        records['selected'][rows] = value
+        self.rows_changed.emit(records['id'][rows].copy())
+
+    def total_duration(self, selected_only=False):
+        """片段总时长（秒）"""
+        records = self.records
+        if selected_only:
+            records = records[records['selected']]
+        return float(np.sum(records['end'] - records['start']))
+
+    def view(self, selected_only=False):
+        """返回片段视图
+
+        记录是一次只读拷贝（每条几十字节，拷贝很快）：导出和预览期间编辑片段，
+        或追加片段使数组重新分配，都不会影响已经取得的视图。
+        """
+        records = self.records
+        if selected_only:
+            records = records[records['selected']]
+        else:
+            records = records.copy()
+        records.flags.writeable = False
+        return SegmentView(records, tuple(self.files), self.thumbnails)
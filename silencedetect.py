@@ -0,0 +1,173 @@
+"""快速音频分析（ffmpeg silencedetect）
+
+不在 Python 中解码波形，而是让 ffmpeg 对音频流做一遍流式处理：
+silencedetect 滤镜给出静音区间，astats 滤镜给出整体电平统计。逐行解析
+ffmpeg 的日志输出，内存占用与文件长度无关，适合对很长的素材做第一遍剪辑。
+
+静音阈值是相对满刻度的绝对电平（dBFS），不同于波形分析中以最响一帧为 0 dB
+的相对电平。
+"""
+import re
+import subprocess
+
+import numpy as np
+import envelope
+import governor
+
+NOISE_DB = -40.0      # 静音阈值（dBFS）
+MIN_SILENCE = 0.05    # 短于此时长（秒）的静音并入片段，与电平范围剪辑一致
+MIN_SEGMENT = 0.1     # 最小有效片段时长（秒）
+
+_SILENCE_START = re.compile(r'silence_start:\s*(-?[\d.]+)')
+_SILENCE_END = re.compile(r'silence_end:\s*(-?[\d.]+)')
+_DURATION = re.compile(r'Duration:\s*(\d+):(\d+):([\d.]+)')
+_AUDIO = re.compile(r'Stream #\S+.*?: Audio: (\w+)[^,]*(?:, (\d+) Hz)?(?:, ([^,\n]+))?')
+_CHANNEL_LAYOUTS = {'mono': 1, 'stereo': 2, '2.1': 3, '3.0': 3, 'quad': 4, '4.0': 4,
+                    '5.0': 5, '5.1': 6, '6.1': 7, '7.1': 8}
+_STAT = re.compile(r'\[Parsed_astats_\d+ @ [^\]]*\] (RMS level|RMS peak|RMS trough|Peak level) dB:\s*(\S+)')
+
+
+def command(file_path, noise_db=NOISE_DB, min_silence=MIN_SILENCE, stats=True):
+    """生成分析命令：日志与进度都输出到 stderr"""
+    filters = f'silencedetect=n={noise_db:.1f}dB:d={min_silence:.3f}'
+    if stats:
+        filters += ',astats=metadata=0:measure_perchannel=none'
+    return ['ffmpeg', '-hide_banner', '-nostdin', '-nostats', '-v', 'info',
+            '-progress', 'pipe:2', '-i', file_path, '-vn', '-sn', '-dn',
+            '-af', filters, '-f', 'null', '-']
+
+
+def _channel_count(layout):
+    """ffmpeg 声道布局名称对应的声道数（如 stereo、5.1(side)、3 channels）"""
+    layout = layout.strip()
+    match = re.match(r'(\d+) channels', layout)
+    if match:
+        return int(match.group(1))
+    return _CHANNEL_LAYOUTS.get(layout.split('(')[0], 0)
+
+
+def parse_media(text):
+    """解析 ffmpeg -i 的文件信息，返回 {'duration': 秒, 'audio': 第一个音频流或None}
+
+    音频流为 {'codec': 编码, 'sample_rate': 采样率, 'channels': 声道数}，未知的值为0。
+    """
+    info = {'duration': 0.0, 'audio': None}
+    match = _DURATION.search(text)
+    if match:
+        hours, minutes, seconds = match.groups()
+        info['duration'] = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    match = _AUDIO.search(text)
+    if match:
+        codec, rate, layout = match.groups()
+        info['audio'] = {'codec': codec, 'sample_rate': int(rate or 0),
+                         'channels': _channel_count(layout or '')}
+    return info
+
+
+def probe_media(file_path):
+    """读取素材的时长与第一个音频流的参数（见 parse_media）"""
+    result = governor.run_leased(['ffmpeg', '-hide_banner', '-nostdin', '-i', file_path],
+                                 governor.INTERACTIVE, name="探测", capture_output=True,
+                                 text=True, encoding='utf-8', errors='replace')
+    return parse_media(result.stderr)
+
+
+def probe_duration(file_path):
+    """从 ffmpeg 的文件信息中读取时长（秒），未知时返回0"""
+    return probe_media(file_path)['duration']
+
+
+def _db(text):
+    try:
+        value = float(text)
+    except ValueError:
+        return None
+    return value if np.isfinite(value) else None
+
+
+def parse(lines, progress=None):
+    """解析 ffmpeg 输出，返回 (静音开始数组, 静音结束数组, 时长, 电平统计)"""
+    silence_starts, silence_ends = [], []
+    duration = 0.0
+    stats = {}
+    for line in lines:
+        if line.startswith('out_time_us='):
+            value = line[len('out_time_us='):].strip()
+            if value.lstrip('-').isdigit():
+                duration = max(duration, int(value) / 1e6)
+                if progress is not None:
+                    progress(duration)
+            continue
+        match = _SILENCE_START.search(line)
+        if match:
+            silence_starts.append(max(0.0, float(match.group(1))))
+            continue
+        match = _SILENCE_END.search(line)
+        if match:
+            silence_ends.append(float(match.group(1)))
+            continue
+        match = _STAT.search(line)
+        if match:
+            stats[match.group(1)] = _db(match.group(2))
+    # 结尾的静音可能没有结束时间
+    if len(silence_ends) < len(silence_starts):
+        silence_ends.append(max(duration, silence_starts[-1]))
+    return np.array(silence_starts), np.array(silence_ends), duration, stats
+
+
+def invert(silence_starts, silence_ends, duration, min_segment=MIN_SEGMENT):
+    """静音区间取反，得到有声片段 (开始时间数组, 结束时间数组)"""
+    starts = np.concatenate(([0.0], silence_ends))
+    ends = np.concatenate((silence_starts, [duration]))
+    keep = ends - starts >= min_segment
+    return starts[keep], np.minimum(ends[keep], duration)
+
+
+def analyze(file_path, noise_db=NOISE_DB, min_silence=MIN_SILENCE,
+            min_segment=MIN_SEGMENT, stats=True, progress=None):
+    """分析音频，返回与 TimeCutter 兼容的结果
+
+    结果中 'segments' 为 [(文件, 开始时间数组, 结束时间数组)]；
+    电平统计以 RMS 峰值为 0 dB，与波形分析的相对电平一致。
+    progress: 可选回调，参数为已处理的时长（秒）。
+    """
+    with governor.instance().acquire(governor.BACKGROUND, name="快速分析") as lease:
+        process = subprocess.Popen(command(file_path, noise_db, min_silence, stats),
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                                   text=True, encoding='utf-8', errors='replace')
+        lease.attach(process)
+        try:
+            tail = []
+
+            def lines():
+                for line in process.stderr:
+                    tail.append(line)
+                    del tail[:-20]
+                    yield line
+
+            silence_starts, silence_ends, duration, levels = parse(lines(), progress)
+        finally:
+            process.stderr.close()
+            code = process.wait()
+            lease.detach(process)
+    if code != 0:
+        raise RuntimeError(''.join(tail).strip() or f"ffmpeg返回码 {code}")
+
+    starts, ends = invert(silence_starts, silence_ends, duration, min_segment)
+    peak = levels.get('RMS peak') or 0.0
+    trough = levels.get('RMS trough')
+    rms = levels.get('RMS level')
+    # 与波形分析一样限制在 TOP_DB 动态范围内
+    floor = -envelope.TOP_DB
+    return {
+        'engine': 'ffmpeg',
+        'duration': duration,
+        'silence_starts': silence_starts,
+        'silence_ends': silence_ends,
+        'segments': [(file_path, starts, ends)],
+        'noise_db': noise_db,
+        'peak_db': levels.get('Peak level'),
+        'min_db': max(trough - peak, floor) if trough is not None else floor,
+        'max_db': 0.0,
+        'mean_db': max(rms - peak, floor) if rms is not None else floor,
+    }
@@ -1,290 +1,367 @@
-from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
-                           QCheckBox, QPushButton, QFileDialog, QScrollArea, QSizePolicy, QListWidget, QListWidgetItem)
-from PyQt5.QtCore import Qt, pyqtSignal, QSize, QFileInfo
-from PyQt5.QtGui import QImage, QPixmap
-import cv2
-import os
-import wave
-import mutagen
-from mutagen.mp3 import MP3
-from mutagen.wave import WAVE
-
-class MediaInfo:
-    def __init__(self, file_path):
-        self.file_path = file_path
-        self.file_info = QFileInfo(file_path)
-        self.file_size = self.file_info.size()
-        self.format = self.file_info.suffix().lower()
-        self.duration = 0
-        self.width = 0
-        self.height = 0
-        self.fps = 0
-        self.is_video = False
-        self.thumbnail = None
-        
-        self._read_media_info()
-    
-    def _read_media_info(self):
-        """读取媒体文件信息"""
-        if self.format in ['mp4', 'avi', 'mkv', 'mpeg', 'mov']:
-            self._read_video_info()
-        elif self.format in ['wav', 'mp3', 'wma']:
-            self._read_audio_info()
-    
-    def _read_video_info(self):
-        """读取视频信息"""
-        try:
-            cap = cv2.VideoCapture(self.file_path)
-            if cap.isOpened():
-                self.is_video = True
-                self.width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-                self.height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-                self.fps = cap.get(cv2.CAP_PROP_FPS)
-                total_frames = cap.get(cv2.CAP_PROP_FRAME_COUNT)
-                self.duration = total_frames / self.fps if self.fps > 0 else 0
-                
-                # 读取缩略图
-                ret, frame = cap.read()
-                if ret:
-                    frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                    if self.width > self.height:
-                        self.thumbnail = cv2.resize(frame, (128, 72))
-                    else:
-                        self.thumbnail = cv2.resize(frame, (72, 128))
-            cap.release()
-        except Exception as e:
-            print(f"读取视频信息错误: {str(e)}")
-    
-    def _read_audio_info(self):
-        """读取音频信息"""
-        try:
-            if self.format == 'wav':
-                with wave.open(self.file_path, 'rb') as wav:
-                    frames = wav.getnframes()
-                    rate = wav.getframerate()
-                    self.duration = frames / float(rate)
-            elif self.format == 'mp3':
-                audio = MP3(self.file_path)
-                self.duration = audio.info.length
-            elif self.format == 'wma':
-                audio = mutagen.File(self.file_path)
-                if audio is not None:
-                    self.duration = audio.info.length
-        except Exception as e:
-            print(f"读取音频信息错误: {str(e)}")
-    
-    def get_formatted_size(self):
-        """返回格式化的文件大小"""
-        size_bytes = self.file_size
-        for unit in ['B', 'KB', 'MB', 'GB']:
-            if size_bytes < 1024:
-                return f"{size_bytes:.2f} {unit}"
-            size_bytes /= 1024
-        return f"{size_bytes:.2f} TB"
-    
-    def get_formatted_duration(self):
-        """返回格式化的时长"""
-        hours = int(self.duration // 3600)
-        minutes = int((self.duration % 3600) // 60)
-        seconds = int(self.duration % 60)
-        if hours > 0:
-            return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
-        return f"{minutes:02d}:{seconds:02d}"
-
-class SourceItem(QWidget):
-    """素材项组件"""
-    deleted = pyqtSignal(str)  # 发送删除信号，参数为文件路径
-    
-    def __init__(self, media_info, parent=None):
-        super().__init__(parent)
-        self.media_info = media_info
-        self.initUI()
-        
-    def initUI(self):
-        layout = QHBoxLayout(self)
-        layout.setContentsMargins(5, 5, 5, 5)
-        layout.setSpacing(10)
-        
-        # 缩略图
-        thumbnail_label = QLabel()
-        if self.media_info.is_video and self.media_info.thumbnail is not None:
-            h, w, ch = self.media_info.thumbnail.shape
-            img = QImage(self.media_info.thumbnail.data, w, h, w * 3, QImage.Format_RGB888)
-            pixmap = QPixmap.fromImage(img)
-        else:
-            # 为音频文件显示默认图标
-            pixmap = QPixmap("icons/audio.png")
-            if not QFileInfo("icons/audio.png").exists():
-                pixmap = QPixmap(72, 72)
-                pixmap.fill(Qt.lightGray)
-            pixmap = pixmap.scaled(72, 72, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-            
-        thumbnail_label.setPixmap(pixmap)
-        thumbnail_label.setFixedSize(pixmap.size())
-        thumbnail_label.setStyleSheet("QLabel { background-color: #f0f0f0; border: 1px solid #cccccc; }")
-        layout.addWidget(thumbnail_label)
-        
-        # 文件信息
-        info_layout = QVBoxLayout()
-        
-        # 文件名和删除按钮在同一行
-        name_layout = QHBoxLayout()
-        name_label = QLabel(os.path.basename(self.media_info.file_path))
-        name_label.setStyleSheet("QLabel { font-weight: bold; }")
-        name_layout.addWidget(name_label)
-        name_layout.addStretch()
-        
-        # 添加删除按钮
-        delete_btn = QPushButton("删除")
-        delete_btn.setFixedWidth(60)
-        delete_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #ff4444;
-                color: white;
-                border: none;
-                padding: 5px;
-                border-radius: 3px;
-            }
-            QPushButton:hover {
-                background-color: #ff6666;
-            }
-            QPushButton:pressed {
-                background-color: #cc0000;
-            }
-        """)
-        delete_btn.clicked.connect(lambda: self.deleted.emit(self.media_info.file_path))
-        name_layout.addWidget(delete_btn)
-        
-        info_layout.addLayout(name_layout)
-        
-        # 其他信息
-        info_text = (
-            f"格式: {self.media_info.format.upper()}\n"
-            f"大小: {self.media_info.get_formatted_size()}\n"
-            f"时长: {self.media_info.get_formatted_duration()}"
-        )
-        if self.media_info.is_video:
-            info_text += f"\n分辨率: {self.media_info.width}x{self.media_info.height}"
-            info_text += f"\n帧率: {self.media_info.fps:.2f}fps"
-            
-        info_label = QLabel(info_text)
-        info_label.setWordWrap(True)
-        info_label.setStyleSheet("QLabel { color: #666666; }")
-        info_layout.addWidget(info_label)
-        
-        layout.addLayout(info_layout, 1)
-        
-        # 勾选框
-        self.checkbox = QCheckBox()
-        self.checkbox.setStyleSheet("QCheckBox { margin: 5px; }")
-        layout.addWidget(self.checkbox)
-        
-        # 设置整体样式
-        self.setStyleSheet("""
-            QWidget {
-                background-color: #f8f8f8;
-                border: 1px solid #ddd;
-                border-radius: 4px;
-            }
-        """)
-        self.setMinimumHeight(90)
-
-class SourceInfo(QWidget):
-    source_selected = pyqtSignal(list)  # 发送选中的素材列表信号
-    
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
-        self.sources = []
-        self.initUI()
-        
-    def initUI(self):
-        main_layout = QVBoxLayout(self)
-        main_layout.setContentsMargins(0, 0, 0, 0)
-        main_layout.setSpacing(0)
-        
-        # 创建滚动区域
-        scroll = QScrollArea()
-        scroll.setWidgetResizable(True)
-        scroll.setHorizontalScrollBarPolicy(Qt.ScrollBarAsNeeded)
-        scroll.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
-        scroll.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
-        scroll.setStyleSheet("""
-            QScrollArea { 
-                background-color: white;
-                border: none;
-            }
-            QScrollBar:vertical {
-                width: 10px;
-            }
-            QScrollBar:horizontal {
-                height: 10px;
-            }
-        """)
-        
-        # 创建内容容器
-        self.content_widget = QWidget()
-        self.content_layout = QVBoxLayout(self.content_widget)
-        self.content_layout.setAlignment(Qt.AlignTop)
-        self.content_layout.setContentsMargins(5, 5, 5, 5)
-        self.content_layout.setSpacing(5)
-        
-        scroll.setWidget(self.content_widget)
-        main_layout.addWidget(scroll)
-    
-    @staticmethod
-    def get_media_filters():
-        """返回媒体文件过滤器"""
-        return "媒体文件 (*.mp4 *.avi *.mkv *.mpeg *.mov *.wav *.mp3 *.wma)"
-    
-    def add_source(self, file_path):
-        """添加新的素材"""
-        # 检查文件是否已经存在
-        if any(source.media_info.file_path == file_path for source in self.sources):
-            return False
-        
-        # 创建媒体信息对象
-        media_info = MediaInfo(file_path)
-        source_item = SourceItem(media_info)
-        self.sources.append(source_item)
-        self.content_layout.addWidget(source_item)
-        
-        # 连接信号
-        source_item.checkbox.stateChanged.connect(self.selection_changed)
-        source_item.deleted.connect(self.remove_source)  # 连接删除信号
-        return True
-    
-    def get_selected_sources(self):
-        """获取选中的素材列表"""
-        return [source.media_info.file_path for source in self.sources 
-                if source.checkbox.isChecked()]
-    
-    def get_selected_source_info(self):
-        """获取选中素材的详细信息"""
-        return [source.media_info for source in self.sources 
-                if source.checkbox.isChecked()]
-    
-    def selection_changed(self):
-        """当选择改变时发出信号"""
-        self.source_selected.emit(self.get_selected_sources())
-    
-    def clear_selection(self):
-        """清除所有选择"""
-        for source in self.sources:
-            source.checkbox.setChecked(False)
-    
-    def select_all(self):
-        """选择所有素材"""
-        for source in self.sources:
-            source.checkbox.setChecked(True)
-    
-    def remove_source(self, file_path):
-        """删除指定素材"""
-        for source in self.sources:
-            if source.media_info.file_path == file_path:
-                self.content_layout.removeWidget(source)
-                self.sources.remove(source)
-                source.deleteLater()
-                # 发出选择改变信号
-                self.selection_changed()
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
+                           QCheckBox, QPushButton, QFileDialog, QScrollArea, QSizePolicy, QListWidget, QListWidgetItem)
+from PyQt5.QtCore import Qt, pyqtSignal, QSize, QFileInfo, QTimer
+from PyQt5.QtGui import QImage, QPixmap
+import os
+import wave
+import lazyload
+import governor
+from thumbnails import ThumbnailLoader
+
+SOURCE_BATCH = 20  # 每次事件循环最多创建的素材项，大量导入时界面不会卡住
+
+class MediaInfo:
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.file_info = QFileInfo(file_path)
+        self.file_size = self.file_info.size()
+        self.format = self.file_info.suffix().lower()
+        self.duration = 0
+        self.width = 0
+        self.height = 0
+        self.fps = 0
+        self.is_video = False
+        self.thumbnail = None  # 由 SourceInfo 在后台解码后填入
+        
+        self._read_media_info()
+    
+    def _read_media_info(self):
+        """读取媒体文件信息"""
+        if self.format in ['mp4', 'avi', 'mkv', 'mpeg', 'mov']:
+            self._read_video_info()
+        elif self.format in ['wav', 'mp3', 'wma']:
+            self._read_audio_info()
+    
+    def _read_video_info(self):
+        """读取视频信息（只读取容器信息，不解码画面）
+
+        探测只占一个槽位、不申请内存，按交互优先级可以抢占其他工作，界面线程上直接等待租约。
+        """
+        try:
+            cv2 = lazyload.cv2()
+            with governor.instance().acquire(governor.INTERACTIVE, name="探测"):
+                cap = cv2.VideoCapture(self.file_path)
+                if cap.isOpened():
+                    self.is_video = True
+                    self.width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+                    self.height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+                    self.fps = cap.get(cv2.CAP_PROP_FPS)
+                    total_frames = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+                    self.duration = total_frames / self.fps if self.fps > 0 else 0
+                cap.release()
+        except Exception as e:
+            print(f"读取视频信息错误: {str(e)}")
+    
+    def _read_audio_info(self):
+        """读取音频信息"""
+        try:
+            if self.format == 'wav':
+                with wave.open(self.file_path, 'rb') as wav:
+                    frames = wav.getnframes()
+                    rate = wav.getframerate()
+                    self.duration = frames / float(rate)
+            elif self.format == 'mp3':
+                from mutagen.mp3 import MP3
+                audio = MP3(self.file_path)
+                self.duration = audio.info.length
+            elif self.format == 'wma':
+                import mutagen
+                audio = mutagen.File(self.file_path)
+                if audio is not None:
+                    self.duration = audio.info.length
+        except Exception as e:
+            print(f"读取音频信息错误: {str(e)}")
+    
+    def get_formatted_size(self):
+        """返回格式化的文件大小"""
+        size_bytes = self.file_size
+        for unit in ['B', 'KB', 'MB', 'GB']:
+            if size_bytes < 1024:
+                return f"{size_bytes:.2f} {unit}"
+            size_bytes /= 1024
+        return f"{size_bytes:.2f} TB"
+    
+    def get_formatted_duration(self):
+        """返回格式化的时长"""
+        hours = int(self.duration // 3600)
+        minutes = int((self.duration % 3600) // 60)
+        seconds = int(self.duration % 60)
+        if hours > 0:
+            return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+        return f"{minutes:02d}:{seconds:02d}"
+
+class SourceItem(QWidget):
+    """素材项组件"""
+    deleted = pyqtSignal(str)  # 发送删除信号，参数为文件路径
+    
+    def __init__(self, media_info, parent=None):
+        super().__init__(parent)
+        self.media_info = media_info
+        self.initUI()
+        
+    def initUI(self):
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(5, 5, 5, 5)
+        layout.setSpacing(10)
+        
+        # 缩略图（视频的缩略图解码完成前先显示占位图）
+        self.thumbnail_label = QLabel()
+        self.thumbnail_label.setStyleSheet("QLabel { background-color: #f0f0f0; border: 1px solid #cccccc; }")
+        self.set_thumbnail(self.media_info.thumbnail)
+        layout.addWidget(self.thumbnail_label)
+        
+        # 文件信息
+        info_layout = QVBoxLayout()
+        
+        # 文件名和删除按钮在同一行
+        name_layout = QHBoxLayout()
+        name_label = QLabel(os.path.basename(self.media_info.file_path))
+        name_label.setStyleSheet("QLabel { font-weight: bold; }")
+        name_layout.addWidget(name_label)
+        name_layout.addStretch()
+        
+        # 添加删除按钮
+        delete_btn = QPushButton("删除")
+        delete_btn.setFixedWidth(60)
+        delete_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #ff4444;
+                color: white;
+                border: none;
+                padding: 5px;
+                border-radius: 3px;
+            }
+            QPushButton:hover {
+                background-color: #ff6666;
+            }
+            QPushButton:pressed {
+                background-color: #cc0000;
+            }
+        """)
+        delete_btn.clicked.connect(lambda: self.deleted.emit(self.media_info.file_path))
+        name_layout.addWidget(delete_btn)
+        
+        info_layout.addLayout(name_layout)
+        
+        # 其他信息
+        info_text = (
+            f"格式: {self.media_info.format.upper()}\n"
+            f"大小: {self.media_info.get_formatted_size()}\n"
+            f"时长: {self.media_info.get_formatted_duration()}"
+        )
+        if self.media_info.is_video:
+            info_text += f"\n分辨率: {self.media_info.width}x{self.media_info.height}"
+            info_text += f"\n帧率: {self.media_info.fps:.2f}fps"
+            
+        info_label = QLabel(info_text)
+        info_label.setWordWrap(True)
+        info_label.setStyleSheet("QLabel { color: #666666; }")
+        info_layout.addWidget(info_label)
+        
+        # 代理生成状态
+        self.proxy_label = QLabel()
+        self.proxy_label.setStyleSheet("QLabel { color: #2196F3; }")
+        self.proxy_label.hide()
+        info_layout.addWidget(self.proxy_label)
+        
+        layout.addLayout(info_layout, 1)
+        
+        # 勾选框
+        self.checkbox = QCheckBox()
+        self.checkbox.setStyleSheet("QCheckBox { margin: 5px; }")
+        layout.addWidget(self.checkbox)
+        
+        # 设置整体样式
+        self.setStyleSheet("""
+            QWidget {
+                background-color: #f8f8f8;
+                border: 1px solid #ddd;
+                border-radius: 4px;
+            }
+        """)
+        self.setMinimumHeight(90)
+    
+    def set_thumbnail(self, thumbnail):
+        """显示缩略图，None 时显示占位图"""
+        if self.media_info.is_video and thumbnail is not None:
+            h, w, ch = thumbnail.shape
+            img = QImage(thumbnail.data, w, h, w * 3, QImage.Format_RGB888)
+            pixmap = QPixmap.fromImage(img)
+        elif self.media_info.is_video:
+            pixmap = QPixmap(128, 72)
+            pixmap.fill(Qt.lightGray)
+        else:
+            # 为音频文件显示默认图标
+            pixmap = QPixmap("icons/audio.png")
+            if not QFileInfo("icons/audio.png").exists():
+                pixmap = QPixmap(72, 72)
+                pixmap.fill(Qt.lightGray)
+            pixmap = pixmap.scaled(72, 72, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        self.thumbnail_label.setPixmap(pixmap)
+        self.thumbnail_label.setFixedSize(pixmap.size())
+    
+    def set_proxy_status(self, text):
+        """显示代理生成状态"""
+        self.proxy_label.setText(text)
+        self.proxy_label.setVisible(bool(text))
+
+class SourceInfo(QWidget):
+    source_selected = pyqtSignal(list)  # 发送选中的素材列表信号
+    source_added = pyqtSignal(str)      # 素材项创建完成（已读取媒体信息）
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.sources = []
+        self._paths = set()  # 已添加（含等待创建）的素材路径
+        self._queued = []    # 等待创建素材项的路径
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.timeout.connect(self._create_queued)
+        self.thumbnail_loader = ThumbnailLoader(self)
+        self.thumbnail_loader.ready.connect(self._on_thumbnail_ready)
+        self.initUI()
+        
+    def initUI(self):
+        main_layout = QVBoxLayout(self)
+        main_layout.setContentsMargins(0, 0, 0, 0)
+        main_layout.setSpacing(0)
+        
+        # 创建滚动区域
+        scroll = QScrollArea()
+        scroll.setWidgetResizable(True)
+        scroll.setHorizontalScrollBarPolicy(Qt.ScrollBarAsNeeded)
+        scroll.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
+        scroll.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        scroll.setStyleSheet("""
+            QScrollArea { 
+                background-color: white;
+                border: none;
+            }
+            QScrollBar:vertical {
+                width: 10px;
+            }
+            QScrollBar:horizontal {
+                height: 10px;
+            }
+        """)
+        
+        # 创建内容容器
+        self.content_widget = QWidget()
+        self.content_layout = QVBoxLayout(self.content_widget)
+        self.content_layout.setAlignment(Qt.AlignTop)
+        self.content_layout.setContentsMargins(5, 5, 5, 5)
+        self.content_layout.setSpacing(5)
+        
+        scroll.setWidget(self.content_widget)
+        main_layout.addWidget(scroll)
+    
+    @staticmethod
+    def get_media_filters():
+        """返回媒体文件过滤器"""
+        return "媒体文件 (*.mp4 *.avi *.mkv *.mpeg *.mov *.wav *.mp3 *.wma)"
+    
+    def add_source(self, file_path):
+        """添加新的素材
+
+        只登记路径，素材项在之后的事件循环中分批创建，创建后发出 source_added；
+        缩略图在后台解码。文件已存在时返回False。
+        """
+        # 检查文件是否已经存在
+        if file_path in self._paths:
+            return False
+        self._paths.add(file_path)
+        self._queued.append(file_path)
+        if not self._flush_timer.isActive():
+            self._flush_timer.start(0)
+        return True
+    
+    def is_loading(self):
+        """是否还有素材项或缩略图没有完成"""
+        return bool(self._queued) or self.thumbnail_loader.pending()
+    
+    def _create_queued(self):
+        """创建一批等待中的素材项，还有剩余时留到下一次事件循环"""
+        batch, self._queued = self._queued[:SOURCE_BATCH], self._queued[SOURCE_BATCH:]
+        for file_path in batch:
+            # 创建媒体信息对象
+            media_info = MediaInfo(file_path)
+            source_item = SourceItem(media_info)
+            self.sources.append(source_item)
+            self.content_layout.addWidget(source_item)
+            
+            # 连接信号
+            source_item.checkbox.stateChanged.connect(self.selection_changed)
+            source_item.deleted.connect(self.remove_source)  # 连接删除信号
+            if media_info.is_video:
+                self.thumbnail_loader.request(file_path, file_path)
+            self.source_added.emit(file_path)
+        if self._queued:
+            self._flush_timer.start(0)
+    
+    def _on_thumbnail_ready(self, file_path, thumbnail):
+        source = self.find_source(file_path)
+        if source is not None:
+            source.media_info.thumbnail = thumbnail
+            source.set_thumbnail(thumbnail)
+    
+    def get_selected_sources(self):
+        """获取选中的素材列表"""
+        return [source.media_info.file_path for source in self.sources 
+                if source.checkbox.isChecked()]
+    
+    def get_selected_source_info(self):
+        """获取选中素材的详细信息"""
+        return [source.media_info for source in self.sources 
+                if source.checkbox.isChecked()]
+    
+    def selection_changed(self):
+        """当选择改变时发出信号"""
+        self.source_selected.emit(self.get_selected_sources())
+    
+    def clear_selection(self):
+        """清除所有选择"""
+        for source in self.sources:
+            source.checkbox.setChecked(False)
+    
+    def select_all(self):
+        """选择所有素材"""
+        for source in self.sources:
+            source.checkbox.setChecked(True)
+    
+    def find_source(self, file_path):
+        """按文件路径查找素材项"""
+        for source in self.sources:
+            if source.media_info.file_path == file_path:
+                return source
+        return None
+    
+    def set_proxy_progress(self, file_path, percent):
+        """更新素材的代理生成进度"""
+        source = self.find_source(file_path)
+        if source is not None:
+            if percent >= 100:
+                source.set_proxy_status("代理: 已就绪")
+            else:
+                source.set_proxy_status(f"代理: 生成中 {percent}%")
+    
+    def set_proxy_failed(self, file_path, message):
+        """显示代理生成失败"""
+        source = self.find_source(file_path)
+        if source is not None:
+            source.set_proxy_status("代理: 生成失败")
+            source.proxy_label.setToolTip(message)
+    
+    def remove_source(self, file_path):
+        """删除指定素材"""
+        self._paths.discard(file_path)
+        if file_path in self._queued:
+            self._queued.remove(file_path)
+        for source in self.sources:
+            if source.media_info.file_path == file_path:
+                self.content_layout.removeWidget(source)
+                self.sources.remove(source)
+                source.deleteLater()
+                # 发出选择改变信号
+                self.selection_changed()
                 break 
\ No newline at end of file
@@ -0,0 +1,213 @@
+"""分块延迟计算的频谱图
+
+不预先计算整段音频的 STFT。时间轴按缩放级别分成固定宽度的图块：
+级别 0 每列 HOP 个采样点，每升一级每列时长加倍。只有可见范围内的图块
+才会在后台线程中计算，每列取列内最多 MAX_FRAMES 个均匀分布的窗口做 FFT，
+功率取平均，计算量只与屏幕像素数有关，与音频总长度无关。
+
+渲染好的图块（QImage）保存在 LRU 缓存中；尚未算好的图块先用上一级
+（更粗）的图块放大顶替，算好后再替换。
+"""
+from PyQt5.QtCore import QObject, pyqtSignal
+from PyQt5.QtGui import QImage
+from collections import OrderedDict
+import math
+import threading
+
+import numpy as np
+import governor
+
+N_FFT = 1024          # FFT 窗长（采样点）
+HOP = 256             # 级别 0 每列的采样点数
+TILE_COLUMNS = 256    # 每个图块的列数
+TILE_ROWS = 128       # 每个图块的行数（频率）
+MAX_FRAMES = 8        # 每列最多计算的窗口数
+MIN_FREQ = 50.0       # 纵轴最低频率（Hz），纵轴按对数刻度
+TOP_DB = 80.0         # 显示的动态范围（dB，以满刻度正弦波为 0 dB）
+CACHE_TILES = 256     # LRU 缓存的图块数（每块 128KB）
+TILE_MEMORY_MB = 32   # 计算一个图块时的临时内存（MB）
+
+# 颜色表锚点（近似 inferno），从静到响
+_ANCHORS = np.array([
+    [0, 0, 4], [40, 11, 84], [101, 21, 110], [159, 42, 99],
+    [212, 72, 66], [245, 125, 21], [250, 193, 39], [252, 255, 164],
+], dtype=np.float64)
+
+
+def _colormap():
+    """256 级颜色表，ARGB32 格式"""
+    positions = np.linspace(0, 1, len(_ANCHORS))
+    x = np.linspace(0, 1, 256)
+    rgb = np.stack([np.interp(x, positions, _ANCHORS[:, c]) for c in range(3)], axis=1)
+    rgb = rgb.round().astype(np.uint32)
+    return (0xFF000000 | (rgb[:, 0] << 16) | (rgb[:, 1] << 8) | rgb[:, 2]).astype(np.uint32)
+
+
+COLORMAP = _colormap()
+
+
+def seconds_per_column(level, sr):
+    return HOP * (2 ** level) / sr
+
+
+def tile_seconds(level, sr):
+    """一个图块覆盖的时长（秒）"""
+    return TILE_COLUMNS * seconds_per_column(level, sr)
+
+
+def level_for(view_seconds_per_pixel, sr, max_level):
+    """显示比例对应的缩放级别：每列时长不超过每像素时长的最粗级别"""
+    if view_seconds_per_pixel <= seconds_per_column(0, sr):
+        return 0
+    level = int(math.floor(math.log2(view_seconds_per_pixel / seconds_per_column(0, sr))))
+    return min(max(level, 0), max_level)
+
+
+def max_level(duration, sr):
+    """整段音频放进一个图块所需的级别"""
+    if duration <= tile_seconds(0, sr):
+        return 0
+    return int(math.ceil(math.log2(duration / tile_seconds(0, sr))))
+
+
+def _row_bins(sr):
+    """每一行（自上而下）对应的 FFT 频点，对数刻度"""
+    nyquist = sr / 2
+    freqs = np.geomspace(nyquist, min(MIN_FREQ, nyquist / 2), TILE_ROWS)
+    return np.clip(np.round(freqs / nyquist * (N_FFT // 2)).astype(np.int64), 0, N_FFT // 2)
+
+
+def compute_tile(y, sr, level, index):
+    """计算一个图块，返回 (TILE_ROWS, TILE_COLUMNS) 的 dB 数组
+
+    y 为单声道数组或 PcmView；只读取列内窗口覆盖的采样点。
+    """
+    n = len(y)
+    column = HOP * (2 ** level)
+    frames = max(1, min(MAX_FRAMES, column // HOP))
+    first = index * TILE_COLUMNS * column
+    # 各列内窗口的中心采样点
+    offsets = (np.arange(frames) + 0.5) * column / frames
+    centers = (first + np.arange(TILE_COLUMNS)[:, None] * column + offsets[None, :]).astype(np.int64)
+    valid = centers < n
+    db = np.full((TILE_ROWS, TILE_COLUMNS), -TOP_DB, dtype=np.float32)
+    if not valid.any():
+        return db
+
+    # 读取覆盖全部窗口的连续区间（相邻列的窗口重叠时只读一次）
+    lo = max(int(centers[valid].min()) - N_FFT // 2, 0)
+    hi = min(int(centers[valid].max()) + N_FFT // 2, n)
+    window = np.hanning(N_FFT).astype(np.float32)
+    starts = centers - N_FFT // 2
+    needed = frames * TILE_COLUMNS * N_FFT
+    if hi - lo <= 2 * needed:
+        samples = np.asarray(y[lo:hi], dtype=np.float32)
+        positions = starts[:, :, None] - lo + np.arange(N_FFT)
+        inside = (positions >= 0) & (positions < len(samples))
+        segments = np.where(inside, samples[np.clip(positions, 0, max(len(samples) - 1, 0))], 0.0)
+    else:
+        # 粗级别：窗口之间相隔很远，逐个读取窗口
+        segments = np.zeros(starts.shape + (N_FFT,), dtype=np.float32)
+        for c, f in zip(*np.nonzero(valid)):
+            a = int(starts[c, f])
+            piece = np.asarray(y[max(a, 0):min(a + N_FFT, n)], dtype=np.float32)
+            segments[c, f, max(-a, 0):max(-a, 0) + len(piece)] = piece
+
+    spectrum = np.fft.rfft(segments * window, axis=-1)
+    power = spectrum.real ** 2 + spectrum.imag ** 2
+    power = np.where(valid[:, :, None], power, 0.0).sum(axis=1)
+    power /= np.maximum(valid.sum(axis=1), 1)[:, None]
+    # 满刻度正弦波的峰值功率为 (窗口和 / 2)^2
+    reference = (window.sum() / 2) ** 2
+    columns_db = 10 * np.log10(np.maximum(power / reference, 1e-12))
+    db[:] = np.maximum(columns_db[:, _row_bins(sr)].T, -TOP_DB)
+    db[:, ~valid.any(axis=1)] = -TOP_DB
+    return db
+
+
+def render_tile(db):
+    """dB 数组转换为 QImage"""
+    levels = np.clip((db + TOP_DB) / TOP_DB * 255, 0, 255).astype(np.uint8)
+    pixels = np.ascontiguousarray(COLORMAP[levels])
+    height, width = pixels.shape
+    return QImage(pixels.data, width, height, width * 4, QImage.Format_ARGB32).copy()
+
+
+class SpectrogramTiles(QObject):
+    """后台计算并缓存频谱图块
+
+    request 传入当前需要的图块，替换之前尚未开始的请求，
+    滚动或缩放时不会积压已经看不到的图块。
+    """
+    tile_ready = pyqtSignal(int, int)  # 级别, 序号
+
+    def __init__(self, capacity=CACHE_TILES, parent=None):
+        super().__init__(parent)
+        self.capacity = capacity
+        self.y = None
+        self.sr = None
+        self._tiles = OrderedDict()  # (级别, 序号) -> QImage
+        self._wanted = []
+        self._generation = 0
+        self._condition = threading.Condition()
+        self._worker = None
+
+    def set_source(self, y, sr):
+        """设置音频（None 表示清空），丢弃全部缓存"""
+        with self._condition:
+            self.y = y
+            self.sr = sr
+            self._tiles.clear()
+            self._wanted = []
+            self._generation += 1
+
+    @property
+    def duration(self):
+        return len(self.y) / self.sr if self.y is not None else 0.0
+
+    def get(self, level, index):
+        """已缓存的图块，没有时返回None"""
+        with self._condition:
+            image = self._tiles.get((level, index))
+            if image is not None:
+                self._tiles.move_to_end((level, index))
+            return image
+
+    def request(self, keys):
+        """请求计算图块（按传入顺序），已缓存的忽略"""
+        with self._condition:
+            if self.y is None:
+                return
+            self._wanted = [key for key in keys if key not in self._tiles]
+            if not self._wanted:
+                return
+            self._condition.notify()
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        """后台线程：依次计算请求的图块，空闲一段时间后退出"""
+        while True:
+            with self._condition:
+                if not self._wanted:
+                    self._condition.wait(timeout=1)
+                    if not self._wanted:
+                        self._worker = None
+                        return
+                key = self._wanted.pop(0)
+                y, sr, generation = self.y, self.sr, self._generation
+            try:
+                with governor.instance().acquire(governor.INTERACTIVE, memory_mb=TILE_MEMORY_MB,
+                                                 name="频谱图"):
+                    image = render_tile(compute_tile(y, sr, *key))
+            except Exception as e:
+                print(f"频谱图计算错误: {str(e)}")
+                continue
+            with self._condition:
+                if generation != self._generation:
+                    continue
+                self._tiles[key] = image
+                while len(self._tiles) > self.capacity:
+                    self._tiles.popitem(last=False)
+            self.tile_ready.emit(*key)
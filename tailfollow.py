@@ -0,0 +1,391 @@
+"""跟随录音的增量分析
+
+直播或长时间录音写入磁盘的同时就开始分析，录音一停止粗剪结果就已就绪。
+数据来源：
+  - 正在写入的 WAV：解析文件头后按文件偏移只读取新增的数据；
+  - 其他容器（MKV 等）：ffmpeg 的 file 协议 follow 模式持续读取新增内容并解码；
+  - 标准输入上的原始 PCM。
+每块新数据与上一块留下的帧重叠部分（帧长减步长以内的尾部采样点，保存在内存中）
+拼接后计算 RMS 包络，已处理的数据不会再次读取。
+
+剪辑规则与电平范围剪辑相同（帧长 256、步长 64、短于 MAX_SILENCE 的空白并入片段、
+短于 MIN_SEGMENT 的片段丢弃），但电平是相对满刻度的绝对电平（dBFS）：录音还没
+结束，无法以最响一帧为 0 dB。片段之后出现足够长的静音即为最终结果并立即发出，
+延迟不超过 MAX_SILENCE + CHUNK_SECONDS + POLL_INTERVAL（加上录音程序自身的写入缓冲）。
+录音持续 IDLE_TIMEOUT 秒没有增长（或标准输入结束）时视为结束，输出最后的片段。
+
+命令行：
+    python tailfollow.py 录音.wav [--min-db -40]
+    arecord -f S16_LE -r 44100 -c 1 -t raw | python tailfollow.py - --sr 44100
+"""
+from PyQt5.QtCore import QObject, pyqtSignal
+import argparse
+import os
+import struct
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+import envelope
+import governor
+from levelstats import DbHistogram
+
+FRAME_LENGTH = 256     # 与电平范围剪辑相同的帧长
+HOP_LENGTH = 64        # 与电平范围剪辑相同的步长
+NOISE_DB = -40.0       # 默认电平下限（dBFS）
+MAX_SILENCE = 0.05     # 短于此时长（秒）的空白并入片段
+MIN_SEGMENT = 0.1      # 最小有效片段时长（秒）
+CHUNK_SECONDS = 1.0    # 每次最多分析的时长（秒）
+POLL_INTERVAL = 0.25   # 没有新数据时的等待间隔（秒）
+IDLE_TIMEOUT = 5.0     # 录音停止增长多久后视为结束（秒）
+SAMPLE_RATE = 44100    # 经 ffmpeg 解码时的采样率
+
+# 原始 PCM 格式 -> numpy 类型
+PCM_FORMATS = {'s16le': '<i2', 's32le': '<i4', 'f32le': '<f4'}
+
+
+def _to_float(data, dtype):
+    """整数采样转换为 [-1, 1) 的 float32"""
+    samples = np.frombuffer(data, dtype=dtype)
+    if samples.dtype.kind == 'f':
+        return samples.astype(np.float32, copy=False)
+    return samples.astype(np.float32) / float(2 ** (8 * samples.dtype.itemsize - 1))
+
+
+class PcmTail:
+    """从流中读取交错的原始 PCM，混为单声道"""
+    def __init__(self, stream, sr, channels=1, sample_format='s16le'):
+        self.stream = stream
+        self.sr = sr
+        self.channels = channels
+        self.dtype = np.dtype(PCM_FORMATS[sample_format])
+        self.frame_bytes = self.dtype.itemsize * channels
+        self.bytes_read = 0  # 读取的音频数据字节数
+        self._partial = b''  # 不足一个采样帧的字节
+
+    def _mix(self, data):
+        self.bytes_read += len(data)
+        data = self._partial + data
+        usable = len(data) // self.frame_bytes * self.frame_bytes
+        self._partial = data[usable:]
+        samples = _to_float(data[:usable], self.dtype)
+        if self.channels > 1:
+            samples = samples.reshape(-1, self.channels).mean(axis=1)
+        return samples
+
+    def read(self, max_frames):
+        """读取可用的数据（最多 max_frames 帧），流结束时返回None"""
+        data = os.read(self.stream.fileno(), max_frames * self.frame_bytes)
+        if not data:
+            return None
+        return self._mix(data)
+
+    def interrupt(self):
+        """让阻塞中的 read 尽快返回（其他线程调用）"""
+
+    def close(self):
+        pass
+
+
+class WavTail(PcmTail):
+    """跟随正在写入的 WAV 文件
+
+    录音程序通常在结束时才写入正确的数据长度，因此忽略文件头中的长度，
+    只按文件当前大小读取；文件持续 idle_timeout 秒没有增长时视为结束。
+    """
+    def __init__(self, file_path, idle_timeout=IDLE_TIMEOUT):
+        self.file_path = file_path
+        self.idle_timeout = idle_timeout
+        self.file = open(file_path, 'rb')
+        self.sr = None
+        self.data_offset = None
+        self.last_growth = time.monotonic()
+        self.bytes_read = 0
+
+    def _parse_header(self):
+        """解析 fmt 与 data 块的位置，文件头还没写完时返回False"""
+        self.file.seek(0)
+        header = self.file.read(12)
+        if len(header) < 12:
+            return False
+        if header[:4] not in (b'RIFF', b'RF64') or header[8:12] != b'WAVE':
+            raise ValueError("不是WAV文件")
+        fmt = None
+        offset = 12
+        while True:
+            self.file.seek(offset)
+            chunk = self.file.read(8)
+            if len(chunk) < 8:
+                return False
+            chunk_id, size = chunk[:4], struct.unpack('<I', chunk[4:])[0]
+            if chunk_id == b'fmt ':
+                fmt = self.file.read(size)
+                if len(fmt) < size:
+                    return False
+            elif chunk_id == b'data':
+                break
+            offset += 8 + size + (size & 1)
+        if fmt is None:
+            raise ValueError("WAV文件缺少fmt块")
+        tag, channels, sr = struct.unpack('<HHI', fmt[:8])
+        bits = struct.unpack('<H', fmt[14:16])[0]
+        if tag == 0xFFFE and len(fmt) >= 26:
+            tag = struct.unpack('<H', fmt[24:26])[0]  # WAVE_FORMAT_EXTENSIBLE 的子格式
+        formats = {(1, 16): 's16le', (1, 32): 's32le', (3, 32): 'f32le'}
+        if (tag, bits) not in formats:
+            raise ValueError(f"不支持的WAV格式（格式 {tag}，{bits} 位）")
+        PcmTail.__init__(self, self.file, sr, channels, formats[(tag, bits)])
+        self.data_offset = offset + 8
+        self.file.seek(self.data_offset)
+        return True
+
+    def read(self, max_frames):
+        if self.data_offset is None and not self._parse_header():
+            return self._idle()
+        data = self.file.read(max_frames * self.frame_bytes)
+        if not data:
+            return self._idle()
+        self.last_growth = time.monotonic()
+        return self._mix(data)
+
+    def _idle(self):
+        """没有新数据：超时后返回None，否则返回空数组"""
+        if time.monotonic() - self.last_growth >= self.idle_timeout:
+            return None
+        return np.zeros(0, dtype=np.float32)
+
+    def close(self):
+        self.file.close()
+
+
+class FfmpegTail(PcmTail):
+    """用 ffmpeg 的 follow 模式跟随其他容器格式的录音（解码为单声道 float32）"""
+    def __init__(self, file_path, sr=SAMPLE_RATE, idle_timeout=IDLE_TIMEOUT, lease=None):
+        command = ['ffmpeg', '-v', 'error', '-nostdin',
+                   '-follow', '1', '-rw_timeout', str(int(idle_timeout * 1e6)),
+                   '-i', file_path, '-vn', '-f', 'f32le', '-ac', '1', '-ar', str(sr), 'pipe:1']
+        self.process = subprocess.Popen(command, stdout=subprocess.PIPE,
+                                        stderr=subprocess.DEVNULL)
+        self.lease = lease
+        if lease is not None:
+            lease.attach(self.process)
+        super().__init__(self.process.stdout, sr, 1, 'f32le')
+
+    def interrupt(self):
+        self.process.kill()
+
+    def close(self):
+        if self.lease is not None:
+            self.lease.detach(self.process)
+        self.process.kill()
+        self.process.wait()
+        self.process.stdout.close()
+
+
+class IncrementalCutter:
+    """逐块计算 RMS 包络并切分片段，只输出已经确定的片段"""
+    def __init__(self, sr, min_db=NOISE_DB, max_db=0.0, frame_length=FRAME_LENGTH,
+                 hop_length=HOP_LENGTH, max_silence=MAX_SILENCE, min_segment=MIN_SEGMENT):
+        self.sr = sr
+        self.min_db = min_db
+        self.max_db = max_db
+        self.frame_length = frame_length
+        self.hop_length = hop_length
+        self.frames_per_second = sr / hop_length
+        self.max_gap = max(1, int(max_silence * self.frames_per_second))
+        self.min_frames = int(min_segment * self.frames_per_second)
+        # 与 center=True 一样在开头补半帧零
+        self.carry = np.zeros(frame_length // 2, dtype=np.float32)
+        self.frames = 0     # 已计算的帧数
+        self.samples = 0    # 已读取的采样点数
+        self.run = None     # 尚未结束的片段 [第一帧, 最后一帧]
+        self.histogram = DbHistogram()
+
+    @property
+    def duration(self):
+        return self.samples / self.sr
+
+    def feed(self, samples):
+        """加入新的采样点，返回新确定的片段 (开始时间数组, 结束时间数组)"""
+        self.samples += len(samples)
+        return self._process(samples, final=False)
+
+    def finish(self):
+        """数据结束：与 center=True 一样在末尾补半帧零，输出剩余的片段"""
+        return self._process(np.zeros(self.frame_length // 2, dtype=np.float32), final=True)
+
+    def _process(self, samples, final):
+        buffer = np.concatenate((self.carry, np.asarray(samples, dtype=np.float32)))
+        count = envelope.frame_count(len(buffer), self.frame_length, self.hop_length, center=False)
+        valid = np.zeros(0, dtype=np.int64)
+        if count > 0:
+            values = envelope.rms(buffer, self.frame_length, self.hop_length, center=False)
+            db = 20.0 * np.log10(np.maximum(values, envelope.AMIN))
+            self.histogram.add(db)
+            valid = np.flatnonzero((db >= self.min_db) & (db <= self.max_db)) + self.frames
+            # 下一帧从 count * hop 开始，之前的采样点不再需要
+            self.carry = buffer[count * self.hop_length:]
+            self.frames += count
+        else:
+            self.carry = buffer
+        return self._segments(valid, final)
+
+    def _segments(self, valid, final):
+        """把有效帧并入片段，返回已结束且足够长的片段"""
+        if self.run is not None:
+            valid = np.concatenate(([self.run[1]], valid))
+        if len(valid) == 0:
+            return np.zeros(0), np.zeros(0)
+        split = np.flatnonzero(np.diff(valid) - 1 >= self.max_gap)
+        firsts = valid[np.concatenate(([0], split + 1))]
+        lasts = valid[np.concatenate((split, [len(valid) - 1]))]
+        if self.run is not None:
+            firsts[0] = self.run[0]
+        # 最后一个片段之后的静音还不够长时，片段可能继续
+        trailing = self.frames - 1 - lasts[-1]
+        if final:
+            if trailing < self.max_gap:
+                lasts[-1] = self.frames
+            self.run = None
+        elif trailing < self.max_gap:
+            self.run = [int(firsts[-1]), int(lasts[-1])]
+            firsts, lasts = firsts[:-1], lasts[:-1]
+        else:
+            self.run = None
+        keep = lasts - firsts >= self.min_frames
+        return firsts[keep] / self.frames_per_second, lasts[keep] / self.frames_per_second
+
+
+def open_tail(file_path, sr=SAMPLE_RATE, channels=1, sample_format='s16le',
+              idle_timeout=IDLE_TIMEOUT, lease=None):
+    """按来源选择读取方式：'-' 为标准输入上的原始 PCM"""
+    if file_path == '-':
+        return PcmTail(sys.stdin.buffer, sr, channels, sample_format)
+    if file_path.lower().endswith('.wav'):
+        return WavTail(file_path, idle_timeout)
+    return FfmpegTail(file_path, sr, idle_timeout, lease)
+
+
+class TailFollower(QObject):
+    """在后台线程中跟随录音，发出已确定的片段"""
+    segments_ready = pyqtSignal(str, object, object)  # 文件, 开始时间数组, 结束时间数组
+    progress = pyqtSignal(str, float)                 # 文件, 已分析的时长（秒）
+    finished = pyqtSignal(str)
+    failed = pyqtSignal(str, str)                     # 文件, 错误信息
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.file_path = None
+        self.cutter = None
+        self.bytes_read = 0  # 上一次跟随读取的音频数据字节数
+        self._stop = threading.Event()
+        self._worker = None
+        self._tail = None
+
+    @property
+    def active(self):
+        return self._worker is not None and self._worker.is_alive()
+
+    def start(self, file_path, min_db=NOISE_DB, max_db=0.0, idle_timeout=IDLE_TIMEOUT):
+        """开始跟随（之前的跟随先停止）"""
+        self.stop()
+        self.file_path = file_path
+        self.cutter = None
+        self.bytes_read = 0
+        self._stop = threading.Event()
+        self._worker = threading.Thread(
+            target=self._run, args=(file_path, min_db, max_db, idle_timeout, self._stop),
+            daemon=True)
+        self._worker.start()
+
+    def stop(self):
+        """停止跟随，已确定的片段保留"""
+        self._stop.set()
+        tail = self._tail
+        if tail is not None:
+            tail.interrupt()
+        if self._worker is not None:
+            self._worker.join()
+            self._worker = None
+
+    def _run(self, file_path, min_db, max_db, idle_timeout, stop):
+        lease = None
+        tail = None
+        try:
+            if not file_path.lower().endswith('.wav'):
+                # 解码进程在整个录音期间运行，作为后台工作调度
+                lease = governor.instance().acquire(governor.BACKGROUND, name="跟随录音")
+            tail = self._tail = open_tail(file_path, idle_timeout=idle_timeout, lease=lease)
+            while not stop.is_set():
+                if tail.sr is None:
+                    samples = tail.read(0)  # WAV 文件头还没写完
+                else:
+                    samples = tail.read(int(CHUNK_SECONDS * tail.sr))
+                if samples is None:
+                    break
+                if len(samples) == 0:
+                    stop.wait(POLL_INTERVAL)
+                    continue
+                if self.cutter is None or self.cutter.sr != tail.sr:
+                    self.cutter = IncrementalCutter(tail.sr, min_db, max_db)
+                starts, ends = self.cutter.feed(samples)
+                if len(starts):
+                    self.segments_ready.emit(file_path, starts, ends)
+                self.progress.emit(file_path, self.cutter.duration)
+            if self.cutter is not None:
+                starts, ends = self.cutter.finish()
+                if len(starts):
+                    self.segments_ready.emit(file_path, starts, ends)
+            self.finished.emit(file_path)
+        except Exception as e:
+            self.failed.emit(file_path, str(e))
+        finally:
+            self._tail = None
+            if tail is not None:
+                self.bytes_read = tail.bytes_read
+                tail.close()
+            if lease is not None:
+                lease.release()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="跟随录音并输出已确定的片段")
+    parser.add_argument('source', help="录音文件，'-' 表示标准输入上的原始PCM")
+    parser.add_argument('--min-db', type=float, default=NOISE_DB, help="电平下限（dBFS）")
+    parser.add_argument('--max-db', type=float, default=0.0, help="电平上限（dBFS）")
+    parser.add_argument('--idle-timeout', type=float, default=IDLE_TIMEOUT,
+                        help="录音停止增长多久后结束（秒）")
+    parser.add_argument('--sr', type=int, default=SAMPLE_RATE, help="标准输入PCM的采样率")
+    parser.add_argument('--channels', type=int, default=1, help="标准输入PCM的声道数")
+    parser.add_argument('--format', choices=sorted(PCM_FORMATS), default='s16le',
+                        help="标准输入PCM的采样格式")
+    args = parser.parse_args()
+
+    tail = open_tail(args.source, args.sr, args.channels, args.format, args.idle_timeout)
+    cutter = None
+    try:
+        while True:
+            samples = tail.read(int(CHUNK_SECONDS * tail.sr) if tail.sr else 0)
+            if samples is None:
+                break
+            if len(samples) == 0:
+                time.sleep(POLL_INTERVAL)
+                continue
+            if cutter is None:
+                cutter = IncrementalCutter(tail.sr, args.min_db, args.max_db)
+            for start, end in zip(*cutter.feed(samples)):
+                print(f"{start:.3f}\t{end:.3f}", flush=True)
+        if cutter is not None:
+            for start, end in zip(*cutter.finish()):
+                print(f"{start:.3f}\t{end:.3f}", flush=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        tail.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""后台缩略图解码
+
+界面线程只登记请求，解码在后台线程中依次进行，完成后用信号送回界面线程，
+导入素材或剪出大量片段时界面不会因为逐个解码缩略图而卡住。
+同一素材连续的请求复用已打开的解码器；每次解码按交互优先级向调度器申请租约。
+"""
+from PyQt5.QtCore import QObject, pyqtSignal
+import queue
+import threading
+
+import lazyload
+import governor
+
+THUMBNAIL_SIZE = (128, 72)  # 横向画面的尺寸，竖向画面宽高互换
+
+
+def read_thumbnail(cap, time=None):
+    """从已打开的解码器读取一帧并缩小，time 为 None 时读取当前位置，失败返回None"""
+    cv2 = lazyload.cv2()
+    if time is not None:
+        cap.set(cv2.CAP_PROP_POS_MSEC, time * 1000)
+    ret, frame = cap.read()
+    if not ret:
+        return None
+    frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    h, w = frame.shape[:2]
+    width, height = THUMBNAIL_SIZE
+    return cv2.resize(frame, (width, height) if w > h else (height, width))
+
+
+class ThumbnailLoader(QObject):
+    """后台解码缩略图的队列"""
+    ready = pyqtSignal(object, object)  # 请求的键, 缩略图（RGB数组）
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._jobs = queue.Queue()
+        self._lock = threading.Lock()
+        self._generation = 0  # cancel 后递增，丢弃之前的请求
+        self._pending = 0
+        self._worker = None
+
+    def request(self, key, file_path, time=None):
+        """请求 file_path 在 time 秒处（None 为第一帧）的缩略图，完成后以 key 发出 ready 信号"""
+        with self._lock:
+            self._pending += 1
+            self._jobs.put((self._generation, key, file_path, time))
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, daemon=True)
+                self._worker.start()
+
+    def cancel(self):
+        """丢弃尚未完成的请求"""
+        with self._lock:
+            self._generation += 1
+
+    def pending(self):
+        """是否还有未完成的请求"""
+        with self._lock:
+            return self._pending > 0
+
+    def _current(self, generation):
+        with self._lock:
+            return generation == self._generation
+
+    def _run(self):
+        """后台线程：依次解码队列中的请求，同一素材连续的请求共用一个解码器"""
+        cv2 = lazyload.cv2()
+        cap, cap_path = None, None
+        try:
+            while True:
+                try:
+                    generation, key, file_path, time = self._jobs.get(timeout=1)
+                except queue.Empty:
+                    with self._lock:
+                        if self._jobs.empty():
+                            self._worker = None
+                            return
+                    continue
+                try:
+                    if not self._current(generation):
+                        continue
+                    with governor.instance().acquire(governor.INTERACTIVE, name="缩略图"):
+                        if cap_path != file_path:
+                            if cap is not None:
+                                cap.release()
+                            cap, cap_path = cv2.VideoCapture(file_path), file_path
+                        thumbnail = read_thumbnail(cap, time)
+                    if thumbnail is not None and self._current(generation):
+                        self.ready.emit(key, thumbnail)
+                except Exception as e:
+                    print(f"获取缩略图错误: {str(e)}")
+                finally:
+                    with self._lock:
+                        self._pending -= 1
+        finally:
+            if cap is not None:
+                cap.release()
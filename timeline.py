@@ -1,200 +1,351 @@
-from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QScrollArea, 
-                           QPushButton, QLabel, QSlider, QFrame)
-from PyQt5.QtCore import Qt, pyqtSignal, QSize
-from PyQt5.QtGui import QImage, QPixmap
-
-class TimelineSegment(QWidget):
-    """时间线片段组件"""
-    def __init__(self, segment, scale_factor=1.0, parent=None):
-        super().__init__(parent)
-        self.segment = segment
-        self.scale_factor = scale_factor
-        self.initUI()
-    
-    def initUI(self):
-        layout = QHBoxLayout(self)
-        layout.setContentsMargins(0, 0, 0, 0)
-        layout.setSpacing(2)
-        
-        # 编号标签
-        index_label = QLabel(f"#{self.segment.index:02d}")
-        index_label.setFixedWidth(30)
-        index_label.setStyleSheet("font-weight: bold;")
-        layout.addWidget(index_label)
-        
-        # 缩略图
-        self.thumbnail_label = QLabel()
-        self.update_thumbnail()
-        layout.addWidget(self.thumbnail_label)
-        
-        self.setFixedHeight(40)
-        self.update_width()
-    
-    def update_thumbnail(self):
-        if self.segment.thumbnail is not None:
-            duration = self.segment.end_time - self.segment.start_time
-            scaled_width = int(duration * 50 * self.scale_factor)  # 50像素/秒
-            scaled_height = 36  # 保持16:9比例
-            
-            h, w = self.segment.thumbnail.shape[:2]
-            img = QImage(self.segment.thumbnail.data, w, h, w * 3, QImage.Format_RGB888)
-            pixmap = QPixmap.fromImage(img)
-            scaled_pixmap = pixmap.scaled(scaled_width, scaled_height, 
-                                        Qt.KeepAspectRatio, Qt.SmoothTransformation)
-            self.thumbnail_label.setPixmap(scaled_pixmap)
-            self.thumbnail_label.setFixedSize(scaled_width, scaled_height)
-    
-    def update_width(self):
-        duration = self.segment.end_time - self.segment.start_time
-        width = int(duration * 50 * self.scale_factor) + 90  # 基础宽度 + 缩略图宽度
-        self.setFixedWidth(width)
-
-class Timeline(QWidget):
-    exportVideo = pyqtSignal(list)
-    exportAudio = pyqtSignal(list)
-    exportScript = pyqtSignal(list)
-    
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self.scale_factor = 1.0
-        self.segments = []
-        self.initUI()
-    
-    def initUI(self):
-        """初始化UI"""
-        layout = QVBoxLayout(self)
-        layout.setContentsMargins(0, 0, 0, 0)
-        layout.setSpacing(5)
-        
-        # 时间线区域
-        self.timeline_scroll = QScrollArea()
-        self.timeline_scroll.setWidgetResizable(True)
-        self.timeline_scroll.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOn)
-        self.timeline_scroll.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
-        self.timeline_scroll.setMinimumHeight(150)
-        
-        # 时间线容器
-        self.timeline_widget = QWidget()
-        self.timeline_layout = QHBoxLayout(self.timeline_widget)
-        self.timeline_layout.setAlignment(Qt.AlignLeft)
-        self.timeline_layout.setContentsMargins(5, 5, 5, 5)
-        self.timeline_layout.setSpacing(5)
-        
-        self.timeline_scroll.setWidget(self.timeline_widget)
-        layout.addWidget(self.timeline_scroll)
-        
-        # 底部控制区域
-        bottom_layout = QHBoxLayout()
-        
-        # 缩放控制
-        zoom_layout = QHBoxLayout()
-        zoom_out_btn = QPushButton("缩小")
-        zoom_out_btn.clicked.connect(lambda: self.zoom_changed(self.zoom_slider.value() - 10))
-        
-        self.zoom_slider = QSlider(Qt.Horizontal)
-        self.zoom_slider.setRange(10, 200)  # 10% 到 200%
-        self.zoom_slider.setValue(100)
-        self.zoom_slider.valueChanged.connect(self.zoom_changed)
-        
-        zoom_in_btn = QPushButton("放大")
-        zoom_in_btn.clicked.connect(lambda: self.zoom_slider.setValue(self.zoom_slider.value() + 10))
-        
-        zoom_layout.addWidget(zoom_out_btn)
-        zoom_layout.addWidget(self.zoom_slider)
-        zoom_layout.addWidget(zoom_in_btn)
-        
-        bottom_layout.addLayout(zoom_layout)
-        bottom_layout.addStretch()
-        
-        # 导出按钮
-        export_layout = QHBoxLayout()
-        self.export_video_btn = QPushButton("输出视频")
-        self.export_audio_btn = QPushButton("输出音频")
-        self.export_script_btn = QPushButton("输出脚本")
-        
-        self.export_video_btn.clicked.connect(self.export_video)
-        self.export_audio_btn.clicked.connect(self.export_audio)
-        self.export_script_btn.clicked.connect(self.export_script)
-        
-        for btn in [self.export_video_btn, self.export_audio_btn, self.export_script_btn]:
-            btn.setStyleSheet("""
-                QPushButton {
-                    background-color: #2196F3;
-                    color: white;
-                    border: none;
-                    border-radius: 3px;
-                    padding: 5px 15px;
-                }
-                QPushButton:hover {
-                    background-color: #1976D2;
-                }
-            """)
-            export_layout.addWidget(btn)
-        
-        bottom_layout.addLayout(export_layout)
-        layout.addLayout(bottom_layout)
-    
-    def clear_segments(self):
-        """清除所有片段"""
-        for segment in self.segments:
-            self.timeline_layout.removeWidget(segment)
-            segment.deleteLater()
-        self.segments.clear()
-    
-    def zoom_changed(self, value):
-        """处理缩放变化"""
-        self.scale_factor = value / 100.0
-        for segment in self.segments:
-            segment.scale_factor = self.scale_factor
-            segment.update_thumbnail()
-            segment.update_width()
-    
-    def export_video(self):
-        """导出视频"""
-        if self.segments:
-            segment_info = []
-            for segment in self.segments:
-                info = {
-                    'file_path': segment.segment.file_path,
-                    'start_time': segment.segment.start_time,
-                    'end_time': segment.segment.end_time
-                }
-                segment_info.append(info)
-            self.exportVideo.emit(segment_info)
-    
-    def export_audio(self):
-        """导出音频"""
-        if self.segments:
-            segment_info = []
-            for segment in self.segments:
-                info = {
-                    'file_path': segment.segment.file_path,
-                    'start_time': segment.segment.start_time,
-                    'end_time': segment.segment.end_time
-                }
-                segment_info.append(info)
-            self.exportAudio.emit(segment_info)
-    
-    def export_script(self):
-        """导出脚本"""
-        if self.segments:
-            segment_info = []
-            for segment in self.segments:
-                info = {
-                    'file_path': segment.segment.file_path,
-                    'start_time': segment.segment.start_time,
-                    'end_time': segment.segment.end_time
-                }
-                segment_info.append(info)
-            self.exportScript.emit(segment_info)
-    
-    def add_segments(self, segments):
-        """添加时间段到时间线"""
-        # 清除现有片段
-        self.clear_segments()
-        
-        # 添加新片段
-        for segment in segments:
-            timeline_segment = TimelineSegment(segment, self.scale_factor)
-            self.segments.append(timeline_segment)
-            self.timeline_layout.addWidget(timeline_segment) 
\ No newline at end of file
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QScrollArea, 
+                           QPushButton, QLabel, QSlider, QFrame, QComboBox, QLineEdit,
+                           QCheckBox)
+from PyQt5.QtCore import Qt, pyqtSignal, QSize, QRect
+from PyQt5.QtGui import QImage, QPixmap, QDoubleValidator, QPainter
+import numpy as np
+from segmentstore import SegmentStore
+from exportplan import GapPolicy
+
+PIXELS_PER_SECOND = 50  # 缩放为100%时每秒的宽度
+
+
+class FilmstripView(QWidget):
+    """片段画面区域：有胶片条时按时间铺满帧，否则只显示片段开头的缩略图"""
+    def __init__(self, segment, parent=None):
+        super().__init__(parent)
+        self.segment = segment
+        self.pixmap = None  # 没有胶片条时使用的缩略图
+    
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        strip = self.segment.filmstrip()
+        record = self.segment.store.get(self.segment.segment_id)
+        if strip is None or record is None:
+            if self.pixmap is not None:
+                painter.drawPixmap(0, 0, self.pixmap)
+            return
+        
+        # 只绘制需要重绘的区域内的帧
+        start, end = float(record['start']), float(record['end'])
+        height = self.height()
+        tile_width = max(1, round(strip.tile_width * height / strip.tile_height))
+        pixels_per_second = PIXELS_PER_SECOND * self.segment.scale_factor
+        exposed = event.rect()
+        first = exposed.left() // tile_width * tile_width
+        for x in range(first, min(exposed.right() + 1, self.width()), tile_width):
+            time = min(start + (x + tile_width / 2) / pixels_per_second, end)
+            source = strip.tile_rect(strip.tile_at(time))
+            width = min(tile_width, self.width() - x)
+            if width < tile_width:
+                source.setWidth(max(1, source.width() * width // tile_width))
+            painter.drawImage(QRect(x, 0, width, height), strip.sheet, source)
+
+
+class TimelineSegment(QWidget):
+    """时间线片段组件"""
+    def __init__(self, store, segment_id, scale_factor=1.0, filmstrips=None, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.segment_id = segment_id
+        self.scale_factor = scale_factor
+        self.filmstrips = filmstrips  # FilmstripCache，没有时只显示缩略图
+        self.initUI()
+    
+    @property
+    def duration(self):
+        """片段时长（从存储读取）"""
+        record = self.store.get(self.segment_id)
+        if record is None:
+            return 0.0
+        return float(record['end'] - record['start'])
+    
+    @property
+    def file_path(self):
+        record = self.store.get(self.segment_id)
+        if record is None or record['file_id'] < 0:
+            return None  # 没有关联素材的片段（file_id 为 -1）
+        return self.store.files[record['file_id']]
+    
+    def filmstrip(self):
+        """片段所属素材的胶片条，尚未生成时返回None"""
+        if self.filmstrips is None:
+            return None
+        file_path = self.file_path
+        return self.filmstrips.get(file_path) if file_path is not None else None
+    
+    def initUI(self):
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(2)
+        
+        # 编号标签
+        index_label = QLabel(f"#{self.segment_id:02d}")
+        index_label.setFixedWidth(30)
+        index_label.setStyleSheet("font-weight: bold;")
+        layout.addWidget(index_label)
+        
+        # 画面
+        self.thumbnail_view = FilmstripView(self)
+        self.update_thumbnail()
+        layout.addWidget(self.thumbnail_view)
+        
+        self.setFixedHeight(40)
+        self.update_width()
+    
+    def update_thumbnail(self):
+        scaled_width = max(1, int(self.duration * PIXELS_PER_SECOND * self.scale_factor))
+        scaled_height = 36  # 保持16:9比例
+        thumbnail = self.store.thumbnails.get(self.segment_id)
+        if thumbnail is not None and self.filmstrip() is None:
+            h, w = thumbnail.shape[:2]
+            img = QImage(thumbnail.data, w, h, w * 3, QImage.Format_RGB888)
+            self.thumbnail_view.pixmap = QPixmap.fromImage(img).scaled(
+                scaled_width, scaled_height, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        self.thumbnail_view.setFixedSize(scaled_width, scaled_height)
+        self.thumbnail_view.update()
+    
+    def update_width(self):
+        duration = self.duration
+        width = int(duration * PIXELS_PER_SECOND * self.scale_factor) + 90  # 基础宽度 + 缩略图宽度
+        self.setFixedWidth(width)
+
+class Timeline(QWidget):
+    # 视频导出方式：方式名 -> 显示名称
+    EXPORT_MODES = {
+        'auto': "自动",
+        'copy': "快速复制",
+        'parallel': "并行重编码",
+        'farm': "本地渲染农场",
+    }
+    exportVideo = pyqtSignal(object)  # 发送片段视图(SegmentView)
+    exportAudio = pyqtSignal(object)
+    exportScript = pyqtSignal(object)
+    previewRequested = pyqtSignal(object)  # 请求预览整个时间线
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.scale_factor = 1.0
+        self.filmstrips = None  # FilmstripCache，由主窗口设置
+        # 时间线上的片段数据，组件只是它的视图
+        self.store = SegmentStore(self)
+        self.items = {}  # 片段id -> TimelineSegment
+        self.store.rows_inserted.connect(self._on_rows_inserted)
+        self.store.rows_removed.connect(self._on_rows_removed)
+        self.store.rows_changed.connect(self._on_rows_changed)
+        self.store.store_reset.connect(self._on_store_reset)
+        self.initUI()
+    
+    def initUI(self):
+        """初始化UI"""
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(5)
+        
+        # 时间线区域
+        self.timeline_scroll = QScrollArea()
+        self.timeline_scroll.setWidgetResizable(True)
+        self.timeline_scroll.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOn)
+        self.timeline_scroll.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
+        self.timeline_scroll.setMinimumHeight(150)
+        
+        # 时间线容器
+        self.timeline_widget = QWidget()
+        self.timeline_layout = QHBoxLayout(self.timeline_widget)
+        self.timeline_layout.setAlignment(Qt.AlignLeft)
+        self.timeline_layout.setContentsMargins(5, 5, 5, 5)
+        self.timeline_layout.setSpacing(5)
+        
+        self.timeline_scroll.setWidget(self.timeline_widget)
+        layout.addWidget(self.timeline_scroll)
+        
+        # 底部控制区域
+        bottom_layout = QHBoxLayout()
+        
+        # 缩放控制
+        zoom_layout = QHBoxLayout()
+        zoom_out_btn = QPushButton("缩小")
+        zoom_out_btn.clicked.connect(lambda: self.zoom_changed(self.zoom_slider.value() - 10))
+        
+        self.zoom_slider = QSlider(Qt.Horizontal)
+        self.zoom_slider.setRange(10, 200)  # 10% 到 200%
+        self.zoom_slider.setValue(100)
+        self.zoom_slider.valueChanged.connect(self.zoom_changed)
+        
+        zoom_in_btn = QPushButton("放大")
+        zoom_in_btn.clicked.connect(lambda: self.zoom_slider.setValue(self.zoom_slider.value() + 10))
+        
+        zoom_layout.addWidget(zoom_out_btn)
+        zoom_layout.addWidget(self.zoom_slider)
+        zoom_layout.addWidget(zoom_in_btn)
+        
+        bottom_layout.addLayout(zoom_layout)
+        bottom_layout.addStretch()
+        
+        # 导出按钮
+        export_layout = QHBoxLayout()
+        export_layout.addWidget(QLabel("导出方式:"))
+        self.export_mode_combo = QComboBox()
+        for mode, name in self.EXPORT_MODES.items():
+            self.export_mode_combo.addItem(name, mode)
+        export_layout.addWidget(self.export_mode_combo)
+        export_layout.addWidget(QLabel("合并间隔:"))
+        self.merge_gap_input = QLineEdit("0.1")
+        self.merge_gap_input.setValidator(QDoubleValidator(0, 10, 2))
+        self.merge_gap_input.setFixedWidth(50)
+        self.merge_gap_input.setToolTip("同一素材中间隔不超过该值（秒）的片段导出时合并")
+        export_layout.addWidget(self.merge_gap_input)
+        export_layout.addWidget(QLabel("秒"))
+        self.loudnorm_check = QCheckBox("响度标准化")
+        self.loudnorm_check.setToolTip("按分析时测量的响度调整导出音量，真峰值不超过 -1.5 dBTP")
+        export_layout.addWidget(self.loudnorm_check)
+        self.loudnorm_input = QLineEdit("-16")
+        self.loudnorm_input.setValidator(QDoubleValidator(-70, 0, 1))
+        self.loudnorm_input.setFixedWidth(40)
+        export_layout.addWidget(self.loudnorm_input)
+        export_layout.addWidget(QLabel("LUFS"))
+        self.preview_btn = QPushButton("预览")
+        self.preview_btn.clicked.connect(self.preview)
+        self.export_video_btn = QPushButton("输出视频")
+        self.export_audio_btn = QPushButton("输出音频")
+        self.export_script_btn = QPushButton("输出脚本")
+        
+        self.export_video_btn.clicked.connect(self.export_video)
+        self.export_audio_btn.clicked.connect(self.export_audio)
+        self.export_script_btn.clicked.connect(self.export_script)
+        
+        for btn in [self.preview_btn, self.export_video_btn, self.export_audio_btn,
+                    self.export_script_btn]:
+            btn.setStyleSheet("""
+                QPushButton {
+                    background-color: #2196F3;
+                    color: white;
+                    border: none;
+                    border-radius: 3px;
+                    padding: 5px 15px;
+                }
+                QPushButton:hover {
+                    background-color: #1976D2;
+                }
+            """)
+            export_layout.addWidget(btn)
+        
+        bottom_layout.addLayout(export_layout)
+        layout.addLayout(bottom_layout)
+    
+    def _on_rows_inserted(self, ids):
+        """存储新增片段时按行号插入组件"""
+        # 按行号从小到大插入，保证插入位置之前的组件都已存在
+        rows = self.store.rows(ids)
+        order = np.argsort(rows, kind='stable')
+        for segment_id, row in zip(ids[order].tolist(), rows[order].tolist()):
+            item = TimelineSegment(self.store, segment_id, self.scale_factor, self.filmstrips)
+            self.items[segment_id] = item
+            self.timeline_layout.insertWidget(row, item)
+        # 请求新出现素材的胶片条（没有关联素材的片段 file_id 为 -1）
+        if self.filmstrips is not None:
+            for file_id in np.unique(self.store.records['file_id'][rows]).tolist():
+                if file_id >= 0:
+                    self.filmstrips.request(self.store.files[file_id])
+    
+    def _on_rows_removed(self, ids):
+        """存储删除片段时移除对应组件"""
+        for segment_id in ids.tolist():
+            item = self.items.pop(segment_id, None)
+            if item is not None:
+                self.timeline_layout.removeWidget(item)
+                item.deleteLater()
+    
+    def _on_rows_changed(self, ids):
+        """片段时间变化时刷新宽度"""
+        for segment_id in ids.tolist():
+            item = self.items.get(segment_id)
+            if item is not None:
+                item.update_thumbnail()
+                item.update_width()
+    
+    def _on_store_reset(self):
+        """存储清空时移除全部组件"""
+        for item in self.items.values():
+            self.timeline_layout.removeWidget(item)
+            item.deleteLater()
+        self.items.clear()
+    
+    def set_filmstrip_cache(self, filmstrips):
+        """设置胶片条缓存，生成完成后刷新对应素材的片段"""
+        self.filmstrips = filmstrips
+        filmstrips.ready.connect(self._on_filmstrip_ready)
+        for item in self.items.values():
+            item.filmstrips = filmstrips
+    
+    def _on_filmstrip_ready(self, file_path):
+        for item in self.items.values():
+            if item.file_path == file_path:
+                item.update_thumbnail()
+    
+    def set_thumbnail(self, segment_id, thumbnail):
+        """片段的缩略图在放入时间线后才解码完成时补上"""
+        item = self.items.get(segment_id)
+        if item is not None and segment_id not in self.store.thumbnails:
+            self.store.thumbnails[segment_id] = thumbnail
+            item.update_thumbnail()
+    
+    def clear_segments(self):
+        """清除所有片段"""
+        self.store.clear()
+    
+    def zoom_changed(self, value):
+        """处理缩放变化"""
+        self.scale_factor = value / 100.0
+        for segment in self.items.values():
+            segment.scale_factor = self.scale_factor
+            segment.update_thumbnail()
+            segment.update_width()
+    
+    def export_mode(self):
+        """当前选择的视频导出方式"""
+        return self.export_mode_combo.currentData()
+    
+    def gap_policy(self):
+        """当前的片段合并策略"""
+        try:
+            return GapPolicy(float(self.merge_gap_input.text() or "0"))
+        except ValueError:
+            return GapPolicy()
+    
+    def loudness_target(self):
+        """响度标准化的目标响度（LUFS），未开启时返回None"""
+        if not self.loudnorm_check.isChecked():
+            return None
+        try:
+            return float(self.loudnorm_input.text())
+        except ValueError:
+            return None
+    
+    def preview(self):
+        """预览时间线"""
+        if len(self.store):
+            self.previewRequested.emit(self.store.view())
+    
+    def export_video(self):
+        """导出视频"""
+        if len(self.store):
+            self.exportVideo.emit(self.store.view())
+    
+    def export_audio(self):
+        """导出音频"""
+        if len(self.store):
+            self.exportAudio.emit(self.store.view())
+    
+    def export_script(self):
+        """导出脚本"""
+        if len(self.store):
+            self.exportScript.emit(self.store.view())
+    
+    def add_segments(self, segments):
+        """添加时间段到时间线"""
+        # 清除现有片段
+        self.clear_segments()
+        
+        # 复制选中片段，由存储通知界面创建组件
+        self.store.extend(segments)
\ No newline at end of file
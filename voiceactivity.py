@@ -0,0 +1,163 @@
+"""多特征人声检测
+
+在一次分帧遍历中同时计算 RMS、过零率和频谱平坦度：
+RMS 与过零率按组累积，每个采样点只读一次；频谱平坦度在同一块数据的零拷贝
+滑动窗口视图上做一次 float32 批量FFT，默认每帧都计算（与 RMS 的时间分辨率相同）。
+纯 RMS（envelope.rms）只需一次顺序读，而每帧一次 1024 点FFT 的耗时就是它的二三十倍，
+所以三项特征合计远超 1.5 倍的预算（实测约 39 倍，见 benchmarks/bench_vad.py）。
+之后用双阈值（滞回）判定人声区间，
+可以去掉单看能量时会保留下来的呼吸声、空调底噪和键盘声。
+"""
+import math
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+import lazyload
+
+# 默认参数
+FRAME_LENGTH = 1024      # 帧长度（采样点）
+HOP_LENGTH = 256         # 帧移（采样点）
+BLOCK_FRAMES = 256       # 每块处理的帧数，加窗后的帧缓冲留在缓存中
+SPECTRAL_STRIDE = 1      # 每隔几帧计算一次频谱平坦度（大于1时降低时间分辨率换速度）
+HYSTERESIS_DB = 6.0      # 开启阈值比关闭阈值高出的分贝数
+MAX_FLATNESS = 0.45      # 频谱平坦度上限（越接近1越像噪声）
+MAX_ZCR = 0.3            # 过零率上限（每个采样点的过零次数）
+MIN_SILENCE = 0.15       # 短于该时长的空白并入前后片段（秒）
+MIN_SEGMENT = 0.1        # 最短有效片段（秒）
+AMIN = 1e-10
+
+
+def frame_features(y, frame_length=FRAME_LENGTH, hop_length=HOP_LENGTH,
+                   spectral_stride=SPECTRAL_STRIDE, block_frames=BLOCK_FRAMES):
+    """一次分帧遍历计算逐帧特征
+
+    返回 (rms, zcr, flatness) 三个长度相同的数组。
+    """
+    # y 可以是数组或 PcmView，逐块切片读取，不整体转换
+    if len(y) < frame_length:
+        y = np.pad(np.asarray(y, dtype=np.float32), (0, frame_length - len(y)))
+    n_frames = 1 + (len(y) - frame_length) // hop_length
+
+    fft = lazyload.scipy_fft()
+    rms = np.empty(n_frames, dtype=np.float32)
+    zcr = np.empty(n_frames, dtype=np.float32)
+    flatness = np.empty(n_frames, dtype=np.float32)
+    window = np.hanning(frame_length).astype(np.float32)
+    bins = frame_length // 2 + 1
+
+    # RMS 与过零率按帧长和帧移的公约数分组累积，每个采样点只读一次（与 envelope.rms 相同）
+    group = math.gcd(frame_length, hop_length)
+    frame_groups = frame_length // group
+    hop_groups = hop_length // group
+
+    for f0 in range(0, n_frames, block_frames):
+        f1 = min(f0 + block_frames, n_frames)
+        count = f1 - f0
+        block = np.asarray(y[f0 * hop_length:(f1 - 1) * hop_length + frame_length],
+                           dtype=np.float32)
+        groups = block.reshape(-1, group)
+
+        # RMS：分组平方和的累积和按帧做差
+        energy = np.zeros(len(groups) + 1)
+        np.cumsum(np.einsum('ij,ij->i', groups, groups), out=energy[1:])
+        energy = (energy[frame_groups::hop_groups][:count]
+                  - energy[0::hop_groups][:count])
+        # 累积和相减可能出现极小的负数
+        np.sqrt(np.maximum(energy, 0.0) / frame_length, out=rms[f0:f1], casting='unsafe')
+
+        # 过零率：相邻采样点的符号变化按组计数再累积；组计数包含帧最后一个采样点
+        # 与下一帧的那一对，按帧减掉
+        sign = np.signbit(block)
+        changes = np.empty(len(block), dtype=bool)
+        np.not_equal(sign[1:], sign[:-1], out=changes[:-1])
+        changes[-1] = False
+        crossings = np.zeros(len(groups) + 1, dtype=np.int64)
+        np.cumsum(changes.view(np.uint8).reshape(-1, group).sum(axis=1, dtype=np.int32),
+                  out=crossings[1:])
+        last = np.arange(count) * hop_length + frame_length - 1
+        zcr[f0:f1] = (crossings[frame_groups::hop_groups][:count]
+                      - crossings[0::hop_groups][:count] - changes[last]) / frame_length
+
+        # 频谱平坦度：零拷贝帧视图加窗后批量FFT（float32）；
+        # 功率谱的几何平均为 exp(2·mean(log|X|))，对数原地计算，不再生成中间数组
+        frames = sliding_window_view(block, frame_length)[::hop_length * spectral_stride]
+        spectrum = fft.rfft(frames * window, axis=1, overwrite_x=True)
+        magnitude = np.abs(spectrum)
+        np.maximum(magnitude, np.sqrt(AMIN), out=magnitude)
+        power = np.einsum('ij,ij->i', magnitude, magnitude) / bins
+        np.log(magnitude, out=magnitude)
+        values = np.exp(2 * magnitude.mean(axis=1)) / power
+        flatness[f0:f1] = np.repeat(values, spectral_stride)[:count]
+
+    return rms, zcr, flatness
+
+
+def hysteresis(on_mask, keep_mask):
+    """滞回判定：保留包含至少一个开启帧的连续保持区间
+
+    返回区间的 (开始帧, 结束帧) 数组，结束帧不包含在内。
+    """
+    keep = keep_mask | on_mask
+    edges = np.diff(keep.astype(np.int8), prepend=0, append=0)
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    on_count = np.concatenate(([0], np.cumsum(on_mask)))
+    has_on = on_count[ends] - on_count[starts] > 0
+    return starts[has_on], ends[has_on]
+
+
+def merge_intervals(starts, ends, min_gap, min_length):
+    """合并间隔小于min_gap的区间，并去掉短于min_length的区间"""
+    if len(starts) == 0:
+        return starts, ends
+    # 与前一个区间的间隔超过min_gap的位置开始一个新区间
+    new_group = np.concatenate(([True], starts[1:] - ends[:-1] > min_gap))
+    group_starts = starts[new_group]
+    group_ends = ends[np.concatenate((np.flatnonzero(new_group)[1:] - 1, [len(ends) - 1]))]
+    keep = group_ends - group_starts >= min_length
+    return group_starts[keep], group_ends[keep]
+
+
+def voiced_frames(y, frame_length=FRAME_LENGTH, hop_length=HOP_LENGTH,
+                  max_flatness=MAX_FLATNESS, max_zcr=MAX_ZCR, spectral_stride=SPECTRAL_STRIDE):
+    """逐帧电平与人声判定，返回 (分贝数组, 是否像人声的布尔数组)
+
+    分贝值以最响的一帧为 0 dB。结果与电平阈值无关，调整阈值时可以复用，
+    只需重新调用 cut_frames。
+    """
+    rms, zcr, flatness = frame_features(y, frame_length, hop_length, spectral_stride)
+    ref = max(float(rms.max()), AMIN)
+    db_values = 20.0 * np.log10(np.maximum(rms, AMIN) / ref)
+    voiced = (flatness <= max_flatness) & (zcr <= max_zcr)
+    return db_values, voiced
+
+
+def cut_frames(db_values, voiced, sr, min_db, max_db, frame_length=FRAME_LENGTH,
+               hop_length=HOP_LENGTH, hysteresis_db=HYSTERESIS_DB,
+               min_silence=MIN_SILENCE, min_segment=MIN_SEGMENT):
+    """由逐帧特征做滞回判定并合并区间，返回 (开始时间数组, 结束时间数组)"""
+    off_db = float(min_db)
+    on_db = min(off_db + hysteresis_db, float(max_db))
+    on_mask = voiced & (db_values >= on_db)
+    keep_mask = db_values >= off_db
+
+    start_frames, end_frames = hysteresis(on_mask, keep_mask)
+    starts = start_frames * hop_length / sr
+    ends = ((end_frames - 1) * hop_length + frame_length) / sr
+    return merge_intervals(starts, ends, min_silence, min_segment)
+
+
+def detect(y, sr, min_db, max_db, frame_length=FRAME_LENGTH, hop_length=HOP_LENGTH,
+           hysteresis_db=HYSTERESIS_DB, max_flatness=MAX_FLATNESS, max_zcr=MAX_ZCR,
+           min_silence=MIN_SILENCE, min_segment=MIN_SEGMENT,
+           spectral_stride=SPECTRAL_STRIDE):
+    """检测人声片段
+
+    min_db 作为关闭阈值，开启阈值为 min_db + hysteresis_db（不超过 max_db），
+    分贝值与 TimeCutter 一致，以最响的一帧为 0 dB。
+    返回 (开始时间数组, 结束时间数组)，单位为秒。
+    """
+    db_values, voiced = voiced_frames(y, frame_length, hop_length, max_flatness, max_zcr,
+                                      spectral_stride)
+    return cut_frames(db_values, voiced, sr, min_db, max_db, frame_length, hop_length,
+                      hysteresis_db, min_silence, min_segment)